@@ -26,6 +26,8 @@ pip install -r requirements.txt -t package/
 # 2. デプロイパッケージの作成
 echo -e "${YELLOW}2. デプロイパッケージを作成中...${NC}"
 cp scraper_function.py package/
+# 検索結果のパーサーはpython-backendと共通
+cp ../python-backend/app/search_parser.py package/
 cd package
 zip -r ../deployment.zip .
 cd ..
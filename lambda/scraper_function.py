@@ -12,6 +12,8 @@ from selenium.webdriver.support import expected_conditions as EC
 import requests
 from typing import List, Dict, Any
 
+import search_parser
+
 def get_chrome_driver():
     """Chrome WebDriverの設定"""
     chrome_options = Options()
@@ -51,63 +53,29 @@ def scrape_amazon(keyword: str, max_pages: int = 3) -> List[Dict[str, Any]]:
                 EC.presence_of_element_located((By.CSS_SELECTOR, '[data-component-type="s-search-result"]'))
             )
             
-            items = driver.find_elements(By.CSS_SELECTOR, '[data-component-type="s-search-result"]')
+            # カードの解析はpython-backendと共通のパーサーを使う（deploy.shでパッケージにコピー）
+            cards = search_parser.parse_cards(driver.page_source, fallback_to_data_asin=False)
+            cards = [card for card in cards if card['asin']][:10]  # 各ページ最大10商品
             
-            for item in items[:10]:  # 各ページ最大10商品
-                try:
-                    # タイトル
-                    title_elem = item.find_element(By.CSS_SELECTOR, 'h2 a span')
-                    title = title_elem.text
-                    
-                    # URL
-                    url_elem = item.find_element(By.CSS_SELECTOR, 'h2 a')
-                    url = url_elem.get_attribute('href')
-                    if not url.startswith('http'):
-                        url = base_url + url
-                    
-                    # 価格
-                    try:
-                        price_elem = item.find_element(By.CSS_SELECTOR, 'span.a-price-whole')
-                        price_text = price_elem.text.replace(',', '').replace('￥', '')
-                        price = int(price_text)
-                    except:
-                        price = None
-                    
-                    # 画像
-                    try:
-                        img_elem = item.find_element(By.CSS_SELECTOR, 'img.s-image')
-                        image_url = img_elem.get_attribute('src')
-                    except:
-                        image_url = None
-                    
-                    # レビュー数
-                    try:
-                        review_elem = item.find_element(By.CSS_SELECTOR, 'span.a-size-base.s-underline-text')
-                        review_count = int(review_elem.text.replace(',', ''))
-                    except:
-                        review_count = 0
-                    
-                    # 評価
-                    try:
-                        rating_elem = item.find_element(By.CSS_SELECTOR, 'span.a-icon-alt')
-                        rating_text = rating_elem.get_attribute('textContent')
-                        rating = float(rating_text.split(' ')[0])
-                    except:
-                        rating = None
-                    
-                    products.append({
-                        'title': title,
-                        'url': url,
-                        'price': price,
-                        'image_url': image_url,
-                        'review_count': review_count,
-                        'rating': rating,
-                        'scraped_at': datetime.now().isoformat()
-                    })
-                    
-                except Exception as e:
-                    print(f"商品解析エラー: {e}")
+            for card, product in zip(cards, map(search_parser.extract_default, cards)):
+                if not product.get('title'):
+                    print(f"商品解析エラー: タイトルが見つかりません ({card['asin']})")
                     continue
+                
+                # URL
+                url = card['detail_url'] or f"/dp/{card['asin']}"
+                if not url.startswith('http'):
+                    url = base_url + url
+                
+                products.append({
+                    'title': product['title'],
+                    'url': url,
+                    'price': product['price'],
+                    'image_url': product.get('image_url'),
+                    'review_count': product.get('review_count', 0),
+                    'rating': product.get('review_avg'),
+                    'scraped_at': datetime.now().isoformat()
+                })
             
     finally:
         driver.quit()
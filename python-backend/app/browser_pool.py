@@ -0,0 +1,322 @@
+"""
+Chromeドライバーのプールとホスト単位のレート制御
+
+AmazonScraperはリクエストごとにプールからドライバーを借りて返す。
+プールはプロセス全体で1つ（get_browser_pool）で、すべてのエンドポイント・カテゴリ別スクレイパーが共有する。
+レートリミッターはプール全体で共有し、ホストごとに流量を制御する。
+
+- 起動時に prewarm でドライバーを起動しておく（スクレイピングのたびにChromeを起動しない）
+- 貸し出し前に応答を確認し、クラッシュしたドライバーは作り直す
+- SCRAPER_DRIVER_MAX_PAGES 回貸し出したドライバー、Chromeのメモリ使用量が
+  SCRAPER_DRIVER_MAX_RSS_MB を超えたドライバーは返却時に終了して作り直す
+- 終了時は quit に失敗しても残ったChromeのプロセスを終了させる（psutilがある場合）
+"""
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+import undetected_chromedriver as uc
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+from .scraper_executor import get_scraper_executor, run_in_scraper_thread
+
+
+# 解析に使わないリソース（画像・フォント・CSS・動画・広告や計測のスクリプト）はChromeに読み込ませない
+BLOCKED_URL_PATTERNS = [
+    '*.jpg*', '*.jpeg*', '*.png*', '*.gif*', '*.webp*', '*.svg*', '*.ico*',
+    '*.woff*', '*.ttf*', '*.otf*', '*.eot*',
+    '*.css*',
+    '*.mp4*', '*.webm*', '*.m3u8*',
+    '*amazon-adsystem.com*', '*doubleclick.net*', '*googlesyndication.com*',
+    '*fls-fe.amazon*', '*unagi.amazon*', '*/rd/uedata*',
+]
+
+
+def create_chrome_driver(block_resources: Optional[bool] = None, page_load_strategy: str = 'eager'):
+    """スクレイピング用のChromeドライバーを生成
+
+    page_load_strategy='eager' ではDOMの構築が終わった時点でdriver.getが戻る
+    （商品カードや商品名の表示はAmazonScraper側で要素の出現を待つ）。
+    """
+    if block_resources is None:
+        block_resources = os.getenv('SCRAPER_BLOCK_RESOURCES', 'true').lower() != 'false'
+    options = uc.ChromeOptions()
+    options.page_load_strategy = page_load_strategy
+    options.add_argument('--headless=new')  # 新しいヘッドレスモード
+    options.add_argument('--lang=ja-JP')
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-dev-shm-usage')
+    options.add_argument('--disable-blink-features=AutomationControlled')
+    # より一般的なUser-Agentを設定
+    options.add_argument('--user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
+    prefs = {"intl.accept_languages": "ja,ja-JP"}
+    if block_resources:
+        prefs["profile.managed_default_content_settings.images"] = 2
+        options.add_argument('--blink-settings=imagesEnabled=false')
+    options.add_experimental_option("prefs", prefs)
+
+    driver = uc.Chrome(options=options, version_main=141)
+    if block_resources:
+        # CDPでURLパターンに一致するリクエストを送信前に遮断する
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': BLOCKED_URL_PATTERNS})
+    return driver
+
+
+class TokenBucket:
+    """トークンバケット方式のレートリミッター"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate  # 1秒あたりに補充されるトークン数
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+        self._loop = None
+
+    def _get_lock(self) -> asyncio.Lock:
+        # Lambdaなどでasyncio.runが複数回呼ばれてもロックが使えるようにループごとに作り直す
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    async def acquire(self) -> None:
+        """トークンを1つ取得する（足りない場合は補充されるまで待機）"""
+        async with self._get_lock():
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                wait_time = (1 - self.tokens) / self.rate
+                print(f"Rate limiting: waiting {wait_time:.1f}s")
+                await asyncio.sleep(wait_time)
+
+
+class HostRateLimiter:
+    """ホストごとにトークンバケットを持つレートリミッター"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.buckets: Dict[str, TokenBucket] = {}
+
+    async def acquire(self, url: str) -> None:
+        host = urlparse(url).netloc
+        bucket = self.buckets.get(host)
+        if bucket is None:
+            bucket = TokenBucket(self.rate, self.capacity)
+            self.buckets[host] = bucket
+        await bucket.acquire()
+
+
+def _driver_processes(driver) -> List[Any]:
+    """chromedriver・Chrome本体（undetected_chromedriverは別プロセスとして起動する）とその子プロセス"""
+    if not PSUTIL_AVAILABLE:
+        return []
+    pids = [getattr(getattr(getattr(driver, 'service', None), 'process', None), 'pid', None),
+            getattr(driver, 'browser_pid', None)]
+    processes = []
+    for pid in pids:
+        if not pid:
+            continue
+        try:
+            process = psutil.Process(pid)
+            processes += [process] + process.children(recursive=True)
+        except psutil.Error:
+            pass
+    return processes
+
+
+def driver_rss_mb(driver) -> float:
+    """ドライバーのプロセスツリーのRSS合計（MB、psutilがなければ0）"""
+    rss = 0
+    for process in _driver_processes(driver):
+        try:
+            rss += process.memory_info().rss
+        except psutil.Error:
+            pass
+    return rss / 1024 / 1024
+
+
+class BrowserPool:
+    """最大size個のドライバーを保持し、リクエストごとに貸し出すプール"""
+
+    def __init__(self, size: int, driver_factory: Callable[[], Any] = create_chrome_driver,
+                 max_pages: Optional[int] = None, max_rss_mb: Optional[float] = None):
+        self.size = max(1, size)
+        self.driver_factory = driver_factory
+        # 0以下なら作り直さない
+        self.max_pages = max_pages if max_pages is not None else int(os.getenv('SCRAPER_DRIVER_MAX_PAGES', '200'))
+        self.max_rss_mb = max_rss_mb if max_rss_mb is not None else float(os.getenv('SCRAPER_DRIVER_MAX_RSS_MB', '1500'))
+        self._idle: List[Any] = []
+        self._all: List[Any] = []
+        self._pages: Dict[int, int] = {}  # id(driver) -> 貸し出し回数
+        self._counters = {'started': 0, 'recycled': 0, 'unhealthy': 0, 'leases': 0}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop = None
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.size)
+        return self._semaphore
+
+    async def _start_driver(self):
+        # Chromeの起動は重いのでイベントループを止めないようにスレッドで実行
+        driver = await run_in_scraper_thread(self.driver_factory)
+        self._all.append(driver)
+        self._pages[id(driver)] = 0
+        self._counters['started'] += 1
+        print(f"[DEBUG] Browser pool: started driver {len(self._all)}/{self.size}")
+        return driver
+
+    async def _acquire_driver(self):
+        """アイドルのドライバー（応答しなければ作り直す）か新しいドライバーを返す"""
+        while self._idle:
+            driver = self._idle.pop()
+            if await run_in_scraper_thread(self._is_healthy, driver):
+                return driver
+            print("[WARNING] Browser pool: driver is not responding, restarting")
+            self._counters['unhealthy'] += 1
+            self._discard(driver)
+        return await self._start_driver()
+
+    def _discard(self, driver) -> None:
+        """プールから外してスクレイピング用スレッドで終了させる"""
+        self._all.remove(driver)
+        self._pages.pop(id(driver), None)
+        get_scraper_executor().submit(self._quit_driver, driver)
+
+    def _should_recycle(self, driver) -> Optional[str]:
+        """作り直す理由（不要ならNone）"""
+        pages = self._pages.get(id(driver), 0)
+        if self.max_pages > 0 and pages >= self.max_pages:
+            return f"{pages} pages"
+        if self.max_rss_mb > 0 and PSUTIL_AVAILABLE:
+            rss = driver_rss_mb(driver)
+            if rss > self.max_rss_mb:
+                return f"RSS {rss:.0f} MB"
+        return None
+
+    @asynccontextmanager
+    async def lease(self):
+        """ドライバーを1つ借りる（使い終わったらプールに戻す）"""
+        async with self._get_semaphore():
+            driver = await self._acquire_driver()
+            self._pages[id(driver)] += 1
+            self._counters['leases'] += 1
+            cancelled = False
+            try:
+                yield driver
+            except asyncio.CancelledError:
+                cancelled = True
+                raise
+            finally:
+                if cancelled:
+                    # タイムアウトでキャンセルされた場合はスレッド側でまだドライバーを使っている可能性があるので、
+                    # プールに戻さずに終了させる（次に借りるときに新しいドライバーが起動される）
+                    self._discard(driver)
+                else:
+                    reason = await run_in_scraper_thread(self._should_recycle, driver)
+                    if reason:
+                        print(f"[INFO] Browser pool: recycling driver after {reason}")
+                        self._counters['recycled'] += 1
+                        self._discard(driver)
+                    else:
+                        self._idle.append(driver)
+
+    async def prewarm(self, count: Optional[int] = None) -> int:
+        """count個（省略時はsize個）のドライバーを起動してアイドルにしておく。起動できた数を返す"""
+        count = min(self.size, count if count is not None else self.size)
+
+        async def start_one() -> bool:
+            try:
+                async with self._get_semaphore():
+                    self._idle.append(await self._acquire_driver())
+                return True
+            except Exception as e:
+                print(f"[WARNING] Browser pool: prewarm failed: {str(e)}")
+                return False
+
+        started = sum(await asyncio.gather(*(start_one() for _ in range(count))))
+        print(f"[INFO] Browser pool: prewarmed {started}/{count} drivers")
+        return started
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'size': self.size,
+            'running': len(self._all),
+            'idle': len(self._idle),
+            'pages': sum(self._pages.values()),
+            **self._counters,
+        }
+
+    async def close(self) -> None:
+        """プール内の全ドライバーを終了する"""
+        drivers, self._all, self._idle = self._all, [], []
+        self._pages = {}
+        for driver in drivers:
+            await run_in_scraper_thread(self._quit_driver, driver)
+
+    @staticmethod
+    def _is_healthy(driver) -> bool:
+        try:
+            return bool(driver.window_handles)
+        except Exception:
+            return False
+
+    @staticmethod
+    def _quit_driver(driver) -> None:
+        # quitに失敗したりChromeが残ったりしてもプロセスが溜まらないように、先にプロセスツリーを控えておく
+        processes = _driver_processes(driver)
+        try:
+            driver.quit()
+        except Exception as e:
+            print(f"[ERROR] Failed to quit driver: {str(e)}")
+        for process in processes:
+            try:
+                if process.is_running():
+                    process.kill()
+            except psutil.Error:
+                pass
+
+
+# プロセス全体で共有するプールとレートリミッター
+_browser_pool: Optional[BrowserPool] = None
+
+host_rate_limiter = HostRateLimiter(
+    rate=float(os.getenv('SCRAPER_RATE_PER_SEC', '0.5')),
+    capacity=float(os.getenv('SCRAPER_RATE_BURST', '2'))
+)
+
+
+def get_browser_pool() -> BrowserPool:
+    """共有ブラウザプールを取得（初回呼び出し時に作成）"""
+    global _browser_pool
+    if _browser_pool is None:
+        _browser_pool = BrowserPool(int(os.getenv('SCRAPER_POOL_SIZE', '2')))
+    return _browser_pool
+
+
+async def prewarm_browser_pool() -> None:
+    """アプリ起動時に共有プールのドライバーを起動しておく（SCRAPER_PREWARM_DRIVERS=0で無効）"""
+    pool = get_browser_pool()
+    count = int(os.getenv('SCRAPER_PREWARM_DRIVERS', str(pool.size)))
+    if count > 0:
+        await pool.prewarm(count)
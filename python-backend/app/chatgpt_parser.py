@@ -1,108 +1,306 @@
 import os
+import asyncio
+import random
+import openai
 from openai import AsyncOpenAI
-from typing import Dict, Optional, Any
+from typing import Dict, List, Optional, Any, Awaitable, Callable
 import json
 import re
-from app.prompts import toilet_paper, dishwashing_liquid, mask
+from app.prompts import toilet_paper, dishwashing_liquid, mask, batch
+from app.extraction_cache import ExtractionCache, get_extraction_cache, prompt_version
+from app.rule_extraction import resolve_locally
+
+# 抽出キャッシュのキーに使うプロンプトのバージョン（プロンプトを変更すると以前の結果は使われなくなる）
+TOILET_PAPER_VERSION = prompt_version(toilet_paper.PROMPT, toilet_paper.FIELDS)
+DISHWASHING_VERSION = prompt_version(dishwashing_liquid.PROMPT, dishwashing_liquid.FIELDS)
+MASK_VERSION = prompt_version(mask.SYSTEM_PROMPT, mask.USER_PROMPT_TEMPLATE, mask.FIELDS)
+
+# 一時的なエラー（レート制限・接続エラー・タイムアウト・5xx）はバックオフして再試行する
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APIConnectionError,
+    openai.APITimeoutError,
+    openai.InternalServerError,
+)
 
 class ChatGPTParser:
     def __init__(self):
         api_key = os.getenv('OPENAI_API_KEY')
         if not api_key:
             raise ValueError("OPENAI_API_KEY environment variable is required")
-        self.client = AsyncOpenAI(api_key=api_key)
-    
-    async def _extract_with_prompt(self, title: str, description: str, 
+        # 再試行は_chatで行う（OPENAI_BASE_URLでローカルの代替サーバーにも向けられる）
+        self.client = AsyncOpenAI(api_key=api_key, max_retries=0)
+        self.model = "gpt-4o-mini"
+        # 同時に送るリクエスト数の上限
+        self.max_concurrency = max(1, int(os.getenv('GPT_MAX_CONCURRENCY', '8')))
+        # まとめて抽出するときに1リクエストに含める商品数
+        self.batch_size = max(1, int(os.getenv('GPT_BATCH_SIZE', '20')))
+        self.max_retries = int(os.getenv('GPT_MAX_RETRIES', '4'))
+        self.retry_base_delay = float(os.getenv('GPT_RETRY_BASE_DELAY', '1.0'))
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop = None
+        # 同じテキストの抽出結果を使い回す（メモリ上のLRU＋SQLite）
+        self.cache = get_extraction_cache()
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # Lambdaなどでasyncio.runが複数回呼ばれても使えるようにループごとに作り直す
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def _chat(self, messages: List[Dict[str, str]], max_tokens: int = 200) -> str:
+        """チャット補完を実行して本文を返す（同時実行数を制限し、一時的なエラーは指数バックオフで再試行）"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self._get_semaphore():
+                    response = await self.client.chat.completions.create(
+                        model=self.model,
+                        messages=messages,
+                        temperature=0.1,
+                        max_tokens=max_tokens
+                    )
+                return response.choices[0].message.content
+            except RETRYABLE_ERRORS as e:
+                if attempt >= self.max_retries:
+                    raise
+                # ジッターを入れて同時に失敗したリクエストの再試行が重ならないようにする
+                wait_time = self.retry_base_delay * (2 ** attempt) * random.uniform(0.5, 1.5)
+                print(f"[WARNING] OpenAI request failed ({type(e).__name__}), retrying in {wait_time:.1f}s ({attempt + 1}/{self.max_retries})")
+                await asyncio.sleep(wait_time)
+
+    @staticmethod
+    def _type_key(product_type: str) -> str:
+        return product_type.lower().replace(' ', '_')
+
+    def _cache_key(self, product_type: str, version: str, title: str, description: str) -> str:
+        return ExtractionCache.make_key(self._type_key(product_type), version, title, description)
+
+    async def _extract_with_prompt(self, title: str, description: str,
                                    prompt_template: str, expected_fields: Dict[str, Any],
-                                   product_type: str) -> Dict[str, Any]:
-        """共通の抽出処理"""
+                                   product_type: str, version: str) -> Dict[str, Any]:
+        """共通の抽出処理（商品名から確実に抽出できる場合・キャッシュ済みの場合はGPTを呼ばない）"""
+        local = resolve_locally(self._type_key(product_type), title)
+        if local is not None:
+            return local
+
+        cache_key = self._cache_key(product_type, version, title, description)
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            return cached
+
         combined_text = f"商品名: {title}\n商品説明: {description}"
         prompt = prompt_template.format(combined_text=combined_text)
-        
+
         try:
-            response = await self.client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": "あなたは商品情報を正確に抽出する専門家です。"},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.1,
-                max_tokens=200
-            )
-            
-            content = response.choices[0].message.content
-            
+            content = await self._chat([
+                {"role": "system", "content": "あなたは商品情報を正確に抽出する専門家です。"},
+                {"role": "user", "content": prompt}
+            ])
+
             # JSON部分のみを抽出
             json_match = re.search(r'\{.*\}', content, re.DOTALL)
             if json_match:
                 result = json.loads(json_match.group())
             else:
                 result = json.loads(content)
-            
+
             # 期待されるフィールドのみを返す（デフォルト値付き）
             extracted = {}
             for field, default_value in expected_fields.items():
                 extracted[field] = result.get(field, default_value)
-            
+
             print(f"{product_type} extracted from '{title[:50]}...': {extracted}")
+            self.cache.set(cache_key, product_type, extracted)
             return extracted
-            
+
         except Exception as e:
             print(f"ChatGPT extraction error for {product_type}: {str(e)}")
             # エラー時はデフォルト値を返す
             return expected_fields.copy()
-    
+
+    async def _extract_batch(self, products: List[Dict[str, Any]], instructions: str,
+                             expected_fields: Dict[str, Any], product_type: str, version: str,
+                             extract_one: Callable[[str, str], Awaitable[Dict[str, Any]]]) -> Dict[str, Dict[str, Any]]:
+        """batch_size件ずつ1リクエストにまとめて抽出し、ASINをキーにした結果を返す
+
+        商品名から確実に抽出できる商品と抽出キャッシュにある商品は送らない。
+        各バッチは同時に送る（同時実行数は_chatで制限）。
+        応答に含まれなかった商品やバッチ全体が失敗した場合は1件ずつの抽出に切り替える。
+        """
+        results: Dict[str, Dict[str, Any]] = {}
+        cache_keys: Dict[str, str] = {}
+        first_asin_by_key: Dict[str, str] = {}
+        duplicates: Dict[str, str] = {}  # 同じテキストの商品は1件だけ送り、結果を共有する
+        pending = []
+        for product in products:
+            if not product.get('asin'):
+                continue
+            local = resolve_locally(self._type_key(product_type), product.get('title') or '')
+            if local is not None:
+                results[product['asin']] = local
+                continue
+            cache_key = self._cache_key(product_type, version, product.get('title') or '', product.get('description') or '')
+            if cache_key in first_asin_by_key:
+                duplicates[product['asin']] = first_asin_by_key[cache_key]
+                continue
+            first_asin_by_key[cache_key] = product['asin']
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                results[product['asin']] = cached
+            else:
+                cache_keys[product['asin']] = cache_key
+                pending.append(product)
+        chunks = [pending[start:start + self.batch_size] for start in range(0, len(pending), self.batch_size)]
+
+        async def extract_chunk(chunk: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+            items = [
+                {
+                    'asin': product['asin'],
+                    'title': product.get('title') or '',
+                    'description': (product.get('description') or '')[:batch.MAX_DESCRIPTION_CHARS]
+                }
+                for product in chunk
+            ]
+            prompt = batch.BATCH_PROMPT.format(
+                instructions=instructions,
+                items=json.dumps(items, ensure_ascii=False, indent=1),
+                fields=', '.join(expected_fields),
+                example=', '.join(f'"{field}": ...' for field in expected_fields)
+            )
+
+            results: Dict[str, Dict[str, Any]] = {}
+            try:
+                content = await self._chat([
+                    {"role": "system", "content": "あなたは商品情報を正確に抽出する専門家です。"},
+                    {"role": "user", "content": prompt}
+                ], max_tokens=100 + 60 * len(chunk))
+
+                # JSON配列部分のみを抽出
+                json_match = re.search(r'\[.*\]', content, re.DOTALL)
+                rows = json.loads(json_match.group() if json_match else content)
+                requested = {product['asin'] for product in chunk}
+                for row in rows:
+                    if isinstance(row, dict) and row.get('asin') in requested:
+                        results[row['asin']] = {
+                            field: row.get(field, default_value)
+                            for field, default_value in expected_fields.items()
+                        }
+                        self.cache.set(cache_keys[row['asin']], product_type, results[row['asin']])
+            except Exception as e:
+                print(f"ChatGPT batch extraction error for {product_type} ({len(chunk)} products): {str(e)}")
+
+            missing = [product for product in chunk if product['asin'] not in results]
+            if missing:
+                print(f"[INFO] {len(missing)}/{len(chunk)} {product_type} products missing from batch response, extracting one by one")
+                extracted = await asyncio.gather(*(
+                    extract_one(product.get('title') or '', product.get('description') or '')
+                    for product in missing
+                ))
+                for product, info in zip(missing, extracted):
+                    results[product['asin']] = info
+            return results
+
+        for chunk_results in await asyncio.gather(*(extract_chunk(chunk) for chunk in chunks)):
+            results.update(chunk_results)
+        for asin, first_asin in duplicates.items():
+            if first_asin in results:
+                results[asin] = dict(results[first_asin])
+        print(f"{product_type} batch extraction: {len(results)} products ({len(results) - len(pending)} resolved locally, cached or duplicate) in {len(chunks)} requests")
+        return results
+
     async def extract_info(self, title: str, description: str = '') -> Dict[str, Optional[float]]:
         """トイレットペーパーの商品情報を抽出"""
         extracted_info = await self._extract_with_prompt(
-            title, description, 
-            toilet_paper.PROMPT, 
+            title, description,
+            toilet_paper.PROMPT,
             toilet_paper.FIELDS,
-            "Toilet paper"
+            "Toilet paper",
+            TOILET_PAPER_VERSION
         )
         return toilet_paper.post_process(extracted_info)
-    
+
+    async def extract_info_batch(self, products: List[Dict[str, Any]]) -> Dict[str, Dict[str, Optional[float]]]:
+        """複数のトイレットペーパー商品の情報をまとめて抽出（ASINをキーにした辞書を返す）"""
+        results = await self._extract_batch(
+            products,
+            toilet_paper.PROMPT.format(combined_text=batch.ITEMS_PLACEHOLDER),
+            toilet_paper.FIELDS,
+            "Toilet paper",
+            TOILET_PAPER_VERSION,
+            self.extract_info
+        )
+        return {asin: toilet_paper.post_process(info) for asin, info in results.items()}
+
     async def extract_dishwashing_info(self, title: str, description: str = '') -> Dict[str, Any]:
         """食器用洗剤の商品情報を抽出"""
         extracted_info = await self._extract_with_prompt(
             title, description,
             dishwashing_liquid.PROMPT,
             dishwashing_liquid.FIELDS,
-            "Dishwashing liquid"
+            "Dishwashing liquid",
+            DISHWASHING_VERSION
         )
         return dishwashing_liquid.post_process(extracted_info)
-    
+
+    async def extract_dishwashing_info_batch(self, products: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """複数の食器用洗剤商品の情報をまとめて抽出（ASINをキーにした辞書を返す）"""
+        results = await self._extract_batch(
+            products,
+            dishwashing_liquid.PROMPT.format(combined_text=batch.ITEMS_PLACEHOLDER),
+            dishwashing_liquid.FIELDS,
+            "Dishwashing liquid",
+            DISHWASHING_VERSION,
+            self.extract_dishwashing_info
+        )
+        return {asin: dishwashing_liquid.post_process(info) for asin, info in results.items()}
+
     async def extract_mask_info(self, title: str, description: str = '') -> Dict[str, Any]:
         """マスクの商品情報を抽出"""
+        local = resolve_locally('mask', title)
+        if local is not None:
+            return local
+
+        cache_key = self._cache_key("Mask", MASK_VERSION, title, description)
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            return cached
+
         prompt = mask.USER_PROMPT_TEMPLATE.format(title=title, description=description)
-        
+
         try:
-            response = await self.client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": mask.SYSTEM_PROMPT},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.1,
-                max_tokens=200
-            )
-            
-            content = response.choices[0].message.content
-            
+            content = await self._chat([
+                {"role": "system", "content": mask.SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ])
+
             # JSON部分のみを抽出
             json_match = re.search(r'\{.*\}', content, re.DOTALL)
             if json_match:
                 result = json.loads(json_match.group())
             else:
                 result = json.loads(content)
-            
+
             print(f"Mask extracted from '{title[:50]}...': {result}")
+            self.cache.set(cache_key, "Mask", result)
             return result
-            
+
         except Exception as e:
             print(f"ChatGPT extraction error for mask: {str(e)}")
             return {'mask_count': None}
-    
+
+    async def extract_mask_info_batch(self, products: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """複数のマスク商品の情報をまとめて抽出（ASINをキーにした辞書を返す）"""
+        return await self._extract_batch(
+            products,
+            mask.SYSTEM_PROMPT,
+            mask.FIELDS,
+            "Mask",
+            MASK_VERSION,
+            self.extract_mask_info
+        )
+
     async def close(self):
         """リソースのクリーンアップ"""
-        pass
\ No newline at end of file
+        await self.client.close()
@@ -1,15 +1,52 @@
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Awaitable, Callable
 from datetime import datetime, timedelta
+import asyncio
 import os
-from supabase import create_client, Client
 import json
+import time
 from dotenv import load_dotenv
 from pathlib import Path
 import httpx
+from postgrest import AsyncPostgrestClient
+from postgrest.constants import DEFAULT_POSTGREST_CLIENT_TIMEOUT
+from postgrest.exceptions import APIError
+from postgrest.types import ReturnMethod
+
+from .http_fetcher import HTTP2_AVAILABLE
+from .read_cache import ReadCache, dump_json
+from .table_sync import plan_sync
+from .listing import LISTING_COLUMNS, listing_row
+from .pagination import Page, apply_page, keyword_condition
+from .price_history import ROLLUP_TABLE, PriceHistoryWriter, series_point
+from .utils.score_calculator import calculate_all_scores, calculate_score_with_bounds
+from .utils.score_index import SCORE_PRICE_FIELDS, ScoreIndex
+from .utils.facet_index import FacetIndex
 
 # グローバルなデータベース接続インスタンス（シングルトン）
 _db_instance = None
 
+# 一覧の読み込みが解釈するフィルタ（それ以外の値は絞り込まない）
+TOILET_PAPER_FILTERS = ('single', 'double', 'sale')
+DISHWASHING_FILTERS = ('refill', 'regular', 'sale')
+
+
+class _PooledPostgrestClient(AsyncPostgrestClient):
+    """共有トランスポート（コネクションプール）を使うPostgRESTクライアント"""
+
+    def __init__(self, base_url: str, headers: Dict[str, str], transport: httpx.AsyncHTTPTransport):
+        self._transport = transport
+        super().__init__(base_url, headers=headers)
+
+    def create_session(self, base_url, headers, timeout) -> httpx.AsyncClient:
+        # プールが埋まっている間は接続が空くまで待つ（同時リクエスト数の上限として使う）
+        return httpx.AsyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=httpx.Timeout(DEFAULT_POSTGREST_CLIENT_TIMEOUT, pool=None),
+            transport=self._transport
+        )
+
+
 class Database:
     def __new__(cls):
         global _db_instance
@@ -33,25 +70,385 @@ class Database:
         
         if not url or not key:
             print("Warning: Supabase credentials not found. Database features will be disabled.")
-            self.supabase = None
             self.enabled = False
         else:
-            try:
-                self.supabase: Client = create_client(url, key)
-                self.enabled = True
-                print(f"✓ Supabase singleton connection established: {url[:30]}...")
-            except Exception as e:
-                print(f"Warning: Failed to connect to Supabase: {str(e)}. Database features will be disabled.")
-                self.supabase = None
-                self.enabled = False
+            self.rest_url = f"{url.rstrip('/')}/rest/v1"
+            self.rest_headers = {
+                'apiKey': key,
+                'Authorization': f"Bearer {key}",
+                'Accept': 'application/json',
+                'Content-Type': 'application/json',
+            }
+            self.enabled = True
+            print(f"✓ Supabase singleton connection configured: {url[:30]}...")
         
         self.cache_duration = timedelta(hours=4)  # 4時間のキャッシュ
+        # 一覧エンドポイントの読み取りキャッシュ（テーブルへの書き込みで破棄される）
+        self.read_cache = ReadCache(self.cache_duration)
+        # 総合スコアの増分計算用の単価の索引（テーブル -> 索引、最初に使うときに読み込む）
+        self.score_indexes: Dict[str, ScoreIndex] = {}
+        self.score_stats = {'incremental': 0, 'full': 0}
+        # 一覧の絞り込み用のファセット索引（テーブル -> 索引、最初に使うときに読み込む）
+        self.facet_indexes: Dict[str, FacetIndex] = {}
+        # 価格履歴はまとめて書き出し、日次・週次の集計も更新する
+        self.price_history = PriceHistoryWriter(self)
+        # 一括書き込み時に1リクエストで送る行数
+        self.batch_size = max(1, int(os.environ.get("SUPABASE_BATCH_SIZE", "100")))
+        # Supabase・Vercelへの同時接続数の上限
+        self.max_connections = max(1, int(os.environ.get("SUPABASE_MAX_CONNECTIONS", "10")))
+        self._transport: Optional[httpx.AsyncHTTPTransport] = None
+        self._rest: Optional[_PooledPostgrestClient] = None
+        self._http: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
         self._initialized = True
-    
-    async def save_dishwashing_products(self, products: List[Dict[str, Any]]) -> None:
-        """食器用洗剤の商品を保存"""
+
+    def _ensure_clients(self) -> None:
+        """実行中のイベントループ用にHTTPクライアントを用意する
+
+        httpxのコネクションは作成したイベントループに紐づくため、
+        asyncio.runを繰り返すスクリプトやLambdaでは新しいループごとに作り直す。
+        """
+        loop = asyncio.get_running_loop()
+        if self._transport is not None and self._loop is loop:
+            return
+        self._transport = httpx.AsyncHTTPTransport(
+            http2=HTTP2_AVAILABLE,
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections
+            )
+        )
+        self._rest = _PooledPostgrestClient(self.rest_url, self.rest_headers, self._transport) if self.enabled else None
+        # Supabase以外（Vercel）向け。認証ヘッダーを送らないようにクライアントは分け、プールは共有する
+        self._http = httpx.AsyncClient(transport=self._transport, timeout=httpx.Timeout(30.0, pool=None))
+        self._loop = loop
+
+    @property
+    def rest(self) -> AsyncPostgrestClient:
+        """Supabase(PostgREST)の非同期クライアント。クエリは `await db.rest.table(...)...execute()` で実行する"""
+        self._ensure_clients()
+        return self._rest
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        """Supabaseと同じコネクションプールを使う汎用HTTPクライアント"""
+        self._ensure_clients()
+        return self._http
+
+    async def close(self) -> None:
+        """コネクションプールを閉じる（アプリ終了時に呼ぶ）"""
+        if self.enabled and self._transport is not None:
+            await self.price_history.flush()
+        if self._transport is not None:
+            await self._transport.aclose()
+        self._transport = None
+        self._rest = None
+        self._http = None
+        self._loop = None
+
+    def _batches(self, rows: List[Dict[str, Any]]):
+        for start in range(0, len(rows), self.batch_size):
+            yield rows[start:start + self.batch_size]
+
+    async def bulk_upsert(self, table: str, rows: List[Dict[str, Any]], on_conflict: str = 'asin') -> Dict[str, Any]:
+        """複数行をbatch_size件ずつまとめてupsertする
+
+        PostgRESTの複数行upsertは全行のキーが揃っている必要があるので、キーの組み合わせごとに分けて送る
+        （欠けている列をnullで埋めると既存の値を上書きしてしまうため）。
+        バッチは同時に送信する（同時接続数はコネクションプールで制限される）。
+        on_conflictは 'asin,period,period_start' のような複合キーでもよい。
+        戻り値: {'upserted': 件数, 'errors': [{on_conflictの先頭の列: 値, 'error': メッセージ}, ...]}
+        """
+        result = {'upserted': 0, 'errors': []}
+        if not rows:
+            return result
+
+        # 同じキーが1つのリクエストに2回含まれるとエラーになるため、後の行を優先して重複を除く
+        key_fields = on_conflict.split(',')
+        unique_rows: Dict[Any, Dict[str, Any]] = {}
+        for row in rows:
+            unique_rows[tuple(row.get(name) for name in key_fields)] = row
+
+        groups: Dict[frozenset, List[Dict[str, Any]]] = {}
+        for row in unique_rows.values():
+            groups.setdefault(frozenset(row.keys()), []).append(row)
+
+        async def send(batch):
+            await self.rest.table(table).upsert(
+                batch,
+                on_conflict=on_conflict,
+                returning=ReturnMethod.minimal
+            ).execute()
+
+        counts = await asyncio.gather(*(
+            self._write_batch(table, batch, send, key_fields[0], result['errors'])
+            for group in groups.values()
+            for batch in self._batches(group)
+        ))
+        result['upserted'] = sum(counts)
+        self.read_cache.invalidate(table)
+        index = self.score_indexes.get(table)
+        if index is not None:
+            index.update_rows(unique_rows.values())
+        facets = self.facet_indexes.get(table)
+        if facets is not None:
+            facets.update_rows(listing_row(table, row) for row in unique_rows.values())
+        return result
+
+    async def bulk_insert(self, table: str, rows: List[Dict[str, Any]], key: str = 'asin') -> Dict[str, Any]:
+        """複数行をbatch_size件ずつまとめてinsertする
+
+        戻り値: {'inserted': 件数, 'errors': [{key: 値, 'error': メッセージ}, ...]}
+        """
+        result = {'inserted': 0, 'errors': []}
+
+        async def send(batch):
+            await self.rest.table(table).insert(batch, returning=ReturnMethod.minimal).execute()
+
+        counts = await asyncio.gather(*(
+            self._write_batch(table, batch, send, key, result['errors'])
+            for batch in self._batches(rows)
+        ))
+        result['inserted'] = sum(counts)
+        self.read_cache.invalidate(table)
+        return result
+
+    async def sync_rows(self, table: str, rows: List[Dict[str, Any]], key: str = 'asin',
+                        soft_delete: Optional[Dict[str, Any]] = None,
+                        touch: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """テーブルをrowsに合わせる（全件削除・再挿入の代わりに差分だけを書き込む）
+
+        既存の行と内容が同じ行は書き込まず、touch（例: 取得日時）だけをまとめて更新する。
+        rowsにない既存の行にはsoft_delete（例: {'out_of_stock': True}）を設定する。
+        戻り値は件数と、全件を書き直す場合と比べた書き込み量（行数・バイト数）。
+        """
         if not self.enabled:
+            return {}
+        current = await self._select_all(table)
+        plan = plan_sync(current, rows, key, soft_delete)
+        changed = plan.inserts + plan.updates
+        errors: List[Dict[str, Any]] = []
+        written_bytes = len(dump_json(changed)) if changed else 0
+
+        if changed:
+            result = await self.bulk_upsert(table, changed, on_conflict=key)
+            errors.extend(result['errors'])
+
+        async def patch(values: Dict[str, Any], keys: List[str]) -> None:
+            try:
+                await self.rest.table(table).update(values, returning=ReturnMethod.minimal).in_(key, keys).execute()
+            except Exception as e:
+                errors.append({key: keys, 'error': str(e)})
+
+        patches = []
+        for values, keys in ((soft_delete, plan.removed), (touch, plan.unchanged)):
+            if values and keys:
+                for batch in self._batches(keys):
+                    patches.append(patch(values, batch))
+                    written_bytes += len(dump_json(values)) + len(dump_json(batch))
+        if patches:
+            await asyncio.gather(*patches)
+        self.read_cache.invalidate(table)
+
+        full_bytes = len(dump_json(rows)) if rows else 0
+        stats = {
+            'inserted': len(plan.inserts),
+            'updated': len(plan.updates),
+            'unchanged': len(plan.unchanged),
+            'soft_deleted': len(plan.removed),
+            'errors': errors,
+            'rows_written': len(changed),
+            'rows_touched': len(plan.unchanged) if touch else 0,  # touchの列だけ更新した行
+            'rows_full_rewrite': len(current) + len(rows),  # 全件削除 + 全件挿入
+            'bytes_written': written_bytes,
+            'bytes_full_rewrite': full_bytes,
+        }
+        print(f"Synced {table}: {stats['inserted']} inserted, {stats['updated']} updated, "
+              f"{stats['unchanged']} unchanged, {stats['soft_deleted']} soft-deleted, {len(errors)} errors "
+              f"(wrote {stats['rows_written']} rows + touched {stats['rows_touched']} / {written_bytes} bytes instead of "
+              f"{stats['rows_full_rewrite']} rows / {full_bytes} bytes)")
+        return stats
+
+    async def _select_all(self, table: str, columns: str = '*') -> List[Dict[str, Any]]:
+        """テーブルの全行を取得（PostgRESTの1レスポンスあたりの上限を超える分はページを分けて取得）"""
+        rows: List[Dict[str, Any]] = []
+        page_size = 1000
+        start = 0
+        while True:
+            response = await self.rest.table(table).select(columns).order('asin') \
+                .limit(page_size).offset(start).execute()
+            page = response.data or []
+            rows.extend(page)
+            if len(page) < page_size:
+                return rows
+            start += page_size
+
+    async def select_listing(self, table: str, load: Callable[[str], Awaitable[List[Dict[str, Any]]]],
+                             listing: bool = True) -> List[Dict[str, Any]]:
+        """load(columns) で一覧用の列（app/listing.py）だけを読み込む
+
+        listing=Falseなら全列を読み込む。一覧用の列がテーブルにない（マイグレーション前の）場合は
+        全列を読み込んでから一覧用の列に絞る。
+        """
+        if not listing:
+            return await load('*')
+        try:
+            return await load(LISTING_COLUMNS[table])
+        except APIError as e:
+            if e.code != '42703':  # undefined_column
+                raise
+            print(f"[WARNING] {table}: listing columns not found ({e.message}), selecting all columns")
+            return [listing_row(table, row) for row in await load('*')]
+
+    async def find_asins_by_text(self, table: str, column: str, keyword: str) -> set:
+        """columnにkeywordを含む（大文字小文字を区別しない）商品のASIN"""
+        if not self.enabled:
+            return set()
+        try:
+            response = await self.rest.table(table).select('asin').ilike(column, f'%{keyword}%').execute()
+            return {row['asin'] for row in response.data or []}
+        except Exception as e:
+            print(f"Error searching {column} of {table}: {str(e)}")
+            return set()
+
+    async def get_product_detail(self, table: str, asin: str) -> Optional[Dict[str, Any]]:
+        """詳細表示用に1商品の全列（説明文を含む）を取得"""
+        if not self.enabled:
+            return None
+        try:
+            response = await self.rest.table(table).select('*').eq('asin', asin).limit(1).execute()
+            return response.data[0] if response.data else None
+        except Exception as e:
+            print(f"Error fetching product detail {asin} from {table}: {str(e)}")
+            return None
+
+    async def get_facet_index(self, table: str) -> FacetIndex:
+        """テーブルのファセット索引（読み込んでからcache_durationを過ぎたら、他のプロセスの書き込みを反映するため読み直す）"""
+        if not self.enabled:
+            return FacetIndex(table)
+        index = self.facet_indexes.get(table)
+        if index is None or time.monotonic() - index.loaded_at > self.cache_duration.total_seconds():
+            try:
+                # 一覧はこの索引の行をそのまま返すので、一覧用の列だけを読み込む
+                fresh = FacetIndex(table, await self.select_listing(
+                    table, lambda columns: self._select_all(table, columns)
+                ))
+            except Exception as e:
+                # 読み直しに失敗した場合は前回の索引を使い続ける
+                print(f"Error loading facet index for {table}: {str(e)}")
+                return index or FacetIndex(table)
+            index = self.facet_indexes[table] = fresh
+        return index
+
+    async def _score_index(self, table: str) -> ScoreIndex:
+        """テーブルの単価の索引（読み込んでからcache_durationを過ぎたら、他のプロセスの書き込みを反映するため読み直す）"""
+        index = self.score_indexes.get(table)
+        if index is None or time.monotonic() - index.loaded_at > self.cache_duration.total_seconds():
+            price_field = SCORE_PRICE_FIELDS[table]
+            index = ScoreIndex(price_field, await self._select_all(table, f'asin,{price_field}'))
+            self.score_indexes[table] = index
+        return index
+
+    async def score_incrementally(self, table: str, rows: List[Dict[str, Any]]) -> None:
+        """保存する前の行（1件〜数件の更新）のtotal_scoreを計算して書き込む
+
+        スコアの単価の最小/最大は、どの経路でもテーブル全体の有効な単価から求める（score_table と同じ）。
+        最小/最大が変わらなければ、ほかの商品のスコアは変わらないので渡された行だけを計算する。
+        最小/最大が変わった場合は全行を再計算し、スコアが変わったほかの行を保存する。
+        """
+        if not self.enabled or not rows:
             return
+        price_field = SCORE_PRICE_FIELDS[table]
+        try:
+            index = await self._score_index(table)
+            before = index.bounds()
+            index.update_rows(rows)
+            after = index.bounds()
+            if before == after:
+                min_price, max_price = after or (None, None)
+                for row in rows:
+                    row['total_score'] = round(calculate_score_with_bounds(row, price_field, min_price, max_price), 2)
+                self.score_stats['incremental'] += 1
+                return
+
+            print(f"[INFO] {table}: unit price range moved {before} -> {after}, rescoring all products")
+            await self._rescore_table(table, rows)
+        except Exception as e:
+            # スコアの計算に失敗しても商品自体の保存は続ける（次の全件のスコア計算で直る）
+            print(f"[WARNING] Incremental scoring failed for {table}: {str(e)}")
+            self.score_indexes.pop(table, None)
+
+    async def score_table(self, table: str, rows: List[Dict[str, Any]]) -> None:
+        """スクレイピングした商品（保存済み）のtotal_scoreを、テーブル全体の単価の最小/最大で計算する
+
+        スクレイピングした商品だけの最小/最大で計算すると、score_incrementally（テーブル全体）と
+        どちらが最後に実行されたかでスコアが変わるので、こちらもテーブル全体で計算し、
+        スコアが変わったほかの行も保存する。DBが無効な場合は渡された行だけで計算する。
+        """
+        if not rows:
+            return
+        if not self.enabled:
+            calculate_all_scores(rows, SCORE_PRICE_FIELDS[table])
+            return
+        try:
+            await self._rescore_table(table, rows)
+            index = self.score_indexes.get(table)
+            if index is not None:
+                index.update_rows(rows)
+        except Exception as e:
+            # テーブルを読めない場合は渡された行だけで計算する（次の全件のスコア計算で直る）
+            print(f"[WARNING] Table-wide scoring failed for {table}, scoring scraped products only: {str(e)}")
+            calculate_all_scores(rows, SCORE_PRICE_FIELDS[table])
+
+    async def _rescore_table(self, table: str, rows: List[Dict[str, Any]]) -> None:
+        """テーブル全体にrowsを重ねて全行のスコアを計算し、rowsにスコアを入れ、スコアが変わったほかの行を保存する"""
+        self.score_stats['full'] += 1
+        current = {row['asin']: row for row in await self._select_all(table)}
+        previous_scores = {asin: row.get('total_score') for asin, row in current.items()}
+        for row in rows:
+            current[row['asin']] = {**current.get(row['asin'], {}), **row}
+        calculate_all_scores(list(current.values()), SCORE_PRICE_FIELDS[table])
+
+        updated_asins = set()
+        for row in rows:
+            row['total_score'] = current[row['asin']]['total_score']
+            updated_asins.add(row['asin'])
+        changed = [
+            {key: value for key, value in row.items() if key not in ('id', 'created_at', 'updated_at')}
+            for asin, row in current.items()
+            if asin not in updated_asins and row['total_score'] != previous_scores.get(asin)
+        ]
+        if changed:
+            result = await self.bulk_upsert(table, changed)
+            print(f"Rescored {result['upserted']} other products, {len(result['errors'])} errors")
+
+    async def _write_batch(self, table: str, batch: List[Dict[str, Any]], send, key: str,
+                     errors: List[Dict[str, Any]]) -> int:
+        """1バッチを書き込み、成功した行数を返す
+
+        バッチが失敗した場合は半分に分けて送り直し、失敗した行だけをerrorsに記録する
+        （1件ずつ送り直すより少ないリクエストで済む）。
+        """
+        try:
+            await send(batch)
+            return len(batch)
+        except Exception as e:
+            if len(batch) == 1:
+                print(f"[ERROR] Failed to write {batch[0].get(key, 'unknown')} to {table}: {str(e)}")
+                errors.append({key: batch[0].get(key), 'error': str(e)})
+                return 0
+            print(f"[WARNING] Batch write to {table} failed ({len(batch)} rows), splitting batch: {str(e)}")
+            middle = len(batch) // 2
+            counts = await asyncio.gather(
+                self._write_batch(table, batch[:middle], send, key, errors),
+                self._write_batch(table, batch[middle:], send, key, errors)
+            )
+            return sum(counts)
+    
+    async def save_dishwashing_products(self, products: List[Dict[str, Any]]) -> bool:
+        """食器用洗剤の商品を保存（書き込みエラーがあればFalse）"""
+        if not self.enabled:
+            return True
 
         try:
             from datetime import datetime
@@ -68,23 +465,23 @@ class Database:
                     product['on_sale'] = False
                     product['discount_percent'] = None
 
-                # asinをキーにしてupsert
-                self.supabase.table('dishwashing_liquid_products').upsert(
-                    product,
-                    on_conflict='asin'
-                ).execute()
+            # asinをキーにしてまとめてupsert
+            result = await self.bulk_upsert('dishwashing_liquid_products', products)
             
-            print(f"Saved {len(products)} dishwashing products to database")
+            print(f"Saved {result['upserted']} dishwashing products to database, {len(result['errors'])} errors")
+            return not result['errors']
         except Exception as e:
             print(f"Error saving dishwashing products: {str(e)}")
+            return False
     
-    async def get_all_dishwashing_products(self, filter: Optional[str] = None) -> List[Dict[str, Any]]:
-        """食器用洗剤の全商品を取得"""
+    async def get_all_dishwashing_products(self, filter: Optional[str] = None, listing: bool = False,
+                                           page: Optional[Page] = None) -> List[Dict[str, Any]]:
+        """食器用洗剤の全商品を取得（listing=Trueなら一覧用の列のみ、pageを指定するとそのページのみ）"""
         if not self.enabled:
             return []
 
-        try:
-            query = self.supabase.table('dishwashing_liquid_products').select('*')
+        async def load(columns: str) -> List[Dict[str, Any]]:
+            query = self.rest.table('dishwashing_liquid_products').select(columns)
 
             # 在庫切れ（価格がnull）を除外
             query = query.not_.is_('price', 'null')
@@ -97,27 +494,32 @@ class Database:
             elif filter == 'sale':
                 query = query.eq('on_sale', True)
 
-            # 単価でソート
-            query = query.order('price_per_1000ml', desc=False)
+            # 単価でソート（ページ指定時はページの並び順）
+            query = apply_page(query, page) if page else query.order('price_per_1000ml', desc=False)
             
-            response = query.execute()
-            
-            if response.data:
-                return response.data
-            return []
+            response = await query.execute()
+            return response.data or []
+
+        try:
+            return await self.select_listing('dishwashing_liquid_products', load, listing)
             
         except Exception as e:
             print(f"Error fetching dishwashing products: {str(e)}")
             return []
     
-    async def get_all_cached_products(self, filter: Optional[str] = None) -> List[Dict[str, Any]]:
-        """全てのキャッシュ商品を取得（時間制限なし）"""
+    async def get_all_cached_products(self, filter: Optional[str] = None, listing: bool = False,
+                                      page: Optional[Page] = None, keyword: Optional[str] = None) -> List[Dict[str, Any]]:
+        """全てのキャッシュ商品を取得（時間制限なし）
+
+        listing=Trueなら一覧用の列のみ。pageを指定するとそのページのみを返し、
+        keywordを指定するとタイトルか説明文にkeywordを含む商品に絞る（ページングと組み合わせるためDB側で絞る）。
+        """
         if not self.enabled:
             return []
 
-        try:
+        async def load(columns: str) -> List[Dict[str, Any]]:
             # 全ての商品を取得（時間制限なし）
-            query = self.supabase.table('toilet_paper_products').select('*')
+            query = self.rest.table('toilet_paper_products').select(columns)
 
             # 在庫切れ（価格がnull）を除外
             query = query.not_.is_('price', 'null')
@@ -130,14 +532,20 @@ class Database:
             elif filter == 'sale':
                 query = query.eq('on_sale', True)
             
-            # 単価でソート
-            query = query.order('price_per_m', desc=False)
-            
-            response = query.execute()
+            conditions = [keyword_condition(keyword)] if keyword else []
+            if page:
+                query = apply_page(query, page, conditions)
+            else:
+                if conditions:
+                    query.params = query.params.add('and', f"({','.join(conditions)})")
+                # 単価でソート
+                query = query.order('price_per_m', desc=False)
             
-            if response.data:
-                return response.data
-            return []
+            response = await query.execute()
+            return response.data or []
+
+        try:
+            return await self.select_listing('toilet_paper_products', load, listing)
             
         except Exception as e:
             print(f"Error fetching cached products: {str(e)}")
@@ -149,7 +557,7 @@ class Database:
             return None
             
         try:
-            response = self.supabase.table('toilet_paper_products').select('*').eq('asin', asin).execute()
+            response = await self.rest.table('toilet_paper_products').select('*').eq('asin', asin).execute()
             if response.data and len(response.data) > 0:
                 return response.data[0]
             return None
@@ -163,7 +571,7 @@ class Database:
             return []
             
         try:
-            response = self.supabase.table('toilet_paper_products').select('*').execute()
+            response = await self.rest.table('toilet_paper_products').select('*').execute()
             return response.data if response.data else []
         except Exception as e:
             print(f"Error fetching all products: {str(e)}")
@@ -175,44 +583,144 @@ class Database:
             return
             
         try:
+            # 行ごとに値が違うupdateはまとめられないので、既存の行に価格関連フィールドを重ねてupsertする
+            asins = [update['asin'] for update in updates]
+            responses = await asyncio.gather(*(
+                self.rest.table('toilet_paper_products').select('*').in_('asin', batch).execute()
+                for batch in self._batches(asins)
+            ))
+            existing = {}
+            for response in responses:
+                for row in response.data or []:
+                    existing[row['asin']] = row
+            
+            rows = []
             for update in updates:
-                asin = update.pop('asin')
-                # 価格関連フィールドのみ更新
-                self.supabase.table('toilet_paper_products').update(update).eq('asin', asin).execute()
-            
-            print(f"Updated prices for {len(updates)} products")
+                current = existing.get(update['asin'])
+                if current is None:
+                    print(f"[WARNING] Product not found, skipping price update: {update['asin']}")
+                    continue
+                # id・作成日時・更新日時はSupabaseに任せる
+                row = {key: value for key, value in current.items() if key not in ('id', 'created_at', 'updated_at')}
+                row.update(update)
+                rows.append(row)
+            
+            # 単価が変わった商品のスコアを計算（最小/最大単価が変わる場合だけ全件を再計算）
+            await self.score_incrementally('toilet_paper_products', rows)
+            result = await self.bulk_upsert('toilet_paper_products', rows)
+            
+            # 価格の変動のしやすさを更新スケジュールに使うので、取得した価格を履歴に残す
+            await self.price_history.add([self._price_history_row(row) for row in rows if row.get('price')])
+            
+            print(f"Updated prices for {result['upserted']} products, {len(result['errors'])} errors")
         except Exception as e:
             print(f"Error updating prices: {str(e)}")
+
+    async def record_refresh_failures(self, failures: Dict[str, int], attempted_at: datetime) -> None:
+        """価格を取得できなかった商品に取得を試みた日時と連続失敗回数（ASIN -> 回数）を記録する
+
+        スケジューラーは失敗回数に応じて次の試行を遅らせる（取得できない商品が毎回予算を使わないようにする）。
+        """
+        if not self.enabled or not failures:
+            return
+
+        # 失敗回数が同じ商品はまとめて更新する
+        asins_by_count: Dict[int, List[str]] = {}
+        for asin, count in failures.items():
+            asins_by_count.setdefault(count, []).append(asin)
+
+        async def patch(count: int, asins: List[str]) -> None:
+            values = {'last_attempted_at': attempted_at.isoformat(), 'refresh_failures': count}
+            await self.rest.table('toilet_paper_products').update(
+                values, returning=ReturnMethod.minimal
+            ).in_('asin', asins).execute()
+
+        try:
+            await asyncio.gather(*(
+                patch(count, batch)
+                for count, asins in asins_by_count.items()
+                for batch in self._batches(asins)
+            ))
+            print(f"[INFO] Recorded refresh failures for {len(failures)} products")
+        except Exception as e:
+            print(f"[WARNING] Failed to record refresh failures: {str(e)}")
+
+    async def get_price_history(self, since: datetime) -> Dict[str, List[Dict[str, Any]]]:
+        """since以降の価格履歴をASINごとに取得（記録日時の昇順）"""
+        if not self.enabled:
+            return {}
+        
+        history: Dict[str, List[Dict[str, Any]]] = {}
+        page_size = 1000  # PostgRESTの1レスポンスあたりの上限行数
+        try:
+            # バッファにたまっている履歴も含める
+            await self.price_history.flush()
+            start = 0
+            while True:
+                response = await self.rest.table('price_history') \
+                    .select('asin,price,on_sale,recorded_at') \
+                    .gte('recorded_at', since.isoformat()) \
+                    .order('recorded_at') \
+                    .limit(page_size) \
+                    .offset(start) \
+                    .execute()
+                rows = response.data or []
+                for row in rows:
+                    history.setdefault(row['asin'], []).append(row)
+                if len(rows) < page_size:
+                    break
+                start += page_size
+        except Exception as e:
+            print(f"Error fetching price history: {str(e)}")
+        return history
     
     async def save_price_history(self, product_data: Dict[str, Any]) -> None:
-        """価格履歴を保存"""
+        """価格履歴を保存（バッファにため、PRICE_HISTORY_FLUSH_SIZE件ごとにまとめてinsertする）"""
         if not self.enabled:
             return
-            
+        await self.price_history.add([self._price_history_row(product_data)])
+    
+    async def get_price_rollups(self, asin: str, period: str, limit: int) -> List[Dict[str, Any]]:
+        """ASINの日次・週次の集計を新しい順にlimit件取得し、グラフの点（古い順）にして返す"""
+        if not self.enabled:
+            return []
         try:
-            history_data = {
-                'asin': product_data.get('asin'),
-                'price': product_data.get('price'),
-                'price_per_m': product_data.get('price_per_m'),
-                'price_per_roll': product_data.get('price_per_roll'),
-                'roll_count': product_data.get('roll_count'),
-                'length_m': product_data.get('length_m'),
-                'total_length_m': product_data.get('total_length_m'),
-                'on_sale': product_data.get('on_sale', False)
-            }
-            
-            self.supabase.table('price_history').insert(history_data).execute()
+            response = await self.rest.table(ROLLUP_TABLE).select('*') \
+                .eq('asin', asin) \
+                .eq('period', period) \
+                .order('period_start', desc=True) \
+                .limit(limit) \
+                .execute()
+            return [series_point(row) for row in reversed(response.data or [])]
         except Exception as e:
-            print(f"Error saving price history: {str(e)}")
+            print(f"Error fetching price rollups: {str(e)}")
+            return []
     
-    async def upsert_products(self, products: List[Any]) -> None:
-        """商品データを更新または挿入"""
+    def _price_history_row(self, product_data: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'asin': product_data.get('asin'),
+            'price': product_data.get('price'),
+            'price_per_m': product_data.get('price_per_m'),
+            'price_per_roll': product_data.get('price_per_roll'),
+            'roll_count': product_data.get('roll_count'),
+            'length_m': product_data.get('length_m'),
+            'total_length_m': product_data.get('total_length_m'),
+            'on_sale': product_data.get('on_sale', False)
+        }
+    
+    async def upsert_products(self, products: List[Any], record_history: bool = True, purge_cache: bool = True) -> None:
+        """商品データを更新または挿入
+
+        record_history=False は同じ実行で保存済みの商品を書き直す場合（スコアの反映など）に使い、価格履歴を重複させない。
+        purge_cache=False ならVercelのキャッシュをパージしない（パイプラインの途中のバッチ）。
+        """
         if not self.enabled:
             return
             
         try:
             # Pydanticモデルを辞書に変換し、フィールドを統一
             products_data = []
+            history_rows = []
             
             # 全フィールドを定義（Supabaseのスキーマに合わせる）
             required_fields = {
@@ -266,10 +774,9 @@ class Database:
                     standardized_dict['on_sale'] = False
                     standardized_dict['discount_percent'] = None
 
-                # 価格履歴を保存（別途保存）
-                if standardized_dict.get('price_per_m'):
-                    # 価格履歴テーブルに保存
-                    await self.save_price_history(standardized_dict)
+                # 価格履歴を保存（商品の保存後にまとめてinsert）
+                if record_history and standardized_dict.get('price_per_m'):
+                    history_rows.append(self._price_history_row(standardized_dict))
                 
                 # updated_atとcreated_atはSupabaseが自動設定するため、送信しない
                 # idフィールドは自動生成なので削除
@@ -289,25 +796,17 @@ class Database:
                 print(f"Sample product data keys: {list(products_data[0].keys())}")
                 print(f"Sample product data: {products_data[0]}")
             
-            # 個別でupsert（コマンドライン版と同じ方式）
-            success_count = 0
-            error_count = 0
-            
-            for product_data in products_data:
-                try:
-                    response = self.supabase.table('toilet_paper_products').upsert(
-                        product_data,
-                        on_conflict='asin'
-                    ).execute()
-                    success_count += 1
-                except Exception as e:
-                    print(f"Error upserting individual product {product_data.get('asin', 'unknown')}: {str(e)}")
-                    error_count += 1
+            # batch_size件ずつまとめてupsert（失敗したバッチは1件ずつ送り直してエラーの行を特定）
+            result = await self.bulk_upsert('toilet_paper_products', products_data)
+            success_count = result['upserted']
+            error_count = len(result['errors'])
             
             print(f"Upserted {success_count} products successfully, {error_count} errors")
             
+            await self.price_history.add(history_rows)
+            
             # Vercelのキャッシュをパージ
-            if success_count > 0:
+            if purge_cache and success_count > 0:
                 await self.purge_vercel_cache()
             
         except Exception as e:
@@ -326,21 +825,20 @@ class Database:
                 return
             
             # revalidateエンドポイントを呼び出してキャッシュを再検証
-            async with httpx.AsyncClient() as client:
-                # GETリクエストでパラメータとして送信
-                paths = "/toilet-paper,/dishwashing-liquid,/,/api/products,/api/scrape-status"
-                tags = "products,scrape-status"
-                url = f"https://www.yasu-ku-kau.com/api/revalidate?token={vercel_token}&paths={paths}&tags={tags}"
-                
-                try:
-                    response = await client.get(url)
-                    if response.status_code == 200:
-                        result = response.json()
-                        print(f"Successfully revalidated cache: {result}")
-                    else:
-                        print(f"Failed to revalidate cache: {response.status_code} - {response.text}")
-                except Exception as e:
-                    print(f"Error calling revalidate API: {str(e)}")
+            # GETリクエストでパラメータとして送信
+            paths = "/toilet-paper,/dishwashing-liquid,/,/api/products,/api/scrape-status"
+            tags = "products,scrape-status"
+            url = f"https://www.yasu-ku-kau.com/api/revalidate?token={vercel_token}&paths={paths}&tags={tags}"
+            
+            try:
+                response = await self.http.get(url)
+                if response.status_code == 200:
+                    result = response.json()
+                    print(f"Successfully revalidated cache: {result}")
+                else:
+                    print(f"Failed to revalidate cache: {response.status_code} - {response.text}")
+            except Exception as e:
+                print(f"Error calling revalidate API: {str(e)}")
         except Exception as e:
             print(f"Error in purge_vercel_cache: {str(e)}")
     
@@ -351,7 +849,10 @@ class Database:
         
         try:
             # toilet_paper_productsテーブルから削除
-            result = self.supabase.table('toilet_paper_products').delete().eq('asin', asin).execute()
+            await self.rest.table('toilet_paper_products').delete().eq('asin', asin).execute()
+            self.read_cache.invalidate('toilet_paper_products')
+            if 'toilet_paper_products' in self.score_indexes:
+                self.score_indexes['toilet_paper_products'].remove(asin)
             print(f"Deleted product: {asin}")
         except Exception as e:
             print(f"Error deleting product {asin}: {str(e)}")
@@ -370,16 +871,16 @@ class Database:
                 product['last_fetched_at'] = current_time
             
             # rice_productsテーブルに保存（upsert）
-            response = self.supabase.table('rice_products').upsert(products, on_conflict='asin').execute()
-            print(f"Saved {len(products)} rice products to database")
+            result = await self.bulk_upsert('rice_products', products)
+            print(f"Saved {result['upserted']} rice products to database, {len(result['errors'])} errors")
             
         except Exception as e:
             print(f"Error saving rice products: {str(e)}")
     
-    async def save_mask_products(self, products: List[Dict[str, Any]]) -> None:
-        """マスク商品をデータベースに保存"""
+    async def save_mask_products(self, products: List[Dict[str, Any]]) -> bool:
+        """マスク商品をデータベースに保存（書き込みエラーがあればFalse）"""
         if not self.enabled or not products:
-            return
+            return True
             
         try:
             from datetime import datetime, timezone
@@ -390,23 +891,28 @@ class Database:
                 product['last_fetched_at'] = current_time
             
             # mask_productsテーブルに保存（upsert）
-            response = self.supabase.table('mask_products').upsert(products, on_conflict='asin').execute()
-            print(f"Saved {len(products)} mask products to database")
+            result = await self.bulk_upsert('mask_products', products)
+            print(f"Saved {result['upserted']} mask products to database, {len(result['errors'])} errors")
+            return not result['errors']
             
         except Exception as e:
             print(f"Error saving mask products: {str(e)}")
+            return False
     
-    async def get_mask_products(self) -> List[Dict[str, Any]]:
-        """マスク商品を取得"""
+    async def get_mask_products(self, listing: bool = False) -> List[Dict[str, Any]]:
+        """マスク商品を取得（listing=Trueなら一覧用の列のみ）"""
         if not self.enabled:
             return []
 
-        try:
-            query = self.supabase.table('mask_products').select('*')
+        async def load(columns: str) -> List[Dict[str, Any]]:
+            query = self.rest.table('mask_products').select(columns)
             # 在庫切れ（価格がnull）を除外
             query = query.not_.is_('price', 'null')
-            response = query.execute()
+            response = await query.execute()
             return response.data or []
+
+        try:
+            return await self.select_listing('mask_products', load, listing)
         except Exception as e:
             print(f"Error getting mask products: {str(e)}")
             return []
@@ -425,23 +931,28 @@ class Database:
                 product['last_fetched_at'] = current_time
             
             # mineral_water_productsテーブルに保存（upsert）
-            response = self.supabase.table('mineral_water_products').upsert(products, on_conflict='asin').execute()
-            print(f"Saved {len(products)} mineral water products to database")
+            result = await self.bulk_upsert('mineral_water_products', products)
+            print(f"Saved {result['upserted']} mineral water products to database, {len(result['errors'])} errors")
             
         except Exception as e:
             print(f"Error saving mineral water products: {str(e)}")
     
-    async def get_mineral_water_products(self) -> List[Dict[str, Any]]:
-        """ミネラルウォーター商品を取得"""
+    async def get_mineral_water_products(self, listing: bool = False, page: Optional[Page] = None) -> List[Dict[str, Any]]:
+        """ミネラルウォーター商品を取得（listing=Trueなら一覧用の列のみ、pageを指定するとそのページのみ）"""
         if not self.enabled:
             return []
 
-        try:
-            query = self.supabase.table('mineral_water_products').select('*')
+        async def load(columns: str) -> List[Dict[str, Any]]:
+            query = self.rest.table('mineral_water_products').select(columns)
             # 在庫切れ（価格がnull）を除外
             query = query.not_.is_('price', 'null')
-            response = query.execute()
+            if page:
+                query = apply_page(query, page)
+            response = await query.execute()
             return response.data or []
+
+        try:
+            return await self.select_listing('mineral_water_products', load, listing)
         except Exception as e:
             print(f"Error getting mineral water products: {str(e)}")
             return []
\ No newline at end of file
@@ -0,0 +1,182 @@
+"""
+ブラウザ内での商品カードの抽出
+
+driver.page_source は数MBのDOMをシリアライズしてPythonに転送し、lxmlで再度パースする必要がある。
+代わりに execute_script を1回だけ実行し、search_parser.collect_card_fields と同じ CardFields
+（各商品カードの生のテキスト）をブラウザ内で集めてJSONの配列として受け取る。
+商品データへの変換は従来どおり search_parser の商品タイプ別の抽出関数で行う。
+
+CAPTCHA・エラーページ・商品カードがないページ・スクリプトの失敗時はNoneを返し、
+呼び出し側は page_source とlxmlのパーサーで解析し直す（HTMLアーカイブもその場合だけ保存される）。
+"""
+from typing import Any, Dict, List, Optional
+
+# search_parser.collect_card_fields をJavaScriptに移植したもの（フィールド名・判定条件は同じ）
+CARD_FIELDS_SCRIPT = r"""
+const fallbackToDataAsin = arguments[0];
+const bodyText = document.body ? document.body.textContent : '';
+if (document.querySelector('form[action*="validateCaptcha"]') || bodyText.includes('認証が必要')
+        || /captcha/i.test(bodyText) || bodyText.includes('申し訳ございません')
+        || bodyText.includes('ご迷惑をおかけしています')) {
+    return {status: 'blocked', cards: []};
+}
+
+const DESCRIPTION = ['a-size-base', 'a-size-base-plus', 'a-size-mini', 's-feature-text', 'a-color-secondary'];
+const AVAILABILITY = ['a-color-secondary', 's-result-item-text', 'a-size-base'];
+const WAS_PRICE = ['a-color-secondary', 's-price-instructions-style'];
+const DISCOUNT_PERCENT = /^-?\d+%$/;
+
+const classesOf = (el) => {
+    const cls = el.getAttribute('class');
+    return new Set(cls ? cls.split(/\s+/).filter(Boolean) : []);
+};
+const hasAny = (classes, names) => names.some((name) => classes.has(name));
+const hasAncestor = (el, card, predicate) => {
+    for (let ancestor = el.parentElement; ancestor; ancestor = ancestor.parentElement) {
+        if (predicate(ancestor)) return true;
+        if (ancestor === card) break;
+    }
+    return false;
+};
+const firstSpanText = (el) => {
+    const span = el.getElementsByTagName('span')[0];
+    return span ? span.textContent : null;
+};
+
+const collect = (card) => {
+    const fields = {
+        asin: card.getAttribute('data-asin') || '',
+        title: null, title_fallback: null, detail_url: null, image_url: null,
+        price_text: null, price_whole_text: null, regular_price_offscreen_text: null, regular_price_text: null,
+        text_price_texts: [], icon_alt_text: null, rating_label: null, rating_count_label_text: null,
+        link_underline_text: null, csa_underline_text: null, size_base_underline_text: null,
+        reviews_slot_text: null, rating_sibling_text: null, customer_reviews_text: null,
+        description_texts: [], availability_texts: [], availability_state_text: null, has_cart_button: false,
+        was_texts: [], price_link_text: null, badge_text: null, savings_text: null, discount_span_texts: [],
+        feature_text: null, brand_text: null, brand_fallback_text: null,
+    };
+
+    for (const el of [card, ...card.getElementsByTagName('*')]) {
+        const tag = el.tagName.toLowerCase();
+        const classes = classesOf(el);
+        let text = null;
+        const elText = () => (text === null ? (text = el.textContent) : text);
+
+        if (tag === 'h2' && fields.title === null) {
+            const span = firstSpanText(el);
+            if (span !== null) fields.title = span.trim();
+        } else if (fields.title_fallback === null && (
+                el.getAttribute('data-cy') === 'title-recipe' || classes.has('s-title-instructions-style'))) {
+            const span = firstSpanText(el);
+            if (span !== null) fields.title_fallback = span.trim();
+        }
+
+        if (tag === 'a') {
+            const href = el.getAttribute('href') || '';
+            if (fields.detail_url === null && href.includes('/dp/')) fields.detail_url = href;
+            if (fields.customer_reviews_text === null && href.includes('customerReviews')) {
+                fields.customer_reviews_text = firstSpanText(el);
+            }
+            if (classes.has('s-link-style') && fields.price_link_text === null) fields.price_link_text = elText();
+        } else if (tag === 'img' && fields.image_url === null && classes.has('s-image')) {
+            fields.image_url = el.getAttribute('src');
+        }
+
+        const ariaLabel = el.getAttribute('aria-label');
+        if (ariaLabel) {
+            if (ariaLabel.includes('つ星のうち') && fields.rating_label === null) {
+                fields.rating_label = ariaLabel;
+                const sibling = el.nextElementSibling;
+                if (sibling && sibling.tagName.toLowerCase() === 'span') fields.rating_sibling_text = sibling.textContent;
+            }
+            if (tag === 'span' && ariaLabel.includes('件の評価') && fields.rating_count_label_text === null) {
+                fields.rating_count_label_text = elText();
+            }
+        }
+
+        if (el.getAttribute('data-action') === 's-card-button') fields.has_cart_button = true;
+
+        const previous = el.previousElementSibling;
+        if (hasAny(classes, WAS_PRICE) || (tag === 'a' && classes.has('s-link-style'))
+                || (previous && classesOf(previous).has('a-price'))) {
+            if (elText().includes('Was:') || elText().includes('以前は')) fields.was_texts.push(elText());
+        }
+        if (tag === 'span') {
+            const stripped = elText().trim();
+            if (stripped.includes('割引') || DISCOUNT_PERCENT.test(stripped)) fields.discount_span_texts.push(stripped);
+        }
+
+        if (classes.size === 0) continue;
+
+        if (classes.has('a-offscreen')) {
+            if (fields.price_text === null && hasAncestor(el, card, (a) => classesOf(a).has('a-price'))) {
+                fields.price_text = elText();
+            }
+            if (fields.regular_price_offscreen_text === null
+                    && hasAncestor(el, card, (a) => classesOf(a).has('a-text-price'))) {
+                fields.regular_price_offscreen_text = elText();
+            }
+        }
+        if (classes.has('a-price-whole') && fields.price_whole_text === null) fields.price_whole_text = elText();
+        if (classes.has('a-text-price')) {
+            fields.text_price_texts.push(elText());
+            if (fields.regular_price_text === null) fields.regular_price_text = elText();
+        }
+
+        if (classes.has('a-icon-alt') && fields.icon_alt_text === null) fields.icon_alt_text = elText();
+        if (classes.has('s-underline-text')) {
+            if (fields.link_underline_text === null && hasAncestor(el, card, (a) => classesOf(a).has('s-link-style'))) {
+                fields.link_underline_text = elText();
+            }
+            if (fields.csa_underline_text === null
+                    && hasAncestor(el, card, (a) => a.getAttribute('data-csa-c-content-id') !== null)) {
+                fields.csa_underline_text = elText();
+            }
+            if (fields.size_base_underline_text === null && classes.has('a-size-base')) {
+                fields.size_base_underline_text = elText();
+            }
+        }
+        if (tag === 'span' && classes.has('a-size-base') && fields.reviews_slot_text === null
+                && hasAncestor(el, card, (a) => a.getAttribute('data-cy') === 'reviews-ratings-slot')) {
+            fields.reviews_slot_text = elText();
+        }
+
+        if (hasAny(classes, DESCRIPTION)) fields.description_texts.push(elText().trim());
+        if (hasAny(classes, AVAILABILITY)) fields.availability_texts.push(elText());
+        if (fields.availability_state_text === null && (classes.has('a-color-price') || classes.has('a-color-state'))) {
+            fields.availability_state_text = elText();
+        }
+
+        if (fields.badge_text === null && (classes.has('s-badge-text') || classes.has('a-badge-text'))) {
+            fields.badge_text = elText();
+        }
+        if (classes.has('savingsPercentage') && fields.savings_text === null) fields.savings_text = elText();
+
+        if (classes.has('puis-padding-left-small') && fields.feature_text === null) fields.feature_text = elText().trim();
+        if (classes.has('puis-text-brand') && fields.brand_text === null
+                && hasAncestor(el, card, (a) => a.getAttribute('data-cy') === 'title-recipe')) {
+            fields.brand_text = elText().trim();
+        }
+        if (classes.has('s-size-mini') && fields.brand_fallback_text === null) fields.brand_fallback_text = elText().trim();
+    }
+
+    if (fields.title === null) fields.title = fields.title_fallback;
+    return fields;
+};
+
+let cards = document.querySelectorAll('[data-component-type="s-search-result"]');
+if (cards.length === 0 && fallbackToDataAsin) cards = document.querySelectorAll('[data-asin]');
+return {status: 'ok', cards: Array.from(cards, collect)};
+"""
+
+
+def collect_cards_in_browser(driver, fallback_to_data_asin: bool = True) -> Optional[List[Dict[str, Any]]]:
+    """表示中のページの商品カードからCardFieldsを集める（page_sourceでの解析が必要な場合はNone）"""
+    try:
+        result = driver.execute_script(CARD_FIELDS_SCRIPT, fallback_to_data_asin)
+    except Exception as e:
+        print(f"[WARNING] In-browser card extraction failed: {str(e)}")
+        return None
+    if not result or result.get('status') != 'ok' or not result.get('cards'):
+        return None
+    return result['cards']
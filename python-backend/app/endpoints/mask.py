@@ -1,33 +1,24 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Response
 from typing import Optional, List, Dict
 import os
 import time
 import asyncio
+from app.read_cache import json_envelope
+from app.utils.facet_index import is_mask_facet, mask_facets, normalize_filter, parse_filter
+from app.pagination import page_body, requested_page
 
 router = APIRouter()
 
 @router.get("/api/mask/filters")
 async def get_available_filters() -> Dict:
-    """利用可能なフィルターオプションを返す"""
+    """利用可能なフィルターオプションを返す（件数はファセット索引の集合の大きさ）"""
     from app.database import Database
     db = Database()
     
-    products = await db.get_mask_products()
-    
-    # 色の集計
-    colors = {}
-    sizes = {}
-    
-    for product in products:
-        # 色
-        color = product.get('mask_color')
-        if color:
-            colors[color] = colors.get(color, 0) + 1
-        
-        # サイズ
-        size = product.get('mask_size')
-        if size:
-            sizes[size] = sizes.get(size, 0) + 1
+    index = await db.get_facet_index('mask_products')
+    colors = index.counts('color_')
+    sizes = index.counts('size_')
+    sizes.pop('unknown', None)
     
     # ソートして返す
     return {
@@ -38,7 +29,10 @@ async def get_available_filters() -> Dict:
         "sizes": [
             {"value": size, "count": count, "label": get_size_label(size)}
             for size, count in sorted(sizes.items(), key=lambda x: x[1], reverse=True)
-        ]
+        ],
+        "packs": {name: index.count(name) for name in ('large_pack', 'small_pack')},
+        "sale": index.count('sale'),
+        "total": len(index)
     }
 
 def get_color_label(color: str) -> str:
@@ -74,11 +68,32 @@ async def search_mask(
     keyword: str = Query(default="マスク"),
     force: bool = Query(default=False),
     filter: Optional[str] = Query(default=None),
-    scrape_token: Optional[str] = Query(default=None)
+    scrape_token: Optional[str] = Query(default=None),
+    sort: Optional[str] = Query(default=None),
+    cursor: Optional[str] = Query(default=None),
+    limit: Optional[int] = Query(default=None)
 ) -> Dict:
-    """マスク商品の検索エンドポイント"""
+    """マスク商品の検索エンドポイント（sort / cursor / limit を指定するとページ単位）"""
     start_time = time.time()
     
+    if not force:
+        try:
+            page = requested_page('mask_products', sort, cursor, limit)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if page:
+            from app.database import Database
+            db = Database()
+            
+            async def load_page(page) -> List[Dict]:
+                # ファセット索引の並べ替え済みのリストをカーソルの位置から読む
+                index = await db.get_facet_index('mask_products')
+                return index.page(filter, page)
+            
+            body = await page_body(db, 'mask_products', normalize_filter(filter, is_mask_facet), page, load_page,
+                                   status="success", from_cache=True, time=round(time.time() - start_time, 2))
+            return Response(content=body, media_type="application/json")
+    
     try:
         # force=trueの場合はトークン検証（ローカル環境はスキップ）
         if force:
@@ -96,16 +111,18 @@ async def search_mask(
             print(f"Scraping {keyword}...")
             
             # スクレイピング実行
-            from app.scraper import AmazonScraper
+            from app.scraper import get_amazon_scraper
             from app.chatgpt_parser import ChatGPTParser
             from app.database import Database
             
-            scraper = AmazonScraper()
+            scraper = get_amazon_scraper()
             text_parser = ChatGPTParser()
             db = Database()
             
-            # マスクキーワードで検索
-            products = await scraper.search_products(keyword)
+            # マスクキーワードで検索（途中で止まった実行があれば取得済みのページを再利用する）
+            from app.scrape_checkpoint import open_run
+            checkpoint = open_run('mask', keyword)
+            products = await scraper.search_products(keyword, checkpoint=checkpoint)
             
             if not products:
                 print("No products found during scraping")
@@ -122,6 +139,7 @@ async def search_mask(
             
             # 処理済み商品リスト
             processed_products = []
+            new_products = []
             new_products_count = 0
             updated_products_count = 0
             
@@ -158,15 +176,16 @@ async def search_mask(
                     processed_products.append(processed_product)
                     continue
                 
-                # 新商品または不完全な既存商品はChatGPTで解析
+                # 新商品または不完全な既存商品はChatGPTで解析（ループの後でまとめて解析）
                 new_products_count += 1
                 print(f"Analyzing mask product: {asin}")
-                
-                # ChatGPT解析
-                extracted_info = await text_parser.extract_mask_info(
-                    product['title'], 
-                    product.get('description', '')
-                )
+                new_products.append(product)
+            
+            # ChatGPT解析（複数商品を1リクエストにまとめ、リクエストは並列に送る）
+            extracted_infos = await text_parser.extract_mask_info_batch(new_products) if new_products else {}
+            
+            for product in new_products:
+                extracted_info = extracted_infos[product['asin']]
                 
                 # mask_countがnullまたは0の場合はスキップ
                 if not extracted_info.get('mask_count'):
@@ -204,7 +223,9 @@ async def search_mask(
             print(f"  - Total processed: {len(processed_products)}")
             
             # データベースに保存
-            await db.save_mask_products(processed_products)
+            # 保存に失敗した場合は、次の実行で取得済みのページを再利用できるようにチェックポイントを残す
+            if await db.save_mask_products(processed_products):
+                checkpoint.complete()
             
             # フィルタリング適用
             if filter:
@@ -223,29 +244,33 @@ async def search_mask(
                 "time": round(time.time() - start_time, 2)
             }
         else:
-            # force=falseの場合はデータベースから取得
+            # force=falseの場合はデータベースから取得（読み取りキャッシュ経由）
             from app.database import Database
             db = Database()
             
-            products = await db.get_mask_products()
-            
-            # フィルタリング適用
-            if filter:
-                products = apply_filter(products, filter)
+            async def load_products() -> List[Dict]:
+                # ファセット索引の積集合で絞り込み、単価順に並べる
+                # （"size_regular,color_black,sale" のようにカンマ区切りで組み合わせられる）
+                index = await db.get_facet_index('mask_products')
+                return index.query(filter)
             
-            # ソート（単価順）
-            products.sort(key=lambda p: p.get('price_per_mask') or float('inf'))
+            entry = await db.read_cache.get(
+                'mask_products', normalize_filter(filter, is_mask_facet), 'price_per_mask', load_products
+            )
+            products_body = entry.body if entry else b"[]"
+            count = len(entry.rows) if entry else 0
             
-            result = {
-                "status": "success",
-                "count": len(products),
-                "products": products,
-                "from_cache": True,
-                "time": round(time.time() - start_time, 2)
-            }
-            print(f"[DEBUG] Returning mask search result: type={type(result)}, is_array={isinstance(result, list)}, count={result.get('count', 'N/A')}")
-            print(f"[DEBUG] FORCE VERIFICATION - Response is object: {result}")
-            return result
+            print(f"[DEBUG] Returning mask search result: count={count}")
+            return Response(
+                content=json_envelope(
+                    products_body,
+                    status="success",
+                    count=count,
+                    from_cache=True,
+                    time=round(time.time() - start_time, 2)
+                ),
+                media_type="application/json"
+            )
             
     except HTTPException:
         raise
@@ -256,49 +281,9 @@ async def search_mask(
         raise HTTPException(status_code=500, detail=str(e))
 
 def apply_filter(products: List[Dict], filter: str) -> List[Dict]:
-    """フィルターを適用"""
-    if not filter:
+    """フィルターを適用（カンマ区切りで指定したファセットすべてに属する商品だけを残す）"""
+    names = {name for name in parse_filter(filter) if is_mask_facet(name)}
+    if not names:
         return products
     
-    if filter == 'large_pack':
-        return [p for p in products if p.get('mask_count', 0) >= 50]
-    elif filter == 'small_pack':
-        return [p for p in products if p.get('mask_count', 0) < 50]
-    elif filter == 'sale':
-        return [p for p in products if p.get('on_sale')]
-    elif filter == 'size_large':
-        return [p for p in products if p.get('mask_size') == 'large']
-    elif filter == 'size_slightly_large':
-        return [p for p in products if p.get('mask_size') == 'slightly_large']
-    elif filter == 'size_regular':
-        return [p for p in products if p.get('mask_size') == 'regular']
-    elif filter == 'size_slightly_small':
-        return [p for p in products if p.get('mask_size') == 'slightly_small']
-    elif filter == 'size_small':
-        return [p for p in products if p.get('mask_size') == 'small']
-    elif filter == 'size_kids':
-        return [p for p in products if p.get('mask_size') == 'kids']
-    elif filter == 'size_unknown':
-        return [p for p in products if not p.get('mask_size')]
-    elif filter == 'color_white':
-        return [p for p in products if p.get('mask_color') == 'white']
-    elif filter == 'color_black':
-        return [p for p in products if p.get('mask_color') == 'black']
-    elif filter == 'color_gray':
-        return [p for p in products if p.get('mask_color') == 'gray']
-    elif filter == 'color_pink':
-        return [p for p in products if p.get('mask_color') == 'pink']
-    elif filter == 'color_blue':
-        return [p for p in products if p.get('mask_color') == 'blue']
-    elif filter == 'color_beige':
-        return [p for p in products if p.get('mask_color') == 'beige']
-    elif filter == 'color_purple':
-        return [p for p in products if p.get('mask_color') == 'purple']
-    elif filter == 'color_green':
-        return [p for p in products if p.get('mask_color') == 'green']
-    elif filter == 'color_yellow':
-        return [p for p in products if p.get('mask_color') == 'yellow']
-    elif filter == 'color_multicolor':
-        return [p for p in products if p.get('mask_color') == 'multicolor']
-    
-    return products
\ No newline at end of file
+    return [p for p in products if names.issubset(mask_facets(p))]
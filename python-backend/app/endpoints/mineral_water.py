@@ -1,9 +1,12 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Response
 from typing import Optional, List, Dict
 import os
 import time
 import asyncio
 from app.scrapers.mineral_water_scraper import scrape_mineral_water, save_mineral_water_to_db
+from app.read_cache import json_envelope
+from app.pagination import page_body, requested_page
+from app.scrape_checkpoint import open_run
 
 router = APIRouter()
 
@@ -11,11 +14,27 @@ router = APIRouter()
 async def search_mineral_water(
     keyword: str = Query(default="ミネラルウォーター"),
     force: bool = Query(default=False),
-    scrape_token: Optional[str] = Query(default=None)
+    scrape_token: Optional[str] = Query(default=None),
+    sort: Optional[str] = Query(default=None),
+    cursor: Optional[str] = Query(default=None),
+    limit: Optional[int] = Query(default=None)
 ) -> Dict:
-    """ミネラルウォーター商品の検索エンドポイント"""
+    """ミネラルウォーター商品の検索エンドポイント（sort / cursor / limit を指定するとページ単位）"""
     start_time = time.time()
     
+    if not force:
+        try:
+            page = requested_page('mineral_water_products', sort, cursor, limit)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if page:
+            from app.database import Database
+            db = Database()
+            body = await page_body(db, 'mineral_water_products', None, page,
+                                   lambda page: db.get_mineral_water_products(listing=True, page=page),
+                                   status="success", from_cache=True, time=round(time.time() - start_time, 2))
+            return Response(content=body, media_type="application/json")
+    
     try:
         # force=trueの場合はトークン検証（ローカル環境はスキップ）
         if force:
@@ -32,8 +51,9 @@ async def search_mineral_water(
             print(f"Starting mineral_water scraping...")
             print(f"Scraping {keyword}...")
             
-            # スクレイピング実行
-            products = await scrape_mineral_water(keyword)
+            # スクレイピング実行（途中で止まった実行があれば取得済みのページと抽出済みの商品を再利用する）
+            checkpoint = open_run('mineral_water', keyword)
+            products = await scrape_mineral_water(keyword, checkpoint=checkpoint)
             
             if not products:
                 print("No products found during scraping")
@@ -49,7 +69,10 @@ async def search_mineral_water(
             products_with_scores = calculate_all_scores(products, 'price_per_liter')
             
             # データベースに保存
-            save_result = save_mineral_water_to_db(products_with_scores)
+            save_result = await save_mineral_water_to_db(products_with_scores)
+            # 保存に失敗した場合は、次の実行で取得済みのページと抽出済みの商品を再利用できるようにチェックポイントを残す
+            if not save_result['errors']:
+                checkpoint.complete()
             
             print(f"mineral_water scraping completed: {len(products)} products in {time.time() - start_time:.2f}s")
             
@@ -61,21 +84,22 @@ async def search_mineral_water(
                 "time": round(time.time() - start_time, 2)
             }
         else:
-            # force=falseの場合はデータベースから取得
+            # force=falseの場合はデータベースから取得（読み取りキャッシュ経由）
             from app.database import Database
             db = Database()
             
-            products = await db.get_mineral_water_products()
-            if not products:
-                products = []
+            entry = await db.read_cache.get('mineral_water_products', None, None, lambda: db.get_mineral_water_products(listing=True))
             
-            return {
-                "status": "success",
-                "count": len(products),
-                "products": products,
-                "from_cache": True,
-                "time": round(time.time() - start_time, 2)
-            }
+            return Response(
+                content=json_envelope(
+                    entry.body if entry else b"[]",
+                    status="success",
+                    count=len(entry.rows) if entry else 0,
+                    from_cache=True,
+                    time=round(time.time() - start_time, 2)
+                ),
+                media_type="application/json"
+            )
             
     except HTTPException:
         raise
@@ -0,0 +1,38 @@
+from fastapi import APIRouter, HTTPException, Query
+from typing import Dict
+import time
+from app.price_history import PERIODS
+
+router = APIRouter()
+
+@router.get("/api/price-history/{asin}")
+async def get_price_history_series(
+    asin: str,
+    period: str = Query(default="day"),
+    limit: int = Query(default=90, ge=1, le=366)
+) -> Dict:
+    """価格推移グラフ用の系列（日次・週次の最小/最大/平均）
+
+    price_history_rollups の集計だけを読むので、生の履歴の件数にかかわらず読む行数はlimit件まで。
+    """
+    start_time = time.time()
+    if period not in PERIODS:
+        raise HTTPException(status_code=400, detail=f"period must be one of {', '.join(PERIODS)}")
+    
+    try:
+        from app.database import Database
+        db = Database()
+        
+        series = await db.get_price_rollups(asin, period, limit)
+        
+        return {
+            "status": "success",
+            "asin": asin,
+            "period": period,
+            "count": len(series),
+            "series": series,
+            "time": round(time.time() - start_time, 2)
+        }
+    except Exception as e:
+        print(f"[ERROR] price history series failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
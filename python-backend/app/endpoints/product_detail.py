@@ -0,0 +1,24 @@
+from fastapi import APIRouter, HTTPException
+from typing import Dict
+from app.listing import CATEGORY_TABLES
+
+router = APIRouter()
+
+@router.get("/api/{category}/products/{asin}")
+async def get_product_detail(category: str, asin: str) -> Dict:
+    """1商品の全項目（説明文を含む）を返す
+
+    一覧エンドポイントは一覧用の列（app/listing.py）だけを返すので、説明文などの全文はここから取得する。
+    """
+    table = CATEGORY_TABLES.get(category)
+    if table is None:
+        raise HTTPException(status_code=404, detail=f"Unknown category: {category}")
+    
+    from app.database import Database
+    db = Database()
+    
+    product = await db.get_product_detail(table, asin)
+    if product is None:
+        raise HTTPException(status_code=404, detail=f"Product not found: {asin}")
+    
+    return {"status": "success", "product": product}
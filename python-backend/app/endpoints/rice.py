@@ -1,30 +1,48 @@
-from fastapi import APIRouter, HTTPException, Query
-from typing import Optional, Dict
+from fastapi import APIRouter, HTTPException, Query, Response
+from typing import Optional, List, Dict
 import os
 import time
 from app.scrapers.rice_scraper import scrape_rice, save_rice_to_db
-from supabase import create_client, Client
-from dotenv import load_dotenv
-
-load_dotenv()
-
-# Supabaseクライアントの初期化
-supabase: Client = create_client(
-    os.getenv("NEXT_PUBLIC_SUPABASE_URL"),
-    os.getenv("NEXT_PUBLIC_SUPABASE_ANON_KEY")
-)
+from app.database import Database
+from app.read_cache import json_envelope
+from app.pagination import Page, apply_page, page_body, requested_page
+from app.scrape_checkpoint import open_run
 
 router = APIRouter()
 
+async def load_in_stock_rice(db: Database, page: Optional[Page] = None) -> List[Dict]:
+    """out_of_stock=falseの商品のみ一覧用の列で取得（在庫切れ商品を除外。pageを指定するとそのページのみ）"""
+    async def load(columns: str) -> List[Dict]:
+        query = db.rest.table("rice_products").select(columns).eq("out_of_stock", False)
+        if page:
+            query = apply_page(query, page)
+        result = await query.execute()
+        return result.data or []
+    return await db.select_listing("rice_products", load)
+
 @router.get("/api/rice/search")
 async def search_rice(
     keyword: str = Query(default="米"),
     force: bool = Query(default=False),
-    scrape_token: Optional[str] = Query(default=None)
+    scrape_token: Optional[str] = Query(default=None),
+    sort: Optional[str] = Query(default=None),
+    cursor: Optional[str] = Query(default=None),
+    limit: Optional[int] = Query(default=None)
 ) -> Dict:
-    """米商品の検索エンドポイント"""
+    """米商品の検索エンドポイント（sort / cursor / limit を指定するとページ単位）"""
     start_time = time.time()
     
+    if not force:
+        try:
+            page = requested_page('rice_products', sort, cursor, limit)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if page:
+            db = Database()
+            body = await page_body(db, 'rice_products', 'in_stock', page, lambda page: load_in_stock_rice(db, page),
+                                   source="database", time=round(time.time() - start_time, 2))
+            return Response(content=body, media_type="application/json")
+    
     try:
         # force=trueの場合はトークン検証（ローカル環境はスキップ）
         if force:
@@ -39,18 +57,21 @@ async def search_rice(
         # force=falseの場合は既存データを返す
         if not force:
             try:
-                # out_of_stock=falseの商品のみ取得（在庫切れ商品を除外）
-                result = supabase.table("rice_products").select("*").eq("out_of_stock", False).execute()
-                if result.data:
+                db = Database()
+                entry = await db.read_cache.get('rice_products', 'in_stock', None, lambda: load_in_stock_rice(db))
+                if entry:
                     # 最新の更新時刻を取得
-                    latest_update = max((p.get('last_fetched_at', '') for p in result.data), default='')
-                    return {
-                        "products": result.data,
-                        "lastUpdate": latest_update,
-                        "source": "database",
-                        "count": len(result.data),
-                        "time": time.time() - start_time
-                    }
+                    latest_update = max((p.get('last_fetched_at', '') for p in entry.rows), default='')
+                    return Response(
+                        content=json_envelope(
+                            entry.body,
+                            lastUpdate=latest_update,
+                            source="database",
+                            count=len(entry.rows),
+                            time=time.time() - start_time
+                        ),
+                        media_type="application/json"
+                    )
             except Exception as e:
                 print(f"Database fetch error: {e}")
         
@@ -58,8 +79,9 @@ async def search_rice(
         print(f"Starting rice scraping...")
         print(f"Scraping {keyword}...")
         
-        # スクレイピング実行
-        products = await scrape_rice(keyword)
+        # スクレイピング実行（途中で止まった実行があれば取得済みのページを再利用する）
+        checkpoint = open_run('rice', keyword)
+        products = await scrape_rice(keyword, checkpoint=checkpoint)
         
         if not products:
             print("No products found during scraping")
@@ -78,6 +100,9 @@ async def search_rice(
         # DBに保存
         save_result = await save_rice_to_db(products_with_scores)
         print(f"Save result: {save_result}")
+        # 保存に失敗した場合は、次の実行で取得済みのページを再利用できるようにチェックポイントを残す
+        if save_result.get('status') == 'success' and not save_result['sync'].get('errors'):
+            checkpoint.complete()
         
         return {
             "status": "success",
@@ -0,0 +1,124 @@
+"""
+GPT抽出結果のキャッシュ
+
+(商品タイプ, プロンプトのバージョン, 正規化したタイトル＋説明文のハッシュ) をキーに、
+抽出した項目を保持する。同じテキストを何度もGPTに送らないようにするためのもの。
+直近の結果はメモリ上のLRUに、全件はSQLiteファイルに保存するので、プロセスを再起動しても残る。
+プロンプトのバージョンはプロンプト本文のハッシュなので、プロンプトを変更すると自動的に別のキーになる。
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+DEFAULT_CACHE_PATH = Path(__file__).parent.parent / 'extraction_cache.sqlite3'
+
+
+def prompt_version(*parts: Any) -> str:
+    """プロンプト（と期待する項目）からバージョン文字列を作る"""
+    text = '\n'.join(json.dumps(part, ensure_ascii=False, sort_keys=True) if not isinstance(part, str) else part
+                     for part in parts)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:12]
+
+
+def normalize_text(text: str) -> str:
+    """全角・半角や空白の違いでキーが変わらないように正規化する"""
+    text = unicodedata.normalize('NFKC', text or '')
+    return re.sub(r'\s+', ' ', text).strip().lower()
+
+
+class ExtractionCache:
+    """メモリ上のLRUとSQLiteの2段のキャッシュ"""
+
+    def __init__(self, path: Optional[str] = None, max_memory_entries: int = 4096):
+        self.path = str(path or os.getenv('EXTRACTION_CACHE_PATH') or DEFAULT_CACHE_PATH)
+        self.max_memory_entries = max_memory_entries
+        self.hits = 0
+        self.misses = 0
+        self._memory: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        # スクレイピング用スレッド（ミネラルウォーター）からも使うのでロックで保護する
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        try:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS extraction_cache ('
+                'key TEXT PRIMARY KEY, product_type TEXT NOT NULL, fields TEXT NOT NULL, created_at TEXT NOT NULL)'
+            )
+            self._conn.commit()
+        except sqlite3.Error as e:
+            print(f"[WARNING] Extraction cache database unavailable ({self.path}): {str(e)}. Using memory only.")
+            self._conn = None
+
+    @staticmethod
+    def make_key(product_type: str, version: str, title: str, description: str = '') -> str:
+        text = normalize_text(title) + '\n' + normalize_text(description)
+        digest = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        return f"{product_type}:{version}:{digest}"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """キャッシュ済みの抽出結果（コピー）を返す。なければNone"""
+        with self._lock:
+            fields = self._memory.get(key)
+            if fields is not None:
+                self._memory.move_to_end(key)
+            elif self._conn is not None:
+                row = self._conn.execute('SELECT fields FROM extraction_cache WHERE key = ?', (key,)).fetchone()
+                if row:
+                    fields = json.loads(row[0])
+                    self._remember(key, fields)
+
+            if fields is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return dict(fields)
+
+    def set(self, key: str, product_type: str, fields: Dict[str, Any]) -> None:
+        """抽出結果を保存する（GPTの呼び出しに成功した結果だけを渡すこと）"""
+        with self._lock:
+            self._remember(key, dict(fields))
+            if self._conn is not None:
+                try:
+                    self._conn.execute(
+                        'INSERT OR REPLACE INTO extraction_cache (key, product_type, fields, created_at) VALUES (?, ?, ?, ?)',
+                        (key, product_type, json.dumps(fields, ensure_ascii=False), datetime.now(timezone.utc).isoformat())
+                    )
+                    self._conn.commit()
+                except sqlite3.Error as e:
+                    print(f"[WARNING] Failed to persist extraction cache entry: {str(e)}")
+
+    def _remember(self, key: str, fields: Dict[str, Any]) -> None:
+        self._memory[key] = fields
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / total, 4) if total else None,
+            'memory_entries': len(self._memory),
+        }
+
+
+_extraction_cache: Optional[ExtractionCache] = None
+_extraction_cache_lock = threading.Lock()
+
+
+def get_extraction_cache() -> ExtractionCache:
+    """共有キャッシュを取得（初回呼び出し時に作成）"""
+    global _extraction_cache
+    with _extraction_cache_lock:
+        if _extraction_cache is None:
+            _extraction_cache = ExtractionCache()
+        return _extraction_cache
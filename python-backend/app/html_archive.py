@@ -0,0 +1,166 @@
+"""
+取得したHTMLのアーカイブ
+
+スクレイパーが取得したページ（検索結果・商品詳細）を圧縮して保存しておき、
+パーサーを修正したときに Amazon へアクセスせずに再解析できるようにする（app/reparse.py）。
+
+- 本文はSHA-256をファイル名にして保存する（同じ内容のページは1つだけ保存される）
+- zstandard がインストールされていればzstd、なければgzipで圧縮する
+- URL・種類（search / detail / rice_search / mineral_water_search）・解析に使う引数・取得日時・ハッシュは
+  SQLiteのインデックスに記録する
+- 保存の失敗（読み取り専用のファイルシステムなど）はスクレイピングを止めない
+"""
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+from .scraper_executor import run_in_scraper_thread
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+DEFAULT_ARCHIVE_DIR = Path(__file__).parent.parent / 'html_archive'
+ZSTD_LEVEL = 9
+
+
+def compress(data: bytes) -> bytes:
+    if ZSTD_AVAILABLE:
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return gzip.compress(data, compresslevel=6)
+
+
+def read_blob(path: str) -> str:
+    """圧縮したページを読み込んでHTMLを返す（ファイルの拡張子で形式を判断）"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if path.endswith('.zst'):
+        data = zstandard.ZstdDecompressor().decompress(data)
+    else:
+        data = gzip.decompress(data)
+    return data.decode('utf-8')
+
+
+class HtmlArchive:
+    """内容のハッシュで保存するHTMLのアーカイブ"""
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = Path(root or os.getenv('HTML_ARCHIVE_DIR') or DEFAULT_ARCHIVE_DIR)
+        self.enabled = os.getenv('HTML_ARCHIVE_ENABLED', 'true').lower() != 'false'
+        self.suffix = '.html.zst' if ZSTD_AVAILABLE else '.html.gz'
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        if not self.enabled:
+            return
+        try:
+            (self.root / 'blobs').mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.root / 'index.sqlite3'), check_same_thread=False)
+            self._conn.executescript(
+                'CREATE TABLE IF NOT EXISTS pages ('
+                'id INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT NOT NULL, url TEXT NOT NULL, '
+                'context TEXT NOT NULL, fetched_at TEXT NOT NULL, sha256 TEXT NOT NULL, blob TEXT NOT NULL);'
+                'CREATE INDEX IF NOT EXISTS idx_pages_kind ON pages(kind, fetched_at);'
+                'CREATE TABLE IF NOT EXISTS parsed ('
+                'sha256 TEXT NOT NULL, kind TEXT NOT NULL, context TEXT NOT NULL, parser_version TEXT NOT NULL, '
+                'result TEXT NOT NULL, PRIMARY KEY (sha256, kind, context, parser_version));'
+            )
+            if not ZSTD_AVAILABLE:
+                print("[WARNING] zstandard is not installed, HTML archive falls back to gzip")
+        except (OSError, sqlite3.Error) as e:
+            print(f"[WARNING] HTML archive unavailable ({self.root}): {str(e)}")
+            self.enabled = False
+            self._conn = None
+
+    def store(self, kind: str, url: str, html: str, **context: Any) -> Optional[str]:
+        """ページを保存してハッシュを返す（無効・失敗時はNone）"""
+        if not self.enabled or not html:
+            return None
+        data = html.encode('utf-8')
+        sha256 = hashlib.sha256(data).hexdigest()
+        blob = Path('blobs') / sha256[:2] / f"{sha256}{self.suffix}"
+        try:
+            path = self.root / blob
+            if not path.exists():
+                path.parent.mkdir(exist_ok=True)
+                # 途中で止まっても壊れたファイルが残らないように一時ファイルから置き換える
+                tmp_path = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+                tmp_path.write_bytes(compress(data))
+                os.replace(tmp_path, path)
+            with self._lock:
+                self._conn.execute(
+                    'INSERT INTO pages (kind, url, context, fetched_at, sha256, blob) VALUES (?, ?, ?, ?, ?, ?)',
+                    (kind, url, json.dumps(context, sort_keys=True), datetime.now(timezone.utc).isoformat(), sha256, str(blob))
+                )
+                self._conn.commit()
+            return sha256
+        except (OSError, sqlite3.Error) as e:
+            print(f"[WARNING] Failed to archive {url}: {str(e)}")
+            return None
+
+    def pages(self, kind: Optional[str] = None, since: Optional[str] = None,
+              latest_only: bool = False) -> Iterator[Dict[str, Any]]:
+        """保存したページの一覧（取得日時の昇順）。latest_onlyならURLごとに最新の1件だけ"""
+        if self._conn is None:
+            return
+        query = 'SELECT id, kind, url, context, fetched_at, sha256, blob FROM pages WHERE 1 = 1'
+        params = []
+        if kind:
+            query += ' AND kind = ?'
+            params.append(kind)
+        if since:
+            query += ' AND fetched_at >= ?'
+            params.append(since)
+        if latest_only:
+            query += ' AND id IN (SELECT MAX(id) FROM pages GROUP BY kind, url, context)'
+        with self._lock:
+            rows = self._conn.execute(query + ' ORDER BY id', params).fetchall()
+        for page_id, kind, url, context, fetched_at, sha256, blob in rows:
+            yield {
+                'id': page_id, 'kind': kind, 'url': url, 'context': json.loads(context),
+                'fetched_at': fetched_at, 'sha256': sha256, 'path': str(self.root / blob),
+            }
+
+    def get_parsed(self, sha256: str, kind: str, context: Dict[str, Any], parser_version: str) -> Optional[Any]:
+        """同じページ・同じパーサーで前回解析した結果（なければNone）"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT result FROM parsed WHERE sha256 = ? AND kind = ? AND context = ? AND parser_version = ?',
+                (sha256, kind, json.dumps(context, sort_keys=True), parser_version)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set_parsed(self, sha256: str, kind: str, context: Dict[str, Any], parser_version: str, result: Any) -> None:
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO parsed (sha256, kind, context, parser_version, result) VALUES (?, ?, ?, ?, ?)',
+                (sha256, kind, json.dumps(context, sort_keys=True), parser_version, json.dumps(result, ensure_ascii=False))
+            )
+            self._conn.commit()
+
+
+_html_archive: Optional[HtmlArchive] = None
+_html_archive_lock = threading.Lock()
+
+
+def get_html_archive() -> HtmlArchive:
+    """共有アーカイブを取得（初回呼び出し時に作成）"""
+    global _html_archive
+    with _html_archive_lock:
+        if _html_archive is None:
+            _html_archive = HtmlArchive()
+        return _html_archive
+
+
+async def archive_page(kind: str, url: str, html: str, **context: Any) -> None:
+    """取得したページをスクレイピング用スレッドで圧縮して保存する"""
+    archive = get_html_archive()
+    if archive.enabled:
+        await run_in_scraper_thread(archive.store, kind, url, html, **context)
@@ -0,0 +1,69 @@
+"""
+HTTP/2コネクションプールを使った軽量フェッチャー
+
+検索結果ページは静的なマークアップなのでヘッドレスChromeを使わずに取得できる。
+CAPTCHAや空の結果が返った場合はAmazonScraper側でブラウザにフォールバックする。
+"""
+import os
+from typing import Optional
+
+import httpx
+
+try:
+    import h2  # noqa: F401  HTTP/2を使うにはh2パッケージが必要
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'ja,ja-JP;q=0.9',
+}
+
+
+class HttpFetcher:
+    """keep-aliveで接続を使い回すHTMLフェッチャー"""
+
+    def __init__(self, max_connections: Optional[int] = None, timeout: float = 15.0):
+        self.max_connections = max_connections or int(os.getenv('SCRAPER_HTTP_MAX_CONNECTIONS', '10'))
+        self.timeout = timeout
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            if not HTTP2_AVAILABLE:
+                print("[WARNING] h2 is not installed, HTTP fetcher falls back to HTTP/1.1")
+            self._client = httpx.AsyncClient(
+                http2=HTTP2_AVAILABLE,
+                headers=DEFAULT_HEADERS,
+                timeout=self.timeout,
+                follow_redirects=True,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections
+                )
+            )
+        return self._client
+
+    async def fetch(self, url: str) -> str:
+        """URLのHTMLを取得"""
+        response = await self._get_client().get(url)
+        response.raise_for_status()
+        return response.text
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+_http_fetcher: Optional[HttpFetcher] = None
+
+
+def get_http_fetcher() -> HttpFetcher:
+    """共有フェッチャーを取得（初回呼び出し時に作成）"""
+    global _http_fetcher
+    if _http_fetcher is None:
+        _http_fetcher = HttpFetcher()
+    return _http_fetcher
@@ -0,0 +1,52 @@
+"""
+一覧用の列（カテゴリごとのビューモデル）
+
+一覧のクエリは select('*') で説明文（get_product_detail で #aplus の内容まで連結した長いテキスト）まで
+Supabaseから読み込み、一覧のたびにフロントエンドへ送っていた。一覧はカードの表示・並び替え・絞り込みに使う列だけを
+読み込み、説明文などの全文は詳細エンドポイント（/api/{category}/products/{asin}）で1商品ずつ返す。
+
+列を追加したテーブルがマイグレーション前で列が存在しない場合は、Database.select_listing が全列を読み込んでから
+一覧用の列に絞る（一覧が空にならないように）。
+"""
+from typing import Any, Dict
+
+# テーブル -> 一覧で返す列
+LISTING_COLUMNS: Dict[str, str] = {
+    # トイレットペーパーはレスポンスの形（main.Product）から説明文を除いた列
+    'toilet_paper_products': (
+        'asin,title,brand,image_url,price,price_regular,discount_percent,on_sale,review_avg,review_count,'
+        'roll_count,length_m,total_length_m,price_per_roll,price_per_m,is_double,total_score'
+    ),
+    'dishwashing_liquid_products': (
+        'id,asin,title,brand,image_url,price,price_regular,discount_percent,on_sale,review_avg,review_count,'
+        'volume_ml,price_per_1000ml,is_refill,total_score,last_fetched_at,created_at,updated_at'
+    ),
+    'mask_products': (
+        'asin,title,brand,image_url,price,price_regular,discount_percent,on_sale,review_avg,review_count,'
+        'mask_count,mask_size,mask_color,price_per_mask,last_fetched_at,created_at,updated_at'
+    ),
+    'mineral_water_products': (
+        'asin,title,brand,image_url,price,price_regular,discount_percent,on_sale,review_avg,review_count,'
+        'volume_ml,bottle_count,total_volume_ml,price_per_liter,total_score,last_fetched_at,created_at,updated_at'
+    ),
+    'rice_products': (
+        'id,asin,title,brand,image_url,price,price_regular,price_fresh,price_fresh_regular,is_fresh_available,'
+        'review_avg,review_count,weight_kg,price_per_kg,price_per_kg_fresh,rice_type,is_musenmai,'
+        'discount_percent,discount_percent_fresh,on_sale,total_score,last_fetched_at,created_at,updated_at'
+    ),
+}
+
+# 詳細エンドポイントのカテゴリ（APIのパス） -> テーブル
+CATEGORY_TABLES: Dict[str, str] = {
+    'toilet-paper': 'toilet_paper_products',
+    'dishwashing': 'dishwashing_liquid_products',
+    'mask': 'mask_products',
+    'mineral-water': 'mineral_water_products',
+    'rice': 'rice_products',
+}
+
+
+def listing_row(table: str, row: Dict[str, Any]) -> Dict[str, Any]:
+    """全列の行を一覧用の列に絞る"""
+    columns = LISTING_COLUMNS[table].split(',')
+    return {name: row[name] for name in columns if name in row}
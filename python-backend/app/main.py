@@ -1,15 +1,25 @@
-from fastapi import FastAPI, HTTPException, Header
+from fastapi import FastAPI, HTTPException, Header, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import List, Optional
+import asyncio
 import os
 import secrets
 from dotenv import load_dotenv
 
-from .scraper import AmazonScraper
+from .scraper import get_amazon_scraper
+from .browser_pool import prewarm_browser_pool
 from .chatgpt_parser import ChatGPTParser
-from .database import Database
+from .database import DISHWASHING_FILTERS, TOILET_PAPER_FILTERS, Database
 from .price_validator import PriceValidator
+from .scraper_executor import run_in_scraper_thread, shutdown_scraper_executor
+from .scrape_scheduler import ScrapeJob, category_timeout, run_scrape_jobs
+from .extraction_cache import get_extraction_cache
+from .rule_extraction import rule_stats
+from .scrape_checkpoint import open_run
+from . import pipeline
+from .pagination import Page, page_body, requested_page
+from .read_cache import known_filter
 
 load_dotenv()
 
@@ -25,11 +35,16 @@ app.add_middleware(
 )
 
 # 初期化
-scraper = AmazonScraper()
+scraper = get_amazon_scraper()
 text_parser = ChatGPTParser()
 db = Database()
 price_validator = PriceValidator()
 
+# スクレイピング結果のパイプライン: 抽出・保存の単位（商品数）、同時に抽出するバッチ数、ステージ間にためるバッチ数の上限
+SCRAPE_PIPELINE_BATCH_SIZE = int(os.getenv('SCRAPE_PIPELINE_BATCH_SIZE', '16'))
+SCRAPE_PIPELINE_CONCURRENCY = int(os.getenv('SCRAPE_PIPELINE_CONCURRENCY', '2'))
+SCRAPE_PIPELINE_QUEUE_SIZE = int(os.getenv('SCRAPE_PIPELINE_QUEUE_SIZE', '2'))
+
 class Product(BaseModel):
     asin: str
     title: str
@@ -54,13 +69,24 @@ class Product(BaseModel):
 async def root():
     return {"message": "Toilet Paper Price Compare API"}
 
+@app.get("/api/cache-stats")
+async def cache_stats():
+    """一覧キャッシュのテーブルごとのヒット率とレイテンシ、GPT抽出キャッシュのヒット率、正規表現で抽出できた割合、ブラウザプールの状態、スコアの増分計算と全件再計算の回数、価格履歴の書き出し"""
+    return {
+        **db.read_cache.stats(),
+        "gpt_extraction": get_extraction_cache().stats(),
+        "rule_extraction": rule_stats(),
+        "browser_pool": scraper.pool.stats(),
+        "scoring": db.score_stats,
+        "price_history": db.price_history.stats,
+    }
+
 @app.get("/api/scrape-all")
 async def scrape_all_products(
     scrape_token: Optional[str] = None
 ):
     """全商品タイプを一括でスクレイピングする統合エンドポイント"""
     import time
-    import asyncio
     
     start_time = time.time()
     
@@ -77,77 +103,39 @@ async def scrape_all_products(
         else:
             print("Local environment detected - skipping token validation")
         
-        results = {}
+        # 商品タイプごとのスクレイピング（同時実行数はSCRAPE_ALL_CONCURRENCY、ブラウザとレート制限は全体で共有）
+        async def scrape_toilet_paper():
+            # toilet_paperエンドポイント（既存のsearch_products関数を呼び出し）
+            products = await search_products(keyword="トイレットペーパー", force=True, scrape_token=scrape_token)
+            # Listが返ってくるので、結果を整形
+            return {
+                "count": len(products),
+                "products": products,
+                "source": "scraping"
+            }
         
-        # 各エンドポイントを順次呼び出し（セッション競合を避けるため）
-        product_endpoints = [
-            ("toilet_paper", "トイレットペーパー"),
-            ("dishwashing_liquid", "食器用洗剤"),
-            ("mineral_water", "ミネラルウォーター"),
-            ("rice", "米"),
-            ("mask", "マスク")
-        ]
+        async def scrape_dishwashing():
+            return await search_dishwashing_internal(keyword="食器用洗剤", force=True, scrape_token=scrape_token)
         
-        for product_type, keyword in product_endpoints:
-            type_start = time.time()
-            
-            try:
-                print(f"\n{'='*60}")
-                print(f"Starting {product_type} scraping...")
-                print(f"{'='*60}")
-                
-                # 各商品タイプごとに対応するエンドポイントを呼び出し
-                if product_type == "toilet_paper":
-                    # toilet_paperエンドポイント（既存のsearch_products関数を呼び出し）
-                    result = await search_products(keyword=keyword, force=True, scrape_token=scrape_token)
-                    # Listが返ってくるので、結果を整形
-                    result = {
-                        "count": len(result),
-                        "products": result,
-                        "source": "scraping"
-                    }
-                    
-                elif product_type == "dishwashing_liquid":
-                    # dishwashing関数は同じファイル内に定義されている
-                    result = await search_dishwashing_internal(keyword=keyword, force=True, scrape_token=scrape_token)
-                    
-                elif product_type == "mineral_water":
-                    from .endpoints.mineral_water import search_mineral_water
-                    result = await search_mineral_water(keyword=keyword, force=True, scrape_token=scrape_token)
-                    
-                elif product_type == "rice":
-                    from .endpoints.rice import search_rice
-                    result = await search_rice(keyword=keyword, force=True, scrape_token=scrape_token)
-                
-                elif product_type == "mask":
-                    from .endpoints.mask import search_mask
-                    result = await search_mask(keyword=keyword, force=True, scrape_token=scrape_token)
-                
-                # 結果を記録
-                results[product_type] = {
-                    "status": "success",
-                    "count": result.get("count", 0),
-                    "time": round(time.time() - type_start, 2),
-                    "source": result.get("source", "unknown")
-                }
-                
-                print(f"✓ Completed {product_type}: {results[product_type]['count']} products in {results[product_type]['time']}s")
-                
-                # 次のスクレイピングの前に少し待機（Chromeの完全クリーンアップのため）
-                await asyncio.sleep(2)
-                
-            except Exception as e:
-                import traceback
-                error_msg = str(e)
-                print(f"✗ Error scraping {product_type}: {error_msg}")
-                print(f"Traceback: {traceback.format_exc()}")
-                
-                results[product_type] = {
-                    "status": "error",
-                    "error": error_msg,
-                    "count": 0,
-                    "time": round(time.time() - type_start, 2)
-                }
+        async def scrape_mineral_water():
+            from .endpoints.mineral_water import search_mineral_water
+            return await search_mineral_water(keyword="ミネラルウォーター", force=True, scrape_token=scrape_token)
+        
+        async def scrape_rice():
+            from .endpoints.rice import search_rice
+            return await search_rice(keyword="米", force=True, scrape_token=scrape_token)
+        
+        async def scrape_mask():
+            from .endpoints.mask import search_mask
+            return await search_mask(keyword="マスク", force=True, scrape_token=scrape_token)
+        
+        results = await run_scrape_jobs([
+            ScrapeJob("toilet_paper", scrape_toilet_paper, category_timeout("toilet_paper")),
+            ScrapeJob("dishwashing_liquid", scrape_dishwashing, category_timeout("dishwashing_liquid")),
+            ScrapeJob("mineral_water", scrape_mineral_water, category_timeout("mineral_water")),
+            ScrapeJob("rice", scrape_rice, category_timeout("rice")),
+            ScrapeJob("mask", scrape_mask, category_timeout("mask")),
+        ])
         
         total_time = time.time() - start_time
         
@@ -158,7 +146,6 @@ async def scrape_all_products(
         if total_success > 0:
             try:
                 import aiohttp
-                import asyncio
                 
                 # 環境変数からVercel URLを取得
                 vercel_url = os.getenv('VERCEL_URL', 'https://amazon-price-comparision.vercel.app')
@@ -194,16 +181,210 @@ async def scrape_all_products(
         print(f"Error in scrape-all: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+async def load_cached_products(filter: Optional[str], page: Optional[Page] = None,
+                               keyword: Optional[str] = None) -> List[dict]:
+    """読み取りキャッシュ用にDBの商品をレスポンスの形（Product）に揃えて返す（pageを指定するとそのページのみ）"""
+    products = await db.get_all_cached_products(filter, listing=True, page=page, keyword=keyword)
+    # 説明文は一覧に含めない（詳細は /api/toilet-paper/products/{asin}）
+    return [Product(**product).model_dump(exclude={'description'}) for product in products]
+
+def product_from_existing(product: dict, existing_product: dict) -> Product:
+    """既存商品：価格関連フィールドのみ更新（タイトル・ロール数などは既存データを保持）"""
+    asin = product['asin']
+    # 価格が変わっていない場合はスキップ
+    if existing_product.get('price') == product.get('price'):
+        print(f"No price change for {asin}, skipping")
+    
+        # 既存データをそのまま使用
+        processed_product = Product(
+            asin=existing_product['asin'],
+            title=existing_product['title'],
+            description=existing_product.get('description'),
+            brand=existing_product.get('brand'),
+            image_url=existing_product.get('image_url'),
+            price=existing_product.get('price'),
+            price_regular=existing_product.get('price_regular'),
+            discount_percent=existing_product.get('discount_percent'),
+            on_sale=existing_product.get('on_sale', False),
+            review_avg=existing_product.get('review_avg'),
+            review_count=existing_product.get('review_count'),
+            roll_count=existing_product.get('roll_count'),
+            length_m=existing_product.get('length_m'),
+            total_length_m=existing_product.get('total_length_m'),
+            price_per_roll=existing_product.get('price_per_roll'),
+            price_per_m=existing_product.get('price_per_m'),
+            is_double=existing_product.get('is_double'),
+            total_score=existing_product.get('total_score')
+        )
+        return processed_product
+    
+    # 価格が変わった場合：価格関連フィールドのみ再計算
+    print(f"Price changed for {asin}: {existing_product.get('price')} -> {product.get('price')}")
+    
+    # 既存の商品情報を使用して単価のみ再計算
+    price_per_roll = None
+    price_per_m = None
+    
+    if product.get('price') and existing_product.get('roll_count'):
+        price_per_roll = product['price'] / existing_product['roll_count']
+    
+    if product.get('price') and existing_product.get('total_length_m'):
+        price_per_m = product['price'] / existing_product['total_length_m']
+    
+    processed_product = Product(
+        asin=asin,
+        title=existing_product['title'],  # 既存データを保持
+        description=existing_product.get('description'),  # 既存データを保持
+        brand=existing_product.get('brand'),  # 既存データを保持
+        image_url=product.get('image_url'),  # 画像URLは更新
+        price=product.get('price'),  # 新しい価格
+        price_regular=product.get('price_regular'),  # 新しい定価
+        discount_percent=product.get('discount_percent'),  # 新しい割引率
+        on_sale=product.get('on_sale', False),  # 新しいセール状態
+        review_avg=product.get('review_avg'),  # 新しいレビュー
+        review_count=product.get('review_count'),  # 新しいレビュー数
+        roll_count=existing_product.get('roll_count'),  # 既存データを保持
+        length_m=existing_product.get('length_m'),  # 既存データを保持
+        total_length_m=existing_product.get('total_length_m'),  # 既存データを保持
+        price_per_roll=price_per_roll,  # 再計算
+        price_per_m=price_per_m,  # 再計算
+        is_double=existing_product.get('is_double'),  # 既存データを保持
+        total_score=existing_product.get('total_score')  # スコアは全件の保存後に再計算
+    )
+    return processed_product
+
+async def analyze_new_products(new_products: List[dict]) -> List[Product]:
+    """新商品をChatGPTで解析し、必要なら詳細ページも取得して単価を計算する"""
+    # 新商品のテキスト解析（複数商品を1リクエストにまとめ、リクエストは並列に送る）
+    extracted_infos = await text_parser.extract_info_batch(new_products) if new_products else {}
+    
+    new_products_with_info = []
+    for product in new_products:
+        extracted_info = extracted_infos[product['asin']]
+    
+        # 詳細ページから取得が必要な場合の判定
+        should_fetch_detail = False
+        if product.get('asin'):
+            # 長さ情報が取得できない場合
+            if not extracted_info['length_m']:
+                if product.get('review_count', 0) > 1000:  # レビュー数が多い人気商品のみ
+                    should_fetch_detail = True
+            # 長さ情報が異常に短い場合（20m未満は疑わしい）
+            elif extracted_info['length_m'] and extracted_info['length_m'] < 20:
+                if product.get('review_count', 0) > 500:  # 一定の評価がある商品のみ
+                    should_fetch_detail = True
+                    print(f"Suspicious short length ({extracted_info['length_m']}m) for {product['asin']}, will fetch detail page")
+    
+            if should_fetch_detail:
+                print(f"No length info for {product['asin']}, will fetch detail page...")
+    
+        new_products_with_info.append((product, extracted_info, should_fetch_detail))
+    
+    # 詳細ページが必要な新商品はプールのワーカーで並列取得
+    detail_asins = [product['asin'] for product, _, fetch_detail in new_products_with_info if fetch_detail]
+    details = await scraper.get_product_details(detail_asins) if detail_asins else {}
+    
+    async def finish(product: dict, extracted_info: dict, should_fetch_detail: bool) -> Product:
+        if should_fetch_detail:
+            try:
+                detail_info = details.get(product['asin'], {})
+                print(f"Detail info retrieved for {product['asin']}: {list(detail_info.keys())}")
+    
+                # description、features の順で解析を試みる
+                for detail_key in ['description', 'features']:
+                    if detail_info.get(detail_key):
+                        print(f"Analyzing {detail_key} content: {detail_info[detail_key][:200]}...")
+                        # 詳細情報で再度解析（長さ情報のみ抽出）
+                        extracted_info_detail = await text_parser.extract_info(
+                            product['title'],
+                            detail_info[detail_key]
+                        )
+                        print(f"Extracted from {detail_key}: {extracted_info_detail}")
+                        # 長さ情報が取得できたら更新（詳細ページの情報を優先）
+                        if extracted_info_detail['length_m']:
+                            extracted_info['length_m'] = extracted_info_detail['length_m']
+                            print(f"Updated length from detail page: {extracted_info['length_m']}m")
+                            # 既存のロール数を保持して総長さを再計算
+                            if extracted_info['roll_count']:
+                                extracted_info['total_length_m'] = extracted_info['roll_count'] * extracted_info['length_m']
+                            break
+                        # ロール数情報のみ取得できて、既存のロール数がない場合のみ更新
+                        elif extracted_info_detail['roll_count'] and not extracted_info['roll_count']:
+                            extracted_info['roll_count'] = extracted_info_detail['roll_count']
+                            print(f"Updated roll count from detail page: {extracted_info['roll_count']}")
+                            if extracted_info['length_m']:
+                                extracted_info['total_length_m'] = extracted_info['roll_count'] * extracted_info['length_m']
+            except Exception as e:
+                print(f"Error fetching detail for {product['asin']}: {str(e)}")
+    
+        # 単価計算
+        price_per_roll = None
+        price_per_m = None
+    
+        if product.get('price') and extracted_info['roll_count']:
+            price_per_roll = product['price'] / extracted_info['roll_count']
+    
+        if product.get('price') and extracted_info['total_length_m']:
+            price_per_m = product['price'] / extracted_info['total_length_m']
+    
+        # 新商品の場合は価格検証スキップ（初回なので基準がない）
+    
+        # 商品データ作成
+        processed_product = Product(
+            asin=product['asin'],
+            title=product.get('title', ''),
+            description=product.get('description'),
+            brand=product.get('brand'),
+            image_url=product.get('image_url'),
+            price=product.get('price'),
+            price_regular=product.get('price_regular'),
+            discount_percent=product.get('discount_percent'),
+            on_sale=product.get('on_sale', False),
+            review_avg=product.get('review_avg'),
+            review_count=product.get('review_count'),
+            roll_count=int(extracted_info['roll_count']) if extracted_info['roll_count'] else None,
+            length_m=extracted_info['length_m'],
+            total_length_m=extracted_info['total_length_m'],
+            price_per_roll=price_per_roll,
+            price_per_m=price_per_m,
+            is_double=extracted_info['is_double']
+        )
+        return processed_product
+    
+    # 詳細ページの内容の再解析は商品ごとに並列に行う（同時リクエスト数はChatGPTParserで制限される）
+    processed_products = list(await asyncio.gather(*(finish(*item) for item in new_products_with_info)))
+    return processed_products
+
 @app.get("/api/search", response_model=List[Product])
 async def search_products(
     keyword: str = "トイレットペーパー",
     filter: Optional[str] = None,
     force: bool = False,
-    scrape_token: Optional[str] = None
+    scrape_token: Optional[str] = None,
+    sort: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None
 ):
     import time
     start_time = time.time()
     
+    # sort / cursor / limit のいずれかを指定するとページ単位で返す（{"products": [...], "next_cursor": ...}）
+    if not force:
+        try:
+            page = requested_page('toilet_paper_products', sort, cursor, limit)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if page:
+            # キーワードはページングと組み合わせるためDB側で絞る
+            page_keyword = keyword if keyword and keyword != "トイレットペーパー" else None
+            # （キーワードは自由入力なので、キーワード付きのページは読み取りキャッシュに入れない）
+            body = await page_body(
+                db, 'toilet_paper_products', known_filter(filter, TOILET_PAPER_FILTERS), page,
+                lambda page: load_cached_products(filter, page, page_keyword),
+                cache=page_keyword is None
+            )
+            return Response(content=body, media_type="application/json")
+    
     try:
         # force=trueの場合はトークン検証（ローカル環境はスキップ）
         if force:
@@ -223,18 +404,28 @@ async def search_products(
         
         # 強制更新でない限り、DBキャッシュを優先的に使用
         if not force:
-            # DBから既存の商品を取得（キーワードでフィルタリング）
-            cached_products = await db.get_all_cached_products(filter)
+            # DBから既存の商品を取得（読み取りキャッシュ経由、キーワードでフィルタリング）
+            entry = await db.read_cache.get(
+                'toilet_paper_products', known_filter(filter, TOILET_PAPER_FILTERS), 'price_per_m',
+                lambda: load_cached_products(filter)
+            )
+            
+            # キーワード指定がなければシリアライズ済みのJSONをそのまま返す
+            if entry and (not keyword or keyword == "トイレットペーパー"):
+                return Response(content=entry.body, media_type="application/json")
+            
+            cached_products = entry.rows if entry else []
             
             # キーワードでフィルタリング
             if cached_products and keyword and keyword != "トイレットペーパー":
                 # キーワードが指定されている場合はタイトルと説明でフィルタリング
+                # （一覧の行には説明文がないので、説明文の一致はDB側で探す）
                 filtered_products = []
                 keyword_lower = keyword.lower()
+                description_asins = await db.find_asins_by_text('toilet_paper_products', 'description', keyword)
                 for product in cached_products:
                     title = (product.get('title') or '').lower()
-                    description = (product.get('description') or '').lower()
-                    if keyword_lower in title or keyword_lower in description:
+                    if keyword_lower in title or product['asin'] in description_asins:
                         filtered_products.append(product)
                 cached_products = filtered_products
             
@@ -245,15 +436,10 @@ async def search_products(
                 print(f"No products in database for keyword: {keyword}, performing initial scraping...")
         
         # force=true の場合のみスクレイピング実行
-        scraping_start = time.time()
+        # 取得 → 解析・重複除去（スクレイパー） → 抽出・単価計算 → 保存 をSCRAPE_PIPELINE_BATCH_SIZE件ずつ流し、
+        # 処理できたバッチから順に保存する
         print(f"Force refresh requested - Scraping Amazon for: {keyword}")
-        scraped_products = await scraper.search_products(keyword)
-        scraping_time = time.time() - scraping_start
-        print(f"Scraped {len(scraped_products)} products in {scraping_time:.2f}s")
-        
-        # テキスト解析と保存
         analysis_start = time.time()
-        processed_products = []
         
         # 既存商品のASINリストを取得
         existing_products_dict = {}
@@ -263,183 +449,72 @@ async def search_products(
         
         print(f"Found {len(existing_products_dict)} existing products in database")
         
-        new_products_count = 0
-        updated_products_count = 0
-        
-        for product in scraped_products:
-            # タイトルがない場合はスキップ
-            if not product.get('title'):
-                print(f"Skipping product without title: {product.get('asin', 'unknown')}")
-                continue
-            
-            asin = product['asin']
-            existing_product = existing_products_dict.get(asin)
-            
-            if existing_product:
-                # 既存商品：価格のみ更新
-                updated_products_count += 1
-                
-                # 価格が変わっていない場合はスキップ
-                if existing_product.get('price') == product.get('price'):
-                    print(f"No price change for {asin}, skipping")
-                    
-                    # 既存データをそのまま使用
-                    processed_product = Product(
-                        asin=existing_product['asin'],
-                        title=existing_product['title'],
-                        description=existing_product.get('description'),
-                        brand=existing_product.get('brand'),
-                        image_url=existing_product.get('image_url'),
-                        price=existing_product.get('price'),
-                        price_regular=existing_product.get('price_regular'),
-                        discount_percent=existing_product.get('discount_percent'),
-                        on_sale=existing_product.get('on_sale', False),
-                        review_avg=existing_product.get('review_avg'),
-                        review_count=existing_product.get('review_count'),
-                        roll_count=existing_product.get('roll_count'),
-                        length_m=existing_product.get('length_m'),
-                        total_length_m=existing_product.get('total_length_m'),
-                        price_per_roll=existing_product.get('price_per_roll'),
-                        price_per_m=existing_product.get('price_per_m'),
-                        is_double=existing_product.get('is_double')
-                    )
-                    processed_products.append(processed_product)
+        # 途中で止まった実行があれば、取得済みのページと処理済みの商品を再利用する
+        checkpoint = open_run('toilet_paper', keyword)
+        counts = {'new': 0, 'updated': 0, 'scraped': 0, 'resumed': 0}
+        
+        async def process_batch(batch: List[dict]) -> Optional[tuple]:
+            counts['scraped'] += len(batch)
+            # 前回の実行で処理・保存済みの商品は抽出し直さない（SQLiteの読み込みはイベントループを止めないようスレッドで）
+            resumed_items = await run_in_scraper_thread(checkpoint.get_items, [product['asin'] for product in batch])
+            resumed = [Product(**item) for item in resumed_items.values()]
+            counts['resumed'] += len(resumed)
+            batch_processed = []
+            new_products = []
+            for product in batch:
+                if product['asin'] in resumed_items:
+                    continue
+                # タイトルがない場合はスキップ
+                if not product.get('title'):
+                    print(f"Skipping product without title: {product.get('asin', 'unknown')}")
                     continue
                 
-                # 価格が変わった場合：価格関連フィールドのみ再計算
-                print(f"Price changed for {asin}: {existing_product.get('price')} -> {product.get('price')}")
-                
-                # 既存の商品情報を使用して単価のみ再計算
-                price_per_roll = None
-                price_per_m = None
-                
-                if product.get('price') and existing_product.get('roll_count'):
-                    price_per_roll = product['price'] / existing_product['roll_count']
-                
-                if product.get('price') and existing_product.get('total_length_m'):
-                    price_per_m = product['price'] / existing_product['total_length_m']
-                
-                processed_product = Product(
-                    asin=asin,
-                    title=existing_product['title'],  # 既存データを保持
-                    description=existing_product.get('description'),  # 既存データを保持
-                    brand=existing_product.get('brand'),  # 既存データを保持
-                    image_url=product.get('image_url'),  # 画像URLは更新
-                    price=product.get('price'),  # 新しい価格
-                    price_regular=product.get('price_regular'),  # 新しい定価
-                    discount_percent=product.get('discount_percent'),  # 新しい割引率
-                    on_sale=product.get('on_sale', False),  # 新しいセール状態
-                    review_avg=product.get('review_avg'),  # 新しいレビュー
-                    review_count=product.get('review_count'),  # 新しいレビュー数
-                    roll_count=existing_product.get('roll_count'),  # 既存データを保持
-                    length_m=existing_product.get('length_m'),  # 既存データを保持
-                    total_length_m=existing_product.get('total_length_m'),  # 既存データを保持
-                    price_per_roll=price_per_roll,  # 再計算
-                    price_per_m=price_per_m,  # 再計算
-                    is_double=existing_product.get('is_double')  # 既存データを保持
-                )
-                processed_products.append(processed_product)
-                continue
-            
-            # 新商品：ChatGPT解析が必要
-            new_products_count += 1
-            print(f"New product detected: {asin}, analyzing with ChatGPT...")
-            
-            # テキスト解析
-            extracted_info = await text_parser.extract_info(
-                product['title'], 
-                product.get('description', '')
-            )
-            
-            # 詳細ページから取得が必要な場合の判定
-            should_fetch_detail = False
-            if product.get('asin'):
-                # 長さ情報が取得できない場合
-                if not extracted_info['length_m']:
-                    if product.get('review_count', 0) > 1000:  # レビュー数が多い人気商品のみ
-                        should_fetch_detail = True
-                # 長さ情報が異常に短い場合（20m未満は疑わしい）
-                elif extracted_info['length_m'] and extracted_info['length_m'] < 20:
-                    if product.get('review_count', 0) > 500:  # 一定の評価がある商品のみ
-                        should_fetch_detail = True
-                        print(f"Suspicious short length ({extracted_info['length_m']}m) for {product['asin']}, will fetch detail page")
-                
-                if should_fetch_detail:
-                    print(f"No length info for {product['asin']}, fetching detail page...")
-                    try:
-                        detail_info = await scraper.get_product_detail(product['asin'])
-                        print(f"Detail info retrieved for {product['asin']}: {list(detail_info.keys())}")
-                        
-                        # description、features の順で解析を試みる
-                        for detail_key in ['description', 'features']:
-                            if detail_info.get(detail_key):
-                                print(f"Analyzing {detail_key} content: {detail_info[detail_key][:200]}...")
-                                # 詳細情報で再度解析（長さ情報のみ抽出）
-                                extracted_info_detail = await text_parser.extract_info(
-                                    product['title'],
-                                    detail_info[detail_key]
-                                )
-                                print(f"Extracted from {detail_key}: {extracted_info_detail}")
-                                # 長さ情報が取得できたら更新（詳細ページの情報を優先）
-                                if extracted_info_detail['length_m']:
-                                    extracted_info['length_m'] = extracted_info_detail['length_m']
-                                    print(f"Updated length from detail page: {extracted_info['length_m']}m")
-                                    # 既存のロール数を保持して総長さを再計算
-                                    if extracted_info['roll_count']:
-                                        extracted_info['total_length_m'] = extracted_info['roll_count'] * extracted_info['length_m']
-                                    break
-                                # ロール数情報のみ取得できて、既存のロール数がない場合のみ更新
-                                elif extracted_info_detail['roll_count'] and not extracted_info['roll_count']:
-                                    extracted_info['roll_count'] = extracted_info_detail['roll_count']
-                                    print(f"Updated roll count from detail page: {extracted_info['roll_count']}")
-                                    if extracted_info['length_m']:
-                                        extracted_info['total_length_m'] = extracted_info['roll_count'] * extracted_info['length_m']
-                    except Exception as e:
-                        print(f"Error fetching detail for {product['asin']}: {str(e)}")
-            
-            # 単価計算
-            price_per_roll = None
-            price_per_m = None
+                existing_product = existing_products_dict.get(product['asin'])
+                if existing_product:
+                    counts['updated'] += 1
+                    batch_processed.append(product_from_existing(product, existing_product))
+                else:
+                    # 新商品：ChatGPT解析が必要（バッチ内でまとめて解析）
+                    counts['new'] += 1
+                    print(f"New product detected: {product['asin']}, analyzing with ChatGPT...")
+                    new_products.append(product)
             
-            if product.get('price') and extracted_info['roll_count']:
-                price_per_roll = product['price'] / extracted_info['roll_count']
-            
-            if product.get('price') and extracted_info['total_length_m']:
-                price_per_m = product['price'] / extracted_info['total_length_m']
-            
-            # 新商品の場合は価格検証スキップ（初回なので基準がない）
-            
-            # 商品データ作成
-            processed_product = Product(
-                asin=product['asin'],
-                title=product.get('title', ''),
-                description=product.get('description'),
-                brand=product.get('brand'),
-                image_url=product.get('image_url'),
-                price=product.get('price'),
-                price_regular=product.get('price_regular'),
-                discount_percent=product.get('discount_percent'),
-                on_sale=product.get('on_sale', False),
-                review_avg=product.get('review_avg'),
-                review_count=product.get('review_count'),
-                roll_count=int(extracted_info['roll_count']) if extracted_info['roll_count'] else None,
-                length_m=extracted_info['length_m'],
-                total_length_m=extracted_info['total_length_m'],
-                price_per_roll=price_per_roll,
-                price_per_m=price_per_m,
-                is_double=extracted_info['is_double']
-            )
-            processed_products.append(processed_product)
+            batch_processed += await analyze_new_products(new_products)
+            return (resumed, batch_processed) if resumed or batch_processed else None
+        
+        async def save_batch(batch: tuple) -> List[Product]:
+            resumed, batch_processed = batch
+            # スコアは全件がそろってから計算するので、ここでは価格履歴だけ残してキャッシュのパージは最後に行う
+            if batch_processed:
+                await db.upsert_products(batch_processed, purge_cache=False)
+                await run_in_scraper_thread(checkpoint.save_items, {p.asin: p.dict() for p in batch_processed})
+            return resumed + batch_processed
+        
+        batches = pipeline.batched(
+            pipeline.flatten(scraper.iter_search_products(
+                keyword, queue_size=SCRAPE_PIPELINE_QUEUE_SIZE, checkpoint=checkpoint
+            )),
+            SCRAPE_PIPELINE_BATCH_SIZE
+        )
+        processed = pipeline.map_stage(
+            batches, process_batch, concurrency=SCRAPE_PIPELINE_CONCURRENCY, maxsize=SCRAPE_PIPELINE_QUEUE_SIZE
+        )
+        saved = pipeline.map_stage(processed, save_batch, maxsize=SCRAPE_PIPELINE_QUEUE_SIZE)
+        
+        processed_products = []
+        async for batch_processed in saved:
+            processed_products.extend(batch_processed)
         
         analysis_time = time.time() - analysis_start
         print(f"Processing summary:")
-        print(f"  - New products (ChatGPT analyzed): {new_products_count}")
-        print(f"  - Updated products (price only): {updated_products_count}")
+        print(f"  - Scraped products: {counts['scraped']}")
+        print(f"  - New products (ChatGPT analyzed): {counts['new']}")
+        print(f"  - Updated products (price only): {counts['updated']}")
+        print(f"  - Resumed from checkpoint: {counts['resumed']}")
         print(f"  - Total processed: {len(processed_products)}")
-        print(f"  - Analysis time: {analysis_time:.2f}s")
+        print(f"  - Scraping + analysis + save time: {analysis_time:.2f}s")
         
-        # 総合スコアを計算
-        from app.utils.score_calculator import calculate_all_scores
+        # 総合スコアを計算（単価の最小/最大はテーブル全体から求める。1商品の更新の増分計算と同じ）
         # Product objectsをdictに変換
         product_dicts = []
         for p in processed_products:
@@ -448,18 +523,22 @@ async def search_products(
             else:
                 product_dicts.append(p)
         
-        products_with_scores = calculate_all_scores(product_dicts, 'price_per_m')
+        await db.score_table('toilet_paper_products', product_dicts)
+        products_with_scores = product_dicts
         
         # dictをProductに戻す
         processed_products_with_scores = []
         for pd in products_with_scores:
             processed_products_with_scores.append(Product(**pd))
         
-        # データベースに保存
+        # スコアを反映（価格履歴はページごとの保存で記録済み）
         db_start = time.time()
-        await db.upsert_products(processed_products_with_scores)
+        await db.upsert_products(processed_products_with_scores, record_history=False)
+        # バッファに残っている価格履歴を書き出し、日次・週次の集計を更新する
+        await db.price_history.flush()
         db_time = time.time() - db_start
-        print(f"Saved to database in {db_time:.2f}s")
+        print(f"Saved scores to database in {db_time:.2f}s")
+        checkpoint.complete()
         
         # フィルタリング
         if filter == 'single':
@@ -579,8 +658,13 @@ async def refetch_single_product(asin: str):
             is_double=extracted_info['is_double']
         )
         
-        # データベースに保存
+        # 総合スコアを計算（テーブル全体の最小/最大単価が変わる場合だけ全件を再計算）
         db_start = time.time()
+        product_row = updated_product.dict()
+        await db.score_incrementally('toilet_paper_products', [product_row])
+        updated_product.total_score = product_row.get('total_score')
+        
+        # データベースに保存
         await db.upsert_products([updated_product])
         db_time = time.time() - db_start
         
@@ -632,7 +716,7 @@ async def search_dishwashing_internal(
         
         # 強制更新でない限り、DBキャッシュを優先的に使用
         if not force:
-            cached_products = await db.get_all_dishwashing_products(filter)
+            cached_products = await db.get_all_dishwashing_products(filter, listing=True)
             if cached_products:
                 print(f"Returning {len(cached_products)} dishwashing products from database")
                 return {
@@ -645,7 +729,9 @@ async def search_dishwashing_internal(
         
         # force=true の場合のみスクレイピング実行
         print(f"Force refresh requested - Scraping Amazon for: {keyword}")
-        scraped_products = await scraper.search_products(keyword)
+        # 途中で止まった実行があれば、取得済みのページを再利用する
+        checkpoint = open_run('dishwashing_liquid', keyword)
+        scraped_products = await scraper.search_products(keyword, checkpoint=checkpoint)
         print(f"Scraped {len(scraped_products)} products")
         
         # 既存商品のASINと情報を取得
@@ -657,6 +743,7 @@ async def search_dishwashing_internal(
         
         # 処理と保存
         processed_products = []
+        new_products = []
         new_products_count = 0
         updated_products_count = 0
         
@@ -705,15 +792,16 @@ async def search_dishwashing_internal(
                 processed_products.append(processed_product)
                 continue
             
-            # 新商品：ChatGPT解析が必要
+            # 新商品：ChatGPT解析が必要（ループの後でまとめて解析）
             new_products_count += 1
             print(f"New dishwashing product detected: {asin}, analyzing with ChatGPT...")
-            
-            # ChatGPT解析
-            extracted_info = await text_parser.extract_dishwashing_info(
-                product['title'], 
-                product.get('description', '')
-            )
+            new_products.append(product)
+        
+        # 新商品のChatGPT解析（複数商品を1リクエストにまとめ、リクエストは並列に送る）
+        extracted_infos = await text_parser.extract_dishwashing_info_batch(new_products) if new_products else {}
+        
+        for product in new_products:
+            extracted_info = extracted_infos[product['asin']]
             
             # 食洗機用製品はスキップ
             if extracted_info.get('is_dishwasher', False):
@@ -759,7 +847,9 @@ async def search_dishwashing_internal(
         processed_products_with_scores = calculate_all_scores(processed_products, 'price_per_1000ml')
         
         # データベースに保存
-        await db.save_dishwashing_products(processed_products_with_scores)
+        # 保存に失敗した場合は、次の実行で取得済みのページを再利用できるようにチェックポイントを残す
+        if await db.save_dishwashing_products(processed_products_with_scores):
+            checkpoint.complete()
         
         # フィルタリング
         if filter == 'refill':
@@ -793,9 +883,31 @@ async def search_dishwashing_products(
     keyword: str = "食器用洗剤",
     filter: Optional[str] = None,
     force: bool = False,
-    scrape_token: Optional[str] = None
+    scrape_token: Optional[str] = None,
+    sort: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None
 ):
-    """食器用洗剤の検索APIエンドポイント（list形式で返す）"""
+    """食器用洗剤の検索APIエンドポイント（list形式で返す。sort / cursor / limit を指定するとページ単位）"""
+    if not force:
+        try:
+            page = requested_page('dishwashing_liquid_products', sort, cursor, limit)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if page:
+            body = await page_body(
+                db, 'dishwashing_liquid_products', known_filter(filter, DISHWASHING_FILTERS), page,
+                lambda page: db.get_all_dishwashing_products(filter, listing=True, page=page)
+            )
+            return Response(content=body, media_type="application/json")
+
+        entry = await db.read_cache.get(
+            'dishwashing_liquid_products', known_filter(filter, DISHWASHING_FILTERS), 'price_per_1000ml',
+            lambda: db.get_all_dishwashing_products(filter, listing=True)
+        )
+        if entry:
+            return Response(content=entry.body, media_type="application/json")
+    
     result = await search_dishwashing_internal(keyword, filter, force, scrape_token)
     return result["products"]  # APIエンドポイントとしてはproductsのみを返す
 
@@ -811,7 +923,25 @@ app.include_router(rice_router)
 from app.endpoints.mask import router as mask_router
 app.include_router(mask_router)
 
+# 価格推移エンドポイントを追加
+from app.endpoints.price_history import router as price_history_router
+app.include_router(price_history_router)
+
+# 商品詳細エンドポイントを追加
+from app.endpoints.product_detail import router as product_detail_router
+app.include_router(product_detail_router)
+
+_prewarm_task: Optional[asyncio.Task] = None
+
+@app.on_event("startup")
+async def startup_event():
+    # Chromeの起動を待たずにリクエストを受け付ける（起動中に借りに来たリクエストは起動完了を待つ）
+    global _prewarm_task
+    _prewarm_task = asyncio.create_task(prewarm_browser_pool())
+
 @app.on_event("shutdown")
 async def shutdown_event():
     await scraper.close()
-    await text_parser.close()
\ No newline at end of file
+    await text_parser.close()
+    await db.close()
+    shutdown_scraper_executor()
\ No newline at end of file
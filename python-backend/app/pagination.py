@@ -0,0 +1,175 @@
+"""
+一覧のカーソル（キーセット）ページングと並び替え
+
+一覧エンドポイントに sort / cursor / limit のいずれかを指定すると、テーブル全体ではなく limit 件ずつ返す。
+並び順は (並び替えの列, asin) で一意に決まり、カーソルは前のページの最後の商品の (値, asin) なので、
+OFFSETと違って何ページ目でもDBは索引をたどって limit 件を読むだけで済み、ページの間に商品が増減しても重複・欠落しない。
+値がnullの商品は昇順・降順とも最後に並べる。
+
+DBの一覧は apply_page で PostgREST の order / and フィルタ / limit に変換し、
+メモリ上の索引（マスクのファセット索引）は row_key の順に並べ替え済みのリストをたどる。
+読み取りキャッシュに入れるのは (テーブル, フィルタ, sort) ごとの最初のページだけで、カーソル以降のページは毎回読む
+（カーソルはクライアントが決める値なので、カーソルごとのエントリは作らない）。
+"""
+import base64
+import json
+from dataclasses import dataclass, replace
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .listing import LISTING_COLUMNS
+from .read_cache import dump_json, json_envelope
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# 並び替えの名前 -> (列, 降順か)。unit_price の列はテーブルごとに決まる
+SORTS: Dict[str, Tuple[Optional[str], bool]] = {
+    'unit_price': (None, False),
+    'total_score': ('total_score', True),
+    'discount': ('discount_percent', True),
+    'review_count': ('review_count', True),
+}
+
+UNIT_PRICE_FIELDS: Dict[str, str] = {
+    'toilet_paper_products': 'price_per_m',
+    'dishwashing_liquid_products': 'price_per_1000ml',
+    'mask_products': 'price_per_mask',
+    'mineral_water_products': 'price_per_liter',
+    'rice_products': 'price_per_kg',
+}
+
+
+@dataclass
+class Page:
+    sort: str
+    column: str
+    desc: bool
+    limit: int
+    after: Optional[Tuple[Any, str]] = None  # 前のページの最後の商品の (値, asin)
+
+
+def make_page(table: str, sort: Optional[str], cursor: Optional[str], limit: Optional[int],
+              columns: str) -> Page:
+    """クエリパラメータからPageを作る（不正な値はValueError）
+
+    columns: テーブルの一覧用の列（並び替えの列が含まれていること）
+    """
+    sort = sort or 'unit_price'
+    if sort not in SORTS:
+        raise ValueError(f"sort must be one of {', '.join(SORTS)}")
+    column, desc = SORTS[sort]
+    column = column or UNIT_PRICE_FIELDS[table]
+    if column not in columns.split(','):
+        raise ValueError(f"sort '{sort}' is not available for this category")
+    limit = limit or DEFAULT_PAGE_SIZE
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+
+    after = None
+    if cursor:
+        try:
+            data = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+            cursor_sort, value, asin = data['s'], data['v'], str(data['a'])
+        except Exception:
+            raise ValueError("invalid cursor")
+        if cursor_sort != sort:
+            raise ValueError("cursor was issued for a different sort")
+        if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float))):
+            raise ValueError("invalid cursor")
+        after = (value, asin)
+    return Page(sort=sort, column=column, desc=desc, limit=limit, after=after)
+
+
+def requested_page(table: str, sort: Optional[str], cursor: Optional[str], limit: Optional[int]) -> Optional[Page]:
+    """一覧エンドポイントのクエリパラメータからPageを作る（どれも指定がなければ従来どおり全件なのでNone）"""
+    if sort is None and cursor is None and limit is None:
+        return None
+    return make_page(table, sort, cursor, limit, LISTING_COLUMNS[table])
+
+
+async def page_body(db, table: str, filter: Optional[str], page: Page,
+                    load: Callable[[Page], Awaitable[List[Dict[str, Any]]]], cache: bool = True,
+                    **fields: Any) -> bytes:
+    """1ページを読み込み、{"products": [...], "next_cursor": ..., ...} のJSONにする
+
+    最初のページ（カーソルなし）は MAX_PAGE_SIZE 件を読み取りキャッシュに入れ、limit 件に切って返す
+    （limit ごとにもエントリを作らない）。カーソル以降のページと cache=False（キーワードなど自由入力の条件を含む場合）は
+    キャッシュを通さずに読み込む。filterは既知の値に正規化してから渡すこと。
+    """
+    if cache and page.after is None:
+        entry = await db.read_cache.get(
+            table, filter, f"first_page:{page.sort}", lambda: load(replace(page, limit=MAX_PAGE_SIZE))
+        )
+        rows = entry.rows[:page.limit] if entry else []
+        body = entry.body if entry and len(entry.rows) <= page.limit else dump_json(rows)
+    else:
+        rows = await load(page)
+        body = dump_json(rows)
+    return json_envelope(
+        body,
+        count=len(rows),
+        sort=page.sort,
+        limit=page.limit,
+        next_cursor=next_cursor(page, rows),
+        **fields
+    )
+
+
+def next_cursor(page: Page, rows: List[Dict[str, Any]]) -> Optional[str]:
+    """次のページのカーソル（limit件に満たなければ最後のページなのでNone）"""
+    if len(rows) < page.limit:
+        return None
+    last = rows[-1]
+    data = {'s': page.sort, 'v': last.get(page.column), 'a': last['asin']}
+    return base64.urlsafe_b64encode(json.dumps(data, separators=(',', ':')).encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def row_key(page: Page, row: Dict[str, Any]) -> Tuple:
+    """メモリ上で並べるときのキー（apply_page の order と同じ順序）"""
+    return _key(page, row.get(page.column), row['asin'])
+
+
+def after_key(page: Page) -> Optional[Tuple]:
+    return _key(page, *page.after) if page.after else None
+
+
+def _key(page: Page, value: Any, asin: str) -> Tuple:
+    if value is None:
+        return (1, 0, asin)
+    value = float(value)
+    return (0, -value if page.desc else value, asin)
+
+
+def _literal(value: Any) -> str:
+    """PostgRESTのフィルタの値（ダブルクォートで囲む）"""
+    text = str(value).replace('\\', '\\\\').replace('"', '\\"')
+    return f'"{text}"'
+
+
+def apply_page(query, page: Page, conditions: Optional[List[str]] = None):
+    """PostgRESTのクエリに並び順・カーソル以降の条件・件数を設定する
+
+    conditions: and=(...) にまとめる追加の条件（例: "or(title.ilike.*x*,description.ilike.*x*)"）
+    """
+    conditions = list(conditions or [])
+    if page.after:
+        value, asin = page.after
+        column = page.column
+        if value is None:
+            conditions.append(f"and({column}.is.null,asin.gt.{_literal(asin)})")
+        else:
+            op = 'lt' if page.desc else 'gt'
+            conditions.append(
+                f"or({column}.{op}.{value},{column}.is.null,and({column}.eq.{value},asin.gt.{_literal(asin)}))"
+            )
+    if conditions:
+        query.params = query.params.add('and', f"({','.join(conditions)})")
+    direction = 'desc' if page.desc else 'asc'
+    query.params = query.params.add('order', f"{page.column}.{direction}.nullslast,asin.asc")
+    return query.limit(page.limit)
+
+
+def keyword_condition(keyword: str, columns: Tuple[str, ...] = ('title', 'description')) -> str:
+    """いずれかの列にkeywordを含む（大文字小文字を区別しない）条件"""
+    pattern = _literal(f'*{keyword}*')
+    return f"or({','.join(f'{column}.ilike.{pattern}' for column in columns)})"
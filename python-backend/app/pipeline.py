@@ -0,0 +1,98 @@
+"""
+スクレイピング結果を流す非同期パイプライン
+
+取得 → 解析 → 重複除去 → 抽出 → 単価計算 → 保存 の各ステージを非同期ジェネレーターでつなぐ。
+ステージの間は大きさに上限のあるキュー（asyncio.Queue）で、後ろのステージが詰まると前のステージが待つ
+（バックプレッシャー）。全ページを取得し終えるのを待たずに、処理できた商品から順にDBへ保存される。
+
+- map_stage: 入力を1件ずつ非同期関数に通す（concurrency個まで並列、出力の順序は保証しない）
+- いずれかのステージで例外が起きると、後続のステージを通してそのまま呼び出し側に送出される
+  （それまでに保存されたバッチは残る）
+- 呼び出し側が途中で読むのをやめた場合は、ワーカーのタスクをキャンセルする
+"""
+import asyncio
+from typing import AsyncIterable, AsyncIterator, Awaitable, Callable, Iterable, List, Optional, TypeVar
+
+T = TypeVar('T')
+U = TypeVar('U')
+
+_DONE = object()
+
+
+class _StageError:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+async def iterate(items: Iterable[T]) -> AsyncIterator[T]:
+    """リストなどを非同期イテレーターに変換する"""
+    for item in items:
+        yield item
+
+
+async def map_stage(source: AsyncIterable[T], func: Callable[[T], Awaitable[Optional[U]]],
+                    concurrency: int = 1, maxsize: int = 1) -> AsyncIterator[U]:
+    """sourceの各要素にfuncを適用して結果を流す（Noneは流さない）
+
+    出力キューがmaxsize件たまるとワーカーは待つので、読む側が遅ければsourceの読み込みも止まる。
+    """
+    output: asyncio.Queue = asyncio.Queue(maxsize=max(1, maxsize))
+    iterator = source.__aiter__()
+    read_lock = asyncio.Lock()
+
+    async def worker() -> None:
+        try:
+            while True:
+                async with read_lock:
+                    try:
+                        item = await iterator.__anext__()
+                    except StopAsyncIteration:
+                        break
+                result = await func(item)
+                if result is not None:
+                    await output.put(result)
+        except Exception as e:
+            await output.put(_StageError(e))
+        # キャンセルされた場合は読む側がいないので何も入れない
+        await output.put(_DONE)
+
+    workers = [asyncio.create_task(worker()) for _ in range(max(1, concurrency))]
+    running = len(workers)
+    try:
+        while running:
+            result = await output.get()
+            if result is _DONE:
+                running -= 1
+            elif isinstance(result, _StageError):
+                raise result.error
+            else:
+                yield result
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        # 前のステージ（非同期ジェネレーター）も閉じて、そのワーカーを止める
+        if hasattr(iterator, 'aclose'):
+            try:
+                await iterator.aclose()
+            except Exception:
+                pass
+
+
+async def flatten(source: AsyncIterable[List[T]]) -> AsyncIterator[T]:
+    """リストを流すステージを要素ごとに展開する"""
+    async for items in source:
+        for item in items:
+            yield item
+
+
+async def batched(source: AsyncIterable[T], size: int) -> AsyncIterator[List[T]]:
+    """size件ずつまとめて流す（最後は端数）"""
+    batch: List[T] = []
+    async for item in source:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
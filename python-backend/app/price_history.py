@@ -0,0 +1,182 @@
+"""
+価格履歴の書き込みバッファと日次・週次の集計
+
+PriceHistoryWriter は price_history に追記する行をためておき、PRICE_HISTORY_FLUSH_SIZE 件たまるか、
+最も古い行が PRICE_HISTORY_FLUSH_SECONDS 秒を過ぎたら（または flush() で）まとめてinsertする。
+同時に ASIN・期間（日 / 週）ごとの最小・最大・合計・件数を price_history_rollups に加算する。
+/api/price-history/{asin} のグラフは集計の行だけを読むので、生の履歴が何件あっても読む行数は期間の数で決まる。
+
+バッファはプロセス内にあるので、Database.close() と get_price_history() の前に書き出す。
+プロセスが異常終了した場合、書き出す前の行は失われる（最大 PRICE_HISTORY_FLUSH_SIZE 件）。
+"""
+import asyncio
+import os
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+ROLLUP_TABLE = 'price_history_rollups'
+ROLLUP_KEY = 'asin,period,period_start'
+PERIODS = ('day', 'week')
+
+# 集計する値（列名の接頭辞）
+ROLLUP_FIELDS = ('price', 'price_per_m')
+
+RollupKey = Tuple[str, str, str]
+
+
+def period_start(recorded_at: datetime, period: str) -> date:
+    """期間の開始日（UTC。週は月曜日から）"""
+    day = recorded_at.astimezone(timezone.utc).date()
+    if period == 'week':
+        return day - timedelta(days=day.weekday())
+    return day
+
+
+def _parse_time(value: Any) -> datetime:
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+
+
+def rollup_rows(rows: List[Dict[str, Any]]) -> Dict[RollupKey, Dict[str, Any]]:
+    """履歴の行を (ASIN, 期間, 開始日) ごとに集計する"""
+    rollups: Dict[RollupKey, Dict[str, Any]] = {}
+    for row in rows:
+        recorded_at = _parse_time(row['recorded_at'])
+        for period in PERIODS:
+            key = (row['asin'], period, period_start(recorded_at, period).isoformat())
+            rollup = rollups.get(key)
+            if rollup is None:
+                rollup = rollups[key] = empty_rollup(*key)
+            add_sample(rollup, row)
+    return rollups
+
+
+def empty_rollup(asin: str, period: str, start: str) -> Dict[str, Any]:
+    rollup = {'asin': asin, 'period': period, 'period_start': start, 'sale_samples': 0}
+    for name in ROLLUP_FIELDS:
+        rollup.update({f'{name}_min': None, f'{name}_max': None, f'{name}_sum': 0, f'{name}_samples': 0})
+    return rollup
+
+
+def add_sample(rollup: Dict[str, Any], row: Dict[str, Any]) -> None:
+    for name in ROLLUP_FIELDS:
+        value = row.get(name)
+        if value is None:
+            continue
+        merge_values(rollup, name, value, value, value, 1)
+    if row.get('on_sale'):
+        rollup['sale_samples'] += 1
+
+
+def merge_values(rollup: Dict[str, Any], name: str, low: Any, high: Any, total: Any, samples: int) -> None:
+    if not samples:
+        return
+    current_low, current_high = rollup[f'{name}_min'], rollup[f'{name}_max']
+    rollup[f'{name}_min'] = low if current_low is None else min(current_low, low)
+    rollup[f'{name}_max'] = high if current_high is None else max(current_high, high)
+    rollup[f'{name}_sum'] = (rollup[f'{name}_sum'] or 0) + total
+    rollup[f'{name}_samples'] = (rollup[f'{name}_samples'] or 0) + samples
+
+
+def merge_rollup(existing: Dict[str, Any], partial: Dict[str, Any]) -> Dict[str, Any]:
+    """保存済みの集計に、新しい履歴の集計を加える"""
+    merged = empty_rollup(existing['asin'], existing['period'], str(existing['period_start']))
+    for source in (existing, partial):
+        for name in ROLLUP_FIELDS:
+            merge_values(merged, name, source.get(f'{name}_min'), source.get(f'{name}_max'),
+                         source.get(f'{name}_sum') or 0, source.get(f'{name}_samples') or 0)
+        merged['sale_samples'] += source.get('sale_samples') or 0
+    return merged
+
+
+def series_point(rollup: Dict[str, Any]) -> Dict[str, Any]:
+    """集計の行をグラフの1点にする（平均は合計 / 件数）"""
+    point = {'period_start': str(rollup['period_start'])}
+    for name in ROLLUP_FIELDS:
+        samples = rollup.get(f'{name}_samples') or 0
+        point[f'{name}_min'] = rollup.get(f'{name}_min')
+        point[f'{name}_max'] = rollup.get(f'{name}_max')
+        point[f'{name}_avg'] = round(float(rollup[f'{name}_sum']) / samples, 2) if samples else None
+    point['samples'] = max(rollup.get(f'{name}_samples') or 0 for name in ROLLUP_FIELDS)
+    point['on_sale_ratio'] = round(rollup.get('sale_samples', 0) / point['samples'], 2) if point['samples'] else None
+    return point
+
+
+class PriceHistoryWriter:
+    """price_history への追記をまとめて書き出すバッファ"""
+
+    def __init__(self, db, flush_size: Optional[int] = None, flush_seconds: Optional[float] = None):
+        self.db = db
+        self.flush_size = max(1, flush_size or int(os.getenv('PRICE_HISTORY_FLUSH_SIZE', '500')))
+        self.flush_seconds = flush_seconds if flush_seconds is not None else float(os.getenv('PRICE_HISTORY_FLUSH_SECONDS', '300'))
+        self._buffer: List[Dict[str, Any]] = []
+        self._oldest: Optional[float] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._lock_loop: Optional[asyncio.AbstractEventLoop] = None
+        self.stats = {'buffered': 0, 'flushes': 0, 'rows_written': 0, 'rollups_written': 0}
+
+    async def add(self, rows: List[Dict[str, Any]]) -> None:
+        """履歴の行を追加する（recorded_atがなければ現在時刻）"""
+        if not rows:
+            return
+        now = datetime.now(timezone.utc).isoformat()
+        for row in rows:
+            row.setdefault('recorded_at', now)
+        if not self._buffer:
+            self._oldest = time.monotonic()
+        self._buffer.extend(rows)
+        self.stats['buffered'] += len(rows)
+        if len(self._buffer) >= self.flush_size or time.monotonic() - self._oldest >= self.flush_seconds:
+            await self.flush()
+
+    def _flush_lock(self) -> asyncio.Lock:
+        # 集計の読み込み・加算・書き込みが重ならないように書き出しは1つずつ行う
+        # （asyncio.runを繰り返すLambdaではイベントループごとに作り直す）
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._lock_loop is not loop:
+            self._lock = asyncio.Lock()
+            self._lock_loop = loop
+        return self._lock
+
+    async def flush(self) -> None:
+        """たまっている行をinsertし、集計に加える"""
+        async with self._flush_lock():
+            rows, self._buffer = self._buffer, []
+            if not rows:
+                return
+            result = await self.db.bulk_insert('price_history', rows)
+            failed = {error.get('asin') for error in result['errors']}
+            try:
+                written = await self._merge_rollups(rollup_rows([row for row in rows if row['asin'] not in failed]))
+            except Exception as e:
+                # 生の履歴は保存済みなので、集計だけ失敗した場合は警告にとどめる
+                print(f"[WARNING] Failed to update price history rollups: {str(e)}")
+                written = 0
+            self.stats['flushes'] += 1
+            self.stats['rows_written'] += result['inserted']
+            self.stats['rollups_written'] += written
+            print(f"[INFO] Flushed {result['inserted']} price history rows ({len(result['errors'])} errors), "
+                  f"updated {written} rollups")
+
+    async def _merge_rollups(self, rollups: Dict[RollupKey, Dict[str, Any]]) -> int:
+        if not rollups:
+            return 0
+        asins = sorted({key[0] for key in rollups})
+        earliest = min(key[2] for key in rollups)
+        responses = await asyncio.gather(*(
+            self.db.rest.table(ROLLUP_TABLE).select('*').in_('asin', batch).gte('period_start', earliest).execute()
+            for batch in self.db._batches(asins)
+        ))
+        merged = []
+        existing = {
+            (row['asin'], row['period'], str(row['period_start'])): row
+            for response in responses for row in response.data or []
+        }
+        now = datetime.now(timezone.utc).isoformat()
+        for key, partial in rollups.items():
+            current = existing.get(key)
+            merged.append({**(merge_rollup(current, partial) if current else partial), 'updated_at': now})
+        result = await self.db.bulk_upsert(ROLLUP_TABLE, merged, on_conflict=ROLLUP_KEY)
+        return result['upserted']
@@ -0,0 +1,24 @@
+"""
+複数商品をまとめて抽出するためのプロンプト定義
+"""
+
+BATCH_PROMPT = """
+以下の商品リストの各商品について、指示に従って情報を抽出してください。
+
+# 指示
+{instructions}
+
+# 商品リスト（JSON）
+{items}
+
+# 出力形式
+商品ごとに {fields} を抽出し、入力と同じ "asin" を含むオブジェクトのJSON配列で返してください。
+例: [{{"asin": "B0XXXXXXXX", {example}}}]
+全ての商品について1件ずつ返してください。JSON配列のみを返し、説明は不要です。
+"""
+
+# 単品用プロンプトの {combined_text} の代わりに埋め込む文言
+ITEMS_PLACEHOLDER = "（下の商品リストの各商品）"
+
+# 1商品あたりの説明文の最大文字数（まとめて送るときのトークン数を抑えるため）
+MAX_DESCRIPTION_CHARS = 1000
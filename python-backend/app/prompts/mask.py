@@ -66,4 +66,10 @@ USER_PROMPT_TEMPLATE = """
 }}
 
 情報が取得できない場合は、その項目にnullを設定してください。
-"""
\ No newline at end of file
+"""
+
+FIELDS = {
+    'mask_count': None,
+    'mask_size': None,
+    'mask_color': None
+}
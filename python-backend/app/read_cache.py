@@ -0,0 +1,155 @@
+"""
+一覧エンドポイント用のプロセス内読み取りキャッシュ
+
+商品データはスクレイピング（数時間おき）でしか変わらないので、
+(テーブル, フィルタ, ソート) ごとに並び替え済みの商品リストとJSONバイト列を保持し、
+リクエストごとのSupabase問い合わせとシリアライズを省く。
+エントリはTTLで失効するほか、Databaseが該当テーブルに書き込んだ時点で破棄される。
+
+キーにはクライアントが指定するフィルタが含まれるので、呼び出し側は既知の値に正規化してから渡す（known_filter）。
+それでもエントリ数は READ_CACHE_MAX_ENTRIES で上限を設け、最も長く使われていないものから捨てる。
+同じキーの読み込みをまとめるロックは読み込み中のキーにだけ存在し、待っている呼び出しがなくなれば消す。
+"""
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any, Awaitable, Callable, Collection, Deque, Dict, List, Optional, Tuple
+
+CacheKey = Tuple[str, Optional[str], Optional[str]]
+
+# レイテンシの統計に使う直近のサンプル数（テーブルごと）
+LATENCY_SAMPLES = 1000
+
+
+def known_filter(filter: Optional[str], allowed: Collection[str]) -> Optional[str]:
+    """キャッシュのキーに使うフィルタ（一覧の読み込みが無視する未知の値は None と同じ結果なので None にまとめる）"""
+    return filter if filter in allowed else None
+
+
+def dump_json(value: Any) -> bytes:
+    """FastAPIのJSONResponseと同じ形式でシリアライズする"""
+    return json.dumps(value, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def json_envelope(products_body: bytes, **fields: Any) -> bytes:
+    """シリアライズ済みの商品リストを {"products": [...], ...fields} の形に埋め込む"""
+    head = dump_json(fields)
+    if head == b"{}":
+        return b'{"products":' + products_body + b"}"
+    return head[:-1] + b',"products":' + products_body + b"}"
+
+
+@dataclass
+class CacheEntry:
+    rows: List[Dict[str, Any]]
+    body: bytes
+    expires_at: float
+
+
+class _TableStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.latencies: Deque[float] = deque(maxlen=LATENCY_SAMPLES)
+
+    def as_dict(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        latencies = sorted(self.latencies)
+
+        def percentile(p: float) -> Optional[float]:
+            if not latencies:
+                return None
+            index = min(len(latencies) - 1, int(round(p * (len(latencies) - 1))))
+            return round(latencies[index] * 1000, 3)
+
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else None,
+            "p50_ms": percentile(0.50),
+            "p99_ms": percentile(0.99),
+        }
+
+
+class ReadCache:
+    """TTL付き・書き込み時に破棄される一覧キャッシュ"""
+
+    def __init__(self, ttl: timedelta, max_entries: Optional[int] = None):
+        self.ttl_seconds = ttl.total_seconds()
+        self.max_entries = max(1, max_entries or int(os.getenv('READ_CACHE_MAX_ENTRIES', '256')))
+        # 使われた順（最後が最近）。上限を超えたら先頭から捨てる
+        self._entries: "OrderedDict[CacheKey, CacheEntry]" = OrderedDict()
+        # 読み込み中のキー -> [ロック, 待っている呼び出しの数]
+        self._locks: Dict[CacheKey, List[Any]] = {}
+        # 読み込み中に書き込みがあった場合に古い結果を保存しないための世代番号
+        self._generations: Dict[str, int] = {}
+        self._stats: Dict[str, _TableStats] = {}
+
+    async def get(self, table: str, filter: Optional[str], sort: Optional[str],
+                  loader: Callable[[], Awaitable[List[Dict[str, Any]]]]) -> Optional[CacheEntry]:
+        """キャッシュ済みのエントリを返す。なければloaderで読み込んで保存する
+
+        loaderはフィルタ・ソート済みの商品リストを返すこと。
+        結果が空の場合は保存せずNoneを返す（呼び出し側で初回スクレイピングに進むため）。
+        """
+        key = (table, filter, sort)
+        stats = self._stats.setdefault(table, _TableStats())
+        start = time.perf_counter()
+
+        entry = self._fresh_entry(key)
+        if entry is None:
+            # 同じキーの読み込みは1回にまとめる
+            holder = self._locks.setdefault(key, [asyncio.Lock(), 0])
+            holder[1] += 1
+            try:
+                async with holder[0]:
+                    entry = self._fresh_entry(key)
+                    if entry is None:
+                        stats.misses += 1
+                        generation = self._generations.get(table, 0)
+                        rows = await loader()
+                        if rows:
+                            entry = CacheEntry(rows=rows, body=dump_json(rows), expires_at=time.monotonic() + self.ttl_seconds)
+                            if self._generations.get(table, 0) == generation:
+                                self._store(key, entry)
+                        stats.latencies.append(time.perf_counter() - start)
+                        return entry
+            finally:
+                holder[1] -= 1
+                if not holder[1] and self._locks.get(key) is holder:
+                    del self._locks[key]
+
+        stats.hits += 1
+        stats.latencies.append(time.perf_counter() - start)
+        return entry
+
+    def _fresh_entry(self, key: CacheKey) -> Optional[CacheEntry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _store(self, key: CacheKey, entry: CacheEntry) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, table: str) -> None:
+        """テーブルのエントリをすべて破棄する"""
+        self._generations[table] = self._generations.get(table, 0) + 1
+        for key in [key for key in self._entries if key[0] == table]:
+            del self._entries[key]
+
+    def stats(self) -> Dict[str, Any]:
+        """テーブルごとのヒット率とレイテンシ（ミリ秒）"""
+        return {table: stats.as_dict() for table, stats in self._stats.items()}
+
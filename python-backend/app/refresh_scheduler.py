@@ -0,0 +1,138 @@
+"""
+価格更新の対象を決めるスケジューラー
+
+update_products.update_product_prices から使う。商品ごとに次の更新予定時刻を
+価格履歴（price_history）の変動のしやすさ・セール中かどうか・前回の取得時刻（last_fetched_at）から決め、
+予定時刻を過ぎた商品だけを1回の実行あたり REFRESH_PAGE_BUDGET 件まで更新する。
+
+- 価格履歴から1時間あたりの価格変化の回数を推定し、1回の間隔で変わる回数の期待値が
+  REFRESH_TARGET_CHANGES になるように間隔を決める
+- セール中の商品は REFRESH_MIN_INTERVAL_HOURS ごとに更新する（セールの終了を早く反映するため）
+- 価格が変わらない商品は最大 REFRESH_MAX_INTERVAL_HOURS まで間隔を空ける
+- 履歴が少ない商品（新しく追加された商品など）は変動のしやすさが分かるまで最短の間隔で更新する
+- 予定時刻を過ぎた商品が予算より多い場合は、前回の取得から価格が変わった回数の期待値が大きい順に選ぶ
+- 価格を取得できなかった商品（refresh_failures > 0）は最後の試行（last_attempted_at）から
+  最短の間隔 × 2^(失敗回数-1)（最大 REFRESH_MAX_INTERVAL_HOURS）待ってから、正常な商品の後に選ぶ
+  （取得できない商品が毎回予算を使い切らないようにするため）
+"""
+import os
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+# 変動のしやすさを判断するのに必要な履歴の件数
+MIN_HISTORY_POINTS = 3
+
+
+@dataclass
+class RefreshPolicy:
+    min_interval: timedelta
+    max_interval: timedelta
+    page_budget: int
+    history_window: timedelta
+    target_changes: float = 0.5
+
+    @classmethod
+    def from_env(cls) -> 'RefreshPolicy':
+        return cls(
+            min_interval=timedelta(hours=float(os.getenv('REFRESH_MIN_INTERVAL_HOURS', '4'))),
+            max_interval=timedelta(hours=float(os.getenv('REFRESH_MAX_INTERVAL_HOURS', '72'))),
+            page_budget=int(os.getenv('REFRESH_PAGE_BUDGET', '50')),
+            history_window=timedelta(days=float(os.getenv('REFRESH_HISTORY_DAYS', '14'))),
+            target_changes=float(os.getenv('REFRESH_TARGET_CHANGES', '0.5')),
+        )
+
+
+@dataclass
+class RefreshPlan:
+    due: List[Dict[str, Any]]  # 今回更新する商品（優先度順）
+    deferred: int  # 予定時刻を過ぎているが予算を超えたため次回に回した件数
+    not_due: int  # 予定時刻前のため更新しない件数
+
+
+def parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    """SupabaseのタイムスタンプをUTCのdatetimeに変換（タイムゾーンなしはUTCとみなす）"""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def price_change_rate(history: List[Dict[str, Any]]) -> Optional[float]:
+    """価格履歴から1時間あたりの価格変化の回数を推定する。履歴が少なければNone
+
+    変化が観測されていない商品も0にはせず、期間中に0.5回変化したとみなす
+    （履歴の期間が短いうちは間隔が長くなりすぎないようにするため）。
+    """
+    rows = [row for row in history if row.get('price') and parse_timestamp(row.get('recorded_at'))]
+    if len(rows) < MIN_HISTORY_POINTS:
+        return None
+    rows.sort(key=lambda row: parse_timestamp(row['recorded_at']))
+    prices = [row['price'] for row in rows]
+    span_hours = (parse_timestamp(rows[-1]['recorded_at']) - parse_timestamp(rows[0]['recorded_at'])).total_seconds() / 3600
+    if span_hours <= 0:
+        return None
+    changes = sum(1 for previous, current in zip(prices, prices[1:]) if previous != current)
+    return max(changes, 0.5) / span_hours
+
+
+def effective_change_rate(product: Dict[str, Any], history: List[Dict[str, Any]], policy: RefreshPolicy) -> float:
+    """スケジュールに使う1時間あたりの価格変化の回数（履歴が少ない商品・セール中の商品は最短間隔に相当する値以上）"""
+    fastest = policy.target_changes / (policy.min_interval.total_seconds() / 3600)
+    rate = price_change_rate(history)
+    if rate is None:
+        return fastest
+    return max(rate, fastest) if product.get('on_sale') else rate
+
+
+def refresh_interval(product: Dict[str, Any], history: List[Dict[str, Any]], policy: RefreshPolicy) -> timedelta:
+    """商品の更新間隔。1回の間隔で価格が変わる回数の期待値がtarget_changesになるようにする"""
+    rate = effective_change_rate(product, history, policy)
+    interval = timedelta(hours=policy.target_changes / rate)
+    return min(policy.max_interval, max(policy.min_interval, interval))
+
+
+def retry_backoff(failures: int, policy: RefreshPolicy) -> timedelta:
+    """連続してfailures回取得に失敗した商品を次に試すまでの間隔"""
+    return min(policy.max_interval, policy.min_interval * 2 ** min(max(failures - 1, 0), 16))
+
+
+def plan_refresh(products: List[Dict[str, Any]], history_by_asin: Dict[str, List[Dict[str, Any]]],
+                 policy: Optional[RefreshPolicy] = None, now: Optional[datetime] = None) -> RefreshPlan:
+    """予定時刻を過ぎた商品を優先度順に最大page_budget件選ぶ"""
+    policy = policy or RefreshPolicy.from_env()
+    now = now or datetime.now(timezone.utc)
+
+    candidates = []
+    not_due = 0
+    for product in products:
+        history = history_by_asin.get(product['asin'], [])
+        failures = product.get('refresh_failures') or 0
+        last_attempted = parse_timestamp(product.get('last_attempted_at'))
+        if failures and last_attempted is not None and now - last_attempted < retry_backoff(failures, policy):
+            # 前回の取得に失敗した商品は間隔を空けてから試す
+            not_due += 1
+            continue
+        last_fetched = parse_timestamp(product.get('last_fetched_at'))
+        if last_fetched is None:
+            # 一度も取得していない商品は最優先（失敗した商品の中では最優先）
+            candidates.append((failures > 0, float('inf'), product))
+            continue
+        elapsed = now - last_fetched
+        if elapsed >= refresh_interval(product, history, policy):
+            missed_changes = elapsed.total_seconds() / 3600 * effective_change_rate(product, history, policy)
+            candidates.append((failures > 0, missed_changes, product))
+        else:
+            not_due += 1
+
+    # 正常な商品を先に、その中では優先度の高い順
+    candidates.sort(key=lambda candidate: (candidate[0], -candidate[1]))
+    budget = max(0, policy.page_budget)
+    return RefreshPlan(
+        due=[product for _, _, product in candidates[:budget]],
+        deferred=max(0, len(candidates) - budget),
+        not_due=not_due,
+    )
@@ -0,0 +1,155 @@
+"""
+アーカイブしたHTMLの再解析
+
+パーサーを修正したあと、Amazonにアクセスせずに app/html_archive.py に保存したページを
+プロセスプールで並列に解析し直す。解析結果はページのハッシュ・種類・引数・パーサーのバージョン
+（パーサーのソースコードのハッシュ）ごとにアーカイブに保存し、前回と同じ組み合わせのページは解析を省く。
+ミネラルウォーターは商品カードの解析までを行う（GPTによる抽出は行わない）。
+
+使い方（python-backendディレクトリで実行）:
+    python -m app.reparse --kind search --latest --output /tmp/reparsed.jsonl
+"""
+import argparse
+import contextlib
+import hashlib
+import importlib
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.html_archive import HtmlArchive, read_blob
+
+# 種類ごとの解析関数（"モジュール:属性"）とバージョンの計算に含めるソースファイル
+PAGE_PARSERS: Dict[str, Tuple[str, List[str]]] = {
+    'search': ('app.scraper:AmazonScraper._parse_search_page', ['scraper.py', 'search_parser.py']),
+    'detail': ('app.scraper:AmazonScraper._parse_detail_page', ['scraper.py']),
+    'rice_search': ('app.scrapers.rice_scraper:_parse_rice_page', ['search_parser.py', 'scrapers/rice_scraper.py']),
+    'mineral_water_search': ('app.scrapers.mineral_water_scraper:_parse_mineral_water_page',
+                             ['search_parser.py', 'scrapers/mineral_water_scraper.py']),
+}
+APP_DIR = Path(__file__).parent
+
+
+def parser_version(kind: str) -> str:
+    """解析関数のソースファイルのハッシュ（パーサーを修正すると変わる）"""
+    digest = hashlib.sha256()
+    for source in PAGE_PARSERS[kind][1]:
+        digest.update((APP_DIR / source).read_bytes())
+    return digest.hexdigest()[:12]
+
+
+def _load_parser(kind: str):
+    module_name, attribute = PAGE_PARSERS[kind][0].split(':')
+    target = importlib.import_module(module_name)
+    for name in attribute.split('.'):
+        target = getattr(target, name)
+    return target
+
+
+def parse_archived_page(kind: str, path: str, context: Dict[str, Any]) -> Dict[str, Any]:
+    """1ページを解析する（プロセスプールのワーカーで実行される）"""
+    try:
+        html = read_blob(path)
+        # パーサーのデバッグ出力は再解析では不要なので捨てる
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = _load_parser(kind)(html, **context)
+        return {'result': result}
+    except Exception as e:
+        return {'error': f"{type(e).__name__}: {str(e)}"}
+
+
+def _count_products(result: Any) -> int:
+    if isinstance(result, list):
+        return len(result)
+    return 1 if result else 0
+
+
+def reparse(archive: HtmlArchive, kind: Optional[str] = None, since: Optional[str] = None,
+            latest_only: bool = False, workers: Optional[int] = None, force: bool = False,
+            output: Optional[str] = None) -> Dict[str, Any]:
+    """アーカイブのページを再解析して件数をまとめて返す"""
+    start = time.perf_counter()
+    pages = [page for page in archive.pages(kind, since, latest_only) if page['kind'] in PAGE_PARSERS]
+    versions = {page_kind: parser_version(page_kind) for page_kind in {page['kind'] for page in pages}}
+
+    results: Dict[int, Dict[str, Any]] = {}
+    pending = []
+    for page in pages:
+        cached = None if force else archive.get_parsed(page['sha256'], page['kind'], page['context'], versions[page['kind']])
+        if cached is not None:
+            results[page['id']] = {'result': cached, 'skipped': True}
+        else:
+            pending.append(page)
+
+    # 同じ内容のページ（同じハッシュ・種類・引数）は1回だけ解析する
+    unique: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+    for page in pending:
+        unique.setdefault((page['sha256'], page['kind'], json.dumps(page['context'], sort_keys=True)), page)
+
+    if unique:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+            futures = {
+                key: executor.submit(parse_archived_page, page['kind'], page['path'], page['context'])
+                for key, page in unique.items()
+            }
+            parsed = {key: future.result() for key, future in futures.items()}
+        for key, outcome in parsed.items():
+            if 'result' in outcome:
+                page = unique[key]
+                archive.set_parsed(page['sha256'], page['kind'], page['context'], versions[page['kind']], outcome['result'])
+        for page in pending:
+            results[page['id']] = parsed[(page['sha256'], page['kind'], json.dumps(page['context'], sort_keys=True))]
+
+    errors = [(page, results[page['id']]['error']) for page in pages if 'error' in results[page['id']]]
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            for page in pages:
+                outcome = results[page['id']]
+                f.write(json.dumps({
+                    'kind': page['kind'], 'url': page['url'], 'context': page['context'],
+                    'fetched_at': page['fetched_at'], 'sha256': page['sha256'],
+                    **({'error': outcome['error']} if 'error' in outcome else {'result': outcome['result']}),
+                }, ensure_ascii=False) + '\n')
+
+    return {
+        'pages': len(pages),
+        'parsed': len(unique),
+        'skipped': sum(1 for outcome in results.values() if outcome.get('skipped')),
+        'errors': len(errors),
+        'error_samples': [f"{page['url']}: {error}" for page, error in errors[:5]],
+        'products': sum(_count_products(outcome.get('result')) for outcome in results.values()),
+        'time': round(time.perf_counter() - start, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='アーカイブしたHTMLを再解析する')
+    parser.add_argument('--kind', choices=sorted(PAGE_PARSERS), help='ページの種類（省略時はすべて）')
+    parser.add_argument('--since', help='この日時（ISO 8601）以降に取得したページだけ')
+    parser.add_argument('--latest', action='store_true', help='URLごとに最新のページだけ')
+    parser.add_argument('--workers', type=int, help='プロセス数（省略時はCPU数）')
+    parser.add_argument('--force', action='store_true', help='前回と同じページ・パーサーでも解析し直す')
+    parser.add_argument('--output', help='解析結果を書き出すJSONLファイル')
+    parser.add_argument('--archive-dir', help='アーカイブのディレクトリ（省略時はHTML_ARCHIVE_DIR）')
+    args = parser.parse_args()
+
+    archive = HtmlArchive(args.archive_dir)
+    if not archive.enabled:
+        print("HTML archive is disabled or unavailable")
+        return
+    summary = reparse(archive, args.kind, args.since, args.latest, args.workers, args.force, args.output)
+    print(f"Reparsed {summary['parsed']} pages ({summary['skipped']} unchanged, skipped) of {summary['pages']}, "
+          f"{summary['products']} products, {summary['errors']} errors in {summary['time']}s")
+    for sample in summary['error_samples']:
+        print(f"  {sample}")
+
+
+if __name__ == "__main__":
+    main()
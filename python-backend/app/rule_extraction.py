@@ -0,0 +1,307 @@
+"""
+正規表現による商品情報の抽出（GPTの前段）
+
+商品名に「12ロール」「75m」「770ml」「50枚入」「2L×9本」のように数値と単位が
+はっきり書かれている場合はGPTを呼ばずにローカルで抽出する。
+各商品タイプの抽出関数は項目と確信度（0〜1）を返し、確信度が
+RULE_EXTRACTION_MIN_CONFIDENCE 以上のときだけその結果を使う（それ以外はGPTに回す）。
+
+- 商品名だけを対象にする（説明文は数値が多く誤抽出しやすいのでGPTに任せる）
+- 同じ項目に異なる値が複数見つかった場合や「24ロール分」のような換算表記は確信度を下げる
+- 判定基準は各商品タイプのプロンプト（app/prompts）と同じにしている
+"""
+import os
+import re
+import threading
+import unicodedata
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+
+@dataclass
+class RuleResult:
+    fields: Dict[str, Any]
+    confidence: float
+
+
+RuleExtractor = Callable[[str], RuleResult]
+_RULE_EXTRACTORS: Dict[str, RuleExtractor] = {}
+
+_stats_lock = threading.Lock()
+_stats: Dict[str, Dict[str, int]] = {}
+
+
+def register_rule_extractor(product_type: str):
+    """商品タイプ別の抽出関数を登録するデコレーター"""
+    def decorator(func: RuleExtractor) -> RuleExtractor:
+        _RULE_EXTRACTORS[product_type] = func
+        return func
+    return decorator
+
+
+def min_confidence() -> float:
+    """ローカルの抽出結果を採用する確信度の下限（1より大きくするとすべてGPTに回る）"""
+    return float(os.getenv('RULE_EXTRACTION_MIN_CONFIDENCE', '0.9'))
+
+
+def normalize_title(title: str) -> str:
+    """全角英数字・単位記号（㎖・㎏など）を半角にそろえ、英字は小文字にし、桁区切りのカンマ（1,425ml）を除く"""
+    text = unicodedata.normalize('NFKC', title or '').lower()
+    text = re.sub(r'(?<=\d),(?=\d{3})', '', text)
+    text = re.sub(r'[✕*]|x(?=\s*\d)', '×', text)
+    return re.sub(r'\s+', ' ', text)
+
+
+def extract_by_rules(product_type: str, title: str) -> Optional[RuleResult]:
+    """商品名から項目と確信度を抽出する（抽出関数が登録されていない商品タイプはNone）"""
+    extractor = _RULE_EXTRACTORS.get(product_type)
+    if extractor is None:
+        return None
+    return extractor(normalize_title(title))
+
+
+def resolve_locally(product_type: str, title: str) -> Optional[Dict[str, Any]]:
+    """確信度が十分ならローカルの抽出結果を返す。Noneの場合はGPTで抽出する"""
+    result = extract_by_rules(product_type, title)
+    resolved = result is not None and result.confidence >= min_confidence()
+    with _stats_lock:
+        counts = _stats.setdefault(product_type, {'local': 0, 'gpt': 0})
+        counts['local' if resolved else 'gpt'] += 1
+    return dict(result.fields) if resolved else None
+
+
+def rule_stats() -> Dict[str, Dict[str, Any]]:
+    """商品タイプごとのローカルで抽出できた件数とGPTに回した件数"""
+    with _stats_lock:
+        return {
+            product_type: {
+                **counts,
+                'local_ratio': round(counts['local'] / (counts['local'] + counts['gpt']), 4)
+            }
+            for product_type, counts in _stats.items()
+        }
+
+
+def _distinct(values: Iterable[float]) -> List[float]:
+    return sorted(set(values))
+
+
+def _single(values: Iterable[float]) -> Tuple[Optional[float], float]:
+    """値が1種類だけなら (値, 1.0)、見つからなければ (None, 0.0)、複数なら (None, 0.5)"""
+    values = _distinct(values)
+    if len(values) == 1:
+        return values[0], 1.0
+    return None, (0.0 if not values else 0.5)
+
+
+def _number(text: str) -> float:
+    value = float(text)
+    return int(value) if value.is_integer() else value
+
+
+def _contains_any(text: str, keywords: Iterable[str]) -> bool:
+    return any(keyword in text for keyword in keywords)
+
+
+# --- トイレットペーパー ---
+
+_TP_ROLL_PACK_RE = re.compile(r'(\d+)\s*ロール\s*×\s*(\d+)\s*(?:パック|袋|セット)')
+# 「24ロール分」「48ロール相当」は換算値なので除外
+_TP_ROLL_RE = re.compile(r'(\d+)\s*(?:ロール|個入|巻)(?!\s*(?:分|相当))')
+_TP_CONVERTED_RE = re.compile(r'\d+\s*(?:ロール|m)\s*(?:分|相当)')
+# mm（幅）・ml は長さとして扱わない
+_TP_LENGTH_RE = re.compile(r'(\d+(?:\.\d+)?)\s*(?:m|メートル)(?![a-z])')
+_TP_DOUBLE = ('ダブル', '2枚重ね', '2枚重')
+_TP_SINGLE = ('シングル', '1枚重ね', '1枚重')
+
+
+@register_rule_extractor('toilet_paper')
+def extract_toilet_paper(title: str) -> RuleResult:
+    pack_totals = [int(rolls) * int(packs) for rolls, packs in _TP_ROLL_PACK_RE.findall(title)]
+    if pack_totals:
+        roll_count, roll_confidence = _single(pack_totals)
+    else:
+        roll_count, roll_confidence = _single(int(rolls) for rolls in _TP_ROLL_RE.findall(title))
+    length_m, length_confidence = _single(_number(length) for length in _TP_LENGTH_RE.findall(title))
+
+    is_double = None
+    double_confidence = 0.8  # 表記がなければGPTに任せる（ブランド・商品名から判定できることがある）
+    has_double, has_single = _contains_any(title, _TP_DOUBLE), _contains_any(title, _TP_SINGLE)
+    if has_double != has_single:
+        is_double, double_confidence = has_double, 1.0
+    elif has_double and has_single:
+        double_confidence = 0.5
+
+    confidence = min(roll_confidence, length_confidence, double_confidence)
+    if _TP_CONVERTED_RE.search(title):
+        # 換算表記があると物理的なロール数・長さの判断が難しいので最大でも0.8
+        confidence = min(confidence, 0.8)
+    return RuleResult({'roll_count': roll_count, 'length_m': length_m, 'is_double': is_double}, confidence)
+
+
+# --- 食器用洗剤 ---
+
+_DW_VOLUME_RE = re.compile(
+    r'(\d+(?:\.\d+)?)\s*(ml|l|g)(?![a-z])(?:\s*×\s*(\d+)\s*(?:個|本|袋|パック|セット|コ)?)?'
+)
+_DW_UNIT_ML = {'ml': 1, 'l': 1000, 'g': 1}
+# 「×」のない「2本セット」「3個組」などのまとめ売り（容量の表記で消費されなかったもの）
+_DW_SET_RE = re.compile(r'(\d+)\s*(?:本|個|袋|パック)\s*(?:セット|組|入)')
+_DW_REFILL = ('詰め替え', '詰替', 'つめかえ', 'レフィル', '詰め替')
+_DW_BODY = ('本体',)
+_DW_DISHWASHER = (
+    '食洗機', '食洗器', '食器洗い機', '食器洗い乾燥機', 'dishwasher',
+    'タブレット', 'キューブ', 'ジェルタブ', 'パワーボール', 'フィニッシュ', 'finish',
+)
+_DW_COUNT_ONLY = ('タブレット', 'キューブ', 'ジェルタブ', 'パワーボール', '粉末')
+
+
+@register_rule_extractor('dishwashing_liquid')
+def extract_dishwashing_liquid(title: str) -> RuleResult:
+    totals = []
+    volume_confidence = 1.0
+    for amount, unit, multiplier in _DW_VOLUME_RE.findall(title):
+        totals.append(_number(float(amount) * _DW_UNIT_ML[unit] * int(multiplier or 1)))
+        if unit == 'g':
+            volume_confidence = 0.9  # 液体の重量表記はmlとして扱う
+    volume_ml, found_confidence = _single(totals)
+    volume_confidence = min(volume_confidence, found_confidence)
+    if not totals and _contains_any(title, _DW_COUNT_ONLY):
+        # タブレット・粉末の個数は容量として扱わない
+        volume_confidence = 1.0
+    if totals and any(int(count) > 1 for count in _DW_SET_RE.findall(_DW_VOLUME_RE.sub(' ', title))):
+        # まとめ売りは合計容量を返す（プロンプトと同じ）が、「×」がないと掛けたかどうか判断できないのでGPTに回す
+        volume_confidence = min(volume_confidence, 0.5)
+
+    is_refill = _contains_any(title, _DW_REFILL)
+    refill_confidence = 0.6 if is_refill and _contains_any(title, _DW_BODY) else 1.0
+    is_dishwasher = _contains_any(title, _DW_DISHWASHER)
+
+    return RuleResult(
+        {'volume_ml': volume_ml, 'is_refill': is_refill, 'is_dishwasher': is_dishwasher},
+        min(volume_confidence, refill_confidence)
+    )
+
+
+# --- マスク ---
+
+# 「3枚重ね」「3枚構造」などは枚数ではない
+_MASK_COUNT_RE = re.compile(
+    r'(\d+)\s*枚(?!\s*(?:重ね|重|構造|仕様))(?:入り?)?(?:\s*×\s*(\d+)\s*(?:箱|袋|パック|セット|個|コ))?'
+)
+# 長い表記から順に照合し、照合した部分は消して「やや大きめ」が「大きめ」にも一致しないようにする
+_MASK_SIZES = (
+    ('やや大きめ', 'slightly_large'), ('ややおおきめ', 'slightly_large'), ('少し大きめ', 'slightly_large'),
+    ('やや小さめ', 'slightly_small'), ('ややちいさめ', 'slightly_small'), ('少し小さめ', 'slightly_small'),
+    ('子供用', 'kids'), ('こども用', 'kids'), ('子ども用', 'kids'), ('キッズ', 'kids'),
+    ('幼児用', 'kids'), ('園児用', 'kids'), ('小学生用', 'kids'),
+    ('大きめ', 'large'), ('おおきめ', 'large'), ('ゆったり', 'large'), ('lサイズ', 'large'),
+    ('ラージ', 'large'), ('大きい', 'large'),
+    ('ふつう', 'regular'), ('普通', 'regular'), ('レギュラー', 'regular'), ('標準', 'regular'),
+    ('mサイズ', 'regular'), ('ミディアム', 'regular'), ('スタンダード', 'regular'),
+    ('小さめ', 'small'), ('ちいさめ', 'small'), ('sサイズ', 'small'), ('スモール', 'small'),
+    ('小顔用', 'small'), ('女性用', 'small'), ('小さい', 'small'),
+)
+_MASK_COLORS = (
+    ('ホワイト', 'white'), ('白色', 'white'),
+    ('ブラック', 'black'), ('黒色', 'black'),
+    ('グレー', 'gray'), ('グレイ', 'gray'), ('灰色', 'gray'),
+    ('ピンク', 'pink'), ('桃色', 'pink'),
+    ('ブルー', 'blue'), ('青色', 'blue'), ('ネイビー', 'blue'), ('紺色', 'blue'),
+    ('ベージュ', 'beige'), ('肌色', 'beige'),
+    ('パープル', 'purple'), ('紫色', 'purple'), ('ラベンダー', 'purple'),
+    ('グリーン', 'green'), ('緑色', 'green'),
+    ('イエロー', 'yellow'), ('黄色', 'yellow'),
+)
+_MASK_MULTICOLOR = ('バイカラー', 'ツートン', 'カラーマスク', '色セット', '色アソート', 'アソート')
+# 1文字の表記（プロンプトの「L」「M」「S」「白」「黒」など）は前後が文字でない単独の語のときだけ一致させる
+# （「白元」「75m」「2l」「kid's」などに一致しないように）
+_MASK_SIZE_TOKENS = {'l': 'large', 'm': 'regular', 's': 'small'}
+_MASK_COLOR_TOKENS = {'白': 'white', '黒': 'black', '紺': 'blue', '青': 'blue', '紫': 'purple', '緑': 'green'}
+
+
+def _lone_token_re(tokens: Dict[str, str]) -> re.Pattern:
+    return re.compile(r"(?<![\w'’])(" + '|'.join(map(re.escape, tokens)) + r")(?![\w'’])")
+
+
+_MASK_SIZE_TOKEN_RE = _lone_token_re(_MASK_SIZE_TOKENS)
+_MASK_COLOR_TOKEN_RE = _lone_token_re(_MASK_COLOR_TOKENS)
+
+
+def _match_keywords(title: str, keywords: Tuple[Tuple[str, str], ...],
+                    tokens: Optional[Dict[str, str]] = None, token_re: Optional[re.Pattern] = None) -> List[str]:
+    found = []
+    for keyword, value in keywords:
+        if keyword in title:
+            found.append(value)
+            title = title.replace(keyword, ' ')
+    if tokens:
+        found.extend(tokens[token] for token in token_re.findall(title))
+    return found
+
+
+@register_rule_extractor('mask')
+def extract_mask(title: str) -> RuleResult:
+    mask_count, count_confidence = _single(
+        int(count) * int(multiplier or 1) for count, multiplier in _MASK_COUNT_RE.findall(title)
+    )
+
+    sizes = _distinct(_match_keywords(title, _MASK_SIZES, _MASK_SIZE_TOKENS, _MASK_SIZE_TOKEN_RE))
+    if len(sizes) == 1:
+        mask_size, size_confidence = sizes[0], 1.0
+    elif sizes:
+        mask_size, size_confidence = None, 0.5
+    elif '大人用' in title:
+        mask_size, size_confidence = 'regular', 1.0  # 「大人用」のみの表記はregular
+    else:
+        # サイズの表記が見つからない場合は、正規表現が拾えない表記の可能性があるのでGPTに回す
+        mask_size, size_confidence = None, 0.5
+
+    colors = _distinct(_match_keywords(title, _MASK_COLORS, _MASK_COLOR_TOKENS, _MASK_COLOR_TOKEN_RE))
+    if _contains_any(title, _MASK_MULTICOLOR) or len(colors) > 1:
+        mask_color, color_confidence = 'multicolor', 1.0
+    elif colors:
+        mask_color, color_confidence = colors[0], 1.0
+    else:
+        # 色の記載がなければwhite（プロンプトと同じ）。ただし拾えない表記の可能性があるのでGPTに回す
+        mask_color, color_confidence = 'white', 0.5
+
+    return RuleResult(
+        {'mask_count': mask_count, 'mask_size': mask_size, 'mask_color': mask_color},
+        min(count_confidence, size_confidence, color_confidence)
+    )
+
+
+# --- ミネラルウォーター ---
+
+_MW_VOLUME_RE = re.compile(r'(\d+(?:\.\d+)?)\s*(ml|l)(?![a-z])(?:\s*×\s*(\d+)\s*(?:本|個|コ)?)?')
+_MW_BOTTLES_RE = re.compile(r'(\d+)\s*本')
+_MW_CASES_RE = re.compile(r'×\s*\d+\s*(?:ケース|箱|セット)')
+
+
+@register_rule_extractor('mineral_water')
+def extract_mineral_water(title: str) -> RuleResult:
+    volumes, bottles = [], []
+    for amount, unit, count in _MW_VOLUME_RE.findall(title):
+        volumes.append(int(float(amount) * (1000 if unit == 'l' else 1)))
+        if count:
+            bottles.append(int(count))
+    bottles.extend(int(count) for count in _MW_BOTTLES_RE.findall(title))
+
+    volume_ml, volume_confidence = _single(volumes)
+    bottle_count, bottle_confidence = _single(bottles)
+    if not volume_ml:
+        # 容量がないと総容量・1リットルあたりの価格を計算できないのでGPTに回す
+        volume_confidence = 0.0
+    if _MW_CASES_RE.search(title):
+        # 「24本×2ケース」のような表記は総本数の判断をGPTに任せる
+        bottle_confidence = min(bottle_confidence, 0.5)
+
+    fields: Dict[str, Any] = {}
+    if volume_ml:
+        fields['volume_ml'] = volume_ml
+    if bottle_count:
+        fields['bottle_count'] = bottle_count
+    if volume_ml and bottle_count:
+        fields['total_volume_ml'] = volume_ml * bottle_count
+    return RuleResult(fields, min(volume_confidence, bottle_confidence))
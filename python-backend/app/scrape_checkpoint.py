@@ -0,0 +1,185 @@
+"""
+スクレイピングのチェックポイント
+
+/api/scrape-all のカテゴリやLambdaの価格更新が途中で止まっても（タイムアウト・Lambdaの15分制限・プロセスの再起動）、
+次の実行で続きから再開できるように、実行ごとに次の内容をローカルのSQLiteに記録する。
+
+- 取得済みのページ（検索結果ページを解析した商品のリスト、詳細ページの解析結果）
+- 処理済みのASIN（抽出・単価計算まで終えた商品データ）
+
+同じ種類・キーワードの未完了の実行が SCRAPE_CHECKPOINT_MAX_AGE_HOURS 以内にあればそれを再開し、
+記録済みのページは取得せず、処理済みの商品は抽出し直さない。完了した実行と古い実行は削除する。
+GPTの抽出結果そのものは app/extraction_cache.py にも残るので、ここでは実行の途中経過だけを持つ。
+"""
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+DEFAULT_CHECKPOINT_PATH = Path(__file__).parent.parent / 'scrape_checkpoints.sqlite3'
+
+
+class CheckpointStore:
+    """実行ごとのページ・商品の途中経過を保存するSQLiteファイル"""
+
+    def __init__(self, path: Optional[str] = None, max_age: Optional[timedelta] = None,
+                 enabled: Optional[bool] = None):
+        self.path = str(path or os.getenv('SCRAPE_CHECKPOINT_PATH') or DEFAULT_CHECKPOINT_PATH)
+        if enabled is None:
+            enabled = os.getenv('SCRAPE_CHECKPOINT_ENABLED', 'true').lower() != 'false'
+        self.enabled = enabled
+        self.max_age = max_age or timedelta(hours=float(os.getenv('SCRAPE_CHECKPOINT_MAX_AGE_HOURS', '6')))
+        # スクレイピング用スレッドからも使うのでロックで保護する
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        if not self.enabled:
+            return
+        try:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.executescript(
+                'CREATE TABLE IF NOT EXISTS runs ('
+                'run_id TEXT PRIMARY KEY, kind TEXT NOT NULL, keyword TEXT NOT NULL, '
+                'started_at TEXT NOT NULL, completed_at TEXT);'
+                'CREATE TABLE IF NOT EXISTS pages ('
+                'run_id TEXT NOT NULL, page_key TEXT NOT NULL, data TEXT NOT NULL, PRIMARY KEY (run_id, page_key));'
+                'CREATE TABLE IF NOT EXISTS items ('
+                'run_id TEXT NOT NULL, asin TEXT NOT NULL, data TEXT NOT NULL, PRIMARY KEY (run_id, asin));'
+            )
+        except sqlite3.Error as e:
+            print(f"[WARNING] Scrape checkpoint database unavailable ({self.path}): {str(e)}")
+            self.enabled = False
+            self._conn = None
+
+    def open_run(self, kind: str, keyword: str = '') -> 'ScrapeRun':
+        """同じ種類・キーワードの未完了の実行があれば再開し、なければ新しく始める"""
+        if not self.enabled:
+            return ScrapeRun(self, None)
+        now = datetime.now(timezone.utc)
+        with self._lock:
+            self._prune(now)
+            row = self._conn.execute(
+                'SELECT run_id, started_at FROM runs WHERE kind = ? AND keyword = ? AND completed_at IS NULL '
+                'ORDER BY started_at DESC LIMIT 1',
+                (kind, keyword)
+            ).fetchone()
+            if row:
+                run_id = row[0]
+                pages, items = (self._conn.execute(f'SELECT COUNT(*) FROM {table} WHERE run_id = ?', (run_id,)).fetchone()[0]
+                                for table in ('pages', 'items'))
+                print(f"[INFO] Resuming {kind} run started at {row[1]} ({pages} pages, {items} products checkpointed)")
+            else:
+                run_id = uuid.uuid4().hex
+                self._conn.execute(
+                    'INSERT INTO runs (run_id, kind, keyword, started_at) VALUES (?, ?, ?, ?)',
+                    (run_id, kind, keyword, now.isoformat())
+                )
+                self._conn.commit()
+        return ScrapeRun(self, run_id)
+
+    def _prune(self, now: datetime) -> None:
+        """完了した実行と、max_ageより古い未完了の実行を削除する（ロックを取ってから呼ぶ）"""
+        cutoff = (now - self.max_age).isoformat()
+        stale = [row[0] for row in self._conn.execute(
+            'SELECT run_id FROM runs WHERE completed_at IS NOT NULL OR started_at < ?', (cutoff,)
+        )]
+        for run_id in stale:
+            for table in ('pages', 'items', 'runs'):
+                self._conn.execute(f'DELETE FROM {table} WHERE run_id = ?', (run_id,))
+        if stale:
+            self._conn.commit()
+
+    def _get(self, table: str, column: str, run_id: str, key: str) -> Optional[Any]:
+        with self._lock:
+            row = self._conn.execute(
+                f'SELECT data FROM {table} WHERE run_id = ? AND {column} = ?', (run_id, key)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _put_many(self, table: str, column: str, run_id: str, entries: Dict[str, Any]) -> None:
+        with self._lock:
+            try:
+                self._conn.executemany(
+                    f'INSERT OR REPLACE INTO {table} (run_id, {column}, data) VALUES (?, ?, ?)',
+                    [(run_id, key, json.dumps(value, ensure_ascii=False, default=str)) for key, value in entries.items()]
+                )
+                self._conn.commit()
+            except sqlite3.Error as e:
+                print(f"[WARNING] Failed to write scrape checkpoint: {str(e)}")
+
+    def _complete(self, run_id: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                'UPDATE runs SET completed_at = ? WHERE run_id = ?', (datetime.now(timezone.utc).isoformat(), run_id)
+            )
+            self._conn.commit()
+
+
+class ScrapeRun:
+    """1回の実行のチェックポイント（ストアが無効な場合は何も記録しない）"""
+
+    def __init__(self, store: CheckpointStore, run_id: Optional[str]):
+        self.store = store
+        self.run_id = run_id
+        self.resumed_pages = 0
+        self.resumed_items = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.run_id is not None
+
+    def get_page(self, page_key: str) -> Optional[Any]:
+        """記録済みのページの解析結果（なければNone）"""
+        if not self.enabled:
+            return None
+        data = self.store._get('pages', 'page_key', self.run_id, page_key)
+        if data is not None:
+            self.resumed_pages += 1
+        return data
+
+    def save_page(self, page_key: str, data: Any) -> None:
+        if self.enabled:
+            self.store._put_many('pages', 'page_key', self.run_id, {page_key: data})
+
+    def get_items(self, asins: List[str]) -> Dict[str, Dict[str, Any]]:
+        """処理済みの商品データ（ASIN -> 商品データ）"""
+        if not self.enabled:
+            return {}
+        items = {}
+        for asin in asins:
+            data = self.store._get('items', 'asin', self.run_id, asin)
+            if data is not None:
+                items[asin] = data
+        self.resumed_items += len(items)
+        return items
+
+    def save_items(self, items: Dict[str, Dict[str, Any]]) -> None:
+        if self.enabled and items:
+            self.store._put_many('items', 'asin', self.run_id, items)
+
+    def complete(self) -> None:
+        """実行が最後まで終わったら呼ぶ（次の実行は最初から始まる）"""
+        if self.enabled:
+            self.store._complete(self.run_id)
+            if self.resumed_pages or self.resumed_items:
+                print(f"[INFO] Run resumed {self.resumed_pages} pages and {self.resumed_items} products from checkpoint")
+
+
+_checkpoint_store: Optional[CheckpointStore] = None
+_checkpoint_store_lock = threading.Lock()
+
+
+def get_checkpoint_store() -> CheckpointStore:
+    """共有ストアを取得（初回呼び出し時に作成）"""
+    global _checkpoint_store
+    with _checkpoint_store_lock:
+        if _checkpoint_store is None:
+            _checkpoint_store = CheckpointStore()
+        return _checkpoint_store
+
+
+def open_run(kind: str, keyword: str = '') -> ScrapeRun:
+    return get_checkpoint_store().open_run(kind, keyword)
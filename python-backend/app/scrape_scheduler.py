@@ -0,0 +1,69 @@
+"""
+複数カテゴリのスクレイピングを並行実行するスケジューラー
+
+/api/scrape-all から使う。各カテゴリは共有ブラウザプール（SCRAPER_POOL_SIZE）と
+ホスト単位の共有レートリミッター（SCRAPER_RATE_PER_SEC）を通してAmazonにアクセスするので、
+同時に走らせるカテゴリ数を増やしてもブラウザ数とリクエスト量の上限は変わらない。
+"""
+import asyncio
+import os
+import time
+import traceback
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+
+@dataclass
+class ScrapeJob:
+    name: str
+    run: Callable[[], Awaitable[Dict[str, Any]]]  # {"count": 件数, "source": ...} を返す
+    timeout: float
+
+
+def category_timeout(name: str, default: Optional[float] = None) -> float:
+    """カテゴリのタイムアウト（秒）。SCRAPE_TIMEOUT_<NAME> で個別に、SCRAPE_CATEGORY_TIMEOUT で全体を指定できる"""
+    if default is None:
+        default = float(os.getenv('SCRAPE_CATEGORY_TIMEOUT', '900'))
+    return float(os.getenv(f'SCRAPE_TIMEOUT_{name.upper()}', str(default)))
+
+
+async def run_scrape_jobs(jobs: List[ScrapeJob], concurrency: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+    """最大concurrency件ずつジョブを実行し、カテゴリごとの結果をジョブの順番で返す"""
+    if concurrency is None:
+        concurrency = int(os.getenv('SCRAPE_ALL_CONCURRENCY', '2'))
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run_job(job: ScrapeJob) -> Dict[str, Any]:
+        async with semaphore:
+            start = time.time()
+            print(f"\n{'='*60}")
+            print(f"Starting {job.name} scraping...")
+            print(f"{'='*60}")
+
+            try:
+                result = await asyncio.wait_for(job.run(), timeout=job.timeout)
+                report = {
+                    "status": "success",
+                    "count": result.get("count", 0),
+                    "time": round(time.time() - start, 2),
+                    "source": result.get("source", "unknown")
+                }
+                print(f"✓ Completed {job.name}: {report['count']} products in {report['time']}s")
+                return report
+            except asyncio.TimeoutError:
+                error_msg = f"Timed out after {job.timeout:g}s"
+                print(f"✗ Error scraping {job.name}: {error_msg}")
+            except Exception as e:
+                error_msg = str(e)
+                print(f"✗ Error scraping {job.name}: {error_msg}")
+                print(f"Traceback: {traceback.format_exc()}")
+
+            return {
+                "status": "error",
+                "error": error_msg,
+                "count": 0,
+                "time": round(time.time() - start, 2)
+            }
+
+    reports = await asyncio.gather(*(run_job(job) for job in jobs))
+    return {job.name: report for job, report in zip(jobs, reports)}
@@ -1,440 +1,482 @@
-import undetected_chromedriver as uc
-from bs4 import BeautifulSoup
-import time
 import asyncio
-from typing import List, Dict, Any
 import os
+import re
+import time
+import traceback
+from typing import AsyncIterator, List, Dict, Any, Optional, Tuple
+
+from bs4 import BeautifulSoup
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+
+from .browser_pool import BrowserPool, get_browser_pool, host_rate_limiter
+from .http_fetcher import HttpFetcher, get_http_fetcher
+from . import pipeline, search_parser
+from .scraper_executor import run_in_scraper_thread
+from .html_archive import archive_page
+from .dom_extraction import collect_cards_in_browser
+from .scrape_checkpoint import ScrapeRun
+
+# ベンチマーク時はローカルのフィクスチャサーバーを指定できる
+AMAZON_BASE_URL = os.getenv('AMAZON_BASE_URL', "https://www.amazon.co.jp")
+
+# ページの読み込み完了とみなす要素（検索結果のコンテナ・商品名。CAPTCHAのフォームが現れた場合もすぐに戻る）
+SEARCH_RESULT_SELECTOR = '.s-main-slot, [data-component-type="s-search-result"]'
+DETAIL_READY_SELECTOR = '#productTitle'
+CAPTCHA_SELECTOR = 'form[action*="validateCaptcha"]'
+
 
 class AmazonScraper:
-    def __init__(self):
-        self.driver = None
-        self.last_request_time = 0
-        self.rate_limit_delay = 3  # 3秒間隔
-        
-    def _init_driver(self):
-        if not self.driver:
-            options = uc.ChromeOptions()
-            options.add_argument('--headless=new')  # 新しいヘッドレスモード
-            options.add_argument('--lang=ja-JP')
-            options.add_argument('--no-sandbox')
-            options.add_argument('--disable-dev-shm-usage')
-            options.add_argument('--disable-blink-features=AutomationControlled')
-            # より一般的なUser-Agentを設定
-            options.add_argument('--user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
-            options.add_experimental_option("prefs", {
-                "intl.accept_languages": "ja,ja-JP"
-            })
-            
-            self.driver = uc.Chrome(options=options, version_main=141)
-            self.driver.implicitly_wait(10)
-    
-    async def _enforce_rate_limit(self):
-        current_time = time.time()
-        time_since_last = current_time - self.last_request_time
-        
-        if time_since_last < self.rate_limit_delay:
-            wait_time = self.rate_limit_delay - time_since_last
-            print(f"Rate limiting: waiting {wait_time:.1f}s")
-            await asyncio.sleep(wait_time)
-        
-        self.last_request_time = time.time()
-    
-    async def search_products(self, keyword: str, max_pages: int = 3) -> List[Dict[str, Any]]:
-        await self._enforce_rate_limit()
-        self._init_driver()
-        
+    def __init__(self, pool: Optional[BrowserPool] = None, fetch_mode: Optional[str] = None,
+                 http_fetcher: Optional[HttpFetcher] = None):
+        # ドライバーはプールから借りる（プールとレートリミッターはプロセス全体で共有）
+        self.pool = pool or get_browser_pool()
+        self.rate_limiter = host_rate_limiter
+        # "browser": 常にChromeで取得 / "http": HTTPで取得し、CAPTCHAや空の結果の場合のみChromeで再取得
+        self.fetch_mode = fetch_mode or os.getenv('SCRAPER_FETCH_MODE', 'browser')
+        self.http_fetcher = http_fetcher or get_http_fetcher()
+        self.search_page_wait = 3  # 検索ページの読み込み待機（秒、smart_waitが無効の場合）
+        self.detail_page_wait = 2  # 詳細ページの読み込み待機（秒、smart_waitが無効の場合）
+        # 固定時間待つ代わりに、商品カード・商品名が表示された時点で読み込み完了とする
+        self.smart_wait = os.getenv('SCRAPER_SMART_WAIT', 'true').lower() != 'false'
+        self.ready_timeout = float(os.getenv('SCRAPER_READY_TIMEOUT', '10'))
+        # 検索結果ページはpage_sourceを取得せず、ブラウザ内で商品カードのフィールドだけを集める
+        self.dom_extraction = os.getenv('SCRAPER_DOM_EXTRACTION', 'true').lower() != 'false'
+
+    def _wait_until_ready(self, driver, ready_selector: str) -> None:
+        """ready_selectorの要素（またはCAPTCHAのフォーム）が現れるまで最大ready_timeout秒待つ"""
+        selector = f'{ready_selector}, {CAPTCHA_SELECTOR}'
+        try:
+            WebDriverWait(driver, self.ready_timeout, poll_frequency=0.1).until(
+                lambda d: d.find_elements(By.CSS_SELECTOR, selector)
+            )
+        except TimeoutException:
+            print(f"[WARNING] {ready_selector} did not appear within {self.ready_timeout:g}s")
+
+    def _open_page(self, driver, url: str, wait: float, screenshot_path: str,
+                   ready_selector: Optional[str] = None) -> None:
+        """ページを開いて読み込みを待つ（スクレイピング用スレッドで実行される）"""
+        driver.get(url)
+        print(f"[DEBUG] Page title: {driver.title}")
+        print(f"[DEBUG] Current URL: {driver.current_url}")
+        if self.smart_wait and ready_selector:
+            self._wait_until_ready(driver, ready_selector)
+        else:
+            time.sleep(wait)  # ページ読み込み待機（ワーカースレッド内なのでイベントループは止まらない）
+
+        # スクリーンショットを保存（GitHub Actions環境でのみ）
+        if os.environ.get('GITHUB_ACTIONS'):
+            driver.save_screenshot(screenshot_path)
+            print(f"[DEBUG] Screenshot saved to {screenshot_path}")
+
+    def _fetch_page_source(self, driver, url: str, wait: float, screenshot_path: str,
+                           ready_selector: Optional[str] = None) -> str:
+        """ページを開いてHTMLを返す（スクレイピング用スレッドで実行される）"""
+        self._open_page(driver, url, wait, screenshot_path, ready_selector)
+        return driver.page_source
+
+    def _fetch_search_cards(self, driver, url: str, wait: float, screenshot_path: str,
+                            fallback_to_data_asin: bool) -> Tuple[Optional[List[Dict[str, Any]]], Optional[str]]:
+        """検索結果ページを開き、(CardFieldsのリスト, None) か (None, HTML) を返す（スクレイピング用スレッドで実行される）
+
+        ブラウザ内で抽出できなかった場合（CAPTCHA・エラーページ・商品カードなし）だけpage_sourceを取得する。
+        """
+        self._open_page(driver, url, wait, screenshot_path, SEARCH_RESULT_SELECTOR)
+        if self.dom_extraction:
+            cards = collect_cards_in_browser(driver, fallback_to_data_asin)
+            if cards is not None:
+                return cards, None
+        return None, driver.page_source
+
+    async def _load_page(self, driver, url: str, wait: float, screenshot_path: str,
+                         ready_selector: Optional[str] = None) -> str:
+        """レート制限を守ってページを読み込み、HTMLを返す"""
+        await self.rate_limiter.acquire(url)
+        return await run_in_scraper_thread(self._fetch_page_source, driver, url, wait, screenshot_path, ready_selector)
+
+    async def fetch_page(self, url: str, wait: float, screenshot_path: str,
+                         ready_selector: Optional[str] = None) -> str:
+        """プールのドライバーでページを開いてHTMLを返す（カテゴリ別スクレイパー用）"""
+        async with self.pool.lease() as driver:
+            return await self._load_page(driver, url, wait, screenshot_path, ready_selector)
+
+    async def fetch_search_page(self, url: str, wait: float, screenshot_path: str,
+                                fallback_to_data_asin: bool = True) -> Tuple[Optional[List[Dict[str, Any]]], Optional[str]]:
+        """プールのドライバーで検索結果ページを開き、(CardFieldsのリスト, None) か (None, HTML) を返す"""
+        async with self.pool.lease() as driver:
+            await self.rate_limiter.acquire(url)
+            return await run_in_scraper_thread(
+                self._fetch_search_cards, driver, url, wait, screenshot_path, fallback_to_data_asin
+            )
+
+    async def _load_page_via_http(self, url: str) -> str:
+        """レート制限を守ってHTTPでHTMLを取得（ブラウザを使わない）"""
+        await self.rate_limiter.acquire(url)
+        return await self.http_fetcher.fetch(url)
+
+    async def search_products(self, keyword: str, max_pages: int = 3,
+                              checkpoint: Optional[ScrapeRun] = None) -> List[Dict[str, Any]]:
+        """検索結果の全ページの商品をまとめて返す"""
         all_products = []
+        async for page_products in self.iter_search_products(keyword, max_pages, checkpoint=checkpoint):
+            all_products.extend(page_products)
+        return all_products
+
+    async def iter_search_products(self, keyword: str, max_pages: int = 3,
+                                   queue_size: int = 1,
+                                   checkpoint: Optional[ScrapeRun] = None) -> AsyncIterator[List[Dict[str, Any]]]:
+        """検索結果をページごとに流す（他のページと重複するASINは除く。ページの順序は保証しない）
+
+        1ページ目でブロックされていないことを確認してから残りのページを並列に取得する。
+        読む側が遅い場合、取得済みのページがqueue_size件たまると次のページの取得を待つ。
+        checkpointを渡すと、解析したページを記録し、再開した実行では記録済みのページを取得しない。
+        """
         seen_asins = set()
-        
-        for page_num in range(1, max_pages + 1):
-            url = f"https://www.amazon.co.jp/s?k={keyword}&language=ja_JP&page={page_num}"
-            print(f"[DEBUG] Navigating to page {page_num}: {url}")
-            
+        pages_scraped = 0
+        total = 0
+
+        def unseen(products: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+            fresh = [product for product in products if product['asin'] not in seen_asins]
+            seen_asins.update(product['asin'] for product in fresh)
+            return fresh
+
+        try:
+            first_page = await self._search_page_checkpointed(keyword, 1, checkpoint)
+        except Exception as e:
+            # 最初のページでエラーの場合は終了
+            print(f"[ERROR] Scraping page 1 failed: {str(e)}")
+            traceback.print_exception(e)
+            return
+        pages_scraped += 1
+        first_products = unseen(first_page)
+        total += len(first_products)
+        yield first_products
+
+        async def fetch(page_num: int) -> Optional[List[Dict[str, Any]]]:
             try:
-                self.driver.get(url)
-                print(f"[DEBUG] Page {page_num} title: {self.driver.title}")
-                print(f"[DEBUG] Current URL: {self.driver.current_url}")
-                time.sleep(3)  # ページ読み込み待機
-                
-                # スクリーンショットを保存（GitHub Actions環境でのみ）
-                if os.environ.get('GITHUB_ACTIONS'):
-                    self.driver.save_screenshot(f'/tmp/amazon_search_page_{page_num}.png')
-                    print(f"[DEBUG] Screenshot saved to /tmp/amazon_search_page_{page_num}.png")
-                
-                # HTMLを解析
-                page_source = self.driver.page_source
-                print(f"[DEBUG] Page source length: {len(page_source)}")
-                
-                # CAPTCHAやエラーページのチェック
-                if "認証が必要" in page_source or "captcha" in page_source.lower():
-                    print(f"[ERROR] CAPTCHA detected on Amazon page {page_num}")
-                    if os.environ.get('GITHUB_ACTIONS'):
-                        # HTMLの一部を出力
-                        print("[DEBUG] Page HTML (first 1000 chars):")
-                        print(page_source[:1000])
-                    raise Exception(f"CAPTCHA detected on page {page_num} - Amazon is blocking the request")
-                
-                if "申し訳ございません" in page_source or "ご迷惑をおかけしています" in page_source:
-                    print(f"[ERROR] Amazon error page detected on page {page_num}")
-                    if os.environ.get('GITHUB_ACTIONS'):
-                        # HTMLの一部を出力
-                        print("[DEBUG] Page HTML (first 1000 chars):")
-                        print(page_source[:1000])
-                    raise Exception(f"Amazon error page {page_num} - request may be blocked")
-                
-                soup = BeautifulSoup(page_source, 'html.parser')
-                
-                # 商品カードを探す
-                search_results = soup.select('[data-component-type="s-search-result"]')
-                print(f"[DEBUG] Page {page_num}: Found {len(search_results)} search result elements")
-                
-                # 商品がない場合、他のセレクタも試す
-                if not search_results:
-                    print(f"[DEBUG] Page {page_num}: Trying alternative selectors...")
-                    search_results = soup.select('[data-asin]')
-                    print(f"[DEBUG] Page {page_num}: Found {len(search_results)} elements with data-asin")
-                
-                # 商品がない場合は次のページへ
-                if not search_results:
-                    print(f"[WARNING] Page {page_num}: No products found, moving to next page")
-                    continue
-                
-                page_products = []
-                for item in search_results:
-                    asin = item.get('data-asin')
-                    if not asin or asin in seen_asins:
-                        continue
-                    seen_asins.add(asin)
-                    
-                    product = {'asin': asin}
-                    
-                    # タイトル
-                    title_elem = item.select_one('h2 span')
-                    if not title_elem:
-                        title_elem = item.select_one('[data-cy="title-recipe"] span')
-                    if not title_elem:
-                        title_elem = item.select_one('.s-title-instructions-style span')
-                    if title_elem:
-                        product['title'] = title_elem.text.strip()
-                    
-                    # 在庫切れチェック（テキストで判定）
-                    unavailable = False
-                    for elem in item.select('.a-color-secondary, .s-result-item-text, .a-size-base'):
-                        if elem.text and ('在庫切れ' in elem.text or '現在お取り扱い' in elem.text or
-                                         'Currently unavailable' in elem.text or '現在在庫切れ' in elem.text):
-                            unavailable = True
-                            break
-
-                    # 価格
-                    price_elem = item.select_one('.a-price .a-offscreen')
-                    if not price_elem:
-                        price_elem = item.select_one('.a-price-whole')
-
-                    # 在庫切れの場合は価格をNoneにする
-                    if unavailable or not price_elem:
-                        product['price'] = None
-                    elif price_elem:
-                        price_text = price_elem.text.replace(',', '').replace('￥', '').replace('¥', '').strip()
-                        try:
-                            # 小数点がある場合は整数に変換
-                            product['price'] = int(float(price_text))
-                        except:
-                            product['price'] = None
-                    
-                    # 商品説明を先に収集（定価取得で使用するため）
-                    description_parts = []
-                    # タイトル以外の全てのテキスト要素を収集
-                    for elem in item.select('.a-size-base, .a-size-base-plus, .a-size-mini, .s-feature-text, .a-color-secondary'):
-                        text = elem.text.strip()
-                        if text and text != product.get('title') and len(text) > 5:
-                            description_parts.append(text)
-                    
-                    # 定価（複数のセレクタで試す）
-                    regular_price_elem = item.select_one('.a-text-price .a-offscreen')
-                    if not regular_price_elem:
-                        regular_price_elem = item.select_one('.a-text-price')
-                    if not regular_price_elem:
-                        # span.a-price.a-text-price.a-size-base の場合
-                        regular_price_elem = item.select_one('span.a-price.a-text-price span.a-offscreen')
-                    
-                    if regular_price_elem:
-                        regular_text = regular_price_elem.text.replace(',', '').replace('￥', '').replace('¥', '').strip()
-                        try:
-                            potential_regular = int(float(regular_text))
-                            # 定価が現在価格より高い場合のみ設定
-                            if potential_regular > product.get('price', 0):
-                                product['price_regular'] = potential_regular
-                        except:
-                            pass
-                    
-                    # 定価が取得できない場合、descriptionから「参考:」価格を探す
-                    if not product.get('price_regular') and description_parts:
-                        import re
-                        for part in description_parts:
-                            # 「参考: ￥490」のパターンを探す
-                            match = re.search(r'参考[:：]?\s*[￥¥]?([\d,]+)', part)
-                            if match:
-                                try:
-                                    ref_price = int(match.group(1).replace(',', ''))
-                                    if ref_price > product.get('price', 0):  # 参考価格が現在価格より高い場合のみ
-                                        product['price_regular'] = ref_price
-                                        break
-                                except:
-                                    pass
-                    
-                    # セール判定
-                    if product.get('price_regular') and product.get('price'):
-                        # 定価が現在価格より高く、かつ妥当な範囲内の場合のみセール判定
-                        price_ratio = product['price_regular'] / product['price']
-                        if (product['price_regular'] > product['price'] and 
-                            price_ratio > 1.05 and  # 5%以上の割引
-                            price_ratio < 10):  # 10倍以上の差は異常値として除外
-                            product['on_sale'] = True
-                            product['discount_percent'] = int(
-                                ((product['price_regular'] - product['price']) / product['price_regular']) * 100
-                            )
-                        else:
-                            product['on_sale'] = False
-                            # 異常な定価は削除
-                            if price_ratio >= 10 or price_ratio < 0.1:
-                                del product['price_regular']
-                    else:
-                        product['on_sale'] = False
-                    
-                    # 画像
-                    img_elem = item.select_one('.s-image')
-                    if img_elem:
-                        product['image_url'] = img_elem.get('src')
-                    
-                    # レビュー - 複数のセレクタを試す
-                    rating_elem = item.select_one('.a-icon-alt') or item.select_one('[data-cy="reviews-ratings-slot"] .a-icon-alt')
-                    if rating_elem:
-                        rating_text = rating_elem.text
-                        if '5つ星のうち' in rating_text:
-                            try:
-                                product['review_avg'] = float(rating_text.split('5つ星のうち')[1].strip())
-                            except:
-                                pass
-                    
-                    # レビュー件数 - 複数のセレクタを試す
-                    review_count_elem = (
-                        item.select_one('span[aria-label*="件の評価"]') or
-                        item.select_one('.s-link-style .s-underline-text') or
-                        item.select_one('[data-cy="reviews-ratings-slot"] span.a-size-base')
-                    )
-                    if review_count_elem:
-                        count_text = review_count_elem.text.replace(',', '').replace('(', '').replace(')', '').strip()
-                        # "1,234" や "1,234件の評価" のような形式に対応
-                        import re
-                        match = re.search(r'(\d+(?:,\d+)*)', count_text)
-                        if match:
-                            try:
-                                product['review_count'] = int(match.group(1).replace(',', ''))
-                            except:
-                                pass
-                    
-                    # 商品説明を辞書に追加
-                    if description_parts:
-                        product['description'] = ' '.join(description_parts)
-                    
-                    page_products.append(product)
-                
-                print(f"[SUCCESS] Page {page_num}: Found {len(page_products)} products")
-                all_products.extend(page_products)
-                
-                # ページ間の待機時間
-                if page_num < max_pages:
-                    await asyncio.sleep(2)
-                
+                return await self._search_page_checkpointed(keyword, page_num, checkpoint)
             except Exception as e:
+                # 2ページ目以降のエラーはそのページだけ飛ばす
                 print(f"[ERROR] Scraping page {page_num} failed: {str(e)}")
-                if page_num == 1:
-                    # 最初のページでエラーの場合は終了
-                    import traceback
-                    traceback.print_exc()
-                    return []
-                else:
-                    # 2ページ目以降でエラーの場合は既存の結果を返す
-                    print(f"[INFO] Returning {len(all_products)} products collected so far")
-                    break
-        
-        print(f"[SUCCESS] Total scraped: {len(all_products)} products from {page_num} pages")
-        return all_products
-    
+                return None
+
+        pages = pipeline.map_stage(
+            pipeline.iterate(range(2, max_pages + 1)), fetch, concurrency=max(1, max_pages - 1), maxsize=queue_size
+        )
+        async for page_products in pages:
+            pages_scraped += 1
+            fresh = unseen(page_products)
+            total += len(fresh)
+            yield fresh
+
+        print(f"[SUCCESS] Total scraped: {total} products from {pages_scraped} pages")
+
+    async def _search_page_checkpointed(self, keyword: str, page_num: int,
+                                        checkpoint: Optional[ScrapeRun]) -> List[Dict[str, Any]]:
+        """チェックポイントに記録済みのページはそれを使い、なければ取得して記録する"""
+        page_key = f"search:{keyword}:{page_num}"
+        if checkpoint:
+            products = await run_in_scraper_thread(checkpoint.get_page, page_key)
+            if products is not None:
+                print(f"[DEBUG] Page {page_num}: {len(products)} products from checkpoint")
+                return products
+        products = await self._search_page(keyword, page_num)
+        if checkpoint and products:
+            await run_in_scraper_thread(checkpoint.save_page, page_key, products)
+        return products
+
+    async def _search_page(self, keyword: str, page_num: int) -> List[Dict[str, Any]]:
+        """検索結果の1ページ分を取得して解析"""
+        url = f"{AMAZON_BASE_URL}/s?k={keyword}&language=ja_JP&page={page_num}"
+        print(f"[DEBUG] Navigating to page {page_num}: {url}")
+
+        if self.fetch_mode == 'http':
+            try:
+                page_source = await self._load_page_via_http(url)
+                await archive_page('search', url, page_source, page_num=page_num)
+                products = await run_in_scraper_thread(self._parse_search_page, page_source, page_num)
+                if products:
+                    return products
+                print(f"[INFO] Page {page_num}: No products via HTTP, falling back to browser")
+            except Exception as e:
+                print(f"[INFO] Page {page_num}: HTTP fetch failed ({str(e)}), falling back to browser")
+
+        cards, page_source = await self.fetch_search_page(
+            url, self.search_page_wait, f'/tmp/amazon_search_page_{page_num}.png'
+        )
+        if cards is not None:
+            print(f"[DEBUG] Page {page_num}: Extracted {len(cards)} cards in browser")
+            return await run_in_scraper_thread(self._products_from_cards, cards, page_num)
+        await archive_page('search', url, page_source, page_num=page_num)
+
+        # HTMLの解析もCPUを使うのでスクレイピング用スレッドで実行
+        return await run_in_scraper_thread(self._parse_search_page, page_source, page_num)
+
+    @staticmethod
+    def _parse_search_page(page_source: str, page_num: int) -> List[Dict[str, Any]]:
+        """検索結果ページのHTMLを解析（app/reparse.pyからも使う）"""
+        print(f"[DEBUG] Page source length: {len(page_source)}")
+
+        # CAPTCHAやエラーページのチェック
+        if "認証が必要" in page_source or "captcha" in page_source.lower():
+            print(f"[ERROR] CAPTCHA detected on Amazon page {page_num}")
+            if os.environ.get('GITHUB_ACTIONS'):
+                # HTMLの一部を出力
+                print("[DEBUG] Page HTML (first 1000 chars):")
+                print(page_source[:1000])
+            raise Exception(f"CAPTCHA detected on page {page_num} - Amazon is blocking the request")
+
+        if "申し訳ございません" in page_source or "ご迷惑をおかけしています" in page_source:
+            print(f"[ERROR] Amazon error page detected on page {page_num}")
+            if os.environ.get('GITHUB_ACTIONS'):
+                # HTMLの一部を出力
+                print("[DEBUG] Page HTML (first 1000 chars):")
+                print(page_source[:1000])
+            raise Exception(f"Amazon error page {page_num} - request may be blocked")
+
+        # 商品カードを探す（見つからない場合はdata-asin属性を持つ要素で代用）
+        cards = search_parser.parse_cards(page_source)
+        return AmazonScraper._products_from_cards(cards, page_num)
+
+    @staticmethod
+    def _products_from_cards(cards: List[Dict[str, Any]], page_num: int) -> List[Dict[str, Any]]:
+        """CardFields（HTMLの解析結果またはブラウザ内での抽出結果）から商品データを作る"""
+        print(f"[DEBUG] Page {page_num}: Found {len(cards)} search result elements")
+
+        # 商品がない場合は次のページへ
+        if not cards:
+            print(f"[WARNING] Page {page_num}: No products found, moving to next page")
+            return []
+
+        unique_cards = []
+        seen_asins = set()
+        for card in cards:
+            asin = card['asin']
+            if not asin or asin in seen_asins:
+                continue
+            seen_asins.add(asin)
+            unique_cards.append(card)
+
+        page_products = search_parser.extract_products(unique_cards)
+
+        print(f"[SUCCESS] Page {page_num}: Found {len(page_products)} products")
+        return page_products
+
     async def get_product_detail(self, asin: str) -> Dict[str, Any]:
         """商品詳細ページから追加情報を取得"""
-        await self._enforce_rate_limit()
-        self._init_driver()
-        
-        url = f"https://www.amazon.co.jp/dp/{asin}?language=ja_JP"
+        url = f"{AMAZON_BASE_URL}/dp/{asin}?language=ja_JP"
         print(f"[DEBUG] Getting detail for ASIN {asin}")
-        
+
         try:
-            self.driver.get(url)
-            print(f"[DEBUG] Detail page title: {self.driver.title}")
-            print(f"[DEBUG] Detail page URL: {self.driver.current_url}")
-            time.sleep(2)  # ページ読み込み待機
-            
-            # スクリーンショットを保存（GitHub Actions環境でのみ）
-            if os.environ.get('GITHUB_ACTIONS'):
-                self.driver.save_screenshot(f'/tmp/amazon_detail_{asin}.png')
-                print(f"[DEBUG] Screenshot saved to /tmp/amazon_detail_{asin}.png")
-            
-            page_source = self.driver.page_source
-            print(f"[DEBUG] Detail page source length: {len(page_source)}")
-            
-            # CAPTCHAやエラーページのチェック
-            if "認証が必要" in page_source or "captcha" in page_source.lower():
-                print(f"[ERROR] CAPTCHA detected on detail page for {asin}")
-                if os.environ.get('GITHUB_ACTIONS'):
-                    print("[DEBUG] Detail page HTML (first 1000 chars):")
-                    print(page_source[:1000])
-                raise Exception(f"CAPTCHA detected on detail page for {asin}")
-            
-            if "申し訳ございません" in page_source:
-                print(f"[ERROR] Amazon error page detected for {asin}")
-                if os.environ.get('GITHUB_ACTIONS'):
-                    print("[DEBUG] Detail page HTML (first 1000 chars):")
-                    print(page_source[:1000])
-                raise Exception(f"Amazon error page for {asin}")
-            
-            soup = BeautifulSoup(page_source, 'html.parser')
-            
-            # 商品の基本情報を取得
-            detail_info = {}
-            
-            # タイトル
-            title_elem = (
-                soup.select_one('#productTitle') or 
-                soup.select_one('.product-title') or
-                soup.select_one('h1.a-size-large')
-            )
-            if title_elem:
-                detail_info['title'] = title_elem.text.strip()
-            
-                # 価格
-            price_elem = (
-                soup.select_one('.a-price .a-offscreen') or 
-                soup.select_one('.a-price-whole') or
-                soup.select_one('#corePrice_feature_div .a-price .a-offscreen')
-            )
-            if price_elem:
-                price_text = price_elem.text.replace(',', '').replace('￥', '').replace('¥', '').strip()
-                try:
-                    detail_info['price'] = int(float(price_text))
-                except:
-                    pass
-            
-                # 定価
-            regular_price_elem = soup.select_one('.a-text-price .a-offscreen')
-            if regular_price_elem:
-                regular_text = regular_price_elem.text.replace(',', '').replace('￥', '').replace('¥', '').strip()
+            detail_info = None
+            if self.fetch_mode == 'http':
                 try:
-                    detail_info['price_regular'] = int(float(regular_text))
-                except:
-                    pass
-            
-                # セール判定
-            if detail_info.get('price_regular') and detail_info.get('price'):
-                if detail_info['price_regular'] > detail_info['price']:
-                    detail_info['on_sale'] = True
-                    detail_info['discount_percent'] = int(
-                        ((detail_info['price_regular'] - detail_info['price']) / detail_info['price_regular']) * 100
+                    page_source = await self._load_page_via_http(url)
+                    await archive_page('detail', url, page_source, asin=asin)
+                    detail_info = await run_in_scraper_thread(self._parse_detail_page, page_source, asin)
+                    if not detail_info.get('title') and not detail_info.get('price'):
+                        print(f"[INFO] Empty detail via HTTP for {asin}, falling back to browser")
+                        detail_info = None
+                except Exception as e:
+                    print(f"[INFO] HTTP fetch failed for {asin} ({str(e)}), falling back to browser")
+
+            if detail_info is None:
+                async with self.pool.lease() as driver:
+                    page_source = await self._load_page(
+                        driver, url, self.detail_page_wait, f'/tmp/amazon_detail_{asin}.png',
+                        DETAIL_READY_SELECTOR
                     )
-                else:
-                    detail_info['on_sale'] = False
-            else:
-                detail_info['on_sale'] = False
-            
-                # 画像
-            img_elem = (
-                soup.select_one('#landingImage') or 
-                soup.select_one('.a-dynamic-image') or
-                soup.select_one('#imgBlkFront')
-            )
-            if img_elem:
-                detail_info['image_url'] = img_elem.get('src')
-            
-                # レビュー
-            rating_elem = soup.select_one('.a-icon-alt')
-            if rating_elem and '5つ星のうち' in rating_elem.text:
-                try:
-                    detail_info['review_avg'] = float(rating_elem.text.split('5つ星のうち')[1].strip())
-                except:
-                    pass
-            
-                # レビュー件数
-            review_count_elem = soup.select_one('#acrCustomerReviewText')
-            if review_count_elem:
-                count_text = review_count_elem.text.replace(',', '').strip()
-                import re
-                match = re.search(r'(\d+(?:,\d+)*)', count_text)
-                if match:
-                    try:
-                        detail_info['review_count'] = int(match.group(1).replace(',', ''))
-                    except:
-                        pass
-            
-                # ブランド
-            brand_elem = soup.select_one('#bylineInfo')
-            if brand_elem:
-                detail_info['brand'] = brand_elem.text.strip()
-            
-                # productDescriptionセクション（商品紹介）
-            product_description = soup.select_one('#productDescription')
-            if product_description:
-                description_text = product_description.text.strip()
-                detail_info['description'] = description_text
-            
-                # aplusセクション（商品の説明）- カークランド商品などで使用
-            aplus_section = soup.select_one('#aplus')
-            if aplus_section:
-                # テキストコンテンツを抽出（スクリプトやスタイルタグを除外）
-                for script in aplus_section.find_all(['script', 'style']):
-                    script.decompose()
-                aplus_text = aplus_section.text.strip()
-                if aplus_text:
-                    # 既存のdescriptionに追加または新規作成
-                    if 'description' in detail_info:
-                        detail_info['description'] += '\n\n' + aplus_text
-                    else:
-                        detail_info['description'] = aplus_text
-            
-                # feature-bulletsセクション（商品の特徴）
-            feature_bullets = soup.select('#feature-bullets .a-list-item')
-            features = []
-            for bullet in feature_bullets:
-                text = bullet.text.strip()
-                if text and not text.startswith('›'):
-                    features.append(text)
-            
-            if features:
-                detail_info['features'] = ' '.join(features)
-            
-            # 商品の詳細情報テーブル
-            detail_table = soup.select('.prodDetTable tr, #productDetails_detailBullets_sections1 tr')
-            for row in detail_table:
-                label = row.select_one('th, .prodDetSectionEntry')
-                value = row.select_one('td, .prodDetAttrValue')
-                if label and value:
-                    label_text = label.text.strip()
-                    value_text = value.text.strip()
-                    if '寸法' in label_text or 'サイズ' in label_text:
-                        detail_info['dimensions'] = value_text
-            
+                await archive_page('detail', url, page_source, asin=asin)
+                detail_info = await run_in_scraper_thread(self._parse_detail_page, page_source, asin)
+
             print(f"[SUCCESS] Detail info for {asin}: {list(detail_info.keys())}")
             if 'description' in detail_info:
                 print(f"[DEBUG] Description preview: {detail_info['description'][:200]}...")
-            
+
             return detail_info
-            
+
         except Exception as e:
             print(f"[ERROR] Failed to get detail for {asin}: {str(e)}")
-            import traceback
             traceback.print_exc()
             return {}
-    
+
+    @staticmethod
+    def _parse_detail_page(page_source: str, asin: str) -> Dict[str, Any]:
+        """商品詳細ページのHTMLを解析（app/reparse.pyからも使う）"""
+        print(f"[DEBUG] Detail page source length: {len(page_source)}")
+
+        # CAPTCHAやエラーページのチェック
+        if "認証が必要" in page_source or "captcha" in page_source.lower():
+            print(f"[ERROR] CAPTCHA detected on detail page for {asin}")
+            if os.environ.get('GITHUB_ACTIONS'):
+                print("[DEBUG] Detail page HTML (first 1000 chars):")
+                print(page_source[:1000])
+            raise Exception(f"CAPTCHA detected on detail page for {asin}")
+
+        if "申し訳ございません" in page_source:
+            print(f"[ERROR] Amazon error page detected for {asin}")
+            if os.environ.get('GITHUB_ACTIONS'):
+                print("[DEBUG] Detail page HTML (first 1000 chars):")
+                print(page_source[:1000])
+            raise Exception(f"Amazon error page for {asin}")
+
+        soup = BeautifulSoup(page_source, 'html.parser')
+
+        # 商品の基本情報を取得
+        detail_info = {}
+
+        # タイトル
+        title_elem = (
+            soup.select_one('#productTitle') or 
+            soup.select_one('.product-title') or
+            soup.select_one('h1.a-size-large')
+        )
+        if title_elem:
+            detail_info['title'] = title_elem.text.strip()
+
+        # 価格
+        price_elem = (
+            soup.select_one('.a-price .a-offscreen') or 
+            soup.select_one('.a-price-whole') or
+            soup.select_one('#corePrice_feature_div .a-price .a-offscreen')
+        )
+        if price_elem:
+            price_text = price_elem.text.replace(',', '').replace('￥', '').replace('¥', '').strip()
+            try:
+                detail_info['price'] = int(float(price_text))
+            except:
+                pass
+
+        # 定価
+        regular_price_elem = soup.select_one('.a-text-price .a-offscreen')
+        if regular_price_elem:
+            regular_text = regular_price_elem.text.replace(',', '').replace('￥', '').replace('¥', '').strip()
+            try:
+                detail_info['price_regular'] = int(float(regular_text))
+            except:
+                pass
+
+        # セール判定
+        if detail_info.get('price_regular') and detail_info.get('price'):
+            if detail_info['price_regular'] > detail_info['price']:
+                detail_info['on_sale'] = True
+                detail_info['discount_percent'] = int(
+                    ((detail_info['price_regular'] - detail_info['price']) / detail_info['price_regular']) * 100
+                )
+            else:
+                detail_info['on_sale'] = False
+        else:
+            detail_info['on_sale'] = False
+
+        # 画像
+        img_elem = (
+            soup.select_one('#landingImage') or 
+            soup.select_one('.a-dynamic-image') or
+            soup.select_one('#imgBlkFront')
+        )
+        if img_elem:
+            detail_info['image_url'] = img_elem.get('src')
+
+        # レビュー
+        rating_elem = soup.select_one('.a-icon-alt')
+        if rating_elem and '5つ星のうち' in rating_elem.text:
+            try:
+                detail_info['review_avg'] = float(rating_elem.text.split('5つ星のうち')[1].strip())
+            except:
+                pass
+
+        # レビュー件数
+        review_count_elem = soup.select_one('#acrCustomerReviewText')
+        if review_count_elem:
+            count_text = review_count_elem.text.replace(',', '').strip()
+            match = re.search(r'(\d+(?:,\d+)*)', count_text)
+            if match:
+                try:
+                    detail_info['review_count'] = int(match.group(1).replace(',', ''))
+                except:
+                    pass
+
+        # ブランド
+        brand_elem = soup.select_one('#bylineInfo')
+        if brand_elem:
+            detail_info['brand'] = brand_elem.text.strip()
+
+        # productDescriptionセクション（商品紹介）
+        product_description = soup.select_one('#productDescription')
+        if product_description:
+            description_text = product_description.text.strip()
+            detail_info['description'] = description_text
+
+        # aplusセクション（商品の説明）- カークランド商品などで使用
+        aplus_section = soup.select_one('#aplus')
+        if aplus_section:
+            # テキストコンテンツを抽出（スクリプトやスタイルタグを除外）
+            for script in aplus_section.find_all(['script', 'style']):
+                script.decompose()
+            aplus_text = aplus_section.text.strip()
+            if aplus_text:
+                # 既存のdescriptionに追加または新規作成
+                if 'description' in detail_info:
+                    detail_info['description'] += '\n\n' + aplus_text
+                else:
+                    detail_info['description'] = aplus_text
+
+        # feature-bulletsセクション（商品の特徴）
+        feature_bullets = soup.select('#feature-bullets .a-list-item')
+        features = []
+        for bullet in feature_bullets:
+            text = bullet.text.strip()
+            if text and not text.startswith('›'):
+                features.append(text)
+
+        if features:
+            detail_info['features'] = ' '.join(features)
+
+        # 商品の詳細情報テーブル
+        detail_table = soup.select('.prodDetTable tr, #productDetails_detailBullets_sections1 tr')
+        for row in detail_table:
+            label = row.select_one('th, .prodDetSectionEntry')
+            value = row.select_one('td, .prodDetAttrValue')
+            if label and value:
+                label_text = label.text.strip()
+                value_text = value.text.strip()
+                if '寸法' in label_text or 'サイズ' in label_text:
+                    detail_info['dimensions'] = value_text
+
+        return detail_info
+
+    async def get_product_details(self, asins: List[str],
+                                  checkpoint: Optional[ScrapeRun] = None) -> Dict[str, Dict[str, Any]]:
+        """複数商品の詳細ページをプールのワーカーで並列取得
+
+        checkpointを渡すと、取得できた詳細を記録し、再開した実行では記録済みの商品を取得しない。
+        """
+        async def fetch(asin: str) -> Dict[str, Any]:
+            page_key = f"detail:{asin}"
+            if checkpoint:
+                detail = await run_in_scraper_thread(checkpoint.get_page, page_key)
+                if detail is not None:
+                    return detail
+            detail = await self.get_product_detail(asin)
+            if checkpoint and detail:
+                await run_in_scraper_thread(checkpoint.save_page, page_key, detail)
+            return detail
+
+        details = await asyncio.gather(*(fetch(asin) for asin in asins))
+        return dict(zip(asins, details))
+
     async def close(self):
-        if self.driver:
-            self.driver.quit()
-            self.driver = None
\ No newline at end of file
+        await self.pool.close()
+        await self.http_fetcher.close()
+
+
+_amazon_scraper: Optional[AmazonScraper] = None
+
+
+def get_amazon_scraper() -> AmazonScraper:
+    """全エンドポイント・カテゴリ別スクレイパーで共有するスクレイパーを取得（初回呼び出し時に作成）"""
+    global _amazon_scraper
+    if _amazon_scraper is None:
+        _amazon_scraper = AmazonScraper()
+    return _amazon_scraper
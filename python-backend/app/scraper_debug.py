@@ -1,10 +1,11 @@
 import undetected_chromedriver as uc
-from bs4 import BeautifulSoup
 import time
 import asyncio
 from typing import List, Dict, Any
 import os
 
+from . import search_parser
+
 class AmazonScraperDebug:
     def __init__(self):
         self.driver = None
@@ -78,20 +79,10 @@ class AmazonScraperDebug:
                     print(page_source[:1000])
                 raise Exception("Amazon error page - request may be blocked")
             
-            soup = BeautifulSoup(page_source, 'html.parser')
-            products = []
-            seen_asins = set()
-            
-            # 商品カードを探す
-            search_results = soup.select('[data-component-type="s-search-result"]')
+            # 商品カードを探す（見つからない場合はdata-asin属性を持つ要素で代用）
+            search_results = search_parser.parse_cards(page_source)
             print(f"[DEBUG] Found {len(search_results)} search result elements")
             
-            # 商品がない場合、他のセレクタも試す
-            if not search_results:
-                print("[DEBUG] Trying alternative selectors...")
-                search_results = soup.select('[data-asin]')
-                print(f"[DEBUG] Found {len(search_results)} elements with data-asin")
-            
             return len(search_results)  # テスト用に商品数だけ返す
             
         except Exception as e:
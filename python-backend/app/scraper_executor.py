@@ -0,0 +1,42 @@
+"""
+スクレイピング処理の実行レイヤー
+
+Seleniumの呼び出し（driver.get / page_source / 待機）は同期処理のため、
+イベントループ上で実行するとFastAPIプロセス全体が止まってしまう。
+ここではスクレイピング専用のスレッドプールでそれらを実行し、
+awaitできるFutureとして返す。
+"""
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_scraper_executor() -> ThreadPoolExecutor:
+    """スクレイピング専用のスレッドプールを取得（初回呼び出し時に作成）"""
+    global _executor
+    if _executor is None:
+        # ドライバー数＋αのワーカーを用意（rice/mineral_waterの単独スクレイパー分）
+        default_workers = int(os.getenv('SCRAPER_POOL_SIZE', '2')) + 2
+        max_workers = int(os.getenv('SCRAPER_EXECUTOR_WORKERS', str(default_workers)))
+        _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='scraper')
+    return _executor
+
+
+async def run_in_scraper_thread(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """同期関数をスクレイピング用スレッドで実行し、結果をawaitする"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_scraper_executor(), functools.partial(func, *args, **kwargs)
+    )
+
+
+def shutdown_scraper_executor() -> None:
+    """スレッドプールを終了する（アプリ終了時に呼ぶ）"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
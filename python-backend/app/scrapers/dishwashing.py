@@ -14,7 +14,7 @@ class DishwashingScraper(BaseScraper):
     
     async def get_cached_products(self, filter: Optional[str] = None) -> List[Dict[str, Any]]:
         """キャッシュされた食器用洗剤商品を取得"""
-        return await self.db.get_all_dishwashing_products(filter)
+        return await self.db.get_all_dishwashing_products(filter, listing=True)
     
     async def process_product(self, product: Dict[str, Any], existing_products: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """食器用洗剤商品を処理"""
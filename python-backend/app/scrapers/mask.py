@@ -25,7 +25,7 @@ class MaskScraper(BaseScraper):
     async def get_cached_products(self, filter: Optional[str] = None) -> List[Dict[str, Any]]:
         """キャッシュされた商品を取得"""
         try:
-            products = await self.db.get_mask_products()
+            products = await self.db.get_mask_products(listing=True)
             
             # フィルタリング実装
             if filter == 'large_pack':
@@ -13,7 +13,7 @@ class MineralWaterScraper(BaseScraper):
     
     async def get_existing_products(self) -> Dict[str, Any]:
         """既存の商品データを取得"""
-        result = self.db.supabase.table("mineral_water_products").select("*").execute()
+        result = await self.db.rest.table("mineral_water_products").select("*").execute()
         return {p['asin']: p for p in (result.data or [])}
     
     async def process_product(self, product: Dict[str, Any], existing_products: Dict[str, Any]) -> Optional[Dict[str, Any]]:
@@ -75,7 +75,7 @@ class MineralWaterScraper(BaseScraper):
         # データベースに保存
         from .mineral_water_scraper import save_mineral_water_to_db
         if products_with_scores:
-            save_mineral_water_to_db(products_with_scores)
+            await save_mineral_water_to_db(products_with_scores)
     
     async def get_cached_products(self, filter: Optional[str] = None) -> List[Dict[str, Any]]:
         """キャッシュされた商品を取得する"""
@@ -83,13 +83,15 @@ class MineralWaterScraper(BaseScraper):
         
         one_hour_ago = datetime.datetime.now(timezone.utc) - datetime.timedelta(hours=1)
         
-        query = self.db.supabase.table("mineral_water_products").select("*")
+        async def load(columns: str) -> List[Dict[str, Any]]:
+            result = await self.db.rest.table("mineral_water_products").select(columns).execute()
+            return result.data or []
         
-        # last_fetched_atが1時間以内のデータを確認
-        result = query.execute()
-        if result.data:
+        # last_fetched_atが1時間以内のデータを確認（一覧用の列のみ）
+        rows = await self.db.select_listing("mineral_water_products", load)
+        if rows:
             recent_products = []
-            for p in result.data:
+            for p in rows:
                 if p.get('last_fetched_at'):
                     try:
                         fetched_at = datetime.datetime.fromisoformat(p['last_fetched_at'].replace('Z', '+00:00'))
@@ -3,202 +3,90 @@ import json
 from typing import Dict, List, Optional
 from datetime import datetime, timezone
 import asyncio
-import time
-from bs4 import BeautifulSoup
-import undetected_chromedriver as uc
+import threading
+from app import search_parser
 from app.services.gpt_parser import parse_mineral_water_info
 from app.database import Database
+from app.scraper import AmazonScraper, AMAZON_BASE_URL, get_amazon_scraper
+from app.scraper_executor import run_in_scraper_thread
+from app.html_archive import archive_page
+from app.scrape_checkpoint import ScrapeRun
 
-async def scrape_mineral_water(keyword: str = "ミネラルウォーター") -> List[Dict]:
-    """ミネラルウォーター商品をスクレイピング"""
-    products = []
-    
-    # Initialize Chrome driver
-    options = uc.ChromeOptions()
-    options.add_argument('--headless=new')
-    options.add_argument('--lang=ja-JP')
-    options.add_argument('--no-sandbox')
-    options.add_argument('--disable-dev-shm-usage')
-    options.add_argument('--disable-blink-features=AutomationControlled')
-    options.add_argument('--user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
-    options.add_experimental_option("prefs", {
-        "intl.accept_languages": "ja,ja-JP"
-    })
+async def scrape_mineral_water(keyword: str = "ミネラルウォーター",
+                               scraper: Optional[AmazonScraper] = None,
+                               checkpoint: Optional[ScrapeRun] = None) -> List[Dict]:
+    """ミネラルウォーター商品をスクレイピング
+
+    checkpointを渡すと、検索ページとGPTで抽出した商品を記録し、再開した実行ではそれらを再利用する。
+    """
+    scraper = scraper or get_amazon_scraper()
     
-    driver = uc.Chrome(options=options, version_main=141)
-    driver.implicitly_wait(10)
+    products = await run_in_scraper_thread(checkpoint.get_page, 'mineral_water_search') if checkpoint else None
+    if products is None:
+        products = await _fetch_mineral_water_page(scraper, keyword)
+        if checkpoint and products:
+            await run_in_scraper_thread(checkpoint.save_page, 'mineral_water_search', products)
     
+    # GPT呼び出しは同期処理なのでスクレイピング用スレッドで実行
+    # （/api/scrape-all のタイムアウトでキャンセルされてもスレッドは止まらないので、
+    # cancelledを立てて商品ごとの確認でループを抜け、ワーカーを空ける）
+    cancelled = threading.Event()
     try:
-        # Amazonの検索ページにアクセス
-        search_url = f"https://www.amazon.co.jp/s?k={keyword}&language=ja_JP"
-        print(f"[DEBUG] Navigating to: {search_url}")
-        driver.get(search_url)
-        time.sleep(2)
-        
-        # ページタイトルを取得して確認
-        title = driver.title
-        print(f"[DEBUG] Page title: {title}")
-        current_url = driver.current_url
-        print(f"[DEBUG] Current URL: {current_url}")
-        
-        # ページのHTMLを取得
-        content = driver.page_source
-        print(f"[DEBUG] Page source length: {len(content)}")
-        
-        soup = BeautifulSoup(content, 'html.parser')
-        
-        # 検索結果の商品を取得
-        product_elements = soup.select('[data-component-type="s-search-result"]')
-        print(f"[DEBUG] Found {len(product_elements)} search result elements")
-        
-        if not product_elements:
-            print("[WARNING] No products found on page")
-            return []
-        
-        for element in product_elements:
-            try:
-                # ASIN取得
-                asin = element.get('data-asin', '')
-                if not asin:
-                    continue
-                
-                # タイトル（複数のセレクタを試す）
-                title_elem = element.select_one('h2 span')
-                if not title_elem:
-                    title_elem = element.select_one('[data-cy="title-recipe"] span')
-                if not title_elem:
-                    title_elem = element.select_one('.s-title-instructions-style span')
-                
-                title = title_elem.text.strip() if title_elem else ''
-                
-                if not title:
-                    continue
-                
-                # 画像URL
-                img_elem = element.select_one('img.s-image')
-                image_url = img_elem.get('src', '') if img_elem else ''
-                
-                # 価格
-                price_elem = element.select_one('.a-price .a-offscreen')
-                if not price_elem:
-                    price_elem = element.select_one('.a-price-whole')
-                
-                price = 0
-                if price_elem:
-                    price_text = price_elem.text.replace(',', '').replace('￥', '').replace('¥', '').strip()
-                    try:
-                        # 小数点がある場合は整数に変換
-                        price = int(float(re.sub(r'[^\d.]', '', price_text)))
-                    except:
-                        price = 0
-                
-                # 通常価格（セール前価格）
-                regular_price_elem = element.select_one('.a-text-price .a-offscreen')
-                if not regular_price_elem:
-                    regular_price_elem = element.select_one('.a-text-price')
-                
-                price_regular = price
-                if regular_price_elem:
-                    regular_price_text = regular_price_elem.text.replace(',', '').replace('¥', '')
-                    try:
-                        price_regular = int(re.sub(r'[^\d]', '', regular_price_text))
-                    except:
-                        price_regular = price
-                
-                # セール判定と割引率
-                on_sale = price_regular > price if price > 0 and price_regular > 0 else False
-                discount_percent = 0
-                if on_sale and price_regular > 0:
-                    discount_percent = round((1 - price / price_regular) * 100, 2)
-                
-                # レビュー情報
-                review_elem = element.select_one('[aria-label*="つ星のうち"]')
-                review_avg = 0.0
-                if review_elem:
-                    review_text = review_elem.get('aria-label', '')
-                    # 「5つ星のうち4.3」のようなテキストから4.3を抽出
-                    # うち の後の数値を抽出
-                    review_match = re.search(r'うち\s*(\d+(?:\.\d+)?)', review_text)
-                    if review_match:
-                        review_avg = float(review_match.group(1))
-                    else:
-                        # fallback: スパンのテキストから直接取得
-                        alt_elem = element.select_one('.a-icon-alt')
-                        if alt_elem and alt_elem.text:
-                            # "5つ星のうち4.4"形式のテキストから数値を抽出
-                            alt_match = re.search(r'(\d+\.\d+)', alt_elem.text)
-                            if alt_match:
-                                review_avg = float(alt_match.group(1))
-                            else:
-                                # 整数のみの場合
-                                alt_match = re.search(r'うち\s*(\d+)', alt_elem.text)
-                                if alt_match:
-                                    review_avg = float(alt_match.group(1))
-                
-                # レビュー数 - 複数のセレクタを試す
-                review_count_elem = (
-                    element.select_one('span[aria-label*="件の評価"]') or
-                    element.select_one('.s-link-style .s-underline-text') or
-                    element.select_one('[data-cy="reviews-ratings-slot"] span.a-size-base') or
-                    element.select_one('[aria-label*="つ星のうち"] + span') or
-                    element.select_one('a[href*="customerReviews"] span')
-                )
-                review_count = 0
-                if review_count_elem:
-                    review_count_text = review_count_elem.text.replace(',', '').replace('(', '').replace(')', '').strip()
-                    # "1,234" や "1,234件の評価" のような形式に対応
-                    review_count_match = re.search(r'(\d+(?:,\d+)*)', review_count_text)
-                    if review_count_match:
-                        try:
-                            review_count = int(review_count_match.group(1).replace(',', ''))
-                        except:
-                            pass
-                
-                # 説明文（箇条書き部分）
-                description_parts = []
-                feature_elem = element.select_one('.puis-padding-left-small')
-                if feature_elem:
-                    description_parts.append(feature_elem.text.strip())
-                
-                description = ' '.join(description_parts)
-                
-                # ブランド情報
-                brand_elem = element.select_one('[data-cy="title-recipe"] .puis-text-brand')
-                if not brand_elem:
-                    brand_elem = element.select_one('.s-size-mini')
-                brand = brand_elem.text.strip() if brand_elem else None
-                
-                product = {
-                    'asin': asin,
-                    'title': title,
-                    'description': description,
-                    'image_url': image_url,
-                    'price': price,
-                    'price_regular': price_regular,
-                    'on_sale': on_sale,
-                    'discount_percent': discount_percent if discount_percent > 0 else None,
-                    'review_avg': review_avg if review_avg > 0 else None,
-                    'review_count': review_count if review_count > 0 else None,
-                    'brand': brand,
-                    'last_fetched_at': datetime.now(timezone.utc).isoformat()
-                }
-                
-                products.append(product)
-                
-            except Exception as e:
-                print(f"[ERROR] Failed to parse product: {str(e)}")
-                continue
-        
-        print(f"[SUCCESS] Found {len(products)} products")
-        
-    except Exception as e:
-        print(f"[ERROR] Scraping failed: {str(e)}")
+        return await run_in_scraper_thread(_extract_mineral_water_info, products, checkpoint, cancelled)
+    except asyncio.CancelledError:
+        cancelled.set()
         raise
-    finally:
-        driver.quit()
+
+async def _fetch_mineral_water_page(scraper: AmazonScraper, keyword: str) -> List[Dict]:
+    """検索ページを取得して商品カードを解析する"""
+    # Amazonの検索ページにアクセス（共有ブラウザプールのドライバーを使う）
+    search_url = f"{AMAZON_BASE_URL}/s?k={keyword}&language=ja_JP"
+    print(f"[DEBUG] Navigating to: {search_url}")
+    cards, content = await scraper.fetch_search_page(
+        search_url, 2, '/tmp/mineral_water_search.png', fallback_to_data_asin=False
+    )
+    if cards is not None:
+        # ブラウザ内で商品カードを抽出できた場合はHTMLの解析を省く
+        print(f"[DEBUG] Extracted {len(cards)} cards in browser")
+        return await run_in_scraper_thread(_mineral_water_products_from_cards, cards)
+    await archive_page('mineral_water_search', search_url, content)
+    return await run_in_scraper_thread(_parse_mineral_water_page, content)
+
+def _parse_mineral_water_page(content: str) -> List[Dict]:
+    """検索結果ページの商品カードを解析する（GPTは呼ばない。app/reparse.pyからも使う）"""
+    print(f"[DEBUG] Page source length: {len(content)}")
+    
+    # 検索結果の商品を取得
+    cards = search_parser.parse_cards(content, fallback_to_data_asin=False)
+    print(f"[DEBUG] Found {len(cards)} search result elements")
+    return _mineral_water_products_from_cards(cards)
+
+def _mineral_water_products_from_cards(cards: List[Dict]) -> List[Dict]:
+    """CardFieldsからミネラルウォーターの商品データを作る"""
+    if not cards:
+        print("[WARNING] No products found on page")
+        return []
+    
+    products = search_parser.extract_products(cards, 'mineral_water')
     
+    print(f"[SUCCESS] Found {len(products)} products")
+    return products
+
+def _extract_mineral_water_info(products: List[Dict], checkpoint: Optional[ScrapeRun] = None,
+                                cancelled: Optional[threading.Event] = None) -> List[Dict]:
+    """GPTで商品情報を抽出する（同期処理。checkpointに記録済みの商品は抽出し直さない）
+
+    cancelledが立ったら次の商品に進まずに抜ける（抽出済みの商品はcheckpointに記録済み）。
+    """
+    resumed = checkpoint.get_items([product['asin'] for product in products]) if checkpoint else {}
     # GPT-4でミネラルウォーター情報を抽出
     for product in products:
+        if cancelled is not None and cancelled.is_set():
+            print("[WARNING] Mineral water extraction cancelled; stopping before remaining products")
+            break
+        if product['asin'] in resumed:
+            product.update(resumed[product['asin']])
+            continue
         try:
             extracted_info = parse_mineral_water_info(product['title'], product.get('description', ''))
             print(f"Mineral water extracted from '{product['title'][:50]}...': {extracted_info}")
@@ -210,12 +98,84 @@ async def scrape_mineral_water(keyword: str = "ミネラルウォーター") ->
                 if product.get('total_volume_ml') and product.get('price'):
                     price_per_liter = (product['price'] / product['total_volume_ml']) * 1000
                     product['price_per_liter'] = round(price_per_liter, 2)
+            if checkpoint:
+                checkpoint.save_items({product['asin']: product})
         except Exception as e:
             print(f"[ERROR] Failed to parse mineral water info for {product['title']}: {str(e)}")
     
     return products
 
-def save_mineral_water_to_db(products: List[Dict]) -> Dict:
+@search_parser.register_card_extractor('mineral_water')
+def extract_mineral_water_card(fields: Dict) -> Optional[Dict]:
+    """検索結果の商品カードからミネラルウォーター商品のデータを作る"""
+    asin = fields['asin']
+    title = fields['title'] or ''
+    if not asin or not title:
+        return None
+    
+    # 価格
+    price_text = fields['price_text'] if fields['price_text'] is not None else fields['price_whole_text']
+    price = 0
+    if price_text is not None:
+        price_text = price_text.replace(',', '').replace('￥', '').replace('¥', '').strip()
+        try:
+            # 小数点がある場合は整数に変換
+            price = int(float(re.sub(r'[^\d.]', '', price_text)))
+        except ValueError:
+            price = 0
+    
+    # 通常価格（セール前価格）
+    regular_price_text = fields['regular_price_offscreen_text']
+    if regular_price_text is None:
+        regular_price_text = fields['regular_price_text']
+    
+    price_regular = price
+    if regular_price_text is not None:
+        try:
+            price_regular = int(re.sub(r'[^\d]', '', regular_price_text.replace(',', '').replace('¥', '')))
+        except ValueError:
+            price_regular = price
+    
+    # セール判定と割引率
+    on_sale = price_regular > price if price > 0 and price_regular > 0 else False
+    discount_percent = 0
+    if on_sale and price_regular > 0:
+        discount_percent = round((1 - price / price_regular) * 100, 2)
+    
+    # レビュー情報
+    review_avg = search_parser.parse_review_avg(fields) or 0.0
+    
+    # レビュー数 - 複数のセレクタを試す
+    review_count = search_parser.parse_review_count(
+        fields['rating_count_label_text'] or
+        fields['link_underline_text'] or
+        fields['reviews_slot_text'] or
+        fields['rating_sibling_text'] or
+        fields['customer_reviews_text']
+    ) or 0
+    
+    # 説明文（箇条書き部分）
+    description = fields['feature_text'] or ''
+    
+    # ブランド情報
+    brand = fields['brand_text'] if fields['brand_text'] is not None else fields['brand_fallback_text']
+    
+    return {
+        'asin': asin,
+        'title': title,
+        'description': description,
+        'image_url': fields['image_url'] or '',
+        'price': price,
+        'price_regular': price_regular,
+        'on_sale': on_sale,
+        'discount_percent': discount_percent if discount_percent > 0 else None,
+        'review_avg': review_avg if review_avg > 0 else None,
+        'review_count': review_count if review_count > 0 else None,
+        'brand': brand,
+        'last_fetched_at': datetime.now(timezone.utc).isoformat()
+    }
+
+async def save_mineral_water_to_db(products: List[Dict]) -> Dict:
     """ミネラルウォーター商品をデータベースに保存"""
     if not products:
         return {'upserted': 0, 'errors': 0}
@@ -229,30 +189,23 @@ def save_mineral_water_to_db(products: List[Dict]) -> Dict:
     
     # Databaseインスタンスを作成
     db = Database()
-    if not db.enabled or not db.supabase:
+    if not db.enabled:
         print("[ERROR] Database is not enabled")
         return {'upserted': 0, 'errors': 0}
     
-    # Supabaseにアップサート
-    upserted = 0
-    errors = 0
-    
+    # NoneやNaN値をクリーンアップ
+    cleaned_products = []
     for product in products:
-        try:
-            # NoneやNaN値をクリーンアップ
-            cleaned_product = {}
-            for key, value in product.items():
-                if value is not None and value != '' and str(value).lower() != 'nan':
-                    cleaned_product[key] = value
-            
-            result = db.supabase.table('mineral_water_products').upsert(
-                cleaned_product,
-                on_conflict='asin'
-            ).execute()
-            upserted += 1
-        except Exception as e:
-            print(f"[ERROR] Failed to upsert product {product.get('asin', 'unknown')}: {str(e)}")
-            errors += 1
+        cleaned_product = {}
+        for key, value in product.items():
+            if value is not None and value != '' and str(value).lower() != 'nan':
+                cleaned_product[key] = value
+        cleaned_products.append(cleaned_product)
+    
+    # Supabaseにまとめてアップサート
+    result = await db.bulk_upsert('mineral_water_products', cleaned_products)
+    upserted = result['upserted']
+    errors = len(result['errors'])
     
     print(f"Upserted {upserted} products successfully, {errors} errors")
     return {'upserted': upserted, 'errors': errors}
\ No newline at end of file
@@ -15,7 +15,7 @@ class RiceScraper(BaseScraper):
         existing_dict = {}
         # rice_productsテーブルから全商品取得
         try:
-            response = self.db.supabase.table('rice_products').select('*').execute()
+            response = await self.db.rest.table('rice_products').select('*').execute()
             if response.data:
                 for product in response.data:
                     existing_dict[product['asin']] = product
@@ -25,8 +25,8 @@ class RiceScraper(BaseScraper):
     
     async def get_cached_products(self, filter: Optional[str] = None) -> List[Dict[str, Any]]:
         """キャッシュされた米商品を取得"""
-        try:
-            query = self.db.supabase.table('rice_products').select('*')
+        async def load(columns: str) -> List[Dict[str, Any]]:
+            query = self.db.rest.table('rice_products').select(columns)
             
             # フィルタリング（必要に応じて追加）
             if filter == 'musenmai':
@@ -37,8 +37,12 @@ class RiceScraper(BaseScraper):
             # 単価でソート
             query = query.order('price_per_kg', desc=False)
             
-            response = query.execute()
+            response = await query.execute()
             return response.data if response.data else []
+
+        try:
+            # 一覧用の列のみ
+            return await self.db.select_listing('rice_products', load)
         except Exception as e:
             print(f"Error fetching cached rice products: {e}")
             return []
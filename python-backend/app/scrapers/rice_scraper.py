@@ -4,387 +4,294 @@
 
 import re
 import json
-import os
-import time
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from datetime import datetime, timezone
 from dotenv import load_dotenv
-from supabase import create_client, Client
-from bs4 import BeautifulSoup
-import undetected_chromedriver as uc
-# GPTパーサーは使用しない（BeautifulSoupで直接パース）
+from app import search_parser
+from app.database import Database
+from app.scraper import AmazonScraper, AMAZON_BASE_URL, get_amazon_scraper
+from app.prompts.rice import extract_weight_from_title, extract_rice_type, is_musenmai
+from app.scraper_executor import run_in_scraper_thread
+from app.html_archive import archive_page
+from app.scrape_checkpoint import ScrapeRun
+# GPTパーサーは使用しない（検索結果のHTMLから直接パース）
 
 load_dotenv()
 
-# Supabaseクライアントの初期化
-supabase: Client = create_client(
-    os.getenv("NEXT_PUBLIC_SUPABASE_URL"),
-    os.getenv("NEXT_PUBLIC_SUPABASE_ANON_KEY")
-)
-
-async def scrape_rice(keyword: str = "米", check_out_of_stock: bool = True) -> List[Dict[str, Any]]:
+async def scrape_rice(keyword: str = "米", check_out_of_stock: bool = True,
+                      scraper: Optional[AmazonScraper] = None,
+                      checkpoint: Optional[ScrapeRun] = None) -> List[Dict[str, Any]]:
     """
     米商品をスクレイピングする
     カテゴリフィルター付きでAmazon検索を実行
+    ページは共有ブラウザプールから借りたドライバーで取得し、解析はスクレイピング用スレッドで実行
+    checkpointを渡すと解析したページを記録し、再開した実行では記録済みのページを取得しない
     """
+    scraper = scraper or get_amazon_scraper()
     products = []
     
-    # Initialize Chrome driver
-    options = uc.ChromeOptions()
-    options.add_argument('--headless=new')
-    options.add_argument('--lang=ja-JP')
-    options.add_argument('--no-sandbox')
-    options.add_argument('--disable-dev-shm-usage')
-    options.add_argument('--disable-blink-features=AutomationControlled')
-    options.add_argument('--user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
-    options.add_experimental_option("prefs", {
-        "intl.accept_languages": "ja,ja-JP"
-    })
+    # カテゴリフィルター付きのURL構築
+    # n:2421961051 = 米カテゴリ
+    # p_n_feature_nine_browse-bin:2421946051|2421947051 = 精米・無洗米
+    base_url = f"{AMAZON_BASE_URL}/s?i=food-beverage&rh=n:2421961051,p_n_feature_nine_browse-bin:2421946051|2421947051&keywords={keyword}"
     
-    # Chrome 141に対応するバージョンを指定
-    driver = uc.Chrome(options=options, version_main=141)
-    driver.implicitly_wait(10)
+    # 最大5ページまでスクレイピング
+    max_pages = 5
     
-    try:
-        # カテゴリフィルター付きのURL構築
-        # n:2421961051 = 米カテゴリ
-        # p_n_feature_nine_browse-bin:2421946051|2421947051 = 精米・無洗米
-        base_url = f"https://www.amazon.co.jp/s?i=food-beverage&rh=n:2421961051,p_n_feature_nine_browse-bin:2421946051|2421947051&keywords={keyword}"
+    for page_num in range(1, max_pages + 1):
+        if page_num == 1:
+            search_url = base_url
+        else:
+            search_url = f"{base_url}&page={page_num}"
         
-        # 最大5ページまでスクレイピング
-        max_pages = 5
+        page_key = f"rice:{keyword}:{page_num}"
+        page_products = await run_in_scraper_thread(checkpoint.get_page, page_key) if checkpoint else None
+        if page_products is not None:
+            print(f"[DEBUG] Page {page_num}: {len(page_products)} products from checkpoint")
+            products.extend(page_products)
+            continue
         
-        for page_num in range(1, max_pages + 1):
-            if page_num == 1:
-                search_url = base_url
-            else:
-                search_url = f"{base_url}&page={page_num}"
-            
-            print(f"[DEBUG] Page {page_num}: Navigating to: {search_url}")
-            driver.get(search_url)
-            time.sleep(2)
-            
-            # ページタイトルを取得して確認
-            title = driver.title
-            print(f"[DEBUG] Page {page_num} title: {title}")
-            
-            # ページのHTMLを取得
-            content = driver.page_source
-            print(f"[DEBUG] Page {page_num} source length: {len(content)}")
-            
-            soup = BeautifulSoup(content, 'html.parser')
-            
-            # 検索結果の商品を取得
-            product_elements = soup.select('[data-component-type="s-search-result"]')
-            print(f"[DEBUG] Page {page_num}: Found {len(product_elements)} search result elements")
-            
-            if not product_elements:
-                print(f"[WARNING] No products found on page {page_num}, stopping pagination")
-                break
-            
-            for element in product_elements:
-                try:
-                    # ASIN取得
-                    asin = element.get('data-asin', '')
-                    if not asin:
-                        continue
-                    
-                    # タイトル
-                    title_elem = element.select_one('h2 span')
-                    if not title_elem:
-                        title_elem = element.select_one('[data-cy="title-recipe"] span')
-                    if not title_elem:
-                        title_elem = element.select_one('.s-title-instructions-style span')
-                    
-                    title = title_elem.text.strip() if title_elem else ''
-                    
-                    if not title:
-                        continue
-                
-                    # 画像URL
-                    img_elem = element.select_one('img.s-image')
-                    image_url = img_elem.get('src', '') if img_elem else ''
-                    
-                    # 現在の価格を取得
-                    price_elem = element.select_one('.a-price .a-offscreen')
-                    if not price_elem:
-                        price_elem = element.select_one('.a-price-whole')
-                    
-                    # 在庫切れチェック
-                    out_of_stock = False
-                    if check_out_of_stock:
-                        # 複数の方法で在庫状況を確認
-                        
-                        # 方法1: a-color-price, a-color-stateクラスで在庫切れテキストをチェック
-                        availability_elem = element.select_one('.a-color-price, .a-color-state')
-                        if availability_elem:
-                            availability_text = availability_elem.text.strip()
-                            if any(keyword in availability_text for keyword in ['在庫切れ', '現在在庫切れ', '現在お取り扱いできません', '入荷未定', '一時的に在庫切れ']):
-                                out_of_stock = True
-                                print(f"[DEBUG] Out of stock (method 1): {title[:50]}... - {availability_text}")
-                        
-                        # 方法2: 価格表示がない、またはAddToCartボタンがない場合
-                        add_to_cart = element.select_one('[data-action="s-card-button"]')
-                        if not add_to_cart and not price_elem:
-                            # 価格もカートボタンもない場合は在庫切れの可能性
-                            out_of_stock = True
-                            print(f"[DEBUG] Out of stock (method 2 - no price/cart): {title[:50]}...")
-                    
-                    price = 0
-                    if price_elem:
-                        price_text = price_elem.text.replace(',', '').replace('￥', '').replace('¥', '').strip()
-                        try:
-                            price = int(float(re.sub(r'[^\d.]', '', price_text)))
-                        except:
-                            price = 0
-                    
-                    # 価格が0の場合も在庫切れとマーク
-                    if price <= 0:
-                        out_of_stock = True
-                        print(f"[DEBUG] No price found, marking as out of stock: {title[:50]}...")
-                    
-                    # 元の価格（セール前価格）を取得
-                    price_regular = price  # デフォルトは現在価格と同じ
-                    
-                    # 方法1: .a-text-priceから取得（複数ある場合は2番目が元価格）
-                    regular_price_elems = element.select('.a-text-price')
-                    for regular_price_elem in regular_price_elems:
-                        regular_text = regular_price_elem.text.replace(',', '').replace('￥', '').replace('¥', '').strip()
-                        # "8602860 や "¥8,602¥8,602" のような重複を処理
-                        # 最初の価格のみを取得
-                        price_match = re.search(r'(\d+)', regular_text)
-                        if price_match:
-                            try:
-                                # 数値が異常に大きい場合（価格の重複）は半分にする
-                                temp_regular = int(price_match.group(1))
-                                if temp_regular > 100000:  # 10万円以上は異常値
-                                    # 桁数を確認して半分にする
-                                    str_price = str(temp_regular)
-                                    half_len = len(str_price) // 2
-                                    if len(str_price) % 2 == 0 and str_price[:half_len] == str_price[half_len:]:
-                                        # 同じ数字の繰り返しなら半分にする
-                                        temp_regular = int(str_price[:half_len])
-                                
-                                # 元の価格が現在価格より高い場合のみ有効（セール中）
-                                if temp_regular > price and temp_regular < 100000:  # 妥当な価格範囲
-                                    price_regular = temp_regular
-                                    print(f"[DEBUG] Sale detected via a-text-price for {title[:30]}... - Original: ¥{temp_regular}, Sale: ¥{price}")
-                                    break
-                            except:
-                                pass
-                    
-                    # 方法2: "Was: ¥X,XXX" パターンを探す  
-                    # 価格リンクやセカンダリテキストに "Was:" が含まれることが多い
-                    was_elements = element.select('.a-color-secondary, .s-price-instructions-style, a.s-link-style, .a-price + *')
-                    
-                    for was_elem in was_elements:
-                        if 'Was:' in was_elem.text or '以前は' in was_elem.text:
-                            # "Was: ¥9,710" または "以前は¥9,710" のようなパターンを探す
-                            was_match = re.search(r'(?:Was:|以前は)\s*[¥￥]?([\d,]+)', was_elem.text)
-                            if was_match:
-                                try:
-                                    was_price = int(float(was_match.group(1).replace(',', '')))
-                                    if was_price > price:
-                                        price_regular = was_price
-                                        print(f"[DEBUG] Sale detected via 'Was/以前は' price for {title[:30]}... - Original: ¥{was_price}, Sale: ¥{price}")
-                                        break
-                                except:
-                                    pass
-                    
-                    # 方法3: 価格リンク内の複数価格パターン（"¥8,602 以前は¥9,710"）
-                    price_link = element.select_one('a.s-link-style')
-                    if price_link:
-                        # 複数の価格が含まれているかチェック
-                        all_prices = re.findall(r'[¥￥]([\d,]+)', price_link.text)
-                        if len(all_prices) >= 2:
-                            try:
-                                # 最も高い価格を元値とする
-                                prices = [int(p.replace(',', '')) for p in all_prices]
-                                max_price = max(prices)
-                                if max_price > price:
-                                    price_regular = max_price
-                                    print(f"[DEBUG] Sale detected via multiple prices for {title[:30]}... - Original: ¥{max_price}, Sale: ¥{price}")
-                            except:
-                                pass
-                    
-                    # 割引パーセンテージを直接探す
-                    discount_found = False
-                    discount_value = 0
-                    
-                    # 複数の方法で割引情報を探す
-                    # 方法1: セールバッジ
-                    sale_badge = element.select_one('.s-badge-text, .a-badge-text')
-                    if sale_badge and 'セール' in sale_badge.text:
-                        print(f"[DEBUG] Sale badge found for {title[:30]}...")
-                        discount_found = True
-                    
-                    # 方法2: 割引バッジを探す
-                    savings_elem = element.select_one('.savingsPercentage')
-                    if savings_elem:
-                        text = savings_elem.text.strip()
-                        match = re.search(r'(\d+)%', text)
-                        if match:
-                            discount_value = int(match.group(1))
-                            discount_found = True
-                            print(f"[DEBUG] Found savings percentage for {title[:30]}... - {text}")
-                    
-                    # 方法3: 割引パーセンテージのテキストを探す（例：「11%割引」）
-                    if not discount_found:
-                        for span in element.select('span'):
-                            text = span.text.strip()
-                            # "11パーセントの割引" や "11%割引" や "-11%" のパターンを探す
-                            if 'パーセント' in text and '割引' in text:
-                                match = re.search(r'(\d+)\s*パーセント', text)
-                                if match:
-                                    discount_value = int(match.group(1))
-                                    discount_found = True
-                                    print(f"[DEBUG] Found discount text for {title[:30]}... - {text}")
-                                    break
-                            elif '割引' in text:
-                                match = re.search(r'(\d+)%?\s*割引', text)
-                                if match:
-                                    discount_value = int(match.group(1))
-                                    discount_found = True
-                                    print(f"[DEBUG] Found discount text for {title[:30]}... - {text}")
-                                    break
-                            elif re.match(r'^-?\d+%$', text):
-                                match = re.search(r'(\d+)%', text)
-                                if match:
-                                    discount_value = int(match.group(1))
-                                    discount_found = True
-                                    print(f"[DEBUG] Found discount percentage for {title[:30]}... - {text}")
-                                    break
-                    
-                    # 割引が見つかった場合は元の価格を計算
-                    if discount_found and discount_value > 0 and price > 0:
-                        # 割引率から元の価格を逆算
-                        calculated_regular = round(price / (1 - discount_value / 100))
-                        if calculated_regular > price_regular:
-                            price_regular = calculated_regular
-                            print(f"[DEBUG] Calculated original price for {title[:30]}... - Discount: {discount_value}%, Original: ¥{calculated_regular}, Sale: ¥{price}")
-                    
-                    # レビュー情報（ミネラルウォーターと同じ方法）
-                    review_elem = element.select_one('[aria-label*="つ星のうち"]')
-                    review_avg = 0.0
-                    if review_elem:
-                        review_text = review_elem.get('aria-label', '')
-                        # 「5つ星のうち4.3」のようなテキストから4.3を抽出
-                        review_match = re.search(r'うち\s*(\d+(?:\.\d+)?)', review_text)
-                        if review_match:
-                            review_avg = float(review_match.group(1))
-                        else:
-                            # fallback: スパンのテキストから直接取得
-                            alt_elem = element.select_one('.a-icon-alt')
-                            if alt_elem and alt_elem.text:
-                                # "5つ星のうち4.4"形式のテキストから数値を抽出
-                                alt_match = re.search(r'(\d+\.\d+)', alt_elem.text)
-                                if alt_match:
-                                    review_avg = float(alt_match.group(1))
-                                else:
-                                    # 整数のみの場合
-                                    alt_match = re.search(r'うち\s*(\d+)', alt_elem.text)
-                                    if alt_match:
-                                        review_avg = float(alt_match.group(1))
-                    
-                    # レビュー数 - 複数のセレクタを試す
-                    review_count_elem = (
-                        element.select_one('span[aria-label*="件の評価"]') or
-                        element.select_one('.s-link-style .s-underline-text') or
-                        element.select_one('[data-csa-c-content-id] .s-underline-text') or
-                        element.select_one('.a-size-base.s-underline-text') or
-                        element.select_one('[data-cy="reviews-ratings-slot"] span.a-size-base') or
-                        element.select_one('[aria-label*="つ星のうち"] + span') or
-                        element.select_one('a[href*="customerReviews"] span')
-                    )
-
-                    review_count = 0
-                    if review_count_elem:
-                        count_text = review_count_elem.text.replace(',', '').replace('(', '').replace(')', '').strip()
-                        # "1,234" や "1,234件の評価" のような形式に対応
-                        match = re.search(r'(\d+(?:,\d+)*)', count_text)
-                        if match:
-                            try:
-                                review_count = int(match.group(1).replace(',', ''))
-                            except:
-                                review_count = 0
-                    
-                    # タイトルから重量を抽出（共通関数を使用）
-                    from app.prompts.rice import extract_weight_from_title
-                    weight_kg = extract_weight_from_title(title)
-                    
-                    # 米の品種を抽出
-                    rice_types = [
-                        'コシヒカリ', 'こしひかり', 'あきたこまち', '秋田小町',
-                        'ひとめぼれ', 'はえぬき', 'ななつぼし', 'ゆめぴりか',
-                        'つや姫', 'ミルキークイーン', 'きぬむすめ', 'にこまる',
-                        'ヒノヒカリ', 'あさひの夢', 'きらら397', '森のくまさん', 'さがびより'
-                    ]
-                    rice_type = None
-                    title_lower = title.lower()
-                    for rt in rice_types:
-                        if rt.lower() in title_lower:
-                            rice_type = rt
-                            break
-                    
-                    # 無洗米判定
-                    is_musenmai = any(keyword in title for keyword in ['無洗米', 'むせんまい', '無洗'])
-                    
-                    # 割引率計算
-                    discount_percent = 0
-                    if discount_found and discount_value > 0:
-                        # 直接検出された割引率を使用
-                        discount_percent = discount_value
-                    elif price_regular > price and price > 0:
-                        # 価格差から計算
-                        discount_percent = round((1 - price / price_regular) * 100)
-                    
-                    # 単価計算
-                    price_per_kg = None
-                    if weight_kg and weight_kg > 0 and price > 0:
-                        price_per_kg = round(price / weight_kg, 2)
-                    
-                    # 在庫切れの場合は価格を0にする
-                    if out_of_stock:
-                        price = 0
-                        price_regular = 0
-                        price_per_kg = None
-                        discount_percent = 0
-                    
-                    product = {
-                        'asin': asin,
-                        'title': title,
-                        'image_url': image_url,
-                        'price': price,
-                        'price_regular': price_regular,
-                        'review_avg': review_avg,
-                        'review_count': review_count,
-                        'weight_kg': weight_kg,
-                        'price_per_kg': price_per_kg,
-                        'rice_type': rice_type,
-                        'is_musenmai': is_musenmai,
-                        'discount_percent': discount_percent,
-                        'on_sale': discount_percent > 0,
-                        'out_of_stock': out_of_stock
-                    }
-                    
-                    # 重量が取得できる商品のみ追加（在庫切れでも重量情報があれば追加）
-                    if weight_kg:
-                        products.append(product)
-                        if out_of_stock:
-                            print(f"[DEBUG] Added out-of-stock product: {title[:50]}...")
-                        else:
-                            print(f"[DEBUG] Added product: {title[:50]}... - {weight_kg}kg - ¥{price_per_kg}/kg")
-                    
-                except Exception as e:
-                    print(f"[ERROR] Failed to parse product element: {e}")
-                    continue
+        print(f"[DEBUG] Page {page_num}: Navigating to: {search_url}")
+        cards, content = await scraper.fetch_search_page(
+            search_url, 2, f'/tmp/rice_search_page_{page_num}.png', fallback_to_data_asin=False
+        )
+        if cards is not None:
+            # ブラウザ内で商品カードを抽出できた場合はHTMLの解析を省く
+            page_products = await run_in_scraper_thread(_rice_products_from_cards, cards, check_out_of_stock)
+        else:
+            await archive_page('rice_search', search_url, content, page_num=page_num, check_out_of_stock=check_out_of_stock)
+            page_products = await run_in_scraper_thread(_parse_rice_page, content, page_num, check_out_of_stock)
+        if checkpoint and page_products is not None:
+            await run_in_scraper_thread(checkpoint.save_page, page_key, page_products)
+        if page_products is None:
+            print(f"[WARNING] No products found on page {page_num}, stopping pagination")
+            break
         
-    finally:
-        driver.quit()
+        products.extend(page_products)
     
     print(f"Total rice products found: {len(products)}")
     return products
 
+def _parse_rice_page(content: str, page_num: int, check_out_of_stock: bool) -> Optional[List[Dict[str, Any]]]:
+    """検索結果ページを解析する（商品カードがなければNone。app/reparse.pyからも使う）"""
+    print(f"[DEBUG] Page {page_num} source length: {len(content)}")
+    
+    # 検索結果の商品を取得
+    cards = search_parser.parse_cards(content, fallback_to_data_asin=False)
+    print(f"[DEBUG] Page {page_num}: Found {len(cards)} search result elements")
+    
+    return _rice_products_from_cards(cards, check_out_of_stock)
+
+def _rice_products_from_cards(cards: List[Dict[str, Any]], check_out_of_stock: bool) -> Optional[List[Dict[str, Any]]]:
+    """CardFieldsから米の商品データを作る（商品カードがなければNone）"""
+    if not cards:
+        return None
+    
+    return search_parser.extract_products(cards, 'rice', check_out_of_stock=check_out_of_stock)
+
+@search_parser.register_card_extractor('rice')
+def extract_rice_card(fields: Dict[str, Any], check_out_of_stock: bool = True) -> Optional[Dict[str, Any]]:
+    """
+    検索結果の商品カードから米商品のデータを作る
+    重量が取得できない商品はNoneを返す（在庫切れでも重量情報があれば対象）
+    """
+    asin = fields['asin']
+    title = fields['title'] or ''
+    if not asin or not title:
+        return None
+    
+    has_price = fields['price_text'] is not None or fields['price_whole_text'] is not None
+    price_text = fields['price_text'] if fields['price_text'] is not None else fields['price_whole_text']
+    
+    # 在庫切れチェック
+    out_of_stock = False
+    if check_out_of_stock:
+        # 方法1: a-color-price, a-color-stateクラスで在庫切れテキストをチェック
+        availability_text = (fields['availability_state_text'] or '').strip()
+        if availability_text and any(keyword in availability_text for keyword in ['在庫切れ', '現在在庫切れ', '現在お取り扱いできません', '入荷未定', '一時的に在庫切れ']):
+            out_of_stock = True
+            print(f"[DEBUG] Out of stock (method 1): {title[:50]}... - {availability_text}")
+        
+        # 方法2: 価格もカートボタンもない場合は在庫切れの可能性
+        if not fields['has_cart_button'] and not has_price:
+            out_of_stock = True
+            print(f"[DEBUG] Out of stock (method 2 - no price/cart): {title[:50]}...")
+    
+    price = 0
+    if price_text is not None:
+        price_text = price_text.replace(',', '').replace('￥', '').replace('¥', '').strip()
+        try:
+            price = int(float(re.sub(r'[^\d.]', '', price_text)))
+        except ValueError:
+            price = 0
+    
+    # 価格が0の場合も在庫切れとマーク
+    if price <= 0:
+        out_of_stock = True
+        print(f"[DEBUG] No price found, marking as out of stock: {title[:50]}...")
+    
+    # 元の価格（セール前価格）を取得
+    price_regular = _find_regular_price(fields, price, title)
+    
+    # 割引パーセンテージを直接探す
+    discount_value = _find_discount_percent(fields, title)
+    discount_found = discount_value is not None
+    discount_value = discount_value or 0
+    
+    # 割引が見つかった場合は元の価格を計算
+    if discount_found and discount_value > 0 and price > 0:
+        # 割引率から元の価格を逆算
+        calculated_regular = round(price / (1 - discount_value / 100))
+        if calculated_regular > price_regular:
+            price_regular = calculated_regular
+            print(f"[DEBUG] Calculated original price for {title[:30]}... - Discount: {discount_value}%, Original: ¥{calculated_regular}, Sale: ¥{price}")
+    
+    # レビュー情報（ミネラルウォーターと同じ方法）
+    review_avg = search_parser.parse_review_avg(fields) or 0.0
+    
+    # レビュー数 - 複数のセレクタを試す
+    review_count = search_parser.parse_review_count(
+        fields['rating_count_label_text'] or
+        fields['link_underline_text'] or
+        fields['csa_underline_text'] or
+        fields['size_base_underline_text'] or
+        fields['reviews_slot_text'] or
+        fields['rating_sibling_text'] or
+        fields['customer_reviews_text']
+    ) or 0
+    
+    # タイトルから重量・品種・無洗米を判定（共通関数を使用）
+    weight_kg = extract_weight_from_title(title)
+    if not weight_kg:
+        return None
+    
+    # 割引率計算
+    discount_percent = 0
+    if discount_found and discount_value > 0:
+        # 直接検出された割引率を使用
+        discount_percent = discount_value
+    elif price_regular > price and price > 0:
+        # 価格差から計算
+        discount_percent = round((1 - price / price_regular) * 100)
+    
+    # 単価計算
+    price_per_kg = None
+    if weight_kg > 0 and price > 0:
+        price_per_kg = round(price / weight_kg, 2)
+    
+    # 在庫切れの場合は価格を0にする
+    if out_of_stock:
+        price = 0
+        price_regular = 0
+        price_per_kg = None
+        discount_percent = 0
+        print(f"[DEBUG] Added out-of-stock product: {title[:50]}...")
+    else:
+        print(f"[DEBUG] Added product: {title[:50]}... - {weight_kg}kg - ¥{price_per_kg}/kg")
+    
+    return {
+        'asin': asin,
+        'title': title,
+        'image_url': fields['image_url'] or '',
+        'price': price,
+        'price_regular': price_regular,
+        'review_avg': review_avg,
+        'review_count': review_count,
+        'weight_kg': weight_kg,
+        'price_per_kg': price_per_kg,
+        'rice_type': extract_rice_type(title),
+        'is_musenmai': is_musenmai(title),
+        'discount_percent': discount_percent,
+        'on_sale': discount_percent > 0,
+        'out_of_stock': out_of_stock
+    }
+
+def _find_regular_price(fields: Dict[str, Any], price: int, title: str) -> int:
+    """セール前価格を探す（見つからない場合は現在価格）"""
+    price_regular = price
+    
+    # 方法1: .a-text-priceから取得（複数ある場合は2番目が元価格）
+    for regular_text in fields['text_price_texts']:
+        regular_text = regular_text.replace(',', '').replace('￥', '').replace('¥', '').strip()
+        # "8602860 や "¥8,602¥8,602" のような重複を処理
+        # 最初の価格のみを取得
+        price_match = re.search(r'(\d+)', regular_text)
+        if not price_match:
+            continue
+        # 数値が異常に大きい場合（価格の重複）は半分にする
+        temp_regular = int(price_match.group(1))
+        if temp_regular > 100000:  # 10万円以上は異常値
+            # 桁数を確認して半分にする
+            str_price = str(temp_regular)
+            half_len = len(str_price) // 2
+            if len(str_price) % 2 == 0 and str_price[:half_len] == str_price[half_len:]:
+                # 同じ数字の繰り返しなら半分にする
+                temp_regular = int(str_price[:half_len])
+        
+        # 元の価格が現在価格より高い場合のみ有効（セール中）
+        if price < temp_regular < 100000:  # 妥当な価格範囲
+            price_regular = temp_regular
+            print(f"[DEBUG] Sale detected via a-text-price for {title[:30]}... - Original: ¥{temp_regular}, Sale: ¥{price}")
+            break
+    
+    # 方法2: "Was: ¥9,710" または "以前は¥9,710" のようなパターンを探す
+    for was_text in fields['was_texts']:
+        was_match = re.search(r'(?:Was:|以前は)\s*[¥￥]?([\d,]+)', was_text)
+        if was_match:
+            try:
+                was_price = int(float(was_match.group(1).replace(',', '')))
+            except ValueError:
+                continue
+            if was_price > price:
+                price_regular = was_price
+                print(f"[DEBUG] Sale detected via 'Was/以前は' price for {title[:30]}... - Original: ¥{was_price}, Sale: ¥{price}")
+                break
+    
+    # 方法3: 価格リンク内の複数価格パターン（"¥8,602 以前は¥9,710"）
+    if fields['price_link_text']:
+        all_prices = re.findall(r'[¥￥]([\d,]+)', fields['price_link_text'])
+        if len(all_prices) >= 2:
+            # 最も高い価格を元値とする
+            max_price = max(int(p.replace(',', '')) for p in all_prices)
+            if max_price > price:
+                price_regular = max_price
+                print(f"[DEBUG] Sale detected via multiple prices for {title[:30]}... - Original: ¥{max_price}, Sale: ¥{price}")
+    
+    return price_regular
+
+def _find_discount_percent(fields: Dict[str, Any], title: str) -> Optional[int]:
+    """セールバッジ・割引率の表示から割引率を探す（見つからない場合はNone）"""
+    discount_found = False
+    
+    # 方法1: セールバッジ
+    if fields['badge_text'] and 'セール' in fields['badge_text']:
+        print(f"[DEBUG] Sale badge found for {title[:30]}...")
+        discount_found = True
+    
+    # 方法2: 割引バッジを探す
+    if fields['savings_text']:
+        match = re.search(r'(\d+)%', fields['savings_text'].strip())
+        if match:
+            print(f"[DEBUG] Found savings percentage for {title[:30]}... - {fields['savings_text'].strip()}")
+            return int(match.group(1))
+    
+    if discount_found:
+        return 0
+    
+    # 方法3: 割引パーセンテージのテキストを探す（「11パーセントの割引」「11%割引」「-11%」）
+    for text in fields['discount_span_texts']:
+        if 'パーセント' in text and '割引' in text:
+            match = re.search(r'(\d+)\s*パーセント', text)
+        elif '割引' in text:
+            match = re.search(r'(\d+)%?\s*割引', text)
+        else:
+            match = re.search(r'(\d+)%', text)
+        if match:
+            print(f"[DEBUG] Found discount text for {title[:30]}... - {text}")
+            return int(match.group(1))
+    
+    return None
+
 async def save_rice_to_db(products: List[Dict[str, Any]]) -> Dict[str, Any]:
     """
     米商品データをデータベースに保存
@@ -402,10 +309,8 @@ async def save_rice_to_db(products: List[Dict[str, Any]]) -> Dict[str, Any]:
         
         products_list = list(unique_products.values())
         
-        # 既存データをクリア
-        supabase.table("rice_products").delete().neq("asin", "").execute()
+        db = Database()
         
-        # 新規データを挿入
         # UTCで現在時刻を取得
         now = datetime.now(timezone.utc).isoformat()
         for product in products_list:
@@ -415,10 +320,16 @@ async def save_rice_to_db(products: List[Dict[str, Any]]) -> Dict[str, Any]:
             if 'out_of_stock' not in product:
                 product['out_of_stock'] = False
         
-        result = supabase.table("rice_products").insert(products_list).execute()
+        # 既存の行と比べて追加・変更された行だけを書き込み、今回見つからなかった商品は在庫切れにする
+        # （全件削除してから入れ直すと、その間 /api/rice/search が空になる）
+        sync = await db.sync_rows(
+            "rice_products", products_list,
+            soft_delete={'out_of_stock': True},
+            touch={'last_fetched_at': now}
+        )
         
         print(f"Saved {len(products_list)} rice products to database (from {len(products)} total with duplicates)")
-        return {"status": "success", "count": len(products_list)}
+        return {"status": "success", "count": len(products_list), "sync": sync}
         
     except Exception as e:
         print(f"Error saving rice products to database: {e}")
@@ -18,7 +18,7 @@ class ToiletPaperScraper(BaseScraper):
     
     async def get_cached_products(self, filter: Optional[str] = None) -> List[Dict[str, Any]]:
         """キャッシュされたトイレットペーパー商品を取得"""
-        return await self.db.get_all_cached_products(filter)
+        return await self.db.get_all_cached_products(filter, listing=True)
     
     async def process_product(self, product: Dict[str, Any], existing_products: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """トイレットペーパー商品を処理"""
@@ -0,0 +1,381 @@
+"""
+検索結果ページの共通パーサー
+
+AmazonScraper・米・ミネラルウォーターの各スクレイパー、デバッグ用スクレイパー、
+Lambdaのスクレイパーで重複していた商品カードの解析処理をまとめたもの。
+
+- HTMLはlxmlでパースし、商品カードはコンパイル済みのXPathで取得する
+- 各カードの要素は1回の走査でクラス名・属性から振り分けて CardFields（辞書）に集める
+- CardFieldsから商品データを作る処理は商品タイプごとの抽出関数としてレジストリに登録する
+  （米・ミネラルウォーターの抽出関数はそれぞれのスクレイパーモジュールで登録）
+
+Lambdaのデプロイパッケージにもそのままコピーされるため、appパッケージには依存しない。
+"""
+import re
+from typing import Any, Callable, Dict, List, Optional
+
+from lxml import etree
+from lxml import html as lxml_html
+
+_SEARCH_RESULT_XPATH = etree.XPath('//*[@data-component-type="s-search-result"]')
+_DATA_ASIN_XPATH = etree.XPath('//*[@data-asin]')
+
+_DESCRIPTION_CLASSES = frozenset(['a-size-base', 'a-size-base-plus', 'a-size-mini', 's-feature-text', 'a-color-secondary'])
+_AVAILABILITY_CLASSES = frozenset(['a-color-secondary', 's-result-item-text', 'a-size-base'])
+_WAS_PRICE_CLASSES = frozenset(['a-color-secondary', 's-price-instructions-style'])
+_DISCOUNT_PERCENT_RE = re.compile(r'^-?\d+%$')
+_EMPTY = frozenset()
+
+CardExtractor = Callable[..., Optional[Dict[str, Any]]]
+_CARD_EXTRACTORS: Dict[str, CardExtractor] = {}
+
+
+def register_card_extractor(category: str):
+    """商品タイプ別の抽出関数を登録するデコレーター"""
+    def decorator(func: CardExtractor) -> CardExtractor:
+        _CARD_EXTRACTORS[category] = func
+        return func
+    return decorator
+
+
+def get_card_extractor(category: str) -> CardExtractor:
+    extractor = _CARD_EXTRACTORS.get(category)
+    if extractor is None:
+        raise ValueError(f"Unknown card extractor: {category}")
+    return extractor
+
+
+def _classes(el) -> frozenset:
+    cls = el.get('class')
+    return frozenset(cls.split()) if cls else _EMPTY
+
+
+def _has_ancestor(el, card, predicate) -> bool:
+    for ancestor in el.iterancestors():
+        if predicate(ancestor):
+            return True
+        if ancestor is card:
+            break
+    return False
+
+
+def parse_html(page_source: str):
+    """HTML文字列をlxmlのツリーに変換"""
+    return lxml_html.fromstring(page_source)
+
+
+def find_cards(root, fallback_to_data_asin: bool = True) -> List[Any]:
+    """商品カードの要素を取得（見つからない場合はdata-asin属性を持つ要素で代用）"""
+    cards = _SEARCH_RESULT_XPATH(root)
+    if not cards and fallback_to_data_asin:
+        cards = _DATA_ASIN_XPATH(root)
+    return cards
+
+
+def collect_card_fields(card) -> Dict[str, Any]:
+    """商品カード内の要素を1回だけ走査して、各スクレイパーが使う生のテキストを集める"""
+    fields: Dict[str, Any] = {
+        'asin': card.get('data-asin') or '',
+        'title': None,
+        'title_fallback': None,
+        'detail_url': None,
+        'image_url': None,
+        'price_text': None,
+        'price_whole_text': None,
+        'regular_price_offscreen_text': None,
+        'regular_price_text': None,
+        'text_price_texts': [],
+        'icon_alt_text': None,
+        'rating_label': None,
+        'rating_count_label_text': None,
+        'link_underline_text': None,
+        'csa_underline_text': None,
+        'size_base_underline_text': None,
+        'reviews_slot_text': None,
+        'rating_sibling_text': None,
+        'customer_reviews_text': None,
+        'description_texts': [],
+        'availability_texts': [],
+        'availability_state_text': None,
+        'has_cart_button': False,
+        'was_texts': [],
+        'price_link_text': None,
+        'badge_text': None,
+        'savings_text': None,
+        'discount_span_texts': [],
+        'feature_text': None,
+        'brand_text': None,
+        'brand_fallback_text': None,
+    }
+
+    for el in card.iter(etree.Element):
+        tag = el.tag
+        classes = _classes(el)
+        text = None
+
+        def el_text() -> str:
+            nonlocal text
+            if text is None:
+                text = el.text_content()
+            return text
+
+        # タイトル（h2 span → [data-cy="title-recipe"] span → .s-title-instructions-style span）
+        if tag == 'h2' and fields['title'] is None:
+            span = el.find('.//span')
+            if span is not None:
+                fields['title'] = span.text_content().strip()
+        elif fields['title_fallback'] is None and (
+                el.get('data-cy') == 'title-recipe' or 's-title-instructions-style' in classes):
+            span = el.find('.//span')
+            if span is not None:
+                fields['title_fallback'] = span.text_content().strip()
+
+        if tag == 'a':
+            href = el.get('href') or ''
+            if fields['detail_url'] is None and '/dp/' in href:
+                fields['detail_url'] = href
+            if fields['customer_reviews_text'] is None and 'customerReviews' in href:
+                span = el.find('.//span')
+                if span is not None:
+                    fields['customer_reviews_text'] = span.text_content()
+            if 's-link-style' in classes and fields['price_link_text'] is None:
+                fields['price_link_text'] = el_text()
+        elif tag == 'img' and fields['image_url'] is None and 's-image' in classes:
+            fields['image_url'] = el.get('src')
+
+        aria_label = el.get('aria-label')
+        if aria_label:
+            if 'つ星のうち' in aria_label and fields['rating_label'] is None:
+                fields['rating_label'] = aria_label
+                sibling = el.getnext()
+                if sibling is not None and sibling.tag == 'span':
+                    fields['rating_sibling_text'] = sibling.text_content()
+            if tag == 'span' and '件の評価' in aria_label and fields['rating_count_label_text'] is None:
+                fields['rating_count_label_text'] = el_text()
+
+        if el.get('data-action') == 's-card-button':
+            fields['has_cart_button'] = True
+
+        # セール前価格（「Was: ¥X」「以前は¥X」）
+        if classes & _WAS_PRICE_CLASSES or (tag == 'a' and 's-link-style' in classes) or _is_after_price(el):
+            if 'Was:' in el_text() or '以前は' in el_text():
+                fields['was_texts'].append(el_text())
+        if tag == 'span':
+            _collect_discount_span(fields, el_text())
+
+        if not classes:
+            continue
+
+        # 価格（.a-price .a-offscreen / .a-text-price .a-offscreen）
+        if 'a-offscreen' in classes:
+            if fields['price_text'] is None and _has_ancestor(el, card, lambda a: 'a-price' in _classes(a)):
+                fields['price_text'] = el_text()
+            if fields['regular_price_offscreen_text'] is None and _has_ancestor(
+                    el, card, lambda a: 'a-text-price' in _classes(a)):
+                fields['regular_price_offscreen_text'] = el_text()
+        if 'a-price-whole' in classes and fields['price_whole_text'] is None:
+            fields['price_whole_text'] = el_text()
+        if 'a-text-price' in classes:
+            fields['text_price_texts'].append(el_text())
+            if fields['regular_price_text'] is None:
+                fields['regular_price_text'] = el_text()
+
+        # レビュー
+        if 'a-icon-alt' in classes and fields['icon_alt_text'] is None:
+            fields['icon_alt_text'] = el_text()
+        if 's-underline-text' in classes:
+            if fields['link_underline_text'] is None and _has_ancestor(
+                    el, card, lambda a: 's-link-style' in _classes(a)):
+                fields['link_underline_text'] = el_text()
+            if fields['csa_underline_text'] is None and _has_ancestor(
+                    el, card, lambda a: a.get('data-csa-c-content-id') is not None):
+                fields['csa_underline_text'] = el_text()
+            if fields['size_base_underline_text'] is None and 'a-size-base' in classes:
+                fields['size_base_underline_text'] = el_text()
+        if tag == 'span' and 'a-size-base' in classes and fields['reviews_slot_text'] is None and _has_ancestor(
+                el, card, lambda a: a.get('data-cy') == 'reviews-ratings-slot'):
+            fields['reviews_slot_text'] = el_text()
+
+        # 説明文・在庫状況
+        if classes & _DESCRIPTION_CLASSES:
+            fields['description_texts'].append(el_text().strip())
+        if classes & _AVAILABILITY_CLASSES:
+            fields['availability_texts'].append(el_text())
+        if fields['availability_state_text'] is None and ('a-color-price' in classes or 'a-color-state' in classes):
+            fields['availability_state_text'] = el_text()
+
+        # セールバッジ・割引率
+        if fields['badge_text'] is None and ('s-badge-text' in classes or 'a-badge-text' in classes):
+            fields['badge_text'] = el_text()
+        if 'savingsPercentage' in classes and fields['savings_text'] is None:
+            fields['savings_text'] = el_text()
+
+        # 説明（箇条書き）・ブランド
+        if 'puis-padding-left-small' in classes and fields['feature_text'] is None:
+            fields['feature_text'] = el_text().strip()
+        if 'puis-text-brand' in classes and fields['brand_text'] is None and _has_ancestor(
+                el, card, lambda a: a.get('data-cy') == 'title-recipe'):
+            fields['brand_text'] = el_text().strip()
+        if 's-size-mini' in classes and fields['brand_fallback_text'] is None:
+            fields['brand_fallback_text'] = el_text().strip()
+
+    if fields['title'] is None:
+        fields['title'] = fields['title_fallback']
+
+    return fields
+
+
+def _is_after_price(el) -> bool:
+    """.a-price + * に該当するか"""
+    previous = el.getprevious()
+    return previous is not None and 'a-price' in _classes(previous)
+
+
+def _collect_discount_span(fields: Dict[str, Any], text: str) -> None:
+    """割引率が書かれていそうなspanのテキストを集める（「11%割引」「11パーセントの割引」「-11%」）"""
+    text = text.strip()
+    if '割引' in text or _DISCOUNT_PERCENT_RE.match(text):
+        fields['discount_span_texts'].append(text)
+
+
+def parse_cards(page_source: str, fallback_to_data_asin: bool = True) -> List[Dict[str, Any]]:
+    """検索結果ページの全商品カードからCardFieldsを作る"""
+    root = parse_html(page_source)
+    return [collect_card_fields(card) for card in find_cards(root, fallback_to_data_asin)]
+
+
+def extract_products(cards: List[Dict[str, Any]], category: str = 'default', **options) -> List[Dict[str, Any]]:
+    """CardFieldsのリストを商品タイプ別の抽出関数で商品データに変換"""
+    extractor = get_card_extractor(category)
+    products = []
+    for fields in cards:
+        try:
+            product = extractor(fields, **options)
+        except Exception as e:
+            print(f"[ERROR] Failed to parse product element: {e}")
+            continue
+        if product:
+            products.append(product)
+    return products
+
+
+def parse_price_text(text: Optional[str]) -> Optional[int]:
+    """「￥1,234」のような価格テキストを整数に変換"""
+    if text is None:
+        return None
+    try:
+        # 小数点がある場合は整数に変換
+        return int(float(text.replace(',', '').replace('￥', '').replace('¥', '').strip()))
+    except ValueError:
+        return None
+
+
+def parse_review_count(text: Optional[str]) -> Optional[int]:
+    """「(1,234)」「1,234件の評価」のようなテキストからレビュー件数を取得"""
+    if not text:
+        return None
+    count_text = text.replace(',', '').replace('(', '').replace(')', '').strip()
+    match = re.search(r'(\d+(?:,\d+)*)', count_text)
+    if match:
+        return int(match.group(1).replace(',', ''))
+    return None
+
+
+def parse_review_avg(fields: Dict[str, Any]) -> Optional[float]:
+    """aria-label（「5つ星のうち4.3」）または.a-icon-altから評価を取得"""
+    if fields['rating_label']:
+        match = re.search(r'うち\s*(\d+(?:\.\d+)?)', fields['rating_label'])
+        if match:
+            return float(match.group(1))
+        alt_text = fields['icon_alt_text']
+        if alt_text:
+            match = re.search(r'(\d+\.\d+)', alt_text) or re.search(r'うち\s*(\d+)', alt_text)
+            if match:
+                return float(match.group(1))
+    return None
+
+
+@register_card_extractor('default')
+def extract_default(fields: Dict[str, Any]) -> Dict[str, Any]:
+    """トイレットペーパー・食器用洗剤・マスクなど汎用の検索結果カード"""
+    product = {'asin': fields['asin']}
+
+    if fields['title'] is not None:
+        product['title'] = fields['title']
+
+    # 在庫切れチェック（テキストで判定）
+    unavailable = any(
+        '在庫切れ' in text or '現在お取り扱い' in text or 'Currently unavailable' in text or '現在在庫切れ' in text
+        for text in fields['availability_texts']
+    )
+
+    # 価格（在庫切れの場合はNone）
+    price_text = fields['price_text'] if fields['price_text'] is not None else fields['price_whole_text']
+    product['price'] = None if unavailable else parse_price_text(price_text)
+
+    # 商品説明（定価取得で使用するため先に収集）
+    description_parts = [
+        text for text in fields['description_texts']
+        if text and text != product.get('title') and len(text) > 5
+    ]
+
+    # 定価
+    regular_text = fields['regular_price_offscreen_text']
+    if regular_text is None:
+        regular_text = fields['regular_price_text']
+    potential_regular = parse_price_text(regular_text)
+    if potential_regular is not None and product['price'] is not None and potential_regular > product['price']:
+        product['price_regular'] = potential_regular
+
+    # 定価が取得できない場合、descriptionから「参考:」価格を探す
+    if not product.get('price_regular') and product['price'] is not None:
+        for part in description_parts:
+            match = re.search(r'参考[:：]?\s*[￥¥]?([\d,]+)', part)
+            if match:
+                ref_price = int(match.group(1).replace(',', ''))
+                if ref_price > product['price']:  # 参考価格が現在価格より高い場合のみ
+                    product['price_regular'] = ref_price
+                    break
+
+    # セール判定
+    if product.get('price_regular') and product.get('price'):
+        price_ratio = product['price_regular'] / product['price']
+        # 5%以上の割引、かつ10倍以上の差は異常値として除外
+        if product['price_regular'] > product['price'] and 1.05 < price_ratio < 10:
+            product['on_sale'] = True
+            product['discount_percent'] = int(
+                ((product['price_regular'] - product['price']) / product['price_regular']) * 100
+            )
+        else:
+            product['on_sale'] = False
+            if price_ratio >= 10 or price_ratio < 0.1:
+                del product['price_regular']
+    else:
+        product['on_sale'] = False
+
+    # 画像
+    if fields['image_url']:
+        product['image_url'] = fields['image_url']
+
+    # レビュー
+    rating_text = fields['icon_alt_text']
+    if rating_text and '5つ星のうち' in rating_text:
+        try:
+            product['review_avg'] = float(rating_text.split('5つ星のうち')[1].strip())
+        except ValueError:
+            pass
+
+    # レビュー件数
+    review_count_text = (
+        fields['rating_count_label_text'] or
+        fields['link_underline_text'] or
+        fields['reviews_slot_text']
+    )
+    review_count = parse_review_count(review_count_text)
+    if review_count is not None:
+        product['review_count'] = review_count
+
+    if description_parts:
+        product['description'] = ' '.join(description_parts)
+
+    return product
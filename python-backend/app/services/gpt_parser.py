@@ -3,6 +3,8 @@ import json
 import re
 from typing import Dict, Optional
 from openai import OpenAI
+from app.extraction_cache import ExtractionCache, get_extraction_cache, prompt_version
+from app.rule_extraction import resolve_locally
 
 client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
@@ -13,6 +15,20 @@ def parse_mineral_water_info(title: str, description: str = "") -> Optional[Dict
     try:
         from app.prompts.mineral_water import SYSTEM_PROMPT, USER_PROMPT_TEMPLATE
         
+        # 商品名から確実に抽出できる場合はGPTを呼ばない
+        local = resolve_locally("mineral_water", title)
+        if local:
+            return local
+        
+        # 同じテキストは以前の抽出結果を使う
+        cache = get_extraction_cache()
+        cache_key = ExtractionCache.make_key(
+            "mineral_water", prompt_version(SYSTEM_PROMPT, USER_PROMPT_TEMPLATE), title, description
+        )
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
         prompt = USER_PROMPT_TEMPLATE.format(
             title=title,
             description=description
@@ -71,7 +87,10 @@ def parse_mineral_water_info(title: str, description: str = "") -> Optional[Dict
                 except (ValueError, TypeError):
                     pass
             
-            return cleaned_result if cleaned_result else None
+            if not cleaned_result:
+                return None
+            cache.set(cache_key, "mineral_water", cleaned_result)
+            return cleaned_result
             
         except json.JSONDecodeError as e:
             print(f"[ERROR] Failed to parse JSON: {e}")
@@ -0,0 +1,72 @@
+"""
+スクレイピング結果とテーブルの差分の計算
+
+テーブルを全件削除してから入れ直す代わりに、既存の行とスクレイピングした行の内容のハッシュを比べ、
+追加・変更された行だけを書き込み、今回見つからなかった行は論理削除する（Database.sync_rows）。
+削除から再挿入までの間に一覧が空になることもない。
+
+ハッシュには取得日時・id・作成/更新日時を含めない。数値はNUMERIC(10, 2)の列に保存されると
+小数第2位に丸められるので、比較の前に同じように丸める（丸めの差で毎回「変更あり」にならないように）。
+"""
+import hashlib
+import json
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional
+
+# 内容の比較に含めない列
+IGNORED_FIELDS = frozenset({'id', 'created_at', 'updated_at', 'last_fetched_at'})
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, (int, float)):
+        return round(float(value), 2)
+    return value
+
+
+def row_digest(row: Dict[str, Any], fields: Iterable[str]) -> str:
+    """fieldsの値のハッシュ"""
+    values = [_normalize(row.get(name)) for name in fields]
+    return hashlib.blake2b(
+        json.dumps(values, ensure_ascii=False, default=str).encode('utf-8'), digest_size=16
+    ).hexdigest()
+
+
+@dataclass
+class SyncPlan:
+    inserts: List[Dict[str, Any]] = field(default_factory=list)
+    updates: List[Dict[str, Any]] = field(default_factory=list)
+    unchanged: List[str] = field(default_factory=list)  # キーのみ
+    removed: List[str] = field(default_factory=list)  # 論理削除するキー
+
+
+def plan_sync(current_rows: Iterable[Dict[str, Any]], new_rows: Iterable[Dict[str, Any]], key: str = 'asin',
+              soft_delete: Optional[Dict[str, Any]] = None) -> SyncPlan:
+    """既存の行と新しい行から、書き込みが必要な行を求める
+
+    soft_delete: 新しい行にない既存の行に設定する値（例: {'out_of_stock': True}）。
+    すでにその値になっている行は論理削除の対象にしない。Noneなら論理削除しない。
+    """
+    current = {row[key]: row for row in current_rows}
+    plan = SyncPlan()
+    seen = set()
+    for row in new_rows:
+        seen.add(row[key])
+        existing = current.get(row[key])
+        if existing is None:
+            plan.inserts.append(row)
+            continue
+        fields = sorted(name for name in row if name not in IGNORED_FIELDS)
+        if row_digest(row, fields) == row_digest(existing, fields):
+            plan.unchanged.append(row[key])
+        else:
+            plan.updates.append(row)
+
+    if soft_delete:
+        for row_key, row in current.items():
+            if row_key in seen:
+                continue
+            if any(row.get(name) != value for name, value in soft_delete.items()):
+                plan.removed.append(row_key)
+    return plan
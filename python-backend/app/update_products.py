@@ -4,20 +4,26 @@ AWS Lambda または cron で実行される
 """
 import asyncio
 import os
-from datetime import datetime
-from typing import Dict, Any, List
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app.scraper import AmazonScraper
 from app.chatgpt_parser import ChatGPTParser
 from app.database import Database
+from app.refresh_scheduler import RefreshPolicy, plan_refresh
+from app.scrape_checkpoint import open_run
 from dotenv import load_dotenv
 
 load_dotenv()
 
-async def update_product_prices():
-    """価格のみを更新する処理"""
+async def update_product_prices(page_budget: Optional[int] = None):
+    """価格のみを更新する処理
+
+    全商品ではなく、価格の変動のしやすさ・セール状況・前回の取得時刻から決めた
+    更新予定時刻を過ぎた商品だけを最大page_budget件（既定はREFRESH_PAGE_BUDGET）更新する。
+    """
     db = Database()
     scraper = AmazonScraper()
     
@@ -31,14 +37,28 @@ async def update_product_prices():
             print("DBに商品がありません。初回スクレイピングを実行します。")
             return await initial_scraping()
         
-        print(f"更新対象: {len(existing_products)}件の商品")
+        policy = RefreshPolicy.from_env()
+        if page_budget is not None:
+            policy.page_budget = page_budget
+        now = datetime.now(timezone.utc)
+        history = await db.get_price_history(now - policy.history_window)
+        plan = plan_refresh(existing_products, history, policy, now)
+        
+        print(f"更新対象: {len(plan.due)}件 / 全{len(existing_products)}件"
+              f"（予定前: {plan.not_due}件, 予算超過で次回: {plan.deferred}件）")
+        
+        # 各商品の最新価格を取得（詳細ページはプールのワーカーで並列取得）
+        # Lambdaの時間制限などで前回の実行が途中で止まっていれば、取得済みの詳細ページは取得し直さない
+        checkpoint = open_run('price_update')
+        details = await scraper.get_product_details(
+            [product['asin'] for product in plan.due], checkpoint=checkpoint
+        ) if plan.due else {}
         
-        # 各商品の最新価格を取得
         updated_products = []
-        for product in existing_products:
+        failures: Dict[str, int] = {}  # ASIN -> 連続失敗回数
+        for product in plan.due:
             try:
-                # 詳細ページから価格を取得
-                detail = await scraper.get_product_detail(product['asin'])
+                detail = details.get(product['asin'])
                 
                 if detail and detail.get('price'):
                     # 価格関連フィールドのみ更新
@@ -49,7 +69,11 @@ async def update_product_prices():
                         'on_sale': detail.get('on_sale', False),
                         'review_avg': detail.get('review_avg'),
                         'review_count': detail.get('review_count'),
+                        'last_fetched_at': now.isoformat(),
                     }
+                    if product.get('refresh_failures'):
+                        # 取得できたので連続失敗回数を戻す
+                        update_data['refresh_failures'] = 0
                     
                     # 単価を再計算
                     if update_data['price'] and product.get('roll_count'):
@@ -62,22 +86,36 @@ async def update_product_prices():
                     print(f"更新: {product['asin']} - ¥{update_data['price']}")
                 else:
                     print(f"価格取得失敗: {product['asin']}")
+                    failures[product['asin']] = (product.get('refresh_failures') or 0) + 1
                     
             except Exception as e:
                 print(f"エラー {product['asin']}: {str(e)}")
+                failures[product['asin']] = (product.get('refresh_failures') or 0) + 1
                 continue
         
         # DBを更新
         if updated_products:
             await db.update_product_prices(updated_products)
             print(f"更新完了: {len(updated_products)}件の価格を更新")
+        # 取得できなかった商品は試行日時を残し、次の試行を遅らせる
+        await db.record_refresh_failures(failures, now)
+        checkpoint.complete()
         
         await scraper.close()
-        return {"updated": len(updated_products), "timestamp": datetime.now().isoformat()}
+        await db.close()
+        return {
+            "updated": len(updated_products),
+            "failed": len(failures),
+            "due": len(plan.due),
+            "deferred": plan.deferred,
+            "not_due": plan.not_due,
+            "timestamp": datetime.now().isoformat()
+        }
         
     except Exception as e:
         print(f"更新エラー: {str(e)}")
         await scraper.close()
+        await db.close()
         raise
 
 async def initial_scraping():
@@ -89,15 +127,20 @@ async def initial_scraping():
     try:
         print("初回スクレイピング開始")
         
-        # Amazon検索
-        products = await scraper.search_products("トイレットペーパー")
+        # Amazon検索（前回の実行が途中で止まっていれば、取得済みのページと解析済みの商品を再利用する）
+        checkpoint = open_run('initial_scraping', "トイレットペーパー")
+        products = await scraper.search_products("トイレットペーパー", checkpoint=checkpoint)
         print(f"取得: {len(products)}件の商品")
         
         # 各商品を解析
         processed = []
+        resumed = checkpoint.get_items([product['asin'] for product in products])
         for product in products:
             if not product.get('title'):
                 continue
+            if product['asin'] in resumed:
+                processed.append(resumed[product['asin']])
+                continue
                 
             # ChatGPTで解析
             info = await parser.extract_info(
@@ -119,13 +162,16 @@ async def initial_scraping():
                 product_data['price_per_m'] = product_data['price'] / product_data['total_length_m']
             
             processed.append(product_data)
+            checkpoint.save_items({product['asin']: product_data})
         
         # DBに保存
         await db.upsert_products(processed)
         print(f"初回登録完了: {len(processed)}件")
+        checkpoint.complete()
         
         await scraper.close()
         await parser.close()
+        await db.close()
         
         return {"initialized": len(processed), "timestamp": datetime.now().isoformat()}
         
@@ -133,11 +179,13 @@ async def initial_scraping():
         print(f"初回スクレイピングエラー: {str(e)}")
         await scraper.close()
         await parser.close()
+        await db.close()
         raise
 
 def lambda_handler(event, context):
-    """AWS Lambda エントリーポイント"""
-    result = asyncio.run(update_product_prices())
+    """AWS Lambda エントリーポイント（eventのpage_budgetで1回の更新件数を指定できる）"""
+    page_budget = (event or {}).get('page_budget')
+    result = asyncio.run(update_product_prices(int(page_budget) if page_budget is not None else None))
     return {
         'statusCode': 200,
         'body': result
@@ -0,0 +1,149 @@
+"""
+絞り込み用のファセット索引
+
+一覧の絞り込み（サイズ・色・入数・セール）のたびに全商品を読み込んで走査する代わりに、
+ファセット名（例: size_regular, color_black, sale）-> ASINの集合 を保持しておく。
+複数のファセットを組み合わせた絞り込み（"size_regular,color_black,sale"）は小さい集合から順に積集合をとり、
+ファセットごとの件数は集合の大きさなのでO(1)で返せる。
+ページングでは並び替えの列ごとに並べ替え済みのキーのリストを持ち、カーソルの位置から二分探索で読み始める
+（リストは書き込みのあと最初に使うときに作り直す）。
+索引は Database が保持し、テーブルへの書き込みのたびに更新する（app/database.py の get_facet_index）。
+"""
+import time
+from bisect import bisect_right
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from ..pagination import Page, after_key, row_key
+
+# 入数がこの枚数以上なら large_pack、未満なら small_pack
+LARGE_PACK_COUNT = 50
+
+
+def mask_facets(row: Dict[str, Any]) -> Tuple[str, ...]:
+    """マスク商品が属するファセット"""
+    facets = ['large_pack' if (row.get('mask_count') or 0) >= LARGE_PACK_COUNT else 'small_pack']
+    if row.get('on_sale'):
+        facets.append('sale')
+    size = row.get('mask_size')
+    facets.append(f'size_{size}' if size else 'size_unknown')
+    if row.get('mask_color'):
+        facets.append(f"color_{row['mask_color']}")
+    return tuple(facets)
+
+
+def is_mask_facet(name: str) -> bool:
+    return name in ('large_pack', 'small_pack', 'sale') or name.startswith(('size_', 'color_'))
+
+
+# ファセット索引を持つテーブル -> (行のファセット, ファセット名として有効か, 一覧の並び順のフィールド)
+FACET_TABLES: Dict[str, Tuple[Callable[[Dict[str, Any]], Tuple[str, ...]], Callable[[str], bool], str]] = {
+    'mask_products': (mask_facets, is_mask_facet, 'price_per_mask'),
+}
+
+
+def parse_filter(filter: Optional[str]) -> List[str]:
+    """"size_regular,color_black,sale" のようなカンマ区切りの絞り込みをファセット名のリストにする"""
+    if not filter:
+        return []
+    return [name.strip() for name in filter.split(',') if name.strip()]
+
+
+def normalize_filter(filter: Optional[str], is_facet: Callable[[str], bool]) -> Optional[str]:
+    """読み取りキャッシュのキーに使う絞り込み（無効なファセット名を除き、重複をなくして名前順に並べる。なければNone）
+
+    並びや重複が違うだけの指定、無効なファセット名を含む指定は同じ結果なので同じキーにまとめる。
+    """
+    names = sorted({name for name in parse_filter(filter) if is_facet(name)})
+    return ','.join(names) or None
+
+
+class FacetIndex:
+    """テーブル内の在庫のある商品のファセット -> ASINの集合"""
+
+    def __init__(self, table: str, rows: Iterable[Dict[str, Any]] = ()):
+        self.facets_of, self.is_facet, self.sort_field = FACET_TABLES[table]
+        self._rows: Dict[str, Dict[str, Any]] = {}
+        self._row_facets: Dict[str, Tuple[str, ...]] = {}
+        self._facets: Dict[str, Set[str]] = {}
+        # (列, 降順か) -> row_key の昇順のリスト
+        self._orders: Dict[Tuple[str, bool], List[Tuple]] = {}
+        self.loaded_at = time.monotonic()
+        for row in rows:
+            self._put(row)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _put(self, row: Dict[str, Any]) -> None:
+        asin = row['asin']
+        self.remove(asin)
+        self._orders.clear()
+        # 在庫切れ（価格がnull）は一覧に出さないので索引にも入れない
+        if row.get('price') is None:
+            return
+        self._rows[asin] = row
+        self._row_facets[asin] = self.facets_of(row)
+        for name in self._row_facets[asin]:
+            self._facets.setdefault(name, set()).add(asin)
+
+    def remove(self, asin: str) -> None:
+        if asin not in self._rows:
+            return
+        self._orders.clear()
+        del self._rows[asin]
+        for name in self._row_facets.pop(asin):
+            members = self._facets[name]
+            members.discard(asin)
+            if not members:
+                del self._facets[name]
+
+    def update_rows(self, rows: Iterable[Dict[str, Any]]) -> None:
+        """書き込んだ行を反映する（一部の列だけの行は保存済みの値に重ねる）"""
+        for row in rows:
+            if 'asin' in row:
+                self._put({**self._rows.get(row['asin'], {}), **row})
+
+    def query(self, filter: Optional[str]) -> List[Dict[str, Any]]:
+        """すべてのファセットに属する商品を並び順のフィールドの昇順で返す
+
+        ファセット名として無効な指定は無視する（以前の apply_filter と同じく絞り込まない）。
+        """
+        asins = self._members(filter)
+        rows = list(self._rows.values()) if asins is None else [self._rows[asin] for asin in asins]
+        rows.sort(key=lambda row: row.get(self.sort_field) or float('inf'))
+        return rows
+
+    def _members(self, filter: Optional[str]) -> Optional[Set[str]]:
+        """すべてのファセットに属するASIN（絞り込みがなければNone）"""
+        names = [name for name in parse_filter(filter) if self.is_facet(name)]
+        if not names:
+            return None
+        members = sorted((self._facets.get(name, set()) for name in names), key=len)
+        return set(members[0]).intersection(*members[1:])
+
+    def page(self, filter: Optional[str], page: Page) -> List[Dict[str, Any]]:
+        """絞り込んだ商品のうち、pageの並び順でカーソルの次からlimit件"""
+        asins = self._members(filter)
+        order = self._orders.get((page.column, page.desc))
+        if order is None:
+            order = sorted(row_key(page, row) for row in self._rows.values())
+            self._orders[(page.column, page.desc)] = order
+        start = bisect_right(order, after_key(page)) if page.after else 0
+        rows = []
+        for position in range(start, len(order)):
+            asin = order[position][-1]
+            if asins is None or asin in asins:
+                rows.append(self._rows[asin])
+                if len(rows) >= page.limit:
+                    break
+        return rows
+
+    def count(self, name: str) -> int:
+        return len(self._facets.get(name, ()))
+
+    def counts(self, prefix: str = '') -> Dict[str, int]:
+        """prefixで始まるファセットの件数（prefixは除いた値 -> 件数）"""
+        return {
+            name[len(prefix):]: len(members)
+            for name, members in self._facets.items() if name.startswith(prefix)
+        }
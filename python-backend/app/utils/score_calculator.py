@@ -1,14 +1,36 @@
 """
 総合点スコアの計算ユーティリティ
+
+calculate_all_scores は全商品の単価の最小/最大を1回だけ求め、調整レビュースコアと単価スコアを
+列（NumPy配列）としてまとめて計算する（商品ごとに全商品を走査していたときはO(n²)だった）。
+複数の重み付け（SCORE_PROFILES）のスコアも同じ列から一度に計算できる。
+NumPyがない環境では同じ計算をPythonのリストで行う。
 """
-from typing import List, Dict, Optional
+from typing import List, Dict, Mapping, Optional, Tuple
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# 名前付きの重み付け（レビュースコアの重み, 単価スコアの重み）
+SCORE_PROFILES: Dict[str, Tuple[float, float]] = {
+    'default': (0.7, 0.3),
+    'price_first': (0.3, 0.7),
+    'review_first': (0.9, 0.1),
+}
+
+# calculate_adjusted_review_score の既定値
+REVIEW_CONFIDENCE = 100
+REVIEW_PRIOR_MEAN = 3.8
 
 
 def calculate_adjusted_review_score(
     review_avg: Optional[float],
     review_count: Optional[int],
-    C: float = 100,  # 信頼性パラメータ（最小レビュー数の閾値）- レビュー件数の影響を大幅に抑制
-    m: float = 3.8  # 全商品の平均レビュー点数の推定値（やや高めに設定）
+    C: float = REVIEW_CONFIDENCE,  # 信頼性パラメータ（最小レビュー数の閾値）- レビュー件数の影響を大幅に抑制
+    m: float = REVIEW_PRIOR_MEAN  # 全商品の平均レビュー点数の推定値（やや高めに設定）
 ) -> float:
     """ベイズ平均を使用した調整レビュースコアの計算"""
     if not review_count or not review_avg:
@@ -70,15 +92,34 @@ def calculate_total_score(
     if not valid_prices:
         return None
 
-    min_price = min(valid_prices)
-    max_price = max(valid_prices)
+    return calculate_score_with_bounds(
+        product, price_field, min(valid_prices), max(valid_prices), review_weight, price_weight
+    )
+
 
-    # 調整レビュースコアの計算
+def calculate_score_with_bounds(
+    product: Dict,
+    price_field: str,
+    min_price: float,
+    max_price: float,
+    review_weight: float = 0.7,
+    price_weight: float = 0.3
+) -> float:
+    """
+    有効な単価の最小/最大がわかっている場合の総合点スコア（app/utils/score_index.py の増分計算で使う）
+
+    Returns:
+        総合スコア（0-5の範囲、価格情報がない場合は調整レビュースコアの半分）
+    """
     adjusted_review_score = calculate_adjusted_review_score(
         product.get('review_avg'),
         product.get('review_count')
     )
 
+    current_price = product.get(price_field)
+    if current_price is None or current_price <= 0:
+        return adjusted_review_score * 0.5
+
     # 単価スコアの計算
     price_score = calculate_price_score(current_price, min_price, max_price)
 
@@ -107,14 +148,109 @@ def calculate_all_scores(
     Returns:
         total_scoreフィールドが追加された商品リスト
     """
-    for product in products:
-        score = calculate_total_score(
-            product,
-            products,
-            price_field,
-            review_weight,
-            price_weight
-        )
-        product['total_score'] = round(score, 2) if score is not None else None
+    scores = calculate_profile_scores(products, price_field, {'total_score': (review_weight, price_weight)})
+    for product, score in zip(products, scores['total_score']):
+        product['total_score'] = score
+
+    return products
+
+
+def calculate_profile_scores(
+    products: List[Dict],
+    price_field: str,
+    profiles: Optional[Mapping[str, Tuple[float, float]]] = None
+) -> Dict[str, List[Optional[float]]]:
+    """
+    複数の重み付けの総合スコアをまとめて計算（calculate_total_score と同じ値を小数第2位に丸めて返す）
+
+    Args:
+        products: 商品リスト
+        price_field: 価格フィールド名
+        profiles: 名前 -> (レビュースコアの重み, 単価スコアの重み)（デフォルト: SCORE_PROFILES）
+
+    Returns:
+        名前 -> 商品の順のスコアのリスト
+    """
+    profiles = SCORE_PROFILES if profiles is None else profiles
+    if not products:
+        return {name: [] for name in profiles}
+    if NUMPY_AVAILABLE:
+        return _profile_scores_numpy(products, price_field, profiles)
+    return _profile_scores_python(products, price_field, profiles)
+
+
+def _column(products: List[Dict], field: str) -> 'np.ndarray':
+    """商品のフィールドをfloat64の配列にする（Noneは0。calculate_total_scoreと同じく0は値なしと同じ扱い）"""
+    return np.fromiter(
+        (value if value is not None else 0 for value in (product.get(field) for product in products)),
+        dtype=np.float64, count=len(products)
+    )
+
+
+def _profile_scores_numpy(
+    products: List[Dict],
+    price_field: str,
+    profiles: Mapping[str, Tuple[float, float]]
+) -> Dict[str, List[Optional[float]]]:
+    prices = _column(products, price_field)
+    review_avg = _column(products, 'review_avg')
+    review_count = _column(products, 'review_count')
+
+    # 調整レビュースコア（レビューがない商品は事前平均）
+    has_reviews = (review_avg != 0) & (review_count != 0)
+    adjusted_review = np.where(
+        has_reviews,
+        (review_count * review_avg + REVIEW_CONFIDENCE * REVIEW_PRIOR_MEAN) / (review_count + REVIEW_CONFIDENCE),
+        REVIEW_PRIOR_MEAN
+    )
+
+    # 単価スコア（有効な単価の最小/最大は全体で1回だけ求める）
+    has_price = prices > 0
+    if has_price.any():
+        min_price = prices[has_price].min()
+        max_price = prices[has_price].max()
+        if max_price == min_price:
+            price_score = np.full(len(products), 2.5)
+        else:
+            price_score = ((max_price - prices) / (max_price - min_price)) * 5
+
+    # 価格情報がない商品は調整レビュースコアの半分（calculate_total_score と同じペナルティ）
+    no_price_score = adjusted_review * 0.5
+    results = {}
+    for name, (review_weight, price_weight) in profiles.items():
+        if has_price.any():
+            total = np.clip(adjusted_review * review_weight + price_score * price_weight, 0.0, 5.0)
+            total = np.where(has_price, total, no_price_score)
+        else:
+            total = no_price_score
+        # 丸めはPythonのround（calculate_total_scoreを使っていたときと同じ結果にする）
+        results[name] = [round(score, 2) for score in total.tolist()]
+    return results
+
+
+def _profile_scores_python(
+    products: List[Dict],
+    price_field: str,
+    profiles: Mapping[str, Tuple[float, float]]
+) -> Dict[str, List[Optional[float]]]:
+    prices = [product.get(price_field) for product in products]
+    valid_prices = [price for price in prices if price is not None and price > 0]
+    min_price = min(valid_prices) if valid_prices else None
+    max_price = max(valid_prices) if valid_prices else None
+    adjusted_reviews = [
+        calculate_adjusted_review_score(product.get('review_avg'), product.get('review_count'))
+        for product in products
+    ]
 
-    return products
\ No newline at end of file
+    results = {}
+    for name, (review_weight, price_weight) in profiles.items():
+        scores = []
+        for price, adjusted_review in zip(prices, adjusted_reviews):
+            if price is None or price <= 0:
+                score = adjusted_review * 0.5
+            else:
+                price_score = calculate_price_score(price, min_price, max_price)
+                score = min(5.0, max(0.0, adjusted_review * review_weight + price_score * price_weight))
+            scores.append(round(score, 2))
+        results[name] = scores
+    return results
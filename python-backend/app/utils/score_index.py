@@ -0,0 +1,71 @@
+"""
+総合スコアの増分計算用の単価の索引
+
+総合スコアの単価スコアはテーブル全体の有効な単価（> 0）の最小/最大に依存する。
+ScoreIndex は商品タイプ（テーブル）ごとに ASIN -> 単価 と並び替え済みの単価のリストを保持し、
+1商品の単価の更新を二分探索で反映する。更新の前後で最小/最大が変わらなければ、
+更新した商品のスコアだけを計算すればほかの商品のスコアは変わらない（変わった場合だけ全件を再計算する）。
+索引は Database が保持し、テーブルへの書き込みのたびに更新する（app/database.py の score_incrementally）。
+"""
+import time
+from bisect import bisect_left, insort
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# 総合スコアを持つテーブル -> スコアに使う単価のフィールド
+SCORE_PRICE_FIELDS: Dict[str, str] = {
+    'toilet_paper_products': 'price_per_m',
+}
+
+
+def _valid_price(value: Any) -> Optional[float]:
+    """スコアの最小/最大に含める単価（Noneと0以下は含めない）"""
+    if value is None:
+        return None
+    value = float(value)
+    return value if value > 0 else None
+
+
+class ScoreIndex:
+    """テーブル内の有効な単価の順序付きの統計"""
+
+    def __init__(self, price_field: str, rows: Iterable[Dict[str, Any]] = ()):
+        self.price_field = price_field
+        self._prices: Dict[str, float] = {}
+        self._sorted: List[float] = []
+        self.loaded_at = time.monotonic()
+        for row in rows:
+            price = _valid_price(row.get(price_field))
+            if price is not None:
+                self._prices[row['asin']] = price
+        self._sorted = sorted(self._prices.values())
+
+    def __len__(self) -> int:
+        return len(self._sorted)
+
+    def bounds(self) -> Optional[Tuple[float, float]]:
+        """有効な単価の (最小, 最大)。有効な単価がなければNone"""
+        if not self._sorted:
+            return None
+        return self._sorted[0], self._sorted[-1]
+
+    def update(self, asin: str, value: Any) -> None:
+        """1商品の単価を反映する（Noneや0以下なら索引から外す）"""
+        price = _valid_price(value)
+        old = self._prices.get(asin)
+        if old == price:
+            return
+        if old is not None:
+            del self._sorted[bisect_left(self._sorted, old)]
+            del self._prices[asin]
+        if price is not None:
+            insort(self._sorted, price)
+            self._prices[asin] = price
+
+    def remove(self, asin: str) -> None:
+        self.update(asin, None)
+
+    def update_rows(self, rows: Iterable[Dict[str, Any]]) -> None:
+        """書き込んだ行を反映する（単価のフィールドを含まない行は既存の値のままなので無視する）"""
+        for row in rows:
+            if 'asin' in row and self.price_field in row:
+                self.update(row['asin'], row[self.price_field])
@@ -0,0 +1,82 @@
+"""
+Chromeドライバーの設定のベンチマーク（従来 vs リソース遮断＋要素の出現待ち）
+
+画像・CSS・フォント・広告スクリプトを含むフィクスチャページを search_products と
+get_product_details で取得し、pages/minute と配信されたバイト数を比較する。
+
+- legacy: すべてのリソースを読み込み、load イベント後に固定時間（検索3秒・詳細2秒）待つ
+- optimized: CDPで不要なリソースを遮断し、DOM構築後に商品カード・商品名が現れた時点で読み込み完了とする
+
+使い方（python-backendディレクトリで実行、Chromeが必要）:
+    python -m benchmarks.benchmark_browser_profile --pages 10 --details 10
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# HTMLアーカイブへの保存は計測に含めない
+os.environ.setdefault('HTML_ARCHIVE_ENABLED', 'false')
+
+from benchmarks.fixtures import FixtureServer
+import app.scraper as scraper_module
+from app.browser_pool import BrowserPool, HostRateLimiter, create_chrome_driver
+from app.http_fetcher import HttpFetcher
+
+PROFILES = {
+    'legacy': dict(block_resources=False, page_load_strategy='normal', smart_wait=False),
+    'optimized': dict(block_resources=True, page_load_strategy='eager', smart_wait=True),
+}
+
+
+async def run_profile(server: FixtureServer, name: str, pages: int, details: int, pool_size: int) -> dict:
+    profile = PROFILES[name]
+    pool = BrowserPool(pool_size, lambda: create_chrome_driver(profile['block_resources'], profile['page_load_strategy']))
+    scraper = scraper_module.AmazonScraper(pool=pool, fetch_mode='browser', http_fetcher=HttpFetcher())
+    scraper.rate_limiter = HostRateLimiter(rate=10000, capacity=10000)
+    scraper.smart_wait = profile['smart_wait']
+
+    try:
+        # ドライバーの起動時間は含めない
+        async with contextlib.AsyncExitStack() as stack:
+            for _ in range(pool_size):
+                await stack.enter_async_context(pool.lease())
+        bytes_before, requests_before = server.bytes_sent, server.requests
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            products = await scraper.search_products("fixture", max_pages=pages)
+            await scraper.get_product_details([product['asin'] for product in products[:details]])
+        elapsed = time.perf_counter() - start
+    finally:
+        await scraper.close()
+
+    return {
+        'products': len(products),
+        'pages_per_minute': (pages + details) / elapsed * 60,
+        'megabytes': (server.bytes_sent - bytes_before) / 1e6,
+        'requests': server.requests - requests_before,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pages', type=int, default=10, help='検索結果ページ数')
+    parser.add_argument('--details', type=int, default=10, help='商品詳細ページ数')
+    parser.add_argument('--pool-size', type=int, default=2)
+    args = parser.parse_args()
+
+    with FixtureServer(assets=True) as server:
+        scraper_module.AMAZON_BASE_URL = server.url
+        print(f"Fixture server: {server.url} ({args.pages} search pages + {args.details} detail pages)")
+        for name in PROFILES:
+            result = await run_profile(server, name, args.pages, args.details, args.pool_size)
+            print(f"{name:>10}: {result['pages_per_minute']:.1f} pages/min, {result['megabytes']:.1f} MB in "
+                  f"{result['requests']} requests, {result['products']} products")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
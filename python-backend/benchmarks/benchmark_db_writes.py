@@ -0,0 +1,102 @@
+"""
+Supabase書き込みのベンチマーク（1件ずつ vs 一括upsert）
+
+ローカルのPostgREST代替サーバーに対して Database の保存メソッドを実行し、
+リクエスト数と所要時間を比較する。batch_size=1 が従来の1件ずつの書き込みに相当する。
+
+使い方（python-backendディレクトリで実行）:
+    python -m benchmarks.benchmark_db_writes --products 150 --latency 0.02
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+from typing import Any, Dict, List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.postgrest_server import DUMMY_SUPABASE_KEY, PostgrestServer
+
+
+def toilet_paper_rows(count: int, bad: int = 0) -> List[Dict[str, Any]]:
+    rng = random.Random(0)
+    rows = []
+    for i in range(count):
+        price = rng.randint(300, 3000)
+        row = {
+            'asin': f"{'BAD' if i < bad else 'B0'}{i:07d}",
+            'title': f"トイレットペーパー {i}",
+            'price': price,
+            'roll_count': 12,
+            'total_length_m': 600,
+            'price_per_m': round(price / 600, 3),
+            'is_double': rng.random() < 0.5,
+        }
+        # 取得できなかった項目がある商品（キーの組み合わせが変わる）
+        if rng.random() < 0.3:
+            row['review_avg'] = round(rng.uniform(3, 5), 1)
+        rows.append(row)
+    return rows
+
+
+def dishwashing_rows(count: int) -> List[Dict[str, Any]]:
+    return [
+        {'asin': f"D0{i:07d}", 'title': f"食器用洗剤 {i}", 'price': 300 + i, 'volume_ml': 500, 'price_per_1000ml': 600 + i}
+        for i in range(count)
+    ]
+
+
+async def run(db, server: PostgrestServer, batch_size: int, products: int, bad: int) -> Dict[str, Any]:
+    db.batch_size = batch_size
+    server.tables.clear()
+    results = {}
+    steps = [
+        ('upsert_products', lambda: db.upsert_products(toilet_paper_rows(products, bad))),
+        ('save_dishwashing_products', lambda: db.save_dishwashing_products(dishwashing_rows(products))),
+        ('update_product_prices', lambda: db.update_product_prices(
+            [{'asin': f"B0{i:07d}", 'price': 999, 'price_per_m': 1.665} for i in range(bad, products)]
+        )),
+    ]
+    for name, step in steps:
+        server.reset_counts()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            await step()
+            await db.price_history.flush()  # バッファにたまった価格履歴の書き込みも含める
+        elapsed = time.perf_counter() - start
+        errors = output.getvalue().count('[ERROR]')
+        results[name] = (server.total_requests, round(elapsed, 2), errors)
+    return results
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--products', type=int, default=150)
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--latency', type=float, default=0.02, help='1リクエストあたりの疑似遅延（秒）')
+    parser.add_argument('--bad-rows', type=int, default=1, help='サーバーが拒否する行の数')
+    args = parser.parse_args()
+
+    with PostgrestServer(latency=args.latency) as server:
+        os.environ['NEXT_PUBLIC_SUPABASE_URL'] = server.url
+        os.environ['NEXT_PUBLIC_SUPABASE_ANON_KEY'] = DUMMY_SUPABASE_KEY
+        os.environ.pop('SUPABASE_SERVICE_KEY', None)
+        os.environ.pop('VERCEL_API_TOKEN', None)
+
+        from app.database import Database
+        with contextlib.redirect_stdout(io.StringIO()):
+            db = Database()
+
+        print(f"{args.products} products, {args.bad_rows} rejected rows, latency {args.latency * 1000:.0f} ms/request")
+        for batch_size in (1, args.batch_size):
+            results = await run(db, server, batch_size, args.products, args.bad_rows)
+            for name, (requests, seconds, errors) in results.items():
+                print(f"batch_size={batch_size:>4} {name:>26}: {requests:>4} requests, {seconds}s, {errors} row errors")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,108 @@
+"""
+検索結果ページの取得方法のベンチマーク（page_source＋lxml vs ブラウザ内での商品カードの抽出）
+
+Python側のコストを比較する。WebDriverはexecute_scriptの戻り値・page_sourceをJSONで返すため、
+1ページあたりの転送バイト数、JSONのデコードから商品データまでのCPU時間、Pythonのメモリのピークを測る。
+ブラウザ内で抽出した場合のCardFieldsは app/dom_extraction.py のスクリプトと同じ内容
+（search_parser.parse_cards の結果）をJSONにしたものを使う。
+
+--browser を付けると、ローカルのフィクスチャサーバーに対してChromeで search_products を実行し、
+pages/minute も比較する（Chromeが必要）。
+
+使い方（python-backendディレクトリで実行）:
+    python -m benchmarks.benchmark_dom_extraction --pages 20
+    python -m benchmarks.benchmark_dom_extraction --fixtures-dir /path/to/saved_html   # *.html を使う
+    python -m benchmarks.benchmark_dom_extraction --pages 10 --browser
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+import tracemalloc
+from typing import Callable, List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# HTMLアーカイブへの保存は計測に含めない
+os.environ.setdefault('HTML_ARCHIVE_ENABLED', 'false')
+
+from benchmarks.benchmark_parser import load_pages
+from benchmarks.fixtures import FixtureServer
+from app import search_parser
+
+
+def from_page_source(payload: str) -> int:
+    """page_source: HTML全体を受け取ってlxmlで解析"""
+    page_source = json.loads(payload)['value']
+    cards = search_parser.parse_cards(page_source)
+    return len(search_parser.extract_products(cards))
+
+
+def from_cards(payload: str) -> int:
+    """ブラウザ内での抽出: CardFieldsの配列を受け取って商品データに変換"""
+    cards = json.loads(payload)['value']['cards']
+    return len(search_parser.extract_products(cards))
+
+
+def measure(name: str, convert: Callable[[str], int], payloads: List[str]) -> None:
+    size = sum(len(payload.encode('utf-8')) for payload in payloads)
+    tracemalloc.start()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        products = sum(convert(payload) for payload in payloads)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:>12}: {size / len(payloads) / 1e3:.1f} KB/page, {elapsed / len(payloads) * 1000:.2f} ms/page, "
+          f"peak {peak / 1e6:.1f} MB, {products} products")
+
+
+async def measure_browser(pages: int) -> None:
+    import app.scraper as scraper_module
+    from app.browser_pool import BrowserPool, HostRateLimiter, create_chrome_driver
+    from app.http_fetcher import HttpFetcher
+
+    with FixtureServer(assets=True) as server:
+        scraper_module.AMAZON_BASE_URL = server.url
+        for name, dom_extraction in (('page_source', False), ('in-browser', True)):
+            scraper = scraper_module.AmazonScraper(pool=BrowserPool(1, create_chrome_driver), fetch_mode='browser',
+                                                   http_fetcher=HttpFetcher())
+            scraper.rate_limiter = HostRateLimiter(rate=10000, capacity=10000)
+            scraper.dom_extraction = dom_extraction
+            try:
+                async with scraper.pool.lease():
+                    pass  # ドライバーの起動時間は含めない
+                start = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    products = await scraper.search_products("fixture", max_pages=pages)
+                elapsed = time.perf_counter() - start
+            finally:
+                await scraper.close()
+            print(f"{name:>12}: {pages / elapsed * 60:.1f} pages/min (Chrome), {len(products)} products")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pages', type=int, default=20)
+    parser.add_argument('--fixtures-dir', help='保存済みの検索結果HTML（*.html）のディレクトリ')
+    parser.add_argument('--browser', action='store_true', help='Chromeでの取得も比較する')
+    args = parser.parse_args()
+
+    pages = load_pages(args.pages, args.fixtures_dir)
+    html_payloads = [json.dumps({'value': page}) for page in pages]
+    card_payloads = [
+        json.dumps({'value': {'status': 'ok', 'cards': search_parser.parse_cards(page)}}) for page in pages
+    ]
+    print(f"{len(pages)} search pages")
+    measure('page_source', from_page_source, html_payloads)
+    measure('in-browser', from_cards, card_payloads)
+
+    if args.browser:
+        asyncio.run(measure_browser(args.pages))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+検索結果ページ取得のベンチマーク（HTTPフェッチャー vs Chrome）
+
+ローカルのフィクスチャサーバーに対して search_products を実行し、
+pages/sec と RSS を比較する。
+
+使い方（python-backendディレクトリで実行）:
+    python -m benchmarks.benchmark_fetch --pages 30
+    python -m benchmarks.benchmark_fetch --pages 30 --browser   # Chromeも計測
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fixtures import FixtureServer
+import app.scraper as scraper_module
+from app.browser_pool import BrowserPool, HostRateLimiter
+from app.http_fetcher import HttpFetcher
+
+
+def current_rss_mb() -> float:
+    """自プロセスと子プロセス（Chrome）のRSS合計（MB）"""
+    try:
+        import psutil
+        process = psutil.Process()
+        rss = process.memory_info().rss
+        for child in process.children(recursive=True):
+            try:
+                rss += child.memory_info().rss
+            except psutil.Error:
+                pass
+        return rss / 1024 / 1024
+    except ImportError:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    return 0.0
+
+
+async def run_mode(fetch_mode: str, pages: int, pool_size: int) -> dict:
+    scraper = scraper_module.AmazonScraper(
+        pool=BrowserPool(pool_size),
+        fetch_mode=fetch_mode,
+        http_fetcher=HttpFetcher()
+    )
+    # ベンチマークではレート制限と読み込み待機を外す
+    scraper.rate_limiter = HostRateLimiter(rate=10000, capacity=10000)
+    scraper.search_page_wait = 0
+
+    try:
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            products = await scraper.search_products("fixture", max_pages=pages)
+        elapsed = time.perf_counter() - start
+        rss = current_rss_mb()
+    finally:
+        await scraper.close()
+
+    return {
+        "mode": fetch_mode,
+        "pages": pages,
+        "products": len(products),
+        "seconds": round(elapsed, 2),
+        "pages_per_sec": round(pages / elapsed, 2),
+        "rss_mb": round(rss, 1),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pages', type=int, default=30)
+    parser.add_argument('--pool-size', type=int, default=2)
+    parser.add_argument('--browser', action='store_true', help='Chromeでの取得も計測する')
+    args = parser.parse_args()
+
+    with FixtureServer() as server:
+        scraper_module.AMAZON_BASE_URL = server.url
+        print(f"Fixture server: {server.url}")
+
+        modes = ['http'] + (['browser'] if args.browser else [])
+        for mode in modes:
+            result = await run_mode(mode, args.pages, args.pool_size)
+            print(
+                f"{result['mode']:>8}: {result['pages']} pages / {result['products']} products "
+                f"in {result['seconds']}s -> {result['pages_per_sec']} pages/sec, RSS {result['rss_mb']} MB"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,97 @@
+"""
+GPT抽出のベンチマーク（1件ずつ順番に vs まとめて並列 vs 抽出キャッシュあり）
+
+ローカルのOpenAI互換サーバーに対して ChatGPTParser を実行し、
+リクエスト数・プロンプトの文字数・所要時間・429（再試行）の回数を比較する。
+最後にプロセスの再起動を想定して同じSQLiteファイルから新しいキャッシュを開き、もう一度まとめて抽出する。
+
+使い方（python-backendディレクトリで実行）:
+    python -m benchmarks.benchmark_gpt_batch --products 120 --latency 0.5 --max-concurrent 4
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.openai_server import FakeOpenAIServer
+
+
+def toilet_paper_products(count: int) -> List[Dict[str, Any]]:
+    rng = random.Random(0)
+    products = []
+    for i in range(count):
+        rolls = rng.choice([4, 8, 12, 18, 24])
+        length = rng.choice([25, 27.5, 50, 75, 100])
+        ply = rng.choice(['ダブル', 'シングル'])
+        products.append({
+            'asin': f"B0{i:08d}",
+            'title': f"ブランド{i % 7} トイレットペーパー {rolls}ロール {length}m {ply} 無香料",
+            'description': '',
+        })
+    return products
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--products', type=int, default=120)
+    parser.add_argument('--latency', type=float, default=0.5, help='1リクエストあたりの疑似応答時間（秒）')
+    parser.add_argument('--max-concurrent', type=int, default=4, help='これを超える同時リクエストには429を返す')
+    parser.add_argument('--batch-size', type=int, default=20)
+    args = parser.parse_args()
+
+    with FakeOpenAIServer(latency=args.latency, max_concurrent=args.max_concurrent) as server:
+        os.environ['OPENAI_BASE_URL'] = server.url
+        os.environ['OPENAI_API_KEY'] = 'sk-benchmark'
+        os.environ['GPT_BATCH_SIZE'] = str(args.batch_size)
+        os.environ['GPT_RETRY_BASE_DELAY'] = '0.2'
+        # 正規表現による抽出は使わずにGPTの呼び出しだけを比較する
+        os.environ['RULE_EXTRACTION_MIN_CONFIDENCE'] = '2'
+
+        from app.chatgpt_parser import ChatGPTParser
+        from app.extraction_cache import ExtractionCache
+        text_parser = ChatGPTParser()
+        cache_dir = tempfile.TemporaryDirectory()
+        products = toilet_paper_products(args.products)
+
+        async def one_by_one():
+            return {product['asin']: await text_parser.extract_info(product['title'], product['description']) for product in products}
+
+        async def batched():
+            return await text_parser.extract_info_batch(products)
+
+        print(f"{args.products} products, latency {args.latency * 1000:.0f} ms/request, "
+              f"429 above {args.max_concurrent} concurrent requests, batch size {args.batch_size}")
+        results = {}
+        runs = (
+            ('one by one', one_by_one, 'one_by_one.sqlite3'),
+            ('batched', batched, 'batched.sqlite3'),
+            ('rerun', batched, 'batched.sqlite3'),  # batchedと同じファイル（2回目の実行）
+        )
+        for name, run, cache_file in runs:
+            text_parser.cache = ExtractionCache(os.path.join(cache_dir.name, cache_file))
+            server.reset_counts()
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                results[name] = await run()
+            elapsed = time.perf_counter() - start
+            print(f"{name:>10}: {server.requests:>4} requests, {text_parser.cache.hits:>4} cache hits, {server.prompt_chars:>7} prompt chars, "
+                  f"{elapsed:.2f}s, {server.rate_limited} rate-limited (retried)")
+
+        same = sum(1 for asin, info in results['batched'].items() if results['one by one'].get(asin) == info)
+        print(f"batched results identical to one-by-one for {same}/{len(products)} products")
+        same = sum(1 for asin, info in results['rerun'].items() if results['batched'].get(asin) == info)
+        print(f"rerun results identical to batched for {same}/{len(products)} products")
+        await text_parser.close()
+        cache_dir.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
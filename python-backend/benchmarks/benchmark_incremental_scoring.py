@@ -0,0 +1,119 @@
+"""
+1商品の更新時の総合スコアの計算（全件の再計算 vs 単価の索引による増分計算）
+
+架空の商品群の1商品ずつの単価の変化（±20%）について、次の2つを比べる。
+- 全件の再計算: 全行を読み込み、calculate_all_scores で計算し、全行を書き直す
+- 増分計算: Database.score_incrementally（最小/最大単価が変わった場合だけ全件を再計算し、スコアが変わった行を書き直す）
+PostgREST代替サーバーに保存したテーブルに対して実行し、1回あたりの時間・読み書きした行数・全件の再計算になった割合を測る。
+増分計算のスコアが全件の再計算と一致することも確認する。
+
+使い方（python-backendディレクトリで実行）:
+    python -m benchmarks.benchmark_incremental_scoring --products 1000 10000 --updates 50
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+from typing import Dict, List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.postgrest_server import DUMMY_SUPABASE_KEY, PostgrestServer
+
+TABLE = 'toilet_paper_products'
+
+
+def make_products(count: int, rng: random.Random) -> List[Dict]:
+    products = []
+    for index in range(count):
+        products.append({
+            'asin': f"B0INC{index:06d}",
+            'title': f"トイレットペーパー {index}",
+            'price': rng.randint(300, 3000),
+            'price_per_m': round(rng.uniform(0.5, 8.0), 3),
+            'review_avg': round(rng.uniform(2.5, 5.0), 1),
+            'review_count': rng.randint(0, 20000),
+        })
+    return products
+
+
+async def full_rescore(db, row: Dict) -> None:
+    """以前の方法: 全行を読み込んで再計算し、全行を書き直す"""
+    from app.utils.score_calculator import calculate_all_scores
+    rows = {current['asin']: current for current in await db._select_all(TABLE)}
+    rows[row['asin']] = {**rows.get(row['asin'], {}), **row}
+    calculate_all_scores(list(rows.values()), 'price_per_m')
+    await db.bulk_upsert(TABLE, list(rows.values()))
+
+
+async def run(db, server: PostgrestServer, products: List[Dict], updates: int, incremental: bool, seed: int) -> Dict:
+    from app.utils.score_calculator import calculate_all_scores
+    rng = random.Random(seed)
+    server.tables[TABLE] = {product['asin']: dict(product) for product in calculate_all_scores(
+        [dict(product) for product in products], 'price_per_m'
+    )}
+    db.score_indexes.clear()
+    db.score_stats.update(incremental=0, full=0)
+    if incremental:
+        await db._score_index(TABLE)  # 索引の読み込みはプロセスで1回なので測らない
+    server.reset_counts()
+
+    elapsed = 0.0
+    for _ in range(updates):
+        asin = rng.choice(products)['asin']
+        row = dict(server.tables[TABLE][asin])
+        row['price_per_m'] = round(row['price_per_m'] * rng.uniform(0.8, 1.2), 3)
+        start = time.perf_counter()
+        if incremental:
+            await db.score_incrementally(TABLE, [row])
+            await db.bulk_upsert(TABLE, [row])
+        else:
+            await full_rescore(db, row)
+        elapsed += time.perf_counter() - start
+
+    # 増分計算の結果が全件の再計算と一致するか確認
+    rows = [dict(row) for row in server.tables[TABLE].values()]
+    stored = {row['asin']: row['total_score'] for row in rows}
+    expected = {row['asin']: row['total_score'] for row in calculate_all_scores(rows, 'price_per_m')}
+    return {
+        'per_update_ms': elapsed / updates * 1000,
+        'requests': server.total_requests,
+        'full': db.score_stats['full'] if incremental else updates,
+        'consistent': stored == expected,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--products', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--updates', type=int, default=50)
+    args = parser.parse_args()
+
+    with PostgrestServer() as server:
+        os.environ.update({
+            'NEXT_PUBLIC_SUPABASE_URL': server.url,
+            'NEXT_PUBLIC_SUPABASE_ANON_KEY': DUMMY_SUPABASE_KEY,
+        })
+        os.environ.pop('SUPABASE_SERVICE_KEY', None)
+        with contextlib.redirect_stdout(io.StringIO()):
+            from app.database import Database
+            db = Database()
+
+        print(f"{args.updates} single-product price updates (±20%)")
+        for count in args.products:
+            products = make_products(count, random.Random(count))
+            for label, incremental in (('full rescore', False), ('incremental', True)):
+                with contextlib.redirect_stdout(io.StringIO()):
+                    result = await run(db, server, products, args.updates, incremental, seed=count)
+                print(f"{count:>7} products {label:>13}: {result['per_update_ms']:8.1f} ms/update, "
+                      f"{result['requests']} requests, {result['full']} full rescores, "
+                      f"scores consistent: {result['consistent']}")
+        await db.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,147 @@
+"""
+一覧エンドポイントのペイロードのベンチマーク（全列 vs 一覧用の列）
+
+PostgREST代替サーバーに、説明文（#aplus の内容を連結した数KBのテキスト）付きの商品をカテゴリごとに保存し、
+読み取りキャッシュが空の状態（書き込み直後）の一覧1回について、
+Supabaseから読んだバイト数・フロントエンドへ返すJSONのバイト数・読み込みからシリアライズまでの時間を
+select('*')（以前）と一覧用の列（app/listing.py）で比べる。
+
+使い方（python-backendディレクトリで実行）:
+    python -m benchmarks.benchmark_listing_payload --products 300 --description-kb 4
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+from typing import Dict, List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.postgrest_server import DUMMY_SUPABASE_KEY, PostgrestServer
+
+# テーブル -> カテゴリ固有の列
+CATEGORY_FIELDS = {
+    'toilet_paper_products': lambda rng: {
+        'roll_count': rng.choice([4, 12, 18]), 'length_m': 50.0, 'total_length_m': 600.0,
+        'price_per_roll': 45.5, 'price_per_m': round(rng.uniform(0.5, 3), 3), 'is_double': rng.random() < 0.5,
+        'total_score': 3.5, 'last_price_per_m': 1.2, 'needs_verification': False,
+    },
+    'dishwashing_liquid_products': lambda rng: {
+        'volume_ml': 1000, 'price_per_1000ml': round(rng.uniform(200, 900), 2), 'is_refill': rng.random() < 0.5,
+        'total_score': 3.5,
+    },
+    'mask_products': lambda rng: {
+        'mask_count': 50, 'mask_size': 'regular', 'mask_color': 'white', 'price_per_mask': round(rng.uniform(5, 40), 2),
+    },
+    'mineral_water_products': lambda rng: {
+        'volume_ml': 500, 'bottle_count': 24, 'total_volume_ml': 12000,
+        'price_per_liter': round(rng.uniform(50, 200), 2), 'total_score': 3.5,
+    },
+    'rice_products': lambda rng: {
+        'weight_kg': 5, 'price_per_kg': round(rng.uniform(400, 1200), 2), 'rice_type': 'コシヒカリ',
+        'is_musenmai': False, 'out_of_stock': False,
+    },
+}
+
+
+def make_rows(table: str, count: int, description_kb: int, rng: random.Random) -> List[Dict]:
+    rows = []
+    for index in range(count):
+        row = {
+            'id': index + 1,
+            'asin': f"B0LIST{index:05d}",
+            'title': f"{table} 商品 {index} まとめ買い お徳用パック",
+            'description': ("この商品について: 高品質・大容量。#aplus メーカーによる説明 " * 200)[:description_kb * 1024 // 3],
+            'brand': rng.choice(['ブランドA', 'ブランドB', None]),
+            'image_url': f"https://m.media-amazon.com/images/I/{index:08d}.jpg",
+            'price': rng.randint(300, 3000),
+            'price_regular': None,
+            'discount_percent': 0,
+            'on_sale': rng.random() < 0.2,
+            'review_avg': round(rng.uniform(3, 5), 1),
+            'review_count': rng.randint(0, 5000),
+            'last_fetched_at': '2024-01-01T00:00:00+00:00',
+            'created_at': '2024-01-01T00:00:00+00:00',
+            'updated_at': '2024-01-01T00:00:00+00:00',
+        }
+        row.update(CATEGORY_FIELDS[table](rng))
+        rows.append(row)
+    return rows
+
+
+def loaders(db, listing: bool):
+    """テーブル -> 一覧エンドポイントの読み込み（read_cache のloaderと同じ）"""
+    from app.endpoints.rice import load_in_stock_rice
+    from app.main import Product
+
+    async def toilet_paper():
+        products = await db.get_all_cached_products(None, listing=listing)
+        exclude = {'description'} if listing else None
+        return [Product(**product).model_dump(exclude=exclude) for product in products]
+
+    async def rice():
+        if listing:
+            return await load_in_stock_rice(db)
+        return (await db.rest.table('rice_products').select('*').eq('out_of_stock', False).execute()).data
+
+    async def mask():
+        if listing:
+            db.facet_indexes.clear()  # 書き込み直後（索引の読み直し）に相当
+            return (await db.get_facet_index('mask_products')).query(None)
+        return await db.get_mask_products()
+
+    return {
+        'toilet_paper_products': toilet_paper,
+        'dishwashing_liquid_products': lambda: db.get_all_dishwashing_products(None, listing=listing),
+        'mask_products': mask,
+        'mineral_water_products': lambda: db.get_mineral_water_products(listing=listing),
+        'rice_products': rice,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--products', type=int, default=300, help='カテゴリごとの商品数')
+    parser.add_argument('--description-kb', type=int, default=4, help='説明文の大きさ（KB）')
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--latency', type=float, default=0.01, help='PostgRESTの1リクエストあたりの疑似遅延（秒）')
+    args = parser.parse_args()
+
+    with PostgrestServer(latency=args.latency) as server:
+        os.environ.update({
+            'NEXT_PUBLIC_SUPABASE_URL': server.url,
+            'NEXT_PUBLIC_SUPABASE_ANON_KEY': DUMMY_SUPABASE_KEY,
+        })
+        os.environ.pop('SUPABASE_SERVICE_KEY', None)
+        with contextlib.redirect_stdout(io.StringIO()):
+            from app.database import Database
+            from app.read_cache import dump_json
+            db = Database()
+
+        rng = random.Random(0)
+        for table in CATEGORY_FIELDS:
+            server.tables[table] = {row['asin']: row for row in make_rows(table, args.products, args.description_kb, rng)}
+        print(f"{args.products} products per category, ~{args.description_kb} KB descriptions, "
+              f"PostgREST latency {args.latency * 1000:.0f} ms, uncached listing request")
+
+        for table in CATEGORY_FIELDS:
+            for label, listing in (("select('*')", False), ('listing columns', True)):
+                load = loaders(db, listing)[table]
+                server.reset_counts()
+                start = time.perf_counter()
+                for _ in range(args.repeat):
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        body = dump_json(await load())
+                elapsed = (time.perf_counter() - start) / args.repeat
+                read_bytes = sum(server.bytes_sent.values()) // args.repeat
+                print(f"{table:>28} {label:>16}: {read_bytes / 1024:8.1f} KB from Supabase, "
+                      f"{len(body) / 1024:8.1f} KB response, {elapsed * 1000:6.1f} ms")
+        await db.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,146 @@
+"""
+マスク一覧の絞り込みのベンチマーク（毎回全件を読み込んで走査 vs ファセット索引）
+
+PostgREST代替サーバーにマスク商品を保存し、読み取りキャッシュを通さない（書き込み直後の）
+絞り込み1回と /api/mask/filters の件数の集計1回の時間を比べる。
+- 以前の方法: get_mask_products で全件を読み込み、if/elif の連鎖で絞り込む・件数を数える
+- ファセット索引: Database.get_facet_index（読み込みはプロセスで1回。書き込みのたびに更新）の積集合と集合の大きさ
+単一のファセットでは以前の方法と結果が一致することも確認する。
+
+使い方（python-backendディレクトリで実行）:
+    python -m benchmarks.benchmark_mask_facets --products 1000 10000 --queries 50
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+from typing import Dict, List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.postgrest_server import DUMMY_SUPABASE_KEY, PostgrestServer
+
+TABLE = 'mask_products'
+SIZES = ['large', 'slightly_large', 'regular', 'slightly_small', 'small', 'kids', None]
+COLORS = ['white', 'black', 'gray', 'pink', 'blue', 'beige', 'purple', 'green', 'yellow', 'multicolor']
+SINGLE_FILTERS = ['sale', 'large_pack', 'size_regular', 'size_unknown', 'color_black']
+COMBINED_FILTERS = ['size_regular,color_black,sale', 'large_pack,color_white', 'size_kids,color_pink']
+
+
+def make_products(count: int, rng: random.Random) -> List[Dict]:
+    products = []
+    for index in range(count):
+        mask_count = rng.choice([7, 30, 50, 60, 100])
+        price = rng.randint(300, 3000)
+        products.append({
+            'asin': f"B0MASK{index:06d}",
+            'title': f"不織布マスク {mask_count}枚 {index}",
+            'price': price if rng.random() > 0.05 else None,
+            'on_sale': rng.random() < 0.2,
+            'mask_count': mask_count,
+            'mask_size': rng.choice(SIZES),
+            'mask_color': rng.choice(COLORS),
+            'price_per_mask': round(price / mask_count, 2),
+        })
+    return products
+
+
+def legacy_filter(products: List[Dict], filter: str) -> List[Dict]:
+    """以前の apply_filter（単一のファセットのみ）"""
+    if filter == 'large_pack':
+        return [p for p in products if p.get('mask_count', 0) >= 50]
+    elif filter == 'small_pack':
+        return [p for p in products if p.get('mask_count', 0) < 50]
+    elif filter == 'sale':
+        return [p for p in products if p.get('on_sale')]
+    elif filter == 'size_unknown':
+        return [p for p in products if not p.get('mask_size')]
+    elif filter.startswith('size_'):
+        return [p for p in products if p.get('mask_size') == filter[5:]]
+    elif filter.startswith('color_'):
+        return [p for p in products if p.get('mask_color') == filter[6:]]
+    return products
+
+
+async def legacy_query(db, filter: str) -> List[Dict]:
+    products = await db.get_mask_products()
+    for name in filter.split(','):
+        products = legacy_filter(products, name)
+    products.sort(key=lambda p: p.get('price_per_mask') or float('inf'))
+    return products
+
+
+async def legacy_counts(db) -> Dict:
+    colors, sizes = {}, {}
+    for product in await db.get_mask_products():
+        if product.get('mask_color'):
+            colors[product['mask_color']] = colors.get(product['mask_color'], 0) + 1
+        if product.get('mask_size'):
+            sizes[product['mask_size']] = sizes.get(product['mask_size'], 0) + 1
+    return {'colors': colors, 'sizes': sizes}
+
+
+async def timed(call, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        await call()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--products', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--queries', type=int, default=50, help='絞り込みごとの繰り返し回数')
+    args = parser.parse_args()
+
+    with PostgrestServer() as server:
+        os.environ.update({
+            'NEXT_PUBLIC_SUPABASE_URL': server.url,
+            'NEXT_PUBLIC_SUPABASE_ANON_KEY': DUMMY_SUPABASE_KEY,
+        })
+        os.environ.pop('SUPABASE_SERVICE_KEY', None)
+        with contextlib.redirect_stdout(io.StringIO()):
+            from app.database import Database
+            db = Database()
+
+        for count in args.products:
+            products = make_products(count, random.Random(count))
+            server.tables[TABLE] = {row['asin']: dict(row) for row in products}
+            db.facet_indexes.clear()
+            # get_mask_productsは1リクエストで全件を読むので、上限のない代替サーバーでは全件が返る
+            with contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                index = await db.get_facet_index(TABLE)
+                load_ms = (time.perf_counter() - start) * 1000
+            print(f"{count} mask products (facet index loaded once in {load_ms:.0f} ms, {len(index)} in stock)")
+
+            consistent = True
+            for filter in SINGLE_FILTERS + COMBINED_FILTERS:
+                expected = [row['asin'] for row in await legacy_query(db, filter)]
+                actual = [row['asin'] for row in index.query(filter)]
+                if filter in SINGLE_FILTERS:
+                    consistent &= sorted(expected) == sorted(actual)
+                legacy_ms = await timed(lambda: legacy_query(db, filter), args.queries)
+                facet_ms = await timed(lambda: asyncio.sleep(0, index.query(filter)), args.queries)
+                print(f"  {filter:>30}: {len(actual):>5} rows, full scan {legacy_ms:7.2f} ms, facet index {facet_ms:6.3f} ms")
+
+            legacy_ms = await timed(lambda: legacy_counts(db), args.queries)
+            facet_ms = await timed(lambda: asyncio.sleep(0, (index.counts('color_'), index.counts('size_'))), args.queries)
+            print(f"  {'/api/mask/filters counts':>30}: full scan {legacy_ms:7.2f} ms, facet index {facet_ms:6.3f} ms")
+
+            # 書き込み後も索引が再読み込みなしで正しいか確認
+            changed = [dict(row, on_sale=not row['on_sale'], mask_color='black') for row in products[:count // 10]]
+            with contextlib.redirect_stdout(io.StringIO()):
+                await db.save_mask_products(changed)
+            after = sorted(row['asin'] for row in await legacy_query(db, 'color_black,sale'))
+            consistent &= after == sorted(row['asin'] for row in index.query('color_black,sale'))
+            print(f"  single-facet results match full scan (and after {len(changed)} writes): {consistent}")
+        await db.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
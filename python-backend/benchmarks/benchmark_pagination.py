@@ -0,0 +1,153 @@
+"""
+一覧のページングのベンチマーク（テーブル全体 vs カーソルで1ページ）
+
+PostgREST代替サーバーに商品を保存し、読み取りキャッシュが空の状態（書き込み直後）の一覧1回について、
+Supabaseから読んだ行数・フロントエンドへ返すJSONのバイト数・時間を、
+テーブル全体（以前）とカーソルのページ（app/pagination.py）で比べる。商品数を増やしてもページは一定であることを確認する。
+- トイレットペーパー・食器用洗剤: DB側で並び替え・カーソル以降の条件・件数を指定する
+- マスク: メモリ上のファセット索引の並べ替え済みのリストを二分探索する（索引の読み込みは時間に含めない）
+あわせて、カーソルで最後のページまでたどると全商品が1回ずつ、全件を並べ替えた順に並ぶことを確認する
+（単価がnullの商品や値が同じ商品を含む）。
+
+使い方（python-backendディレクトリで実行）:
+    python -m benchmarks.benchmark_pagination --products 1000 10000 --limit 50
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+from typing import Dict, List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.postgrest_server import DUMMY_SUPABASE_KEY, PostgrestServer
+
+# テーブル -> (単価の列, カテゴリ固有の列)
+CATEGORY_FIELDS = {
+    'toilet_paper_products': ('price_per_m', lambda rng: {
+        'roll_count': 12, 'length_m': 50.0, 'total_length_m': 600.0, 'is_double': rng.random() < 0.5,
+    }),
+    'dishwashing_liquid_products': ('price_per_1000ml', lambda rng: {
+        'volume_ml': 1000, 'is_refill': rng.random() < 0.5,
+    }),
+    'mask_products': ('price_per_mask', lambda rng: {
+        'mask_count': rng.choice([30, 50, 60]), 'mask_size': 'regular', 'mask_color': rng.choice(['white', 'black']),
+    }),
+}
+
+
+def make_rows(table: str, count: int, rng: random.Random) -> List[Dict]:
+    unit_field, fields = CATEGORY_FIELDS[table]
+    rows = []
+    for index in range(count):
+        price = rng.randint(300, 3000)
+        rows.append({
+            'asin': f"B0{table[:4].upper()}{index:06d}",
+            'title': f"商品 {index}",
+            'brand': rng.choice(['A', 'B', 'C']),
+            'image_url': f"https://m.media-amazon.com/images/I/{index:08d}.jpg",
+            'price': price if rng.random() > 0.03 else None,
+            'price_regular': price,
+            # 割引率・単価は値が同じ商品が多い（キーセットの並びがasinで決まることを確かめる）
+            'discount_percent': rng.choice([0, 0, 0, 5, 10, 20]),
+            'on_sale': rng.random() < 0.2,
+            'review_avg': round(rng.uniform(3.0, 5.0), 1),
+            'review_count': rng.randint(0, 5000),
+            unit_field: round(rng.uniform(1, 10), 1) if rng.random() > 0.05 else None,
+            'total_score': round(rng.uniform(1, 5), 2),
+            'description': 'x' * 200,
+            **fields(rng),
+        })
+    return rows
+
+
+def loader(db, table: str, page):
+    """一覧エンドポイントの読み込み（pageがNoneならテーブル全体）"""
+    if table == 'toilet_paper_products':
+        return lambda: db.get_all_cached_products(None, listing=True, page=page)
+    if table == 'dishwashing_liquid_products':
+        return lambda: db.get_all_dishwashing_products(None, listing=True, page=page)
+
+    async def mask():
+        if not page:
+            # 以前の /api/mask/search（全件を読み込んで単価順に並べる）
+            rows = await db.get_mask_products(listing=True)
+            return sorted(rows, key=lambda row: row.get('price_per_mask') or float('inf'))
+        # 索引はプロセスで1回読み込み、書き込みのたびに更新されるのでページごとにはDBを読まない
+        return (await db.get_facet_index('mask_products')).page(None, page)
+    return mask
+
+
+async def walk(db, table: str, sort: str, limit: int) -> List[str]:
+    """カーソルで最後のページまでたどったASINの並び"""
+    from app.pagination import next_cursor, requested_page
+    asins, cursor = [], None
+    while True:
+        page = requested_page(table, sort, cursor, limit)
+        rows = await loader(db, table, page)()
+        asins += [row['asin'] for row in rows]
+        cursor = next_cursor(page, rows)
+        if cursor is None:
+            return asins
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--products', type=int, nargs='+', default=[1000, 10000], help='カテゴリごとの商品数')
+    parser.add_argument('--limit', type=int, default=50, help='1ページの件数')
+    parser.add_argument('--walk-limit', type=int, default=200, help='全ページをたどるときの1ページの件数')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--latency', type=float, default=0.01, help='PostgRESTの1リクエストあたりの疑似遅延（秒）')
+    args = parser.parse_args()
+
+    with PostgrestServer(latency=args.latency) as server:
+        os.environ.update({
+            'NEXT_PUBLIC_SUPABASE_URL': server.url,
+            'NEXT_PUBLIC_SUPABASE_ANON_KEY': DUMMY_SUPABASE_KEY,
+        })
+        os.environ.pop('SUPABASE_SERVICE_KEY', None)
+        with contextlib.redirect_stdout(io.StringIO()):
+            from app.database import Database
+            from app.pagination import requested_page, row_key
+            from app.read_cache import dump_json
+            db = Database()
+
+        print(f"PostgREST latency {args.latency * 1000:.0f} ms, uncached listing request, page size {args.limit}")
+        for count in args.products:
+            rng = random.Random(count)
+            for table in CATEGORY_FIELDS:
+                server.tables[table] = {row['asin']: row for row in make_rows(table, count, rng)}
+            db.facet_indexes.clear()
+            await db.get_facet_index('mask_products')
+            for table in CATEGORY_FIELDS:
+                for label, page in (('full table', None), ('first page', requested_page(table, 'unit_price', None, args.limit))):
+                    server.reset_counts()
+                    start = time.perf_counter()
+                    for _ in range(args.repeat):
+                        with contextlib.redirect_stdout(io.StringIO()):
+                            body = dump_json(await loader(db, table, page)())
+                    elapsed = (time.perf_counter() - start) / args.repeat
+                    rows_read = sum(server.rows_read.values()) // args.repeat
+                    print(f"{count:>6} {table:>28} {label:>11}: {rows_read:6} rows read, "
+                          f"{len(body) / 1024:8.1f} KB response, {elapsed * 1000:7.1f} ms")
+
+        # 最後に保存した商品でカーソルを最後までたどる
+        for table in CATEGORY_FIELDS:
+            in_stock = [row for row in server.tables[table].values() if row['price'] is not None]
+            for sort in ('unit_price', 'discount', 'review_count'):
+                page = requested_page(table, sort, None, args.walk_limit)
+                expected = [row['asin'] for row in sorted(in_stock, key=lambda row: row_key(page, row))]
+                with contextlib.redirect_stdout(io.StringIO()):
+                    asins = await walk(db, table, sort, args.walk_limit)
+                assert asins == expected, f"{table} sort={sort}: cursor walk differs from full sort"
+            print(f"{table}: cursor walk matches full sort for unit_price/discount/review_count "
+                  f"({len(in_stock)} products, each exactly once)")
+        await db.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,92 @@
+"""
+検索結果パーサーのベンチマーク（lxml共通パーサー vs BeautifulSoup html.parser）
+
+フィクスチャ（または保存済みの検索結果HTML）をパースし、pages/sec と1カードあたりの時間を比較する。
+BeautifulSoup側は共通化前の各スクレイパーと同じセレクタで1カードずつ select_one する。
+
+使い方（python-backendディレクトリで実行）:
+    python -m benchmarks.benchmark_parser --pages 20
+    python -m benchmarks.benchmark_parser --fixtures-dir /path/to/saved_html   # *.html を使う
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+
+from benchmarks.fixtures import build_search_fixtures
+from app import search_parser
+
+_BS_CARD_SELECTORS = [
+    'h2 span', '.a-price .a-offscreen', '.a-price-whole', '.a-text-price .a-offscreen', '.a-text-price',
+    '.s-image', '.a-icon-alt', 'span[aria-label*="件の評価"]', '.s-link-style .s-underline-text',
+    '[data-cy="reviews-ratings-slot"] span.a-size-base', '[aria-label*="つ星のうち"]',
+]
+
+
+def bs_reference_parse(page_source: str) -> int:
+    """共通化前と同じBeautifulSoup(html.parser)での解析"""
+    soup = BeautifulSoup(page_source, 'html.parser')
+    cards = soup.select('[data-component-type="s-search-result"]')
+    for card in cards:
+        for selector in _BS_CARD_SELECTORS:
+            card.select_one(selector)
+        card.select('.a-color-secondary, .s-result-item-text, .a-size-base')
+        card.select('.a-size-base, .a-size-base-plus, .a-size-mini, .s-feature-text, .a-color-secondary')
+    return len(cards)
+
+
+def lxml_parse(page_source: str) -> int:
+    """共通パーサー（lxml + 1回走査）での解析"""
+    cards = search_parser.parse_cards(page_source, fallback_to_data_asin=False)
+    search_parser.extract_products(cards)
+    return len(cards)
+
+
+def load_pages(pages: int, fixtures_dir: str = None) -> List[str]:
+    if fixtures_dir:
+        return [path.read_text(encoding='utf-8') for path in sorted(Path(fixtures_dir).glob('*.html'))]
+    return build_search_fixtures(pages)
+
+
+def measure(name: str, parse: Callable[[str], int], pages: List[str]) -> dict:
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        cards = sum(parse(page) for page in pages)
+    elapsed = time.perf_counter() - start
+    return {
+        "name": name,
+        "pages": len(pages),
+        "cards": cards,
+        "seconds": round(elapsed, 3),
+        "pages_per_sec": round(len(pages) / elapsed, 2),
+        "ms_per_card": round(elapsed * 1000 / cards, 3) if cards else 0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pages', type=int, default=20)
+    parser.add_argument('--fixtures-dir', help='保存済みの検索結果HTML（*.html）のディレクトリ')
+    args = parser.parse_args()
+
+    pages = load_pages(args.pages, args.fixtures_dir)
+    print(f"Pages: {len(pages)} ({sum(len(p) for p in pages) / len(pages) / 1024:.0f} KB/page)")
+
+    for name, parse in [('bs4', bs_reference_parse), ('lxml', lxml_parse)]:
+        result = measure(name, parse, pages)
+        print(
+            f"{result['name']:>5}: {result['cards']} cards in {result['seconds']}s -> "
+            f"{result['pages_per_sec']} pages/sec, {result['ms_per_card']} ms/card"
+        )
+
+
+if __name__ == "__main__":
+    main()
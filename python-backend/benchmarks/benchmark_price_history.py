@@ -0,0 +1,140 @@
+"""
+価格履歴のベンチマーク（1行ずつinsert vs まとめて書き出し、生の履歴からのグラフ vs 日次集計からのグラフ）
+
+1. 書き込み: 商品ごとに価格履歴を1行ずつ保存する場合（以前の save_price_history）と、
+   PriceHistoryWriter でためてまとめて書き出す場合（日次・週次の集計の更新を含む）のリクエスト数と時間を比べる。
+2. 読み込み: 1商品の生の履歴（1日あたり --samples 件）の日数を変えて、
+   生の履歴を全件読んで日ごとに集計する場合と /api/price-history/{asin} （集計の行だけを読む）の
+   読んだ行数と時間を比べ、両者の系列が一致することを確認する。
+PostgREST代替サーバーに対して実行する。
+
+使い方（python-backendディレクトリで実行）:
+    python -m benchmarks.benchmark_price_history --products 200 --days 30 365 --samples 24
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.postgrest_server import DUMMY_SUPABASE_KEY, PostgrestServer
+
+ASIN = 'B0HIST00001'
+
+
+def history_rows(asins: List[str], start: datetime, days: int, samples: int, rng: random.Random) -> List[Dict]:
+    rows = []
+    for asin in asins:
+        price = rng.randint(400, 2000)
+        for step in range(days * samples):
+            price = max(100, int(price * rng.uniform(0.97, 1.03)))
+            rows.append({
+                'asin': asin,
+                'price': price,
+                'price_per_m': round(price / 300, 2),
+                'on_sale': rng.random() < 0.2,
+                'recorded_at': (start + timedelta(days=step / samples)).isoformat(),
+            })
+    return rows
+
+
+async def legacy_series(db, asin: str) -> List[Dict]:
+    """以前の方法: 生の履歴を全件読み、日ごとに集計する"""
+    from app.price_history import rollup_rows, series_point
+    rows, offset = [], 0
+    while True:
+        response = await db.rest.table('price_history').select('*').eq('asin', asin) \
+            .order('recorded_at').limit(1000).offset(offset).execute()
+        rows += response.data
+        if len(response.data) < 1000:
+            break
+        offset += 1000
+    rollups = [rollup for key, rollup in sorted(rollup_rows(rows).items()) if key[1] == 'day']
+    return [series_point(rollup) for rollup in rollups]
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--products', type=int, default=200, help='書き込みの比較で1回に価格を記録する商品数')
+    parser.add_argument('--days', type=int, nargs='+', default=[30, 365])
+    parser.add_argument('--samples', type=int, default=24, help='1日あたりの価格の記録回数')
+    parser.add_argument('--latency', type=float, default=0.005, help='PostgRESTの1リクエストあたりの疑似遅延（秒）')
+    args = parser.parse_args()
+
+    with PostgrestServer(latency=args.latency) as server:
+        os.environ.update({
+            'NEXT_PUBLIC_SUPABASE_URL': server.url,
+            'NEXT_PUBLIC_SUPABASE_ANON_KEY': DUMMY_SUPABASE_KEY,
+        })
+        os.environ.pop('SUPABASE_SERVICE_KEY', None)
+        with contextlib.redirect_stdout(io.StringIO()):
+            from app.database import Database
+            from app.endpoints.price_history import get_price_history_series
+            from app.price_history import PriceHistoryWriter
+            db = Database()
+
+        # 1. 書き込み
+        now = datetime.now(timezone.utc)
+        rows = history_rows([f"B0HIST{index:05d}" for index in range(args.products)], now, 1, 1, random.Random(0))
+        print(f"Recording {len(rows)} price history rows, PostgREST latency {args.latency * 1000:.0f} ms")
+
+        server.reset_counts()
+        start = time.perf_counter()
+        for row in rows:
+            await db.rest.table('price_history').insert(dict(row)).execute()
+        elapsed = time.perf_counter() - start
+        print(f"{'one insert per row':>20}: {server.total_requests} requests, {elapsed * 1000:.0f} ms")
+
+        server.tables.clear()
+        server.reset_counts()
+        writer = PriceHistoryWriter(db, flush_size=500, flush_seconds=300)
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for row in rows:
+                await writer.add([dict(row)])
+            await writer.flush()
+        elapsed = time.perf_counter() - start
+        print(f"{'buffered + rollups':>20}: {server.total_requests} requests "
+              f"({writer.stats['rows_written']} rows, {writer.stats['rollups_written']} rollups written), "
+              f"{elapsed * 1000:.0f} ms")
+
+        # 2. 読み込み
+        print(f"\nDaily chart for one product ({args.samples} samples/day)")
+        for days in args.days:
+            server.tables.clear()
+            start_day = (now - timedelta(days=days)).replace(hour=0, minute=0, second=0, microsecond=0)
+            with contextlib.redirect_stdout(io.StringIO()):
+                writer = PriceHistoryWriter(db, flush_size=1000, flush_seconds=300)
+                # 1日分ずつ追加する（集計は書き出しのたびに保存済みの値に加算される）
+                history = history_rows([ASIN], start_day, days, args.samples, random.Random(days))
+                for offset in range(0, len(history), args.samples):
+                    await writer.add(history[offset:offset + args.samples])
+                await writer.flush()
+
+            server.reset_counts()
+            start = time.perf_counter()
+            legacy = await legacy_series(db, ASIN)
+            legacy_elapsed = time.perf_counter() - start
+            legacy_rows = sum(server.rows_read.values())
+
+            server.reset_counts()
+            start = time.perf_counter()
+            response = await get_price_history_series(ASIN, period='day', limit=366)
+            elapsed = time.perf_counter() - start
+            rollup_rows_read = sum(server.rows_read.values())
+
+            print(f"{days:>5} days raw history : {legacy_rows:>6} rows read, {legacy_elapsed * 1000:7.1f} ms")
+            print(f"{days:>5} days rollups     : {rollup_rows_read:>6} rows read, {elapsed * 1000:7.1f} ms, "
+                  f"series match: {response['series'] == legacy[-366:]}")
+        await db.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
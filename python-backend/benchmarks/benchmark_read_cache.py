@@ -0,0 +1,119 @@
+"""
+一覧エンドポイントの読み取りキャッシュのベンチマーク
+
+ローカルのPostgREST代替サーバーに商品を入れ、一覧の読み取りを繰り返して
+毎回Supabaseに問い合わせてシリアライズする場合と Database.read_cache を使う場合を比べる。
+途中で保存（書き込み）を挟み、書き込み時の破棄後に再読み込みされることも確認する。
+
+使い方（python-backendディレクトリで実行）:
+    python -m benchmarks.benchmark_read_cache --requests 1000 --products 300
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+from typing import Any, Dict, List, Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.postgrest_server import DUMMY_SUPABASE_KEY, PostgrestServer
+
+
+def product_rows(prefix: str, count: int, unit_key: str) -> List[Dict[str, Any]]:
+    rng = random.Random(prefix)
+    return [
+        {
+            'asin': f"{prefix}{i:08d}",
+            'title': f"商品 {prefix} {i} " + "説明" * 20,
+            'price': rng.randint(300, 3000),
+            unit_key: round(rng.uniform(0.5, 5), 3),
+            'on_sale': rng.random() < 0.2,
+            'review_avg': round(rng.uniform(3, 5), 1),
+        }
+        for i in range(count)
+    ]
+
+
+def percentile(samples: List[float], p: float) -> float:
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(round(p * (len(ordered) - 1))))] * 1000, 3)
+
+
+async def run(db, requests: int, write_every: int, use_cache: bool) -> Tuple[List[float], Dict[str, Any]]:
+    from app.read_cache import dump_json
+
+    reads = [
+        ('dishwashing_liquid_products', None, 'price_per_1000ml', lambda: db.get_all_dishwashing_products(None)),
+        ('dishwashing_liquid_products', 'sale', 'price_per_1000ml', lambda: db.get_all_dishwashing_products('sale')),
+        ('mask_products', None, 'price_per_mask', db.get_mask_products),
+        ('mineral_water_products', None, None, db.get_mineral_water_products),
+    ]
+    rng = random.Random(0)
+    latencies = []
+    for i in range(requests):
+        if write_every and i and i % write_every == 0:
+            # スクレイピング後の保存に相当（該当テーブルのキャッシュが破棄される）
+            with contextlib.redirect_stdout(io.StringIO()):
+                await db.save_mask_products(product_rows('M', 10, 'price_per_mask'))
+        table, filter, sort, loader = rng.choice(reads)
+        start = time.perf_counter()
+        if use_cache:
+            entry = await db.read_cache.get(table, filter, sort, loader)
+            body = entry.body
+        else:
+            body = dump_json(await loader())
+        latencies.append(time.perf_counter() - start)
+        assert body
+    return latencies, db.read_cache.stats()
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--products', type=int, default=300, help='テーブルごとの商品数')
+    parser.add_argument('--write-every', type=int, default=500, help='何リクエストごとに保存を挟むか（0で保存なし）')
+    parser.add_argument('--latency', type=float, default=0.02, help='1リクエストあたりの疑似遅延（秒）')
+    args = parser.parse_args()
+
+    with PostgrestServer(latency=args.latency) as server:
+        os.environ['NEXT_PUBLIC_SUPABASE_URL'] = server.url
+        os.environ['NEXT_PUBLIC_SUPABASE_ANON_KEY'] = DUMMY_SUPABASE_KEY
+        os.environ.pop('SUPABASE_SERVICE_KEY', None)
+        os.environ.pop('VERCEL_API_TOKEN', None)
+
+        from app.database import Database
+        from app.read_cache import ReadCache
+        with contextlib.redirect_stdout(io.StringIO()):
+            db = Database()
+
+        for table, prefix, unit_key in (
+            ('dishwashing_liquid_products', 'D', 'price_per_1000ml'),
+            ('mask_products', 'M', 'price_per_mask'),
+            ('mineral_water_products', 'W', 'price_per_liter'),
+        ):
+            server.tables[table] = {row['asin']: row for row in product_rows(prefix, args.products, unit_key)}
+
+        print(f"{args.requests} reads, {args.products} products/table, save every {args.write_every} reads, "
+              f"latency {args.latency * 1000:.0f} ms/request")
+        for use_cache in (False, True):
+            db.read_cache = ReadCache(db.cache_duration)
+            server.reset_counts()
+            start = time.perf_counter()
+            latencies, stats = await run(db, args.requests, args.write_every, use_cache)
+            elapsed = time.perf_counter() - start
+            reads = sum(count for (_, method), count in server.requests.items() if method == 'GET')
+            label = 'cache' if use_cache else 'no cache'
+            print(f"{label:>8}: {reads:>5} Supabase reads, {elapsed:.2f}s, "
+                  f"p50 {percentile(latencies, 0.5)} ms, p99 {percentile(latencies, 0.99)} ms")
+            if use_cache:
+                for table, table_stats in stats.items():
+                    print(f"          {table:>28}: hit ratio {table_stats['hit_ratio']}, "
+                          f"{table_stats['misses']} misses, p99 {table_stats['p99_ms']} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,118 @@
+"""
+価格更新スケジューラーのシミュレーション（全件更新 vs 変動のしやすさに応じた更新）
+
+価格がよく変わる商品・たまに変わる商品・ほとんど変わらない商品を混ぜた架空の商品群について、
+4時間ごとの価格更新を一定期間シミュレーションし、取得した詳細ページ数と
+価格の変化を検出するまでの遅れ（平均・p90）を比較する。--failing を指定すると、その件数の商品は
+詳細ページの取得に毎回失敗する（失敗した商品に使ったページ数も表示する）。Amazon・Supabaseにはアクセスしない。
+
+使い方（python-backendディレクトリで実行）:
+    python -m benchmarks.benchmark_refresh_scheduler --products 300 --days 14 --budget 50 --failing 60
+"""
+import argparse
+import os
+import random
+import sys
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.refresh_scheduler import RefreshPolicy, plan_refresh
+
+RUN_INTERVAL = timedelta(hours=4)
+# (割合, 4時間あたりに価格が変わる確率, セール中の割合)
+PROFILES = [(0.1, 0.5, 0.5), (0.2, 0.1, 0.1), (0.7, 0.01, 0.0)]
+
+
+def simulate(products: int, days: int, budget: int, adaptive: bool, failing: int = 0, seed: int = 0) -> Dict[str, float]:
+    rng = random.Random(seed)
+    catalog = []
+    for index in range(products):
+        share_total, roll = 0.0, rng.random()
+        for share, change_probability, sale_ratio in PROFILES:
+            share_total += share
+            if roll < share_total:
+                break
+        catalog.append({
+            'asin': f"B0SIM{index:05d}",
+            'change_probability': change_probability,
+            'sale_ratio': sale_ratio,
+            'true_price': rng.randint(500, 3000),
+            'changed_at': None,  # 検出されていない価格変化の発生時刻
+            'profile': change_probability,
+        })
+
+    policy = RefreshPolicy(
+        min_interval=RUN_INTERVAL,
+        max_interval=timedelta(hours=72),
+        page_budget=budget if adaptive else products,
+        history_window=timedelta(days=14),
+    )
+    rows = [{'asin': item['asin'], 'last_fetched_at': None, 'on_sale': False} for item in catalog]
+    # 取得に毎回失敗する商品（販売終了・ページ構成の変更など）
+    failing_asins = {row['asin'] for row in rng.sample(rows, min(failing, products))}
+    history: Dict[str, List[dict]] = {}
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    pages = 0
+    failed_pages = 0
+    delays: Dict[float, List[float]] = {change_probability: [] for _, change_probability, _ in PROFILES}
+
+    for run in range(int(timedelta(days=days) / RUN_INTERVAL)):
+        now = start + run * RUN_INTERVAL
+        # 前回の実行からの間に価格が変わる
+        for item in catalog:
+            if rng.random() < item['change_probability']:
+                item['true_price'] = max(100, item['true_price'] + rng.choice([-1, 1]) * rng.randint(20, 300))
+                if item['changed_at'] is None:
+                    item['changed_at'] = now - RUN_INTERVAL * rng.random()
+
+        due = plan_refresh(rows, history, policy, now).due if adaptive else rows
+        for row in due:
+            item = catalog[int(row['asin'][5:])]
+            pages += 1
+            if row['asin'] in failing_asins:
+                # update_products と同じく、試行日時と連続失敗回数だけを記録する
+                failed_pages += 1
+                row['last_attempted_at'] = now.isoformat()
+                row['refresh_failures'] = row.get('refresh_failures', 0) + 1
+                continue
+            row['last_fetched_at'] = now.isoformat()
+            row['on_sale'] = rng.random() < item['sale_ratio']
+            history.setdefault(row['asin'], []).append({'price': item['true_price'], 'recorded_at': now.isoformat()})
+            if item['changed_at'] is not None:
+                delays[item['profile']].append((now - item['changed_at']).total_seconds() / 3600)
+                item['changed_at'] = None
+
+    def summary(values: List[float]) -> str:
+        values = sorted(values)
+        if not values:
+            return '-'
+        return f"{sum(values) / len(values):.1f}h (p90 {values[int(len(values) * 0.9)]:.1f}h)"
+
+    return {
+        'pages': pages,
+        'failed_pages': failed_pages,
+        'delays': {profile: summary(values) for profile, values in delays.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--products', type=int, default=300)
+    parser.add_argument('--days', type=int, default=14)
+    parser.add_argument('--budget', type=int, default=50, help='1回の実行で取得する詳細ページ数の上限')
+    parser.add_argument('--failing', type=int, default=0, help='詳細ページの取得に毎回失敗する商品数')
+    args = parser.parse_args()
+
+    print(f"{args.products} products, {args.days} days, update every {RUN_INTERVAL.total_seconds() / 3600:g}h")
+    for name, adaptive in (('fetch all', False), ('adaptive', True)):
+        result = simulate(args.products, args.days, args.budget, adaptive, args.failing)
+        runs = int(timedelta(days=args.days) / RUN_INTERVAL)
+        delays = ', '.join(f"change p={profile:g}: {delay}" for profile, delay in result['delays'].items())
+        print(f"{name:>10}: {result['pages']:>6} pages ({result['pages'] / runs:.1f}/run, "
+              f"{result['failed_pages']} on failing products), detection delay {delays}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+HTMLアーカイブと再解析のベンチマーク
+
+フィクスチャの検索結果ページ・商品詳細ページを一時ディレクトリのアーカイブに保存し、
+圧縮率と、1プロセスで順番に解析した場合・プロセスプールで再解析した場合・
+2回目の再解析（前回と同じページは解析を省く）の所要時間を比較する。
+
+使い方（python-backendディレクトリで実行）:
+    python -m benchmarks.benchmark_reparse --pages 40 --workers 4
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fixtures import detail_page_html, search_page_html
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pages', type=int, default=40, help='検索結果ページ・商品詳細ページそれぞれの数')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    from app.html_archive import ZSTD_AVAILABLE, HtmlArchive
+    from app.reparse import parse_archived_page, reparse
+
+    with tempfile.TemporaryDirectory() as archive_dir:
+        archive = HtmlArchive(archive_dir)
+        raw_bytes = 0
+        for index in range(args.pages):
+            html = search_page_html(index + 1, seed=index)
+            raw_bytes += len(html.encode('utf-8'))
+            archive.store('search', f"https://www.amazon.co.jp/s?k=fixture&page={index + 1}", html, page_num=index + 1)
+            asin = f"B0FIX{index:05d}"
+            html = detail_page_html(asin)
+            raw_bytes += len(html.encode('utf-8'))
+            archive.store('detail', f"https://www.amazon.co.jp/dp/{asin}", html, asin=asin)
+        stored_bytes = sum(path.stat().st_size for path in Path(archive_dir, 'blobs').rglob('*') if path.is_file())
+        print(f"{args.pages * 2} pages, {raw_bytes / 1e6:.1f} MB of HTML -> {stored_bytes / 1e6:.2f} MB "
+              f"({'zstd' if ZSTD_AVAILABLE else 'gzip'}, {raw_bytes / stored_bytes:.1f}x)")
+
+        pages = list(archive.pages())
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for page in pages:
+                parse_archived_page(page['kind'], page['path'], page['context'])
+        print(f"{'serial':>14}: {time.perf_counter() - start:.2f}s")
+
+        for name in ('reparse', 'reparse again'):
+            summary = reparse(archive, workers=args.workers)
+            print(f"{name:>14}: {summary['time']:.2f}s, {summary['parsed']} parsed, {summary['skipped']} skipped, "
+                  f"{summary['products']} products, {summary['errors']} errors ({args.workers} workers)")
+
+
+if __name__ == "__main__":
+    main()
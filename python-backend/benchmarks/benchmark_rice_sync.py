@@ -0,0 +1,154 @@
+"""
+米商品の保存のベンチマーク（全件削除＋全件挿入 vs 差分の書き込み）
+
+PostgREST代替サーバーに前回のスクレイピング結果を保存しておき、一部の商品の価格が変わり、
+一部の商品が消え、新しい商品が加わった今回の結果を保存する。
+以前の方法（全件削除してから全件挿入）と save_rice_to_db（差分の書き込み）で、
+書き込んだ行数・バイト数・リクエスト数と、保存中にテーブルが空だった時間を比べる。
+
+使い方（python-backendディレクトリで実行）:
+    python -m benchmarks.benchmark_rice_sync --products 240 --changed 0.1 --latency 0.02
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import time
+from typing import Dict, List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.postgrest_server import DUMMY_SUPABASE_KEY, PostgrestServer
+
+TABLE = 'rice_products'
+
+
+def make_products(count: int, rng: random.Random) -> List[Dict]:
+    products = []
+    for index in range(count):
+        weight = rng.choice([2, 5, 10])
+        price = rng.randint(1500, 9000)
+        products.append({
+            'asin': f"B0RICE{index:05d}",
+            'title': f"新米 コシヒカリ {weight}kg 精米 {index}",
+            'brand': rng.choice(['魚沼', '秋田', '北海道', None]),
+            'price': price,
+            'price_regular': price + rng.choice([0, 0, 500]),
+            'review_avg': round(rng.uniform(3.0, 5.0), 1),
+            'review_count': rng.randint(0, 5000),
+            'image_url': f"https://m.media-amazon.com/images/I/{index:08d}.jpg",
+            'weight_kg': weight,
+            'price_per_kg': price / weight,
+            'rice_type': 'コシヒカリ',
+            'is_musenmai': rng.random() < 0.3,
+            'discount_percent': 0,
+            'out_of_stock': False,
+        })
+    return products
+
+
+def next_run(products: List[Dict], rng: random.Random, changed: float, churn: float) -> List[Dict]:
+    """一部の価格が変わり、一部が消え、新しい商品が加わった次回のスクレイピング結果"""
+    rows = []
+    for product in products:
+        if rng.random() < churn:
+            continue
+        row = dict(product)
+        if rng.random() < changed:
+            row['price'] = int(row['price'] * rng.uniform(0.85, 1.15))
+            row['price_per_kg'] = row['price'] / row['weight_kg']
+        rows.append(row)
+    rows += make_products(int(len(products) * churn) + 1, random.Random(rng.random()))
+    for index, row in enumerate(rows[-int(len(products) * churn) - 1:]):
+        row['asin'] = f"B0RICENEW{index:04d}"
+    return rows
+
+
+async def legacy_save(db, products: List[Dict]) -> None:
+    """以前の save_rice_to_db（全件削除してから全件挿入）"""
+    await db.rest.table(TABLE).delete().neq("asin", "").execute()
+    await db.rest.table(TABLE).insert(products).execute()
+
+
+async def measure(server: PostgrestServer, save) -> Dict:
+    """保存にかかった時間、リクエスト数、テーブルが空だった時間"""
+    empty = 0.0
+    done = False
+
+    async def watch():
+        nonlocal empty
+        last = time.perf_counter()
+        while not done:
+            await asyncio.sleep(0.001)
+            now = time.perf_counter()
+            if not server.tables.get(TABLE):
+                empty += now - last
+            last = now
+
+    server.reset_counts()
+    watcher = asyncio.create_task(watch())
+    start = time.perf_counter()
+    result = await save()
+    elapsed = time.perf_counter() - start
+    done = True
+    await watcher
+    return {'elapsed': elapsed, 'requests': server.total_requests, 'empty': empty, 'result': result}
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--products', type=int, default=240)
+    parser.add_argument('--changed', type=float, default=0.1, help='価格が変わる商品の割合')
+    parser.add_argument('--churn', type=float, default=0.03, help='消える商品・新しい商品の割合')
+    parser.add_argument('--latency', type=float, default=0.02, help='PostgRESTの1リクエストあたりの疑似遅延（秒）')
+    args = parser.parse_args()
+
+    with PostgrestServer(latency=args.latency) as server:
+        os.environ.update({
+            'NEXT_PUBLIC_SUPABASE_URL': server.url,
+            'NEXT_PUBLIC_SUPABASE_ANON_KEY': DUMMY_SUPABASE_KEY,
+        })
+        os.environ.pop('SUPABASE_SERVICE_KEY', None)
+        with contextlib.redirect_stdout(io.StringIO()):
+            from app.database import Database
+            from app.scrapers.rice_scraper import save_rice_to_db
+            db = Database()
+
+        rng = random.Random(0)
+        previous = make_products(args.products, rng)
+        current = next_run(previous, rng, args.changed, args.churn)
+        print(f"{len(previous)} stored rice products, {len(current)} scraped "
+              f"({args.changed:.0%} price changes, {args.churn:.0%} churn), PostgREST latency {args.latency * 1000:.0f} ms")
+
+        def reset():
+            # 前回 save_rice_to_db で保存された状態（on_sale・取得日時あり）
+            server.tables[TABLE] = {
+                row['asin']: dict(row, on_sale=row['discount_percent'] > 0, last_fetched_at='2024-01-01T00:00:00+00:00')
+                for row in previous
+            }
+
+        reset()
+        legacy = await measure(server, lambda: legacy_save(db, [dict(row) for row in current]))
+        full_bytes = len(json.dumps(current, ensure_ascii=False, separators=(",", ":")).encode('utf-8'))
+        print(f"{'delete + insert':>16}: {len(previous) + len(current)} rows written (~{full_bytes} bytes), "
+              f"{legacy['requests']} requests, {legacy['elapsed'] * 1000:.0f} ms, table empty for ~{legacy['empty'] * 1000:.0f} ms")
+
+        reset()
+        with contextlib.redirect_stdout(io.StringIO()):
+            synced = await measure(server, lambda: save_rice_to_db([dict(row) for row in current]))
+        sync = synced['result']['sync']
+        hidden = sum(1 for row in server.tables[TABLE].values() if row.get('out_of_stock'))
+        print(f"{'diff sync':>16}: {sync['rows_written']} rows written + {sync['rows_touched']} last_fetched_at touched "
+              f"({sync['bytes_written']} bytes incl. patches; "
+              f"{sync['inserted']} inserted, {sync['updated']} updated, {sync['unchanged']} unchanged, "
+              f"{sync['soft_deleted']} soft-deleted), {synced['requests']} requests, {synced['elapsed'] * 1000:.0f} ms, "
+              f"table empty for ~{synced['empty'] * 1000:.0f} ms, {hidden} rows marked out_of_stock")
+        await db.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
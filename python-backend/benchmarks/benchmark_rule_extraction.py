@@ -0,0 +1,85 @@
+"""
+正規表現による抽出（GPTの前段）のベンチマーク
+
+benchmarks/extraction_corpus.py の商品名を1件ずつ抽出し、
+正規表現の抽出を無効にした場合（すべてGPT）と有効にした場合を比較する。
+ローカルで抽出できた割合・GPTへのリクエスト数・1商品あたりの所要時間と、
+ローカルで抽出した結果が正解と一致した割合を表示する。GPTはOpenAI互換のローカルサーバーを使う。
+
+使い方（python-backendディレクトリで実行）:
+    python -m benchmarks.benchmark_rule_extraction --latency 0.5
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.extraction_corpus import CORPUS
+from benchmarks.openai_server import FakeOpenAIServer
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--latency', type=float, default=0.5, help='1リクエストあたりの疑似応答時間（秒）')
+    args = parser.parse_args()
+
+    with FakeOpenAIServer(latency=args.latency) as server:
+        os.environ['OPENAI_BASE_URL'] = server.url
+        os.environ['OPENAI_API_KEY'] = 'sk-benchmark'
+
+        from app import extraction_cache
+        from app.chatgpt_parser import ChatGPTParser
+        from app.rule_extraction import extract_by_rules, min_confidence
+        from app.services.gpt_parser import parse_mineral_water_info
+        text_parser = ChatGPTParser()
+
+        async def extract(product_type, title):
+            if product_type == 'toilet_paper':
+                return await text_parser.extract_info(title)
+            if product_type == 'dishwashing_liquid':
+                return await text_parser.extract_dishwashing_info(title)
+            if product_type == 'mask':
+                return await text_parser.extract_mask_info(title)
+            return await asyncio.to_thread(parse_mineral_water_info, title)
+
+        print(f"{sum(len(items) for items in CORPUS.values())} titles, latency {args.latency * 1000:.0f} ms/request")
+        totals = {'gpt only': [0, 0.0], 'rules + gpt': [0, 0.0]}
+        for product_type, items in CORPUS.items():
+            line = [f"{product_type:>18}:"]
+            for name, threshold in (('gpt only', '2'), ('rules + gpt', '0.9')):
+                os.environ['RULE_EXTRACTION_MIN_CONFIDENCE'] = threshold
+                # 抽出キャッシュは毎回空にする（キャッシュの効果と区別するため）
+                extraction_cache._extraction_cache = text_parser.cache = extraction_cache.ExtractionCache(':memory:')
+                server.reset_counts()
+                start = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    for title, _ in items:
+                        await extract(product_type, title)
+                elapsed = time.perf_counter() - start
+                totals[name][0] += server.requests
+                totals[name][1] += elapsed
+                line.append(f"{name} {server.requests:>3} requests {elapsed / len(items) * 1000:>6.1f} ms/product")
+
+            local = [
+                (result.fields, expected) for result, expected in (
+                    (extract_by_rules(product_type, title), expected) for title, expected in items
+                ) if result.confidence >= min_confidence()
+            ]
+            correct = sum(1 for fields, expected in local if all(fields.get(key) == value for key, value in expected.items()))
+            line.append(f"local {len(local)}/{len(items)} ({correct} correct)")
+            print(' | '.join(line))
+
+        count = sum(len(items) for items in CORPUS.values())
+        saved = (totals['gpt only'][1] - totals['rules + gpt'][1]) / count * 1000
+        print(f"{'total':>18}: requests {totals['gpt only'][0]} -> {totals['rules + gpt'][0]}, "
+              f"{saved:.1f} ms saved per product on average")
+        await text_parser.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
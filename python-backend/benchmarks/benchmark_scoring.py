@@ -0,0 +1,91 @@
+"""
+総合スコアの計算のベンチマーク（商品ごとに全商品を走査 vs 列でまとめて計算）
+
+架空の商品群（単価・レビューなしの商品を含む）について、次の時間を測り、結果が同じことを確認する。
+- 以前の calculate_all_scores（商品ごとに calculate_total_score を呼び、毎回全商品の最小/最大を求める）
+- 列でまとめて計算する calculate_all_scores（NumPy / NumPyなしのPython）
+- SCORE_PROFILES の全重み付けを一度に計算する calculate_profile_scores
+以前の方法はO(n²)なので、--legacy-max より多い件数では測らない。
+
+使い方（python-backendディレクトリで実行）:
+    python -m benchmarks.benchmark_scoring --sizes 1000 10000 100000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from typing import Dict, List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils import score_calculator
+from app.utils.score_calculator import (
+    SCORE_PROFILES, calculate_all_scores, calculate_profile_scores, calculate_total_score
+)
+
+
+def make_products(count: int, seed: int = 0) -> List[Dict]:
+    rng = random.Random(seed)
+    products = []
+    for index in range(count):
+        has_reviews = rng.random() > 0.1
+        products.append({
+            'asin': f"B0SCORE{index:06d}",
+            'price_per_m': round(rng.uniform(0.5, 8.0), 3) if rng.random() > 0.05 else None,
+            'review_avg': round(rng.uniform(2.5, 5.0), 1) if has_reviews else None,
+            'review_count': rng.randint(1, 20000) if has_reviews else 0,
+        })
+    return products
+
+
+def legacy_all_scores(products: List[Dict], price_field: str) -> List[Dict]:
+    """以前の calculate_all_scores（商品ごとに全商品を走査する）"""
+    for product in products:
+        score = calculate_total_score(product, products, price_field)
+        product['total_score'] = round(score, 2) if score is not None else None
+    return products
+
+
+def timed(func, *args) -> float:
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--legacy-max', type=int, default=10000, help='以前の方法を測る最大件数')
+    args = parser.parse_args()
+
+    print(f"{'products':>9} {'legacy':>10} {'numpy':>10} {'python':>10} {f'{len(SCORE_PROFILES)} profiles':>11}")
+    for size in args.sizes:
+        products = make_products(size)
+        expected = None
+        legacy = '-'
+        if size <= args.legacy_max:
+            legacy_products = [dict(product) for product in products]
+            legacy = f"{timed(legacy_all_scores, legacy_products, 'price_per_m') * 1000:.1f}ms"
+            expected = [product['total_score'] for product in legacy_products]
+
+        vectorized = [dict(product) for product in products]
+        numpy_time = timed(calculate_all_scores, vectorized, 'price_per_m')
+
+        score_calculator.NUMPY_AVAILABLE = False
+        fallback = [dict(product) for product in products]
+        python_time = timed(calculate_all_scores, fallback, 'price_per_m')
+        score_calculator.NUMPY_AVAILABLE = True
+
+        profiles_time = timed(calculate_profile_scores, products, 'price_per_m')
+
+        scores = [product['total_score'] for product in vectorized]
+        assert scores == [product['total_score'] for product in fallback], "NumPy and Python scores differ"
+        if expected is not None:
+            assert scores == expected, "scores differ from calculate_total_score"
+        print(f"{size:>9} {legacy:>10} {numpy_time * 1000:>8.1f}ms {python_time * 1000:>8.1f}ms "
+              f"{profiles_time * 1000:>9.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+スクレイピングのチェックポイントのベンチマーク（/api/search?force=true）
+
+フィクスチャサーバー（HTTP取得）・OpenAI互換サーバー・PostgREST代替サーバーに対して
+main.search_products を途中で打ち切り（タイムアウト・Lambdaの時間制限を想定）、もう一度最後まで実行する。
+チェックポイントなし（最初からやり直す）と、チェックポイントから再開する場合で、
+再実行にかかった時間・取得した検索ページ数・OpenAIへのリクエスト数を比べる。
+Amazonのページ取得にかかる時間（レート制限込み）は --page-latency で模擬する。
+どちらもGPT抽出キャッシュは打ち切った実行と再実行で共有する（本番と同じ）。
+
+使い方（python-backendディレクトリで実行）:
+    python -m benchmarks.benchmark_scrape_checkpoint --pages 3 --latency 0.5 --page-latency 2
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fixtures import FixtureServer
+from benchmarks.openai_server import FakeOpenAIServer
+from benchmarks.postgrest_server import DUMMY_SUPABASE_KEY, PostgrestServer
+
+
+async def run(main_module, pages: int, timeout: float = None) -> float:
+    main_module.scraper.rate_limiter.buckets.clear()
+    original = main_module.scraper.iter_search_products
+    main_module.scraper.iter_search_products = lambda keyword, **kwargs: original(keyword, max_pages=pages, **kwargs)
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            await asyncio.wait_for(main_module.search_products(force=True), timeout)
+    except asyncio.TimeoutError:
+        pass
+    finally:
+        main_module.scraper.iter_search_products = original
+    return time.perf_counter() - start
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pages', type=int, default=3)
+    parser.add_argument('--latency', type=float, default=0.5, help='OpenAIの1リクエストあたりの疑似応答時間（秒）')
+    parser.add_argument('--page-latency', type=float, default=2.0, help='検索ページ1件の取得にかかる疑似時間（秒）')
+    parser.add_argument('--abort-at', type=float, default=0.5, help='全体の時間に対して打ち切る割合')
+    args = parser.parse_args()
+
+    with FixtureServer() as fixtures, FakeOpenAIServer(latency=args.latency) as openai, PostgrestServer() as postgrest:
+        work_dir = tempfile.TemporaryDirectory()
+        os.environ.update({
+            'AMAZON_BASE_URL': fixtures.url,
+            'SCRAPER_FETCH_MODE': 'http',
+            'SCRAPER_RATE_PER_SEC': '10000',
+            'SCRAPER_RATE_BURST': '10000',
+            'HTML_ARCHIVE_ENABLED': 'false',
+            'OPENAI_BASE_URL': openai.url,
+            'OPENAI_API_KEY': 'sk-benchmark',
+            'RULE_EXTRACTION_MIN_CONFIDENCE': '2',
+            'NEXT_PUBLIC_SUPABASE_URL': postgrest.url,
+            'NEXT_PUBLIC_SUPABASE_ANON_KEY': DUMMY_SUPABASE_KEY,
+        })
+        for name in ('SUPABASE_SERVICE_KEY', 'VERCEL_API_TOKEN'):
+            os.environ.pop(name, None)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            from app import main as main_module
+        from app import scrape_checkpoint
+        from app.extraction_cache import ExtractionCache
+
+        # Amazonのページ取得にかかる時間を模擬する
+        original_search_page = main_module.scraper._search_page
+        search_pages = []
+
+        async def slow_search_page(keyword, page_num):
+            search_pages.append(page_num)
+            await asyncio.sleep(args.page_latency)
+            return await original_search_page(keyword, page_num)
+
+        main_module.scraper._search_page = slow_search_page
+
+        print(f"{args.pages} search pages x 48 products, page fetch {args.page_latency:.1f}s, "
+              f"OpenAI latency {args.latency * 1000:.0f} ms/request")
+        full = None
+        for label, enabled in (('from scratch', False), ('resume', True)):
+            postgrest.tables.clear()
+            main_module.text_parser.cache = ExtractionCache(os.path.join(work_dir.name, f'{label}.sqlite3'))
+            scrape_checkpoint._checkpoint_store = scrape_checkpoint.CheckpointStore(
+                os.path.join(work_dir.name, f'{label}-checkpoints.sqlite3'), enabled=enabled
+            )
+            if full is None:
+                full = await run(main_module, args.pages)
+                postgrest.tables.clear()
+                main_module.text_parser.cache = ExtractionCache(os.path.join(work_dir.name, f'{label}-2.sqlite3'))
+            aborted = await run(main_module, args.pages, timeout=full * args.abort_at)
+            saved = len(postgrest.tables.get('toilet_paper_products', {}))
+            search_pages.clear()
+            openai.reset_counts()
+            rerun = await run(main_module, args.pages)
+            print(f"{label:>12}: stopped after {aborted:.2f}s ({saved} saved), rerun took {rerun:.2f}s, "
+                  f"{len(search_pages)} search pages fetched, {openai.requests} OpenAI requests")
+
+        main_module.scraper._search_page = original_search_page
+        await main_module.scraper.http_fetcher.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
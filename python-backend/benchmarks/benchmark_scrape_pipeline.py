@@ -0,0 +1,102 @@
+"""
+スクレイピングのパイプラインのベンチマーク（/api/search?force=true）
+
+フィクスチャサーバー（HTTP取得）・OpenAI互換サーバー・PostgREST代替サーバーに対して
+main.search_products を実行し、最初の商品がDBに保存されるまでの時間と全体の時間を測る。
+続けて、全体の時間の半分で実行を打ち切り（途中で失敗した場合を想定）、それまでに保存された商品数を数える。
+（ページごとに保存する前は、最後にまとめて保存していたため、どちらも全体の時間・0件に相当する）
+
+使い方（python-backendディレクトリで実行）:
+    python -m benchmarks.benchmark_scrape_pipeline --pages 3 --latency 0.5
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fixtures import FixtureServer
+from benchmarks.openai_server import FakeOpenAIServer
+from benchmarks.postgrest_server import DUMMY_SUPABASE_KEY, PostgrestServer
+
+
+async def run(main_module, server: PostgrestServer, pages: int, timeout: float = None) -> dict:
+    server.tables.clear()
+    main_module.scraper.rate_limiter.buckets.clear()
+    saved_at = []
+    start = time.perf_counter()
+
+    async def watch():
+        while True:
+            if server.tables.get('toilet_paper_products') and not saved_at:
+                saved_at.append(time.perf_counter() - start)
+            await asyncio.sleep(0.01)
+
+    original = main_module.scraper.iter_search_products
+    main_module.scraper.iter_search_products = lambda keyword, **kwargs: original(keyword, max_pages=pages, **kwargs)
+    watcher = asyncio.create_task(watch())
+    completed = True
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            await asyncio.wait_for(main_module.search_products(force=True), timeout)
+    except asyncio.TimeoutError:
+        completed = False
+    finally:
+        watcher.cancel()
+        main_module.scraper.iter_search_products = original
+    return {
+        'elapsed': time.perf_counter() - start,
+        'first_save': saved_at[0] if saved_at else None,
+        'saved': len(server.tables.get('toilet_paper_products', {})),
+        'completed': completed,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pages', type=int, default=3)
+    parser.add_argument('--latency', type=float, default=0.5, help='OpenAIの1リクエストあたりの疑似応答時間（秒）')
+    args = parser.parse_args()
+
+    with FixtureServer() as fixtures, FakeOpenAIServer(latency=args.latency) as openai, PostgrestServer() as postgrest:
+        cache_dir = tempfile.TemporaryDirectory()
+        os.environ.update({
+            'AMAZON_BASE_URL': fixtures.url,
+            'SCRAPER_FETCH_MODE': 'http',
+            'SCRAPER_RATE_PER_SEC': '10000',
+            'SCRAPER_RATE_BURST': '10000',
+            'HTML_ARCHIVE_ENABLED': 'false',
+            'SCRAPE_CHECKPOINT_ENABLED': 'false',
+            'OPENAI_BASE_URL': openai.url,
+            'OPENAI_API_KEY': 'sk-benchmark',
+            'RULE_EXTRACTION_MIN_CONFIDENCE': '2',
+            'NEXT_PUBLIC_SUPABASE_URL': postgrest.url,
+            'NEXT_PUBLIC_SUPABASE_ANON_KEY': DUMMY_SUPABASE_KEY,
+        })
+        for name in ('SUPABASE_SERVICE_KEY', 'VERCEL_API_TOKEN'):
+            os.environ.pop(name, None)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            from app import main as main_module
+        from app.extraction_cache import ExtractionCache
+
+        print(f"{args.pages} search pages x 48 products, OpenAI latency {args.latency * 1000:.0f} ms/request")
+        main_module.text_parser.cache = ExtractionCache(os.path.join(cache_dir.name, 'full.sqlite3'))
+        full = await run(main_module, postgrest, args.pages)
+        print(f"{'full run':>14}: first product saved after {full['first_save']:.2f}s, "
+              f"{full['saved']} saved in {full['elapsed']:.2f}s")
+
+        main_module.text_parser.cache = ExtractionCache(os.path.join(cache_dir.name, 'aborted.sqlite3'))
+        aborted = await run(main_module, postgrest, args.pages, timeout=full['elapsed'] / 2)
+        print(f"{'aborted at 50%':>14}: {aborted['saved']} products already saved when stopped after {aborted['elapsed']:.2f}s")
+
+        await main_module.scraper.http_fetcher.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,71 @@
+"""
+商品情報抽出のベンチマーク用コーパス
+
+Amazonの検索結果によくある表記の商品名と、プロンプトの基準で人手で付けた正解の組。
+正規表現の抽出で確信度が下がるべき表記（換算表記・複数の容量・ケース単位など）も含めている。
+"""
+
+CORPUS = {
+    'toilet_paper': [
+        ("エリエール トイレットペーパー 12ロール ダブル 30m 香り付き", {'roll_count': 12, 'length_m': 30, 'is_double': True}),
+        ("スコッティ フラワーパック 3倍長持ち 75m×12ロール シングル", {'roll_count': 12, 'length_m': 75, 'is_double': False}),
+        ("ネピア 鼻セレブ トイレットペーパー 12ロール×4パック 25m ダブル", {'roll_count': 48, 'length_m': 25, 'is_double': True}),
+        ("スコッティ 2倍巻き 12ロール(24ロール分) 50m ダブル", {'roll_count': 12, 'length_m': 50, 'is_double': True}),
+        ("トイレットペーパー 114mm×30m 18ロール シングル 再生紙", {'roll_count': 18, 'length_m': 30, 'is_double': False}),
+        ("【Amazon.co.jp限定】 エリエール 1.5倍巻 ８ロール ４５ｍ ダブル", {'roll_count': 8, 'length_m': 45, 'is_double': True}),
+        ("ナクレ トイレットペーパー 60m 48ロール シングル 業務用", {'roll_count': 48, 'length_m': 60, 'is_double': False}),
+        ("ネピア ネピネピ トイレットロール 12ロール ダブル", {'roll_count': 12, 'length_m': 30, 'is_double': True}),
+        ("芯なし トイレットペーパー 170m 24個入 シングル", {'roll_count': 24, 'length_m': 170, 'is_double': False}),
+        ("スコッティ フラワーパック 4倍長持ち 8ロール(32ロール分) 100m ダブル", {'roll_count': 8, 'length_m': 100, 'is_double': True}),
+        ("トイレットペーパー 27.5m 12ロール×8パック 2枚重ね", {'roll_count': 96, 'length_m': 27.5, 'is_double': True}),
+        ("エリエール i:na トイレットティシュー 12ロール 30m", {'roll_count': 12, 'length_m': 30, 'is_double': True}),
+    ],
+    'dishwashing_liquid': [
+        ("ジョイ W除菌 食器用洗剤 詰め替え 特大 770ml", {'volume_ml': 770, 'is_refill': True, 'is_dishwasher': False}),
+        ("キュキュット 食器用洗剤 本体 240ml", {'volume_ml': 240, 'is_refill': False, 'is_dishwasher': False}),
+        ("フィニッシュ 食洗機 洗剤 タブレット パワーキューブ 60個", {'volume_ml': None, 'is_refill': False, 'is_dishwasher': True}),
+        ("チャーミーマジカ 速乾+ 詰替用大型 950ml×3個", {'volume_ml': 2850, 'is_refill': True, 'is_dishwasher': False}),
+        ("キュキュット 食器用洗剤 本体 240ml + 詰め替え 700ml セット", {'volume_ml': 940, 'is_refill': False, 'is_dishwasher': False}),
+        ("キュキュット クリア除菌 詰め替え 1.38L", {'volume_ml': 1380, 'is_refill': True, 'is_dishwasher': False}),
+        ("ジョイ 食洗機用洗剤 除菌 詰め替え 490g", {'volume_ml': 490, 'is_refill': True, 'is_dishwasher': True}),
+        ("やしの実洗剤 つめかえ用 ５００ｍｌ", {'volume_ml': 500, 'is_refill': True, 'is_dishwasher': False}),
+        ("CHARMY 泡のチカラ 食洗機用 粉末 本体", {'volume_ml': None, 'is_refill': False, 'is_dishwasher': True}),
+        ("ジョイ コンパクト 食器用洗剤 超特大 1065ml×2個", {'volume_ml': 2130, 'is_refill': False, 'is_dishwasher': False}),
+        ("キュキュット 食器用洗剤 オレンジの香り", {'volume_ml': 240, 'is_refill': False, 'is_dishwasher': False}),
+        # 桁区切りのカンマと「×」のないまとめ売り
+        ("ジョイ 食器用洗剤 詰め替え 超特大 1,425ml", {'volume_ml': 1425, 'is_refill': True, 'is_dishwasher': False}),
+        ("キュキュット 食器用洗剤 1250ml 2本セット", {'volume_ml': 2500, 'is_refill': False, 'is_dishwasher': False}),
+    ],
+    'mask': [
+        ("超快適 マスク 不織布 ふつうサイズ 50枚入 ホワイト", {'mask_count': 50, 'mask_size': 'regular', 'mask_color': 'white'}),
+        ("カラーマスク 不織布 小さめサイズ 30枚×3パック ピンク/グレー", {'mask_count': 90, 'mask_size': 'small', 'mask_color': 'multicolor'}),
+        ("不織布マスク 3枚重ね 個包装 50枚 やや大きめ", {'mask_count': 50, 'mask_size': 'slightly_large', 'mask_color': 'white'}),
+        ("ＢＦＥ９９％ 子供用 マスク ６０枚", {'mask_count': 60, 'mask_size': 'kids', 'mask_color': 'white'}),
+        ("大人用 マスク 不織布 100枚入×2箱 ブラック", {'mask_count': 200, 'mask_size': 'regular', 'mask_color': 'black'}),
+        ("立体マスク 大きめ 30枚 ネイビー", {'mask_count': 30, 'mask_size': 'large', 'mask_color': 'blue'}),
+        ("バイカラー マスク 血色 不織布 やや小さめ 40枚", {'mask_count': 40, 'mask_size': 'slightly_small', 'mask_color': 'multicolor'}),
+        ("3D立体マスク 7枚入×10袋 ふつう ベージュ", {'mask_count': 70, 'mask_size': 'regular', 'mask_color': 'beige'}),
+        ("超快適マスク プリーツタイプ", {'mask_count': 30, 'mask_size': 'regular', 'mask_color': 'white'}),
+        ("ユニチャーム 超立体マスク 大きめ/ふつう 選べる 50枚", {'mask_count': 50, 'mask_size': None, 'mask_color': 'white'}),
+        # 1文字の色・サイズの表記と、色・サイズの記載がない商品名（記載がなければGPTに回す）
+        ("不織布マスク 黒 50枚入 ふつうサイズ", {'mask_count': 50, 'mask_size': 'regular', 'mask_color': 'black'}),
+        ("マスク 黒 30枚入", {'mask_count': 30, 'mask_size': None, 'mask_color': 'black'}),
+        ("マスク 50枚 M", {'mask_count': 50, 'mask_size': 'regular', 'mask_color': 'white'}),
+        ("立体マスク 紺 L 30枚", {'mask_count': 30, 'mask_size': 'large', 'mask_color': 'blue'}),
+        ("白元アース 快適ガード マスク ふつうサイズ 60枚 グレー", {'mask_count': 60, 'mask_size': 'regular', 'mask_color': 'gray'}),
+    ],
+    'mineral_water': [
+        ("サントリー 天然水 550ml×24本", {'volume_ml': 550, 'bottle_count': 24, 'total_volume_ml': 13200}),
+        ("い・ろ・は・す 天然水 2L×9本", {'volume_ml': 2000, 'bottle_count': 9, 'total_volume_ml': 18000}),
+        ("クリスタルガイザー 500ml 48本 並行輸入品", {'volume_ml': 500, 'bottle_count': 48, 'total_volume_ml': 24000}),
+        ("天然水 500ml×24本×2ケース", {'volume_ml': 500, 'bottle_count': 48, 'total_volume_ml': 24000}),
+        ("エビアン 330ml×24本", {'volume_ml': 330, 'bottle_count': 24, 'total_volume_ml': 7920}),
+        ("アイリスオーヤマ 富士山の天然水 ２Ｌ×１０本", {'volume_ml': 2000, 'bottle_count': 10, 'total_volume_ml': 20000}),
+        ("[Amazonブランド] Happy Belly 天然水 525ml×48本 静岡県御殿場市", {'volume_ml': 525, 'bottle_count': 48, 'total_volume_ml': 25200}),
+        ("ボルヴィック 1.5L ペットボトル 12本", {'volume_ml': 1500, 'bottle_count': 12, 'total_volume_ml': 18000}),
+        ("財宝 温泉水 ミネラルウォーター 箱入り", {'volume_ml': 2000, 'bottle_count': 10, 'total_volume_ml': 20000}),
+        # 桁区切りのカンマ
+        ("サントリー 天然水 1,000ml×12本", {'volume_ml': 1000, 'bottle_count': 12, 'total_volume_ml': 12000}),
+        ("アルカリイオンの水 2,000ml 6本", {'volume_ml': 2000, 'bottle_count': 6, 'total_volume_ml': 12000}),
+    ],
+}
@@ -0,0 +1,228 @@
+"""
+ベンチマーク用のHTMLフィクスチャとローカルフィクスチャサーバー
+
+Amazonの検索結果ページ・商品詳細ページと同じ構造のHTMLを生成する。
+実際のページと同程度のサイズになるようにスクリプトやスタイルの詰め物を入れている。
+"""
+import os
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+TITLES = [
+    "エリエール トイレットペーパー 12ロール ダブル 30m 香り付き",
+    "スコッティ フラワーパック 3倍長持ち 75m×12ロール シングル",
+    "ジョイ W除菌 食器用洗剤 詰め替え 特大 770ml",
+    "キュキュット 食器用洗剤 本体 240ml",
+    "サントリー 天然水 550ml×24本",
+    "い・ろ・は・す 天然水 2L×9本",
+    "【精米】新潟県産 コシヒカリ 5kg 令和6年産",
+    "無洗米 北海道産 ななつぼし 10kg（5kg×2）",
+    "超快適 マスク 不織布 ふつうサイズ 50枚入 ホワイト",
+    "カラーマスク 不織布 小さめサイズ 30枚×3パック ピンク/グレー",
+]
+
+# 実際のページに含まれるスクリプトやスタイルの代わり
+_FILLER = "<script>var ue_t0=ue_t0||+new Date();" + "x" * 4000 + "</script><style>.s-result-item{margin:0}" + "y" * 2000 + "</style>"
+
+
+def search_result_card(index: int, rng: random.Random) -> str:
+    """検索結果の商品カード1件分のHTML"""
+    asin = f"B0FIX{index:05d}"
+    title = rng.choice(TITLES)
+    price = rng.randint(300, 9000)
+    on_sale = rng.random() < 0.3
+    out_of_stock = rng.random() < 0.05
+    rating = round(rng.uniform(3.0, 4.9), 1)
+    review_count = rng.randint(0, 20000)
+
+    price_html = ""
+    if not out_of_stock:
+        price_html = (
+            f'<span class="a-price" data-a-size="xl"><span class="a-offscreen">￥{price:,}</span>'
+            f'<span aria-hidden="true"><span class="a-price-symbol">￥</span><span class="a-price-whole">{price:,}</span></span></span>'
+        )
+        if on_sale:
+            regular = int(price * rng.uniform(1.1, 1.5))
+            price_html += (
+                f'<span class="a-price a-text-price" data-a-size="b"><span class="a-offscreen">￥{regular:,}</span>'
+                f'<span aria-hidden="true">￥{regular:,}</span></span>'
+                f'<span class="a-size-base a-color-secondary">参考: ￥{regular:,}</span>'
+            )
+    else:
+        price_html = '<span class="a-size-base a-color-price">現在在庫切れです。</span>'
+
+    return f'''
+<div data-asin="{asin}" data-index="{index}" data-component-type="s-search-result" class="sg-col-4-of-24 s-result-item s-asin">
+  <div class="sg-col-inner"><div class="s-widget-container s-spacing-small">
+    <div class="puis-card-container s-card-container">
+      <div class="s-product-image-container"><span data-component-type="s-product-image">
+        <a class="a-link-normal s-no-outline" href="/dp/{asin}"><div class="a-section aok-relative s-image-square-aspect">
+          <img class="s-image" src="https://m.media-amazon.com/images/I/{asin}._AC_UL320_.jpg" alt="{title}">
+        </div></a>
+      </span></div>
+      <div class="a-section a-spacing-small puis-padding-left-small puis-padding-right-small">
+        <div data-cy="title-recipe" class="a-section a-spacing-none puis-padding-right-micro s-title-instructions-style">
+          <h2 class="a-size-base-plus a-spacing-none a-color-base a-text-normal"><span>{title}</span></h2>
+        </div>
+        <div data-cy="reviews-block" class="a-section a-spacing-none a-spacing-top-micro">
+          <div class="a-row a-size-small">
+            <span aria-label="5つ星のうち{rating}"><span class="a-declarative"><a href="javascript:void(0)" class="a-popover-trigger a-declarative">
+              <i class="a-icon a-icon-star-small"><span class="a-icon-alt">5つ星のうち{rating}</span></i></a></span></span>
+            <span aria-label="{review_count:,}件の評価"><a class="a-link-normal s-underline-text s-underline-link-text s-link-style" href="/dp/{asin}#customerReviews">
+              <span class="a-size-base s-underline-text">{review_count:,}</span></a></span>
+          </div>
+          <div class="a-row a-size-base"><span class="a-size-base a-color-secondary">過去1か月で{rng.randint(1, 50)}00点以上購入されました</span></div>
+        </div>
+        <div data-cy="price-recipe" class="a-section a-spacing-none a-spacing-top-small s-price-instructions-style">
+          <div class="a-row a-size-base a-color-base">{price_html}</div>
+        </div>
+        <div data-cy="delivery-recipe" class="a-section a-spacing-none a-spacing-top-micro">
+          <div class="a-row a-size-base a-color-secondary s-align-children-center"><span class="a-size-small a-color-base">明日中にお届け</span></div>
+        </div>
+        <div class="a-row"><span class="a-declarative" data-action="s-card-button"><button class="a-button-text">カートに入れる</button></span></div>
+      </div>
+    </div>
+  </div></div>
+</div>'''
+
+
+def search_page_html(page_num: int, cards_per_page: int = 48, seed: Optional[int] = None) -> str:
+    """検索結果ページ1ページ分のHTML"""
+    rng = random.Random(seed if seed is not None else page_num)
+    cards = "".join(
+        search_result_card((page_num - 1) * cards_per_page + i, rng) for i in range(cards_per_page)
+    )
+    return (
+        '<!doctype html><html lang="ja-jp"><head><meta charset="utf-8"><title>Amazon.co.jp : フィクスチャ</title>'
+        + _FILLER * 20 + '</head><body><div id="a-page"><div class="s-main-slot s-result-list s-search-results sg-row">'
+        + cards + '</div>' + _FILLER * 20 + '</div></body></html>'
+    )
+
+
+def detail_page_html(asin: str) -> str:
+    """商品詳細ページのHTML"""
+    rng = random.Random(asin)
+    title = rng.choice(TITLES)
+    price = rng.randint(300, 9000)
+    return f'''<!doctype html><html lang="ja-jp"><head><meta charset="utf-8"><title>{title}</title>{_FILLER * 30}</head><body>
+<div id="dp"><div id="centerCol">
+  <h1 id="title" class="a-size-large"><span id="productTitle" class="a-size-large product-title-word-break">{title}</span></h1>
+  <div id="bylineInfo_feature_div"><a id="bylineInfo" href="#">ブランド: フィクスチャ</a></div>
+  <div id="averageCustomerReviews"><span class="a-icon-alt">5つ星のうち{round(rng.uniform(3, 5), 1)}</span>
+    <span id="acrCustomerReviewText">{rng.randint(1, 9999):,}個の評価</span></div>
+  <div id="corePrice_feature_div"><span class="a-price"><span class="a-offscreen">￥{price:,}</span></span></div>
+  <div id="feature-bullets"><ul><li><span class="a-list-item">{title} の特徴</span></li>
+    <li><span class="a-list-item">1ロールあたり75m</span></li></ul></div>
+</div>
+<div id="imgTagWrapperId"><img id="landingImage" src="https://m.media-amazon.com/images/I/{asin}.jpg"></div>
+<div id="productDescription"><p>{title}。詳しい商品説明です。</p></div>
+{_FILLER * 30}
+</div></body></html>'''
+
+
+# assets=True のときにページに埋め込むサブリソース（実際のページの画像・CSS・フォント・広告スクリプトの代わり）
+ASSET_TYPES = {
+    '.jpg': ('image/jpeg', 25_000),
+    '.css': ('text/css', 120_000),
+    '.woff2': ('font/woff2', 40_000),
+    '.js': ('application/javascript', 80_000),
+}
+
+
+def with_assets(html: str) -> str:
+    """画像をローカルのURLに書き換え、CSS・フォント・サードパーティスクリプトの読み込みを追加する"""
+    head = (
+        '<link rel="stylesheet" href="/assets/css/main.css">'
+        '<link rel="preload" as="font" type="font/woff2" href="/assets/fonts/amazon-ember.woff2" crossorigin>'
+        '<script src="/amazon-adsystem.com/aax2/apstag.js"></script>'
+    )
+    return html.replace('https://m.media-amazon.com/images/', '/images/').replace('</head>', head + '</head>', 1)
+
+
+def build_search_fixtures(pages: int, cards_per_page: int = 48) -> List[str]:
+    """ベンチマーク用の検索結果ページを複数生成"""
+    return [search_page_html(page_num, cards_per_page) for page_num in range(1, pages + 1)]
+
+
+class FixtureServer:
+    """検索結果・商品詳細のフィクスチャを返すローカルHTTPサーバー
+
+    /s?...&page=N は検索結果ページ、/dp/ASIN は詳細ページを返す。
+    assets=True ならページに画像・CSS・フォント・広告スクリプトを埋め込み、それらのリクエストにも応答する。
+    配信したバイト数とリクエスト数を記録する。
+    """
+
+    def __init__(self, cards_per_page: int = 48, assets: bool = False):
+        self.cards_per_page = cards_per_page
+        self.assets = assets
+        self.bytes_sent = 0
+        self.requests = 0
+        self._cache: Dict[str, Tuple[str, bytes]] = {}
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def _render(self, path: str) -> Tuple[str, bytes]:
+        if path in self._cache:
+            return self._cache[path]
+        parsed = urlparse(path)
+        extension = os.path.splitext(parsed.path)[1]
+        if extension in ASSET_TYPES:
+            content_type, size = ASSET_TYPES[extension]
+            self._cache[path] = (content_type, b'\0' * size)
+            return self._cache[path]
+        if parsed.path.startswith('/dp/'):
+            html = detail_page_html(parsed.path.split('/')[2])
+        else:
+            params = dict(p.split('=', 1) for p in parsed.query.split('&') if '=' in p)
+            html = search_page_html(int(params.get('page', '1')), self.cards_per_page)
+        if self.assets:
+            html = with_assets(html)
+        self._cache[path] = ('text/html; charset=utf-8', html.encode('utf-8'))
+        return self._cache[path]
+
+    def start(self) -> str:
+        fixture = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                content_type, body = fixture._render(self.path)
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                with fixture._lock:
+                    fixture.bytes_sent += len(body)
+                    fixture.requests += 1
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self.url
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def stop(self) -> None:
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,146 @@
+"""
+ベンチマーク用のOpenAI互換サーバー
+
+/v1/chat/completions だけを実装し、プロンプト中の商品名から正規表現で値を作って返す。
+まとめて抽出するプロンプト（商品リストのJSONを含む）にはJSON配列で応答する。
+同時リクエスト数が max_concurrent を超えると429を返すので、再試行の確認にも使える。
+"""
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+
+ITEMS_PATTERN = re.compile(r'# 商品リスト（JSON）\s*(\[.*?\])\s*# 出力形式', re.DOTALL)
+TITLE_PATTERN = re.compile(r'(?:商品名|タイトル): (.*)')
+
+
+def fake_fields(title: str) -> Dict[str, Any]:
+    """商品名から各商品タイプの項目をそれらしく作る"""
+    def number(pattern: str) -> Optional[float]:
+        match = re.search(pattern, title)
+        return float(match.group(1)) if match else None
+
+    roll_count = number(r'(\d+)ロール')
+    mask_count = number(r'(\d+)枚')
+    return {
+        'roll_count': int(roll_count) if roll_count else None,
+        'length_m': number(r'(\d+(?:\.\d+)?)m(?![lL])'),
+        'is_double': 'ダブル' in title if ('ダブル' in title or 'シングル' in title) else None,
+        'volume_ml': number(r'(\d+)ml'),
+        'is_refill': '詰め替え' in title or '詰替' in title,
+        'is_dishwasher': '食洗機' in title,
+        'mask_count': int(mask_count) if mask_count else None,
+        'mask_size': 'regular' if 'ふつう' in title else None,
+        'mask_color': 'white',
+    }
+
+
+class FakeOpenAIServer:
+    """chat.completionsに応答するOpenAIの代替サーバー"""
+
+    def __init__(self, latency: float = 0.5, per_item_latency: float = 0.01, max_concurrent: int = 0):
+        self.latency = latency  # 1リクエストあたりの応答時間（秒）
+        self.per_item_latency = per_item_latency  # まとめて抽出するときの1商品あたりの追加時間（秒）
+        self.max_concurrent = max_concurrent  # 0なら無制限
+        self.requests = 0
+        self.rate_limited = 0
+        self.prompt_chars = 0
+        self._active = 0
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def reset_counts(self) -> None:
+        self.requests = 0
+        self.rate_limited = 0
+        self.prompt_chars = 0
+
+    def _answer(self, prompt: str) -> str:
+        items_match = ITEMS_PATTERN.search(prompt)
+        if items_match:
+            items = json.loads(items_match.group(1))
+            time.sleep(self.per_item_latency * len(items))
+            return json.dumps(
+                [{'asin': item['asin'], **fake_fields(item['title'])} for item in items],
+                ensure_ascii=False
+            )
+        title_match = TITLE_PATTERN.search(prompt)
+        return json.dumps(fake_fields(title_match.group(1) if title_match else ''), ensure_ascii=False)
+
+    def start(self) -> str:
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _send(self, status: int, payload: Any):
+                body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                request = json.loads(self.rfile.read(length) or b'{}')
+                prompt = '\n'.join(message.get('content', '') for message in request.get('messages', []))
+
+                with stub._lock:
+                    if stub.max_concurrent and stub._active >= stub.max_concurrent:
+                        stub.rate_limited += 1
+                        limited = True
+                    else:
+                        stub._active += 1
+                        stub.requests += 1
+                        stub.prompt_chars += len(prompt)
+                        limited = False
+                if limited:
+                    self._send(429, {'error': {'message': 'Rate limit reached', 'type': 'rate_limit_error', 'code': 'rate_limit_exceeded'}})
+                    return
+
+                try:
+                    time.sleep(stub.latency)
+                    content = stub._answer(prompt)
+                finally:
+                    with stub._lock:
+                        stub._active -= 1
+
+                self._send(200, {
+                    'id': f'chatcmpl-{stub.requests}',
+                    'object': 'chat.completion',
+                    'created': int(time.time()),
+                    'model': request.get('model', 'gpt-4o-mini'),
+                    'choices': [{
+                        'index': 0,
+                        'message': {'role': 'assistant', 'content': content},
+                        'finish_reason': 'stop',
+                    }],
+                    'usage': {'prompt_tokens': len(prompt), 'completion_tokens': len(content), 'total_tokens': len(prompt) + len(content)},
+                })
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self.url
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}/v1"
+
+    def stop(self) -> None:
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,271 @@
+"""
+ベンチマーク用のPostgREST代替サーバー
+
+Supabaseクライアントを向けるとテーブルをメモリ上に保持して応答する。
+リクエスト数をテーブル・メソッドごとに数え、asin が "BAD" で始まる行を含む書き込みは400を返す
+（一括書き込みが失敗したときに失敗した行を特定できるか確認するため）。
+対応しているのは 列=eq./neq./in./gt./gte./lt./lte./is./not.is./ilike. の絞り込みと and=(...) / or=(...)、
+select（列の指定）、order（複数列、nullsfirst/nullslast）、limit/offset と
+upsert（Prefer: resolution=merge-duplicates。キーは on_conflict、省略時は asin）のみ。
+GETで返した行数を rows_read に、レスポンスのバイト数を bytes_sent に数える。
+"""
+import json
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlparse
+
+# supabase-pyのキー形式チェックを通すためのダミーJWT
+DUMMY_SUPABASE_KEY = (
+    "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9."
+    "eyJyb2xlIjoiYW5vbiIsImlzcyI6ImJlbmNobWFyayJ9."
+    "c2lnbmF0dXJl"
+)
+
+
+class PostgrestServer:
+    """メモリ上のテーブルを持つPostgRESTの代替サーバー"""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency  # 1リクエストあたりの疑似ネットワーク遅延（秒）
+        self.tables: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.requests: Counter = Counter()
+        self.rows_read: Counter = Counter()
+        self.bytes_sent: Counter = Counter()
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def total_requests(self) -> int:
+        return sum(self.requests.values())
+
+    def reset_counts(self) -> None:
+        self.requests.clear()
+        self.rows_read.clear()
+        self.bytes_sent.clear()
+
+    # 絞り込み以外のクエリパラメータ
+    _RESERVED = {'select', 'order', 'limit', 'offset', 'on_conflict', 'columns'}
+
+    @staticmethod
+    def _text(value: Any) -> str:
+        if isinstance(value, bool):
+            return 'true' if value else 'false'
+        return 'null' if value is None else str(value)
+
+    def _filter_rows(self, table: str, query: str) -> List[Dict[str, Any]]:
+        rows = list(self.tables.get(table, {}).values())
+        for column, value in parse_qsl(query):
+            if column in self._RESERVED:
+                continue
+            if column in ('and', 'or'):
+                condition = self._parse_logic(column, value[1:-1])
+            else:
+                op, _, operand = value.partition('.')
+                condition = ('cmp', column, op, operand)
+            rows = [row for row in rows if self._match(row, condition)]
+        return rows
+
+    @staticmethod
+    def _split(text: str) -> List[str]:
+        """カンマ区切り（括弧とダブルクォートの中のカンマは区切らない）"""
+        parts, depth, quoted, current = [], 0, False, ''
+        for char in text:
+            if char == '"':
+                quoted = not quoted
+            elif not quoted and char == '(':
+                depth += 1
+            elif not quoted and char == ')':
+                depth -= 1
+            if char == ',' and depth == 0 and not quoted:
+                parts.append(current)
+                current = ''
+            else:
+                current += char
+        return parts + [current] if current else parts
+
+    def _parse_logic(self, kind: str, text: str) -> Tuple:
+        """and=(...) / or=(...) の中身を (kind, [条件, ...]) にする"""
+        conditions = []
+        for part in self._split(text):
+            if part.startswith(('and(', 'or(')):
+                name, _, rest = part.partition('(')
+                conditions.append(self._parse_logic(name, rest[:-1]))
+            else:
+                column, _, rest = part.partition('.')
+                op, _, operand = rest.partition('.')
+                conditions.append(('cmp', column, op, operand))
+        return (kind, conditions)
+
+    def _match(self, row: Dict[str, Any], condition: Tuple) -> bool:
+        if condition[0] == 'and':
+            return all(self._match(row, child) for child in condition[1])
+        if condition[0] == 'or':
+            return any(self._match(row, child) for child in condition[1])
+        _, column, op, operand = condition
+        if len(operand) >= 2 and operand[0] == operand[-1] == '"':
+            operand = operand[1:-1].replace('\\"', '"').replace('\\\\', '\\')
+        if operand.lower() in ('true', 'false', 'null'):
+            operand = operand.lower()  # postgrest-pyは eq.True のように送る
+        value = row.get(column)
+        if op == 'not' and operand.startswith('is.'):
+            return self._text(value) != operand[3:]
+        if op in ('is', 'eq'):
+            return self._text(value) == operand
+        if op == 'neq':
+            return self._text(value) != operand
+        if op == 'in':
+            return self._text(value) in set(operand[1:-1].replace('"', '').split(','))
+        if op == 'ilike':
+            pattern = re.compile('.*'.join(re.escape(part) for part in re.split(r'[%*]', operand)), re.IGNORECASE)
+            return value is not None and bool(pattern.fullmatch(str(value)))
+        if op in ('gt', 'gte', 'lt', 'lte'):
+            if value is None:
+                return False
+            # 数値の列は数値で、日付・日時（ISO形式の文字列）やasinは文字列で比べる
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                left, right = float(value), float(operand)
+            else:
+                left, right = str(value), operand
+            return {'gt': left > right, 'gte': left >= right, 'lt': left < right, 'lte': left <= right}[op]
+        return True
+
+    def _page(self, rows: List[Dict[str, Any]], query: str) -> List[Dict[str, Any]]:
+        params = dict(parse_qsl(query))
+        if 'order' in params:
+            # 後ろの列から順に安定ソートする（PostgreSQLと同じく、既定は昇順ならnullが最後・降順なら最初）
+            for term in reversed(params['order'].split(',')):
+                column, *options = term.split('.')
+                desc = 'desc' in options
+                nulls_last = 'nullslast' in options or (not desc and 'nullsfirst' not in options)
+                present = [row for row in rows if row.get(column) is not None]
+                missing = [row for row in rows if row.get(column) is None]
+                present.sort(key=lambda row: row[column], reverse=desc)
+                rows = present + missing if nulls_last else missing + present
+        start = int(params.get('offset', 0))
+        end = start + int(params['limit']) if 'limit' in params else None
+        rows = rows[start:end]
+        columns = params.get('select', '*')
+        if columns != '*':
+            names = columns.split(',')
+            rows = [{name: row[name] for name in names if name in row} for row in rows]
+        return rows
+
+    def _write(self, table: str, body: Any, upsert: bool, on_conflict: str = 'asin') -> Optional[str]:
+        rows = body if isinstance(body, list) else [body]
+        if any(str(row.get('asin') or '').startswith('BAD') for row in rows):
+            return "invalid input syntax for type numeric"
+        if len({frozenset(row.keys()) for row in rows}) > 1:
+            return "All object keys must match"
+        with self._lock:
+            stored = self.tables.setdefault(table, {})
+            for row in rows:
+                # upsertはon_conflictの列（既定はasin）をキーにし、通常のinsertは常に追加する
+                key = self._key(row, on_conflict) if upsert else str(len(stored))
+                if upsert and key in stored:
+                    stored[key].update(row)
+                else:
+                    stored[key] = dict(row)
+        return None
+
+    @staticmethod
+    def _key(row: Dict[str, Any], on_conflict: str) -> Any:
+        columns: Tuple[str, ...] = tuple(on_conflict.split(','))
+        if len(columns) == 1:
+            return row.get(columns[0])
+        return '|'.join(str(row.get(column)) for column in columns)
+
+    def start(self) -> str:
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _send(self, status: int, payload: Any = None):
+                body = b'' if payload is None else json.dumps(payload, ensure_ascii=False).encode('utf-8')
+                with stub._lock:
+                    stub.bytes_sent[self._table()] += len(body)
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _table(self) -> str:
+                return urlparse(self.path).path.rsplit('/', 1)[-1]
+
+            def _read_body(self, default: Any) -> Any:
+                length = int(self.headers.get('Content-Length', 0))
+                return json.loads(self.rfile.read(length) or b'null') if length else default
+
+            def _count(self):
+                with stub._lock:
+                    stub.requests[(self._table(), self.command)] += 1
+                if stub.latency:
+                    time.sleep(stub.latency)
+
+            def do_GET(self):
+                self._count()
+                self._read_body(None)  # postgrest-pyはGETでも空のJSONを送る
+                query = urlparse(self.path).query
+                rows = stub._page(stub._filter_rows(self._table(), query), query)
+                with stub._lock:
+                    stub.rows_read[self._table()] += len(rows)
+                self._send(200, rows)
+
+            def do_POST(self):
+                self._count()
+                body = self._read_body([])
+                upsert = 'merge-duplicates' in (self.headers.get('Prefer') or '')
+                on_conflict = dict(parse_qsl(urlparse(self.path).query)).get('on_conflict', 'asin')
+                error = stub._write(self._table(), body, upsert, on_conflict)
+                if error:
+                    self._send(400, {'code': 'PGRST102', 'message': error, 'details': None, 'hint': None})
+                else:
+                    self._send(201, [])
+
+            def do_PATCH(self):
+                self._count()
+                body = self._read_body({})
+                rows = stub._filter_rows(self._table(), urlparse(self.path).query)
+                for row in rows:
+                    row.update(body)
+                self._send(200, rows)
+
+            def do_DELETE(self):
+                self._count()
+                self._read_body(None)
+                rows = stub._filter_rows(self._table(), urlparse(self.path).query)
+                with stub._lock:
+                    table = stub.tables.get(self._table(), {})
+                    for row in rows:
+                        table.pop(row.get('asin'), None)
+                self._send(200, rows)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self.url
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def stop(self) -> None:
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
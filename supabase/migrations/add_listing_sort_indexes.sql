@@ -0,0 +1,47 @@
+-- Create indexes for listing pagination
+-- 一覧のページング（app/pagination.py）は ORDER BY <並び替えの列> NULLS LAST, asin で limit 件を読み、
+-- 次のページは前のページの最後の (値, asin) より後ろから読む。並び順と同じ索引があれば、
+-- 何ページ目でもテーブル全体を並べ替えずに索引をたどって limit 件を読むだけで済む。
+-- unit_price は昇順、total_score / discount / review_count は降順（asinはどちらも昇順）
+
+-- トイレットペーパー
+CREATE INDEX IF NOT EXISTS idx_toilet_paper_products_page_unit_price
+    ON public.toilet_paper_products(price_per_m ASC NULLS LAST, asin);
+CREATE INDEX IF NOT EXISTS idx_toilet_paper_products_page_total_score
+    ON public.toilet_paper_products(total_score DESC NULLS LAST, asin);
+CREATE INDEX IF NOT EXISTS idx_toilet_paper_products_page_discount
+    ON public.toilet_paper_products(discount_percent DESC NULLS LAST, asin);
+CREATE INDEX IF NOT EXISTS idx_toilet_paper_products_page_review_count
+    ON public.toilet_paper_products(review_count DESC NULLS LAST, asin);
+
+-- 食器用洗剤
+CREATE INDEX IF NOT EXISTS idx_dishwashing_liquid_products_page_unit_price
+    ON public.dishwashing_liquid_products(price_per_1000ml ASC NULLS LAST, asin);
+CREATE INDEX IF NOT EXISTS idx_dishwashing_liquid_products_page_total_score
+    ON public.dishwashing_liquid_products(total_score DESC NULLS LAST, asin);
+CREATE INDEX IF NOT EXISTS idx_dishwashing_liquid_products_page_discount
+    ON public.dishwashing_liquid_products(discount_percent DESC NULLS LAST, asin);
+CREATE INDEX IF NOT EXISTS idx_dishwashing_liquid_products_page_review_count
+    ON public.dishwashing_liquid_products(review_count DESC NULLS LAST, asin);
+
+-- ミネラルウォーター
+CREATE INDEX IF NOT EXISTS idx_mineral_water_products_page_unit_price
+    ON public.mineral_water_products(price_per_liter ASC NULLS LAST, asin);
+CREATE INDEX IF NOT EXISTS idx_mineral_water_products_page_total_score
+    ON public.mineral_water_products(total_score DESC NULLS LAST, asin);
+CREATE INDEX IF NOT EXISTS idx_mineral_water_products_page_discount
+    ON public.mineral_water_products(discount_percent DESC NULLS LAST, asin);
+CREATE INDEX IF NOT EXISTS idx_mineral_water_products_page_review_count
+    ON public.mineral_water_products(review_count DESC NULLS LAST, asin);
+
+-- 米
+CREATE INDEX IF NOT EXISTS idx_rice_products_page_unit_price
+    ON public.rice_products(price_per_kg ASC NULLS LAST, asin);
+CREATE INDEX IF NOT EXISTS idx_rice_products_page_total_score
+    ON public.rice_products(total_score DESC NULLS LAST, asin);
+CREATE INDEX IF NOT EXISTS idx_rice_products_page_discount
+    ON public.rice_products(discount_percent DESC NULLS LAST, asin);
+CREATE INDEX IF NOT EXISTS idx_rice_products_page_review_count
+    ON public.rice_products(review_count DESC NULLS LAST, asin);
+
+-- マスクはメモリ上のファセット索引（app/utils/facet_index.py）で並べるので索引は不要
@@ -0,0 +1,9 @@
+-- Add refresh attempt columns to toilet_paper_products
+-- 価格を取得できなかった商品は last_fetched_at が更新されないため、毎回の価格更新で予定時刻を過ぎたままになる。
+-- 最後に取得を試みた日時と連続失敗回数を記録し、スケジューラー（app/refresh_scheduler.py）は
+-- 失敗回数に応じて次の試行を遅らせ、正常な商品の後に選ぶ。
+ALTER TABLE public.toilet_paper_products
+ADD COLUMN IF NOT EXISTS last_attempted_at TIMESTAMPTZ;
+
+ALTER TABLE public.toilet_paper_products
+ADD COLUMN IF NOT EXISTS refresh_failures INTEGER NOT NULL DEFAULT 0;
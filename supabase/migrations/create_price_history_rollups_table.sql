@@ -0,0 +1,59 @@
+-- Create price_history_rollups table
+-- ASINごとの日次・週次の価格の集計（app/price_history.py が履歴の書き出しのたびに加算する）
+-- 平均は sum / samples で求める
+CREATE TABLE IF NOT EXISTS public.price_history_rollups (
+    id SERIAL PRIMARY KEY,
+    asin VARCHAR(20) NOT NULL,
+    period VARCHAR(10) NOT NULL CHECK (period IN ('day', 'week')),
+    period_start DATE NOT NULL,
+    price_min INTEGER,
+    price_max INTEGER,
+    price_sum BIGINT DEFAULT 0,
+    price_samples INTEGER DEFAULT 0,
+    price_per_m_min NUMERIC(10, 2),
+    price_per_m_max NUMERIC(10, 2),
+    price_per_m_sum NUMERIC(14, 2) DEFAULT 0,
+    price_per_m_samples INTEGER DEFAULT 0,
+    sale_samples INTEGER DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    UNIQUE (asin, period, period_start)
+);
+
+-- /api/price-history/{asin} は (asin, period) で絞り込み、period_startの新しい順に読む
+CREATE INDEX IF NOT EXISTS idx_price_history_rollups_series
+    ON public.price_history_rollups(asin, period, period_start DESC);
+
+-- 既存の価格履歴から日次・週次の集計を作る（以降はapp/price_history.pyが書き出しのたびに加算する）
+-- 期間の開始はUTCの日付・月曜始まりの週（app/price_history.py の period_start と同じ）
+-- 作成済みの集計は上書きしない（再実行しても二重に加算しない）
+INSERT INTO public.price_history_rollups (
+    asin, period, period_start,
+    price_min, price_max, price_sum, price_samples,
+    price_per_m_min, price_per_m_max, price_per_m_sum, price_per_m_samples,
+    sale_samples
+)
+SELECT
+    h.asin,
+    p.period,
+    date_trunc(p.period, h.recorded_at AT TIME ZONE 'UTC')::date AS period_start,
+    MIN(h.price), MAX(h.price), COALESCE(SUM(h.price), 0), COUNT(h.price),
+    MIN(h.price_per_m), MAX(h.price_per_m), COALESCE(SUM(h.price_per_m), 0), COUNT(h.price_per_m),
+    COUNT(*) FILTER (WHERE h.on_sale)
+FROM public.price_history h
+CROSS JOIN (VALUES ('day'), ('week')) AS p(period)
+WHERE h.recorded_at IS NOT NULL
+GROUP BY h.asin, p.period, date_trunc(p.period, h.recorded_at AT TIME ZONE 'UTC')::date
+ON CONFLICT (asin, period, period_start) DO NOTHING;
+
+-- Enable RLS
+ALTER TABLE public.price_history_rollups ENABLE ROW LEVEL SECURITY;
+
+-- Create policy for public read access
+CREATE POLICY "Allow public read access" ON public.price_history_rollups
+    FOR SELECT
+    USING (true);
+
+-- Create policy for authenticated write access (for admin)
+CREATE POLICY "Allow authenticated write access" ON public.price_history_rollups
+    FOR ALL
+    USING (auth.role() = 'authenticated');